@@ -30,6 +30,8 @@ tmesh = UniformTimeLine(0, T, nt)
 tau = tmesh.dt
 
 solver = NSMacSolver(Re, mesh)
+# 压力修正量的快速解法器（离散余弦变换）
+psolver = solver.pressure_solver()
 np.set_printoptions(linewidth=1000)
 
 #网格点的位置
@@ -168,10 +170,9 @@ for i in range(2):
     w_1 = np.stack((u_1,v_1),axis=1) 
     
     #求解修正项
-    H = solver.laplace_phi() 
     dpm_u,dpm_v = solver.dpm()
     M = (dpm_u*u_1+dpm_v*v_1)/tau 
-    K = spsolve(H,M) 
+    K = -psolver.solve(M)
     mean = np.sum(K*hx*hy)/(nx*hx*ny*hy)
     K -= mean
     phi = result_phi(K,solver.pmesh) 
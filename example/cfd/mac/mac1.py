@@ -31,6 +31,8 @@ tau = tmesh.dt
 
 #建立Solver
 solver = NSMacSolver(Re, mesh)
+# 压力修正量的快速解法器（离散余弦变换）
+psolver = solver.pressure_solver()
 
 #网格点的位置
 nodes_u = solver.umesh.entity('node') 
@@ -142,15 +144,12 @@ for i in range(2,100):
     v_1 = spsolve(A_v,b_v)
     v_1[is_boundaryv] = dirchiletv
     
-    # 第三步左端矩阵组装
-    H = solver.laplace_phi()
-    
     # 第三步右端向量组装
     dpm_u,dpm_v = solver.dpm()
     M = (dpm_u*u_1+dpm_v*v_1)/tau 
 
     # 第三步求解
-    K = spsolve(H,M) 
+    K = -psolver.solve(M)
     mean = np.sum(K*hx*hy)/(nx*hx*ny*hy)
     K -= mean
     Nrow = mesh.node.shape[1]
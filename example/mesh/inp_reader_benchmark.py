@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+#
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+
+from fealpy.mesh import TetrahedronMesh, HexahedronMesh, InpFileReader
+
+
+parser = argparse.ArgumentParser(description=
+        """
+        比较 Abaqus .inp 文件的两种读入方法的时间:
+        逐行用 Python 字符串处理的方法与按数据块整块转换的 InpFileReader
+        """)
+
+parser.add_argument('--mesh',
+        default='tet', type=str,
+        help="网格类型, 可选 tet, hex, 默认 tet")
+
+parser.add_argument('--ncells',
+        default=[100000, 1000000, 5000000], type=int, nargs='+',
+        help="网格单元个数的近似值, 可以给多个, 默认 100000 1000000 5000000")
+
+parser.add_argument('--old',
+        default=1, type=int,
+        help="是否同时测试原来逐行处理的方法, 默认 1")
+
+args = parser.parse_args()
+
+meshes = {
+        'tet': (TetrahedronMesh, 'C3D4', 6),
+        'hex': (HexahedronMesh, 'C3D8R', 1)}
+
+Mesh, etype, nsub = meshes[args.mesh]
+
+
+def write_inp(fname, mesh):
+    node = mesh.entity('node')
+    cell = mesh.entity('cell')
+    NN = len(node)
+    NC = len(cell)
+    with open(fname, 'w') as f:
+        f.write('*Heading\n*Part, name=Part-1\n*Node\n')
+        np.savetxt(f, np.c_[np.arange(1, NN+1), node], fmt='%d, %.12g, %.12g, %.12g')
+        f.write(f'*Element, type={etype}\n')
+        np.savetxt(f, np.c_[np.arange(1, NC+1), cell+1], fmt='%d', delimiter=', ')
+        f.write('*End Part\n')
+
+
+def old_read(fname):
+    """
+    原来的方法: 读入整个文件, 逐行切分字符串并用字典映射编号
+    """
+    with open(fname, 'r') as f:
+        contents = f.read().split('\n')
+    node = []
+    nmap = {}
+    elem = []
+    k = 0
+    while k < len(contents):
+        line = contents[k]
+        if line.startswith('*Node'):
+            k += 1
+            i = 0
+            while not contents[k].startswith('*'):
+                s = contents[k].split(',')
+                node.append((float(s[1]), float(s[2]), float(s[3])))
+                nmap[int(s[0])] = i
+                i += 1
+                k += 1
+        elif line.startswith('*Element'):
+            k += 1
+            while not contents[k].startswith('*'):
+                ss = contents[k].split(',')
+                elem.append([nmap[int(s)] for s in ss[1:]])
+                k += 1
+        else:
+            k += 1
+    return np.array(node, dtype=np.float64), np.array(elem, dtype=np.int_)
+
+
+with tempfile.TemporaryDirectory() as d:
+    fname = os.path.join(d, 'test.inp')
+    for NC in args.ncells:
+        n = max(int(round((NC/nsub)**(1/3))), 1)
+        mesh = Mesh.from_box(nx=n, ny=n, nz=n)
+        write_inp(fname, mesh)
+        size = os.path.getsize(fname)/2**20
+        print(f"{args.mesh} 网格, 单元个数: {mesh.number_of_cells()}, "
+              f"节点个数: {mesh.number_of_nodes()}, 文件大小: {size:.1f} MB")
+
+        start = time.perf_counter()
+        reader = InpFileReader(fname)
+        reader.parse()
+        node, _ = reader.parts['Part-1']['node']
+        cell, _ = reader.parts['Part-1']['elem'][etype]
+        t0 = time.perf_counter() - start
+        assert np.allclose(node, mesh.entity('node'))
+        assert np.all(cell == mesh.entity('cell'))
+        print(f"    InpFileReader {t0:.3f} s", end='')
+
+        if args.old:
+            start = time.perf_counter()
+            node1, cell1 = old_read(fname)
+            t1 = time.perf_counter() - start
+            assert np.all(cell1 == cell)
+            print(f", 逐行处理 {t1:.3f} s, 加速比 {t1/t0:.1f}")
+        else:
+            print()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+#
+
+import argparse
+import time
+import numpy as np
+
+from fealpy.mesh import TriangleMesh, QuadrangleMesh
+from fealpy.mesh import TetrahedronMesh, HexahedronMesh
+from fealpy.mesh.mesh_data_structure import unique_entity
+
+
+parser = argparse.ArgumentParser(description=
+        """
+        比较网格拓扑构造中两种查找面（边）的方法的时间:
+        np.unique(np.sort(total, axis=1), axis=0) 与 int64 键值排序 unique_entity
+        """)
+
+parser.add_argument('--mesh',
+        default='tet', type=str,
+        help="网格类型, 可选 tri, quad, tet, hex, 默认 tet")
+
+parser.add_argument('--ncells',
+        default=[1000000, 5000000, 10000000], type=int, nargs='+',
+        help="网格单元个数的近似值, 可以给多个, 默认 1000000 5000000 10000000, "
+             "50000000 个单元时需要几十 GB 内存")
+
+parser.add_argument('--old',
+        default=1, type=int,
+        help="是否同时测试原来的 np.unique 方法, 默认 1")
+
+args = parser.parse_args()
+
+meshes = {
+        'tri': (TriangleMesh, 2, 2),
+        'quad': (QuadrangleMesh, 2, 1),
+        'tet': (TetrahedronMesh, 3, 6),
+        'hex': (HexahedronMesh, 3, 1)}
+
+Mesh, TD, nsub = meshes[args.mesh]
+
+
+def old_unique(total):
+    _, i0, j = np.unique(np.sort(total, axis=1),
+            return_index=True,
+            return_inverse=True,
+            axis=0)
+    return i0, j
+
+
+for NC in args.ncells:
+    n = max(int(round((NC/nsub)**(1/TD))), 1)
+    if TD == 2:
+        mesh = Mesh.from_box(nx=n, ny=n)
+    else:
+        mesh = Mesh.from_box(nx=n, ny=n, nz=n)
+    ds = mesh.ds
+    NN = mesh.number_of_nodes()
+    print(f"{args.mesh} 网格, 单元个数: {mesh.number_of_cells()}, 节点个数: {NN}")
+
+    start = time.perf_counter()
+    ds.construct()
+    print(f"    construct 总时间: {time.perf_counter() - start:.3f} s")
+
+    totals = [('face', ds.total_face())]
+    if TD == 3:
+        totals.append(('edge', ds.total_edge()))
+
+    for name, total in totals:
+        start = time.perf_counter()
+        i0, j = unique_entity(total, NN=NN)
+        t0 = time.perf_counter() - start
+        print(f"    {name}: unique_entity {t0:.3f} s", end='')
+        if args.old:
+            start = time.perf_counter()
+            i1, j1 = old_unique(total)
+            t1 = time.perf_counter() - start
+            assert np.all(i0 == i1) and np.all(j == j1.reshape(-1))
+            print(f", np.unique {t1:.3f} s, 加速比 {t1/t0:.1f}")
+        else:
+            print()
@@ -27,14 +27,23 @@ class NSFEMSolver:
         self.dt = dt
 
         ##\rho u
-        bform = BilinearForm((self.uspace,)*2)
-        bform.add_domain_integrator(VectorMassIntegrator(c=rho, q=q))
-        self.M = bform.assembly() 
+        # 这些双线性型在时间步之间保留, 系数改变时只更新积分子的系数再做数值
+        # 组装, 复用积分点上的基函数值和全局矩阵的稀疏模式
+        self._mi = VectorMassIntegrator(c=rho, q=q)
+        self._mform = BilinearForm((self.uspace,)*2, cache=True)
+        self._mform.add_domain_integrator(self._mi)
+        self.M = self._mform.assembly().copy()
         
         ##mu * \laplace u
-        bform = BilinearForm((self.uspace,)*2)
-        bform.add_domain_integrator(VectorDiffusionIntegrator(c=self.mu, q=q))
-        self.S = bform.assembly() 
+        self._si = VectorDiffusionIntegrator(c=self.mu, q=q)
+        self._sform = BilinearForm((self.uspace,)*2, cache=True)
+        self._sform.add_domain_integrator(self._si)
+        self.S = self._sform.assembly().copy()
+
+        ##u \cdot \nabla u
+        self._ci = VectorConvectionIntegrator(c=None, q=q)
+        self._cform = BilinearForm((self.uspace,)*2)
+        self._cform.add_domain_integrator(self._ci)
         
         ##\laplace p
         bform = BilinearForm(self.pspace)
@@ -45,26 +54,71 @@ class NSFEMSolver:
         bform = MixedBilinearForm((self.pspace,), 2*(self.uspace,)) 
         bform.add_domain_integrator(PressWorkIntegrator(q=q)) 
         self.AP = bform.assembly()
-    
+
+        self._A = None # Oseen 块矩阵, 第一次调用 ossen_A 时建立稀疏结构
+        self._kslot = None # 速度块的非零元在块矩阵 data 数组中的位置
+        self._kindex = None # 与 _kslot 对应的速度块 data 数组的下标
+
+    def _assembly(self, form, integrator, c):
+        """
+        @brief 更新积分子的系数, 重新做数值组装
+
+        @note 返回的矩阵对象会在下一次组装时被覆盖
+        """
+        integrator.coef = c
+        return form.assembly()
+
+    def _oseen_structure(self, K):
+        """
+        @brief 建立 Oseen 块矩阵
+                [[K, -AP],
+                 [AP.T, 0]]
+               的稀疏结构, 并记录速度块 K 的每个非零元在块矩阵中的位置
+        """
+        AP = self.AP.tocsr()
+        APT = AP.T.tocsr()
+        n0 = K.nnz
+        n1 = n0 + AP.nnz
+
+        # 用非零元的编号作为值组装块矩阵, 组装后的值就是每个位置对应的编号
+        mark = lambda M, start: csr_matrix(
+                (np.arange(start+1, start+M.nnz+1, dtype=np.float64), M.indices, M.indptr),
+                shape=M.shape)
+        A = bmat([[mark(K, 0), mark(AP, n0)],
+                  [mark(APT, n1), None]], format='csr')
+        perm = A.data.astype(np.int_) - 1
+
+        A.data = np.concatenate((K.data, -AP.data, APT.data))[perm]
+        isK = perm < n0
+        self._kslot, = np.nonzero(isK)
+        self._kindex = perm[isK]
+        self._kpattern = (K.indices.copy(), K.indptr.copy())
+        self._A = A
+
     #u \cdot u   \approx   u^n \cdot u^{n+1}
     def ossen_A(self,un, mu=None ,rho=None):
-        AP = self.AP
+        """
+        @brief 组装 Oseen 方程的块矩阵
+
+        @note 块矩阵的稀疏结构只在第一次调用时建立, 之后每一步只把新的
+              1/dt*M + S + C 的值写到速度块对应的位置。M、S、C 共用同一个
+              向量空间的稀疏模式, 所以它们的 data 数组可以直接相加。
+              和 `BilinearForm.assembly` 一样, 每次调用返回同一个矩阵对象,
+              下一次调用会覆盖它的值。需要保留或者原地修改（如处理边界条件）
+              时, 调用者应先复制一份。
+        """
         if rho is None:
             M = self.M
         else:
-            bform = BilinearForm((self.uspace,)*2)
-            bform.add_domain_integrator(VectorMassIntegrator(c=rho, q=self.q))
-            M = bform.assembly() 
+            M = self._assembly(self._mform, self._mi, rho)
 
         if mu is None:
             S = self.S
         else:
-            bform = BilinearForm((self.uspace,)*2)
-            bform.add_domain_integrator(VectorDiffusionIntegrator(c=mu, q=self.q))
-            S = bform.assembly()
+            S = self._assembly(self._sform, self._si, mu)
 
-        SP = self.SP
         dt = self.dt
+        rho = self.rho if rho is None else rho
         
         @barycentric
         def coef(bcs, index):
@@ -73,14 +127,18 @@ class NSFEMSolver:
             else:
                 return rho*un(bcs,index)
             
-        bform = BilinearForm((self.uspace,)*2)
-        bform.add_domain_integrator(VectorConvectionIntegrator(c=coef, q=self.q))
-        C = bform.assembly() 
+        C = self._assembly(self._cform, self._ci, coef)
 
-        A0 = 1/dt*M+S+C
-        A = bmat([[1/dt*M+S+C,  -AP],\
-                [AP.T, None]], format='csr')
-        return A
+        if self._A is None:
+            self._oseen_structure(C)
+        indices, indptr = self._kpattern
+        for K in (M, S, C):
+            if not (np.array_equal(K.indptr, indptr) and np.array_equal(K.indices, indices)):
+                raise ValueError("the sparsity pattern of the velocity block has been changed!")
+
+        K = 1/dt*M.data + S.data + C.data
+        self._A.data[self._kslot] = K[self._kindex]
+        return self._A
 
     def ossen_b(self, un, rho=None): 
         dt = self.dt
@@ -88,9 +146,7 @@ class NSFEMSolver:
         if rho is None:
             M = self.M
         else:
-            bform = BilinearForm((self.uspace,)*2)
-            bform.add_domain_integrator(VectorMassIntegrator(c=rho, q=self.q))
-            M = bform.assembly() 
+            M = self._assembly(self._mform, self._mi, rho)
         
         b = 1/dt * M@un.flatten()
         b = np.hstack((b,[0]*pgdof))
@@ -4,6 +4,7 @@ from scipy.sparse import diags, lil_matrix,csr_matrix
 from scipy.sparse import vstack,hstack
 from scipy.sparse.linalg import spsolve
 from ..mesh import UniformMesh2d
+from ..solver.fast_poisson_solver import FastPoissonSolver
 
 
 class NSMacSolver():
@@ -273,6 +274,17 @@ class NSMacSolver():
         A += csr_matrix((val2, (J0m, J_0m)), shape=(NN, NN), dtype=self.ftype)
         return A.toarray()
 
+    def pressure_solver(self, workers=None):
+        """
+        @brief 投影步中压力修正量 phi 的快速解法器
+
+        phi 在单元中心（pmesh 的节点）上, 满足齐次 Neumann 边界条件, 用离散余弦
+        变换求解, 不需要组装 `laplace_phi` 的稠密矩阵。当 hx = hy 时
+        `laplace_phi() @ phi = M` 的平均值为 0 的解为 `-solver.solve(M)`。
+        """
+        return FastPoissonSolver.from_mesh(self.pmesh, bc='neumann', grid='cell',
+                workers=workers)
+
     #找v网格边界点位置
     def vnodes_ub(self):
         mesh = self.mesh
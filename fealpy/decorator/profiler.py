@@ -0,0 +1,239 @@
+"""
+
+Notes
+-----
+在这个模块中, 我们引入了分层的计时与计数器统计
+"""
+
+import os
+import json
+import threading
+from time import perf_counter
+from contextlib import nullcontext
+
+
+class ScopeRecord():
+    """
+    @brief 一个计时区域的统计数据
+    """
+    __slots__ = ('name', 'count', 'time', 'nbytes', 'counters', 'children')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0 # 调用次数
+        self.time = 0.0 # 总时间（秒）
+        self.nbytes = 0 # 分配的大数组的字节数
+        self.counters = {} # 自定义计数器
+        self.children = {} # 嵌套的子区域
+
+    def self_time(self):
+        """
+        @brief 除去子区域之外的时间
+        """
+        return self.time - sum(c.time for c in self.children.values())
+
+    def to_dict(self):
+        return {'name': self.name, 'count': self.count, 'time': self.time,
+                'self_time': self.self_time(), 'nbytes': self.nbytes,
+                'counters': dict(self.counters),
+                'children': [c.to_dict() for c in self.children.values()]}
+
+
+class Scope():
+    """
+    @brief 计时区域的上下文管理器
+    """
+    __slots__ = ('profiler', 'name', 'record', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        p = self.profiler
+        stack = p._stack()
+        parent = stack[-1]
+        with p._lock:
+            record = parent.children.get(self.name)
+            if record is None:
+                record = parent.children[self.name] = ScopeRecord(self.name)
+        stack.append(record)
+        self.record = record
+        self.start = perf_counter()
+        return record
+
+    def __exit__(self, *args):
+        end = perf_counter()
+        p = self.profiler
+        t = end - self.start
+        with p._lock:
+            self.record.count += 1
+            self.record.time += t
+            if p.trace:
+                p.events.append((self.name, self.start, t, threading.get_ident()))
+        p._stack().pop()
+        if p.verbose:
+            print('run {} with time:'.format(self.name), t)
+        return False
+
+
+_NULL_SCOPE = nullcontext()
+
+
+class Profiler():
+    """
+    @brief 分层的计时与计数器注册表
+
+    用 `scope(name)` 标记一段代码, 嵌套的区域形成一棵树, 记录每个区域的调用
+    次数、总时间、分配的大数组的字节数和自定义计数器。结果可以用 `report`
+    打印, 或者导出为 JSON 和 Chrome trace（在 chrome://tracing 或 Perfetto 中
+    查看）格式。
+
+    默认关闭, 关闭时 `scope` 返回一个空的上下文管理器, `count`、`allocated`
+    只做一次属性判断, 开销可以忽略。
+
+    @note 每个线程有自己的区域栈, 线程池中的工作线程里的区域挂在根节点下
+    """
+    def __init__(self):
+        self.enabled = False
+        self.trace = False # 是否记录每一次调用的时间线, 用于 Chrome trace
+        self.verbose = False # 是否在每个区域结束时打印时间
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def enable(self, trace=False, verbose=False):
+        """
+        @brief 开启统计
+
+        @param[in] trace 是否记录时间线
+        @param[in] verbose 是否在每个区域结束时打印运行时间
+        """
+        self.enabled = True
+        self.trace = trace
+        self.verbose = verbose
+        return self
+
+    def disable(self):
+        """
+        @brief 关闭统计, 已有的数据保留
+        """
+        self.enabled = False
+        return self
+
+    def reset(self):
+        """
+        @brief 清空所有的统计数据
+        """
+        self.root = ScopeRecord('root')
+        self.events = []
+        self._t0 = perf_counter()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if (stack is None) or (stack[0] is not self.root):
+            stack = self._local.stack = [self.root]
+        return stack
+
+    def scope(self, name):
+        """
+        @brief 计时区域, 用法为 `with profiler.scope('name'): ...`
+        """
+        if not self.enabled:
+            return _NULL_SCOPE
+        return Scope(self, name)
+
+    def count(self, name, n=1):
+        """
+        @brief 当前区域的计数器 name 增加 n
+        """
+        if self.enabled:
+            counters = self._stack()[-1].counters
+            with self._lock:
+                counters[name] = counters.get(name, 0) + n
+
+    def allocated(self, a):
+        """
+        @brief 记录当前区域分配的数组
+
+        @param[in] a 数组（使用它的 nbytes 属性）或字节数
+        """
+        if self.enabled:
+            record = self._stack()[-1]
+            with self._lock:
+                record.nbytes += int(getattr(a, 'nbytes', a))
+
+    def find(self, *path):
+        """
+        @brief 按路径查找区域, 如 `find('BilinearForm.assembly', 'ScalarDiffusionIntegrator')`
+
+        @note 只给一个名字时在整棵树中查找第一个同名的区域
+        """
+        if len(path) == 1:
+            nodes = [self.root]
+            while nodes:
+                node = nodes.pop(0)
+                if node.name == path[0] and node is not self.root:
+                    return node
+                nodes.extend(node.children.values())
+            return None
+        node = self.root
+        for name in path:
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def to_dict(self):
+        return self.root.to_dict()
+
+    def to_json(self, fname=None, indent=1):
+        """
+        @brief 导出为 JSON 字符串, 给定文件名时同时写入文件
+        """
+        s = json.dumps(self.to_dict(), indent=indent)
+        if fname is not None:
+            with open(fname, 'w') as f:
+                f.write(s)
+        return s
+
+    def to_chrome_trace(self, fname=None):
+        """
+        @brief 导出为 Chrome trace 格式（需要用 `enable(trace=True)` 开启时间线）
+        """
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'ts': (start - self._t0)*1e6,
+            'dur': t*1e6, 'pid': pid, 'tid': tid}
+            for name, start, t, tid in self.events]
+        data = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if fname is not None:
+            with open(fname, 'w') as f:
+                json.dump(data, f)
+        return data
+
+    def report(self, mintime=0.0):
+        """
+        @brief 以表格的形式返回统计结果
+
+        @param[in] mintime 只显示总时间不小于 mintime 秒的区域
+        """
+        lines = [f"{'scope':<48}{'count':>8}{'time(s)':>12}{'self(s)':>12}{'MB':>10}"]
+        def visit(node, depth):
+            for c in node.children.values():
+                if c.time < mintime:
+                    continue
+                name = '  '*depth + c.name
+                lines.append(f"{name:<48}{c.count:>8}{c.time:>12.4f}"
+                        f"{c.self_time():>12.4f}{c.nbytes/2**20:>10.2f}")
+                for key, val in c.counters.items():
+                    lines.append(f"{'  '*(depth+1) + '#' + key:<48}{val:>8}")
+                visit(c, depth + 1)
+        visit(self.root, 0)
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.report()
+
+
+# 全局的统计对象
+profiler = Profiler()
@@ -6,19 +6,32 @@ Notes
 """
 
 from functools import wraps
-from timeit import default_timer as dtimer 
 
-def timer(func):
+from .profiler import profiler
+
+__all__ = ['timer']
+
+def timer(func=None, name=None):
     """
     Notes
     -----
     测试函数运行的墙上时间。
+
+    运行时间记录到全局的统计对象 `profiler` 中, 区域的名字默认为函数的
+    限定名。`profiler` 关闭（默认）时直接调用原函数, 不做任何统计; 用
+    `profiler.enable(verbose=True)` 可以像原来一样打印每次运行的时间。
+
+    也可以指定区域的名字: `@timer(name='setup')`
     """
+    if func is None:
+        return lambda f: timer(f, name=name)
+
+    label = func.__qualname__ if name is None else name
+
     @wraps(func)
     def run(*args, **kwargs):
-        start = dtimer()
-        val = func(*args, **kwargs)
-        end = dtimer()
-        print('run {} with time:'.format(func.__name__), end - start)
-        return val 
-    return run 
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        with profiler.scope(label):
+            return func(*args, **kwargs)
+    return run
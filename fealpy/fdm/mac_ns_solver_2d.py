@@ -1,7 +1,8 @@
 import numpy as np
 from typing import Optional, Tuple, Callable, Any, Union, List
 
-from .mesh import UniformMesh2d
+from ..mesh import UniformMesh2d
+from ..solver.fast_poisson_solver import FastPoissonSolver
 
 class MACNSSolver2d():
     """
@@ -12,10 +13,31 @@ class MACNSSolver2d():
         """
         @brief 
         """
-        self.dx = (domain[1] - domain[0])/nx
-        self.dy = (domain[3] - domain[2])/ny
-        self.umesh = UniformMesh2d(extent, h=(dx, dy), origin=origin)
-        self.vmesh = UniformMesh2d()
-        self.pmesh = UniformMesh2d()
+        self.dx = dx = (domain[1] - domain[0])/nx
+        self.dy = dy = (domain[3] - domain[2])/ny
+        x0, y0 = domain[0], domain[2]
+        self.umesh = UniformMesh2d([0, nx, 0, ny-1], h=(dx, dy), origin=(x0, y0+dy/2))
+        self.vmesh = UniformMesh2d([0, nx-1, 0, ny], h=(dx, dy), origin=(x0+dx/2, y0))
+        self.pmesh = UniformMesh2d([0, nx-1, 0, ny-1], h=(dx, dy), origin=(x0+dx/2, y0+dy/2))
+        self.psolver = FastPoissonSolver.from_mesh(self.pmesh, bc='neumann', grid='cell')
 
-    
+    def projection(self, u, v, tau):
+        """
+        @brief 把中间速度投影到离散散度为 0 的空间
+
+        @param[in] u umesh 节点上的 x 方向速度, 形状为 (nx+1, ny)
+        @param[in] v vmesh 节点上的 y 方向速度, 形状为 (nx, ny+1)
+        @param[in] tau 时间步长
+
+        @return 投影后的 u, v 和压力修正量 phi（平均值为 0）
+
+        @note 边界上的法向速度保持不变, 对应 phi 的齐次 Neumann 边界条件
+        """
+        div = (u[1:, :] - u[:-1, :])/self.dx + (v[:, 1:] - v[:, :-1])/self.dy
+        # -Delta phi = -div/tau
+        phi = self.psolver.solve(-div/tau)
+        u = u.copy()
+        v = v.copy()
+        u[1:-1, :] -= tau*(phi[1:, :] - phi[:-1, :])/self.dx
+        v[:, 1:-1] -= tau*(phi[:, 1:] - phi[:, :-1])/self.dy
+        return u, v, phi
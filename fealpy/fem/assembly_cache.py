@@ -0,0 +1,276 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from multiprocessing.pool import ThreadPool as Pool
+
+
+class AssemblyCache():
+    """
+    @brief 双线性型的组装缓存
+
+    在时间步进和非线性迭代中, 网格和空间通常不变, 变化的只是系数。
+    这里缓存与系数无关的数据:
+        * 积分点、积分权重和基函数（或其梯度）在积分点处的值
+        * 单元测度、重心坐标梯度等几何量
+        * 全局矩阵的稀疏模式（见 `AssemblyPattern`）
+
+    这样重新组装时只需要做系数的缩并和按位置的数值累加。
+
+    @note 网格加密（拓扑重新构造）后缓存会自动失效。网格节点移动而拓扑不变时,
+          需要手动调用 `clear()`。
+    """
+    def __init__(self):
+        self._data = {}
+        self._ds = None
+        self._stamp = None
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def clear(self):
+        """
+        @brief 清空所有缓存数据
+        """
+        self._data.clear()
+        self._ds = None
+        self._stamp = None
+
+    def check(self, mesh):
+        """
+        @brief 检查网格拓扑是否改变, 如果改变则清空缓存
+
+        @param[in] mesh 缓存数据所依赖的网格
+        """
+        ds = mesh.ds
+        stamp = (getattr(ds, 'topology_stamp', 0),
+                mesh.number_of_nodes(), mesh.number_of_cells())
+        if (ds is not self._ds) or (stamp != self._stamp):
+            self._data.clear()
+            self._ds = ds
+            self._stamp = stamp
+
+    def fetch(self, key, func):
+        """
+        @brief 获取 key 对应的缓存数据, 如果不存在则调用 func() 计算并缓存
+
+        @param[in] key 缓存的键, 一般为 (数据类型, 空间, 积分阶数) 的元组
+        @param[in] func 无参数的可调用对象, 用来计算需要缓存的数据
+        """
+        if key not in self._data:
+            self._data[key] = func()
+        return self._data[key]
+
+
+def is_full_index(index):
+    """
+    @brief 判断 index 是否是取全部单元的索引, 只有这种情形才使用缓存
+    """
+    return isinstance(index, slice) and index == np.s_[:]
+
+
+def fetch_cell_data(cache, key, func, index=np.s_[:]):
+    """
+    @brief 积分子获取单元上的积分数据
+
+    @note 当 cache 为 None 或者 index 不是全部单元时, 直接计算不缓存
+    """
+    if (cache is None) or (not is_full_index(index)):
+        return func()
+    return cache.fetch(key, func)
+
+
+def cell_chunks(NC, chunk_size):
+    """
+    @brief 把 NC 个单元分成若干块, 依次返回每一块的单元编号数组
+
+    @param[in] chunk_size 每一块的单元个数, 为 None 时只有一块, 返回 np.s_[:]
+
+    @note 这里返回整数数组而不是切片, 因为网格的很多方法只支持数组索引
+    """
+    if (chunk_size is None) or (chunk_size >= NC):
+        yield np.s_[:]
+        return
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size should be a positive integer, but got {chunk_size}")
+    for start in range(0, NC, chunk_size):
+        yield np.arange(start, min(start+chunk_size, NC))
+
+
+def block_accumulate(func, blocks, init, nthreads=None):
+    """
+    @brief 对每一块调用 func(block, out), 把结果就地累加到 out 中
+
+    @param[in] func 以块的单元编号和累加数组为参数的函数
+    @param[in] blocks 单元块的列表
+    @param[in] init 无参数的函数, 返回一个初始化为零的累加数组
+    @param[in] nthreads 线程个数, 大于 1 时用线程池计算
+
+    @note 每个线程只有一个累加数组, 额外的内存与块的个数无关。多线程时把块按
+          顺序分成 nthreads 组, 每个线程按顺序累加一组, 最后再按组的顺序相加。
+          求和的顺序只依赖于分块方式和线程个数, 与线程的调度无关, 所以同样的
+          设置下结果每次都完全相同。
+    """
+    blocks = list(blocks)
+
+    def reduce(group):
+        out = init()
+        for i in group:
+            func(blocks[i], out)
+        return out
+
+    if (nthreads is None) or (nthreads <= 1) or (len(blocks) == 1):
+        return reduce(range(len(blocks)))
+
+    groups = np.array_split(np.arange(len(blocks)), min(nthreads, len(blocks)))
+    with Pool(len(groups)) as p:
+        partial = p.map(reduce, groups)
+
+    out = partial[0]
+    for v in partial[1:]:
+        out += v
+    return out
+
+
+def cell_array(coef, NC, index=np.s_[:]):
+    """
+    @brief 分块组装时, 取出定义在全部单元上的系数数组在当前块上的部分
+
+    @param[in] coef 系数, 形状为 (NC, ...) 或 (NQ, NC, ...) 的数组会被切片,
+               其它类型原样返回
+    @param[in] NC 网格的单元个数
+    """
+    if is_full_index(index) or (not isinstance(coef, np.ndarray)):
+        return coef
+    if (coef.ndim in {1, 3}) and (coef.shape[0] == NC):
+        return coef[index]
+    elif (coef.ndim in {2, 4}) and (coef.shape[1] == NC):
+        return coef[:, index]
+    return coef
+
+
+class AssemblyPattern():
+    """
+    @brief 固定稀疏模式的 CSR 矩阵组装
+
+    符号组装阶段由单元自由度数组 cell2dof 只计算一次全局矩阵的 `indptr`、
+    `indices`, 数值组装阶段把单元矩阵按位置累加到 CSR 的 `data` 数组中, 并且
+    复用同一个矩阵对象, 避免每次组装都做 COO 到 CSR 的排序和重复元素求和。
+
+    不分块时还保存单元矩阵中每个元素在 `data` 中的位置 `slot`（与全部单元矩阵
+    一样大）, 数值组装只需要一次 `np.bincount`。分块时不保存 `slot`, 符号组装
+    也按块进行, 每一块的位置在累加时由排好序的 (行, 列) 键值二分查找得到,
+    所以内存只与块的大小和非零元的个数有关。
+    """
+    def __init__(self, cell2dof, gdof, chunk_size=None):
+        """
+        @param[in] cell2dof 形状为 (NC, ldof) 的单元自由度数组
+        @param[in] gdof 全局自由度个数
+        @param[in] chunk_size 分块的大小, 默认不分块
+        """
+        NC, ldof = cell2dof.shape
+        self.gdof = gdof
+        self.NC = NC
+        self.cell2dof = cell2dof
+        self.slot = None
+
+        if (chunk_size is None) or (chunk_size >= NC):
+            key, slot = np.unique(self._key(cell2dof), return_inverse=True)
+            self.slot = slot.reshape(-1)
+        else:
+            key = [np.unique(self._key(cell2dof[index]))
+                    for index in cell_chunks(NC, chunk_size)]
+            key = np.unique(np.concatenate(key))
+
+        self.key = key
+        self.nnz = len(key)
+        self.indices = (key % gdof).astype(cell2dof.dtype)
+        self.indptr = np.zeros(gdof+1, dtype=cell2dof.dtype)
+        self.indptr[1:] = np.cumsum(np.bincount(key//gdof, minlength=gdof))
+        self.matrix = None
+
+    def _key(self, cell2dof):
+        """
+        @brief 单元矩阵中每个元素的 (行, 列) 键值 row*gdof + col
+        """
+        NC, ldof = cell2dof.shape
+        I = np.broadcast_to(cell2dof[:, :, None], shape=(NC, ldof, ldof))
+        J = np.broadcast_to(cell2dof[:, None, :], shape=(NC, ldof, ldof))
+        return (I.astype(np.int64)*self.gdof + J).reshape(-1)
+
+    def cell_slot(self, index=np.s_[:]):
+        """
+        @brief 一块单元的单元矩阵中每个元素在 CSR data 数组中的位置
+        """
+        if self.slot is not None:
+            if is_full_index(index):
+                return self.slot
+            return self.slot.reshape(self.NC, -1)[index].reshape(-1)
+        return np.searchsorted(self.key, self._key(self.cell2dof[index]))
+
+    def accumulate(self, CM, index=np.s_[:], out=None):
+        """
+        @brief 把单元矩阵的值累加到 CSR 的 data 数组中
+
+        @param[in] CM 形状为 (NC, ldof, ldof) 的单元矩阵
+        @param[in] index CM 对应的单元索引, 分块组装时只是一部分单元
+        @param[in] out 长度为 nnz 的数组, 给定时直接累加到其中
+        """
+        slot = self.cell_slot(index)
+        if out is not None:
+            np.add.at(out, slot, CM.reshape(-1))
+            return out
+        if np.iscomplexobj(CM):
+            data = np.bincount(slot, weights=CM.real.ravel(), minlength=self.nnz)
+            data = data + 1j*np.bincount(slot, weights=CM.imag.ravel(), minlength=self.nnz)
+        else:
+            data = np.bincount(slot, weights=CM.ravel(), minlength=self.nnz)
+        return data
+
+    def assembly(self, CM):
+        """
+        @brief 数值组装
+
+        @note 返回的矩阵对象在多次组装之间是复用的, 需要保留上一次组装的结果时
+              请先复制一份
+        """
+        return self.update(self.accumulate(CM))
+
+    def update(self, data):
+        """
+        @brief 用累加好的 data 数组更新全局矩阵
+        """
+        M = self.matrix
+        if (M is None) or (M.indices is not self.indices) \
+                or (M.indptr is not self.indptr) or (M.dtype != data.dtype):
+            # 第一次组装, 或者矩阵的稀疏结构已经在外部被修改
+            M = csr_matrix((data, self.indices, self.indptr),
+                    shape=(self.gdof, self.gdof))
+            M.has_sorted_indices = True
+            # scipy 可能会转换索引的类型, 这里直接使用矩阵内部的索引数组
+            self.indices = M.indices
+            self.indptr = M.indptr
+            self.matrix = M
+        else:
+            M.data[:] = data
+        return M
+
+
+def vector_cell_to_dof(cell2dof, gdof, GD, doforder):
+    """
+    @brief 由标量空间的单元自由度数组生成向量空间的单元自由度数组
+
+    @param[in] doforder 'sdofs' 时单元矩阵的局部编号为 i*ldof + l,
+               'vdims' 时为 l*GD + i, 其中 i 是分量编号, l 是标量局部自由度编号
+
+    @return 形状为 (NC, GD*ldof) 的数组
+    """
+    NC = cell2dof.shape[0]
+    if doforder == 'sdofs':
+        c2d = cell2dof[:, None, :] + gdof*np.arange(GD, dtype=cell2dof.dtype)[:, None]
+    elif doforder == 'vdims':
+        c2d = GD*cell2dof[:, :, None] + np.arange(GD, dtype=cell2dof.dtype)
+    else:
+        raise ValueError(f"Unsupported doforder: {doforder}. Supported types are: 'sdofs' and 'vdims'.")
+    return c2d.reshape(NC, -1)
@@ -1,19 +1,41 @@
+import os
 import numpy as np
 
-from scipy.sparse import csr_matrix
+from .assembly_cache import AssemblyCache, AssemblyPattern, vector_cell_to_dof
+from .assembly_cache import cell_chunks, block_accumulate
+from .matrix_free import MatrixFreeOperator
+from ..decorator.profiler import profiler
 
 
 class BilinearForm:
-    def __init__(self, space, atype=None):
+    def __init__(self, space, atype=None, cache=False, chunk_size=None):
         """
         @brief 
+
+        @param[in] atype 矩阵组装的方式, None、'fast'、'ref' 或者 'matfree'。
+                   'matfree' 时不组装全局矩阵, `assembly` 返回一个 `LinearOperator`,
+                   矩阵向量乘在单元上计算（四边形、六面体单元上使用和因子分解）
+        @param[in] cache 是否缓存积分子的积分数据。开启后积分点处的基函数（梯度）
+                   值、单元测度等几何量只计算一次, 再次组装时只做与系数相关的缩并。
+        @param[in] chunk_size 分块组装时每一块的单元个数, 默认不分块。分块时每次
+                   只计算一块单元上的单元矩阵并累加到全局矩阵中, 临时数组的内存
+                   与块的大小成正比。分块组装不使用积分数据的缓存。
+
+        @note 全局矩阵的稀疏模式总是在第一次组装时计算并保存, 之后的组装只做数值
+              累加, 并复用同一个矩阵对象。网格加密后这些数据自动失效。
         """
         self.space = space
-        self.atype = atype # 矩阵组装的方式，None、fast、ref
+        self.atype = atype # 矩阵组装的方式，None、fast、ref、matfree
         self.dintegrators = [] # 区域积分子
         self.bintegrators = [] # 边界积分子
 
         self._M = None # 需要组装的矩阵 
+        self._A = None # 无矩阵算子
+        self._CM = None # 无矩阵模式下不支持单元算子的积分子的单元矩阵
+        self._BM = None # 无矩阵模式下边界积分子的矩阵
+        self._cache = AssemblyCache() # 组装缓存
+        self._keep_data = cache # 是否缓存积分子的积分数据
+        self.chunk_size = chunk_size # 分块组装时每一块的单元个数
 
     def add_domain_integrator(self, I) -> None:
         """
@@ -37,15 +59,24 @@ class BilinearForm:
     def mult(self, x, out=None):
         """
         """
+        if self.atype == 'matfree':
+            y = self._apply(x)
+        else:
+            y = self._M@x
         if out is None:
-            return self._M@x
+            return y
         else:
-            out[:] = self._M@x
+            out[:] = y
 
     def add_mult(self, x, y, a=1.0):
-        y += a*(self._M@x)
+        if self.atype == 'matfree':
+            y += a*self._apply(x)
+        else:
+            y += a*(self._M@x)
 
     def get_matrix(self, copy=False):
+        if self.atype == 'matfree':
+            return self._A
         if copy is False:
             return self._M
         else:
@@ -57,10 +88,206 @@ class BilinearForm:
         """
         return self.assembly()
 
-    def assembly(self):
+    def clear_cache(self):
+        """
+        @brief 清空组装缓存
+
+        @note 网格加密后缓存会自动失效, 但网格节点移动（拓扑不变）时需要手动调用
+        """
+        self._cache.clear()
+
+    def _get_cache(self, mesh):
+        """
+        @brief 获取当前网格下有效的组装缓存
+        """
+        self._cache.check(mesh)
+        return self._cache
+
+    def _assembly_cell_matrix(self, di, space, cache, fast=False, **kwargs):
+        """
+        @brief 调用积分子组装单元矩阵, 支持缓存的积分子会传入缓存对象
+        """
+        if self._keep_data and getattr(di, 'cacheable', False):
+            kwargs['cache'] = cache
+        with profiler.scope(type(di).__name__):
+            if fast:
+                return di.assembly_cell_matrix_fast(space, **kwargs)
+            else:
+                return di.assembly_cell_matrix(space, **kwargs)
+
+    def _assembly_face_matrix(self, bi, space):
+        """
+        @brief 调用边界积分子组装边界上的矩阵
+        """
+        with profiler.scope(type(bi).__name__):
+            return bi.assembly_face_matrix(space)
+
+    def _pattern(self):
+        """
+        @brief 符号组装, 计算全局矩阵的稀疏模式
+        """
+        with profiler.scope('pattern'):
+            return AssemblyPattern(*self._cell_to_dof(), chunk_size=self.chunk_size)
+
+    def _global_matrix(self, space, ldof, cache, fast=False, cellmeasure=None,
+            nthreads=None, **kwargs):
+        """
+        @brief 数值组装, 把单元矩阵累加到固定稀疏模式的全局矩阵中
+
+        @param[in] ldof 单元矩阵的行数（向量空间是 GD*ldof）
+        @param[in] nthreads 线程个数, 大于 1 时各个单元块在线程池中并行计算
+
+        @note 设置了 chunk_size 时按块组装, 每一块的单元矩阵就地累加到同一个
+              data 数组（每个线程一个）中后就释放, 稀疏模式也按块计算。
+              多线程而没有设置 chunk_size 时, 每个线程处理一块。
+        """
+        mesh = space[0].mesh if isinstance(space, tuple) else space.mesh
+        ftype = space[0].ftype if isinstance(space, tuple) else space.ftype
+        NC = mesh.number_of_cells()
+        pattern = cache.fetch(('pattern', self.space), self._pattern)
+
+        chunk_size = self.chunk_size
+        if (chunk_size is None) and (nthreads is not None) and (nthreads > 1):
+            chunk_size = -(-NC//nthreads)
+
+        if (chunk_size is None) or (chunk_size >= NC):
+            if cellmeasure is not None:
+                kwargs['cellmeasure'] = cellmeasure
+            CM = np.zeros((NC, ldof, ldof), dtype=ftype)
+            profiler.allocated(CM)
+            for di in self.dintegrators:
+                self._assembly_cell_matrix(di, space, cache, fast=fast,
+                        out=CM, **kwargs)
+            with profiler.scope('scatter'):
+                return pattern.assembly(CM)
+
+        def block_data(index, out):
+            kw = dict(kwargs) # 每个线程使用自己的参数字典
+            if cellmeasure is not None:
+                kw['cellmeasure'] = cellmeasure[index]
+            CM = np.zeros((len(index), ldof, ldof), dtype=ftype)
+            profiler.allocated(CM)
+            for di in self.dintegrators:
+                self._assembly_cell_matrix(di, space, cache, fast=fast,
+                        index=index, out=CM, **kw)
+            with profiler.scope('scatter'):
+                pattern.accumulate(CM, index=index, out=out)
+
+        data = block_accumulate(block_data, cell_chunks(NC, chunk_size),
+                lambda: np.zeros(pattern.nnz, dtype=ftype), nthreads)
+        return pattern.update(data)
+
+    def _cell_to_dof(self):
+        """
+        @brief 返回单元自由度数组和全局自由度个数, 向量空间按 doforder 展开
+        """
+        space = self.space
+        if isinstance(space, tuple) and not isinstance(space[0], tuple):
+            GD = len(space)
+            gdof = space[0].number_of_global_dofs()
+            cell2dof = vector_cell_to_dof(space[0].cell_to_dof(), gdof, GD,
+                    space[0].doforder)
+            return cell2dof, GD*gdof
+        else:
+            return space.cell_to_dof(), space.number_of_global_dofs()
+
+    def _apply_cell_operator(self, uc, cache):
+        """
+        @brief 计算所有区域积分子的单元算子与单元自由度向量的乘积
+
+        @note 积分子提供 `apply_cell_operator` 时不生成单元矩阵, 否则使用第一次
+              调用时计算并保存的单元矩阵
+        """
+        space = self.space
+        yc = np.zeros_like(uc)
+        for di in self.dintegrators:
+            if hasattr(di, 'apply_cell_operator'):
+                yc += di.apply_cell_operator(space, uc, cache=cache)
+        if self._CM is not None:
+            yc += np.einsum('cij, cj->ci', self._CM, uc, optimize=True)
+        return yc
+
+    def _apply(self, x):
+        """
+        @brief 无矩阵的矩阵向量乘
+        """
+        mesh = self.space[0].mesh if isinstance(self.space, tuple) else self.space.mesh
+        cache = self._get_cache(mesh)
+        cell2dof, gdof = cache.fetch(('cell2dof', self.space), self._cell_to_dof)
+        shape = x.shape
+        x = x.reshape(-1)
+        yc = self._apply_cell_operator(x[cell2dof], cache)
+        if np.iscomplexobj(yc):
+            y = np.zeros(gdof, dtype=yc.dtype)
+            np.add.at(y, cell2dof, yc)
+        else:
+            y = np.bincount(cell2dof.flat, weights=yc.flat, minlength=gdof)
+        if self._BM is not None:
+            y += self._BM@x
+        return y.reshape(shape)
+
+    def diagonal(self):
+        """
+        @brief 计算矩阵的对角线, 无矩阵模式下对每个局部自由度作用一次单元算子
+        """
+        if self.atype != 'matfree':
+            return self._M.diagonal()
+        mesh = self.space[0].mesh if isinstance(self.space, tuple) else self.space.mesh
+        cache = self._get_cache(mesh)
+        cell2dof, gdof = cache.fetch(('cell2dof', self.space), self._cell_to_dof)
+        NC, ldof = cell2dof.shape
+        dc = np.zeros((NC, ldof), dtype=self._A.dtype)
+        e = np.zeros((NC, ldof), dtype=self._A.dtype)
+        for l in range(ldof):
+            e[:, l] = 1
+            dc[:, l] = self._apply_cell_operator(e, cache)[:, l]
+            e[:, l] = 0
+        d = np.bincount(cell2dof.flat, weights=dc.flat, minlength=gdof)
+        if self._BM is not None:
+            d += self._BM.diagonal()
+        return d
+
+    def assembly_matrix_free(self):
+        """
+        @brief 无矩阵组装, 只做准备工作, 返回 `MatrixFreeOperator`
+
+        @note 无矩阵模式下总是缓存积分点处的基函数和几何量, 否则每次矩阵向量乘
+              都要重新计算。不提供 `apply_cell_operator` 的积分子退化为保存单元矩阵,
+              边界积分子仍然组装成稀疏矩阵。
+        """
+        space = self.space
+        isvspace = isinstance(space, tuple) and not isinstance(space[0], tuple)
+        mesh = space[0].mesh if isvspace else space.mesh
+        cache = self._get_cache(mesh)
+        cell2dof, gdof = cache.fetch(('cell2dof', space), self._cell_to_dof)
+        ftype = space[0].ftype if isvspace else space.ftype
+
+        self._M = None
+        self._CM = None
+        NC, ldof = cell2dof.shape
+        for di in self.dintegrators:
+            if not hasattr(di, 'apply_cell_operator'):
+                if self._CM is None:
+                    self._CM = np.zeros((NC, ldof, ldof), dtype=ftype)
+                self._assembly_cell_matrix(di, space, cache, out=self._CM)
+
+        self._BM = None
+        for bi in self.bintegrators:
+            if self._BM is None:
+                self._BM = self._assembly_face_matrix(bi, space)
+            else:
+                self._BM += self._assembly_face_matrix(bi, space)
+
+        self._A = MatrixFreeOperator(self, gdof, dtype=ftype)
+        return self._A
+
+    def assembly(self, nthreads=None):
         """
         @brief 数值积分组装
 
+        @param[in] nthreads 组装使用的线程个数, 默认单线程。多线程时单元按块
+                   并行计算, 同样的 chunk_size 和 nthreads 下结果是确定的
+
         @note space 可能是以下的情形
             * 标量空间
             * 由标量空间组成的向量空间
@@ -68,15 +295,18 @@ class BilinearForm:
             * 向量空间（基函数是向量型的）
             * 张量空间（基函数是张量型的
         """
-        if isinstance(self.space, tuple) and not isinstance(self.space[0], tuple):
-            # 由标量函数空间组成的向量函数空间
-            return self.assembly_for_vspace_with_scalar_basis()
-        else:
-            # 标量函数空间或基是向量函数的向量函数空间
-            return self.assembly_for_sspace_and_vspace_with_vector_basis()
-
-
-    def assembly_for_sspace_and_vspace_with_vector_basis(self) -> None:
+        with profiler.scope('BilinearForm.assembly'):
+            if self.atype == 'matfree':
+                return self.assembly_matrix_free()
+            if isinstance(self.space, tuple) and not isinstance(self.space[0], tuple):
+                # 由标量函数空间组成的向量函数空间
+                return self.assembly_for_vspace_with_scalar_basis(nthreads=nthreads)
+            else:
+                # 标量函数空间或基是向量函数的向量函数空间
+                return self.assembly_for_sspace_and_vspace_with_vector_basis(nthreads=nthreads)
+
+
+    def assembly_for_sspace_and_vspace_with_vector_basis(self, nthreads=None) -> None:
         """
         组装标量空间（其基函数为标量函数）和向量空间（其基函数为向量函数）的矩阵的方法
 
@@ -85,32 +315,23 @@ class BilinearForm:
         2. 获取网格和单元数量
         3. 初始化单元格矩阵 CM
         4. 对于每个区域积分器，组装单元矩阵
-        5. 获取单元到自由度的映射
-        6. 生成 I 和 J 的矩阵来构建稀疏矩阵
-        7. 使用 CM、I 和 J 生成稀疏矩阵并保存到 _M 属性中
+        5. 获取单元到自由度的映射, 计算（或复用）全局矩阵的稀疏模式
+        6. 把 CM 的值累加到稀疏模式对应的位置, 结果保存到 _M 属性中
 
         """
         space = self.space
         ldof = space.number_of_local_dofs()
-        gdof = space.number_of_global_dofs()
 
         mesh = space.mesh
-        NC = mesh.number_of_cells()
-        CM = np.zeros((NC, ldof, ldof), dtype=space.ftype)
-        for di in self.dintegrators:
-            di.assembly_cell_matrix(space, out=CM)
-
-        cell2dof = space.cell_to_dof()
-        I = np.broadcast_to(cell2dof[:, :, None], shape=CM.shape)
-        J = np.broadcast_to(cell2dof[:, None, :], shape=CM.shape)
-        self._M = csr_matrix((CM.flat, (I.flat, J.flat)), shape=(gdof, gdof))
+        cache = self._get_cache(mesh)
+        self._M = self._global_matrix(space, ldof, cache, nthreads=nthreads)
 
         for bi in self.bintegrators:
-            self._M += bi.assembly_face_matrix(space)
+            self._M += self._assembly_face_matrix(bi, space)
 
         return self._M
 
-    def assembly_for_vspace_with_scalar_basis(self) -> None:
+    def assembly_for_vspace_with_scalar_basis(self, nthreads=None) -> None:
         """
         组装基函数由标量函数组合而成的向量函数空间的矩阵
 
@@ -121,8 +342,7 @@ class BilinearForm:
         4. 获取网格的度量和单元数量
         5. 初始化单元矩阵 CM
         6. 对于每个区域积分器，组装单元矩阵
-        7. 初始化稀疏矩阵 _M
-        8. 根据空间的自由度排序优先级，进行对应的操作来更新 _M
+        7. 根据空间的自由度排序生成向量空间的单元自由度数组, 一次组装到 _M 中
 
         注意：这个函数不返回任何值，结果保存在 _M 属性中
         """
@@ -132,54 +352,21 @@ class BilinearForm:
         mesh = space[0].mesh
         GD = len(space) # 几个分量，几维问题
         ldof = space[0].number_of_local_dofs()
-        gdof = space[0].number_of_global_dofs()
-        cell2dof = space[0].cell_to_dof() # 标量空间的自由度矩阵
         
-        cellmeasure = mesh.entity_measure()
-        NC = mesh.number_of_cells()
-        CM = np.zeros((NC, GD*ldof, GD*ldof), dtype=space[0].ftype)
-        for di in self.dintegrators:
-            di.assembly_cell_matrix(space, cellmeasure=cellmeasure, out=CM)
-        self._M = csr_matrix((GD*gdof, GD*gdof), dtype=space[0].ftype)
-        if space[0].doforder == 'sdofs': # 标量自由度排序优先
-            for i in range(GD):
-                for j in range(i, GD):
-                    if i == j:
-                        val = CM[:, i*ldof:(i+1)*ldof, i*ldof:(i+1)*ldof]
-                        I = np.broadcast_to(cell2dof[:, :, None]+i*gdof, shape=val.shape)
-                        J = np.broadcast_to(cell2dof[:, None, :]+i*gdof, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-                    else:
-                        val = CM[:, i*ldof:(i+1)*ldof, j*ldof:(j+1)*ldof]
-                        I = np.broadcast_to(cell2dof[:, :, None]+i*gdof, shape=val.shape)
-                        J = np.broadcast_to(cell2dof[:, None, :]+j*gdof, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-
-                        val = CM[:, j*ldof:(j+1)*ldof, i*ldof:(i+1)*ldof]
-                        I = np.broadcast_to(cell2dof[:, :, None]+j*gdof, shape=val.shape)
-                        J = np.broadcast_to(cell2dof[:, None, :]+i*gdof, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-        elif space[0].doforder == 'vdims': # 向量分量自由度排序优先
-            for i in range(GD):
-                for j in range(i, GD):
-                    if i==j:
-                        val = CM[:, i::GD, i::GD]
-                        I = np.broadcast_to(GD*cell2dof[:, :, None] + i, shape=val.shape)
-                        J = np.broadcast_to(GD*cell2dof[:, None, :] + i, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-                    else:
-                        val = CM[:, i::GD, j::GD] 
-                        I = np.broadcast_to(GD*cell2dof[:, :, None] + i, shape=val.shape)
-                        J = np.broadcast_to(GD*cell2dof[:, None, :] + j, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-
-                        self._M += csr_matrix((val.flat, (J.flat, I.flat)), shape=(GD*gdof, GD*gdof))
+        cache = self._get_cache(mesh)
+        if self._keep_data:
+            cellmeasure = cache.fetch(('cellmeasure', mesh), mesh.entity_measure)
+        else:
+            cellmeasure = mesh.entity_measure()
+        self._M = self._global_matrix(space, GD*ldof, cache,
+                cellmeasure=cellmeasure, nthreads=nthreads)
 
         for bi in self.bintegrators:
-            self._M += bi.assembly_face_matrix(space)
+            self._M += self._assembly_face_matrix(bi, space)
         return self._M
 
-    def fast_assembly(self, trialspace=None, testspace=None, coefspace=None):
+    def fast_assembly(self, trialspace=None, testspace=None, coefspace=None,
+            nthreads=None):
         """
         @brief 免数值积分组装
 
@@ -190,14 +377,18 @@ class BilinearForm:
             * 向量空间（基函数是向量型的）
             * 张量空间（基函数是张量型的
         """
-        if isinstance(self.space, tuple) and not isinstance(self.space[0], tuple):
-            # 由标量函数空间组成的向量函数空间
-            return self.fast_assembly_for_vspace_with_scalar_basis(trialspace, testspace, coefspace)
-        else:
-            # 标量函数空间或基是向量函数的向量函数空间
-            return self.fast_assembly_for_sspace_and_vspace_with_vector_basis(trialspace, testspace, coefspace)
-
-    def fast_assembly_for_sspace_and_vspace_with_vector_basis(self, trialspace, testspace, coefspace) -> None:
+        with profiler.scope('BilinearForm.fast_assembly'):
+            if isinstance(self.space, tuple) and not isinstance(self.space[0], tuple):
+                # 由标量函数空间组成的向量函数空间
+                return self.fast_assembly_for_vspace_with_scalar_basis(trialspace,
+                        testspace, coefspace, nthreads=nthreads)
+            else:
+                # 标量函数空间或基是向量函数的向量函数空间
+                return self.fast_assembly_for_sspace_and_vspace_with_vector_basis(trialspace,
+                        testspace, coefspace, nthreads=nthreads)
+
+    def fast_assembly_for_sspace_and_vspace_with_vector_basis(self, trialspace, testspace, coefspace,
+            nthreads=None) -> None:
         """
         免数值积分组装标量空间（其基函数为标量函数）和向量空间（其基函数为向量函数）的矩阵的方法
 
@@ -206,9 +397,8 @@ class BilinearForm:
         2. 获取网格和单元数量
         3. 初始化单元格矩阵 CM
         4. 对于每个区域积分器，组装单元矩阵
-        5. 获取单元到自由度的映射
-        6. 生成 I 和 J 的矩阵来构建稀疏矩阵
-        7. 使用 CM、I 和 J 生成稀疏矩阵并保存到 _M 属性中
+        5. 获取单元到自由度的映射, 计算（或复用）全局矩阵的稀疏模式
+        6. 把 CM 的值累加到稀疏模式对应的位置, 结果保存到 _M 属性中
 
         """
         space = self.space
@@ -216,25 +406,20 @@ class BilinearForm:
         testspace = testspace
         coefspace = coefspace
         ldof = space.number_of_local_dofs()
-        gdof = space.number_of_global_dofs()
 
         mesh = space.mesh
-        NC = mesh.number_of_cells()
-        CM = np.zeros((NC, ldof, ldof), dtype=space.ftype)
-        for di in self.dintegrators:
-            di.assembly_cell_matrix_fast(space, trialspace, testspace, coefspace, out=CM)
-
-        cell2dof = space.cell_to_dof()
-        I = np.broadcast_to(cell2dof[:, :, None], shape=CM.shape)
-        J = np.broadcast_to(cell2dof[:, None, :], shape=CM.shape)
-        self._M = csr_matrix((CM.flat, (I.flat, J.flat)), shape=(gdof, gdof))
+        cache = self._get_cache(mesh)
+        self._M = self._global_matrix(space, ldof, cache, fast=True,
+                nthreads=nthreads, trialspace=trialspace, testspace=testspace,
+                coefspace=coefspace)
 
         for bi in self.bintegrators:
-            self._M += bi.assembly_face_matrix(space)
+            self._M += self._assembly_face_matrix(bi, space)
 
         return self._M
 
-    def fast_assembly_for_vspace_with_scalar_basis(self, trialspace, testspace, coefspace) -> None:
+    def fast_assembly_for_vspace_with_scalar_basis(self, trialspace, testspace, coefspace,
+            nthreads=None) -> None:
         """
         免数值积分组装基函数由标量函数组合而成的向量函数空间的矩阵
 
@@ -245,8 +430,7 @@ class BilinearForm:
         4. 获取网格的度量和单元数量
         5. 初始化单元矩阵 CM
         6. 对于每个区域积分器，组装单元矩阵
-        7. 初始化稀疏矩阵 _M
-        8. 根据空间的自由度排序优先级，进行对应的操作来更新 _M
+        7. 根据空间的自由度排序生成向量空间的单元自由度数组, 一次组装到 _M 中
 
         注意：这个函数不返回任何值，结果保存在 _M 属性中
         """
@@ -256,58 +440,30 @@ class BilinearForm:
         mesh = space[0].mesh
         GD = len(space) # 几个分量，几维问题
         ldof = space[0].number_of_local_dofs()
-        gdof = space[0].number_of_global_dofs()
-        cell2dof = space[0].cell_to_dof() # 标量空间的自由度矩阵
         
-        cellmeasure = mesh.entity_measure()
-        NC = mesh.number_of_cells()
-        CM = np.zeros((NC, GD*ldof, GD*ldof), dtype=space[0].ftype)
-        for di in self.dintegrators:
-            di.assembly_cell_matrix_fast(space, trialspace, testspace, coefspace, cellmeasure=cellmeasure, out=CM)
-        self._M = csr_matrix((GD*gdof, GD*gdof), dtype=space[0].ftype)
-        if space[0].doforder == 'sdofs': # 标量自由度排序优先
-            for i in range(GD):
-                for j in range(i, GD):
-                    if i == j:
-                        val = CM[:, i*ldof:(i+1)*ldof, i*ldof:(i+1)*ldof]
-                        I = np.broadcast_to(cell2dof[:, :, None]+i*gdof, shape=val.shape)
-                        J = np.broadcast_to(cell2dof[:, None, :]+i*gdof, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-                    else:
-                        val = CM[:, i*ldof:(i+1)*ldof, j*ldof:(j+1)*ldof]
-                        I = np.broadcast_to(cell2dof[:, :, None]+i*gdof, shape=val.shape)
-                        J = np.broadcast_to(cell2dof[:, None, :]+j*gdof, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-
-                        val = CM[:, j*ldof:(j+1)*ldof, i*ldof:(i+1)*ldof]
-                        I = np.broadcast_to(cell2dof[:, :, None]+j*gdof, shape=val.shape)
-                        J = np.broadcast_to(cell2dof[:, None, :]+i*gdof, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-        elif space[0].doforder == 'vdims': # 向量分量自由度排序优先
-            for i in range(GD):
-                for j in range(i, GD):
-                    if i==j:
-                        val = CM[:, i::GD, i::GD]
-                        I = np.broadcast_to(GD*cell2dof[:, :, None] + i, shape=val.shape)
-                        J = np.broadcast_to(GD*cell2dof[:, None, :] + i, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-                    else:
-                        val = CM[:, i::GD, j::GD] 
-                        I = np.broadcast_to(GD*cell2dof[:, :, None] + i, shape=val.shape)
-                        J = np.broadcast_to(GD*cell2dof[:, None, :] + j, shape=val.shape)
-                        self._M += csr_matrix((val.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
-
-                        self._M += csr_matrix((val.flat, (J.flat, I.flat)), shape=(GD*gdof, GD*gdof))
+        cache = self._get_cache(mesh)
+        if self._keep_data:
+            cellmeasure = cache.fetch(('cellmeasure', mesh), mesh.entity_measure)
+        else:
+            cellmeasure = mesh.entity_measure()
+        self._M = self._global_matrix(space, GD*ldof, cache, fast=True,
+                trialspace=trialspace, testspace=testspace, coefspace=coefspace,
+                cellmeasure=cellmeasure, nthreads=nthreads)
 
         for bi in self.bintegrators:
-            self._M += bi.assembly_face_matrix(space)
+            self._M += self._assembly_face_matrix(bi, space)
         return self._M
 
 
-    def parallel_assembly(self):
+    def parallel_assembly(self, nthreads=None):
         """
         @brief 多线程数值积分组装
         @note 特别当三维情形，最好并行来组装
+
+        @param[in] nthreads 线程个数, 默认为 CPU 的核数
         """
+        if nthreads is None:
+            nthreads = os.cpu_count()
+        return self.assembly(nthreads=nthreads)
 
 
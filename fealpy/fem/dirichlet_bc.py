@@ -1,9 +1,114 @@
 import numpy as np
 
 from scipy.sparse import csr_matrix, spdiags, eye, bmat
+from scipy.sparse.linalg import LinearOperator
 
 from typing import Optional, Union, Tuple, Callable, Any
 
+from .matrix_free import DirichletConstrainedOperator
+
+class BoundaryPattern():
+    """
+    @brief 固定稀疏模式和 Dirichlet 自由度下, CSR 矩阵中与边界相关的非零元位置
+
+    这些位置只依赖于矩阵的稀疏模式和边界自由度, 在时间步进或非线性迭代中
+    可以重复使用, 处理边界条件时只需要对 `data` 数组做一次索引操作。
+    """
+    def __init__(self, A, isDDof):
+        """
+        @param[in] A CSR 格式的矩阵
+        @param[in] isDDof 形状为 (gdof, ) 的布尔数组, 标记 Dirichlet 自由度
+        """
+        gdof = A.shape[0]
+        self.indptr = A.indptr
+        self.indices = A.indices
+        self.isDDof = isDDof.copy()
+
+        row = np.repeat(np.arange(gdof), np.diff(A.indptr))
+        col = A.indices
+        brow = isDDof[row]
+        bcol = isDDof[col]
+
+        # 边界行或者边界列上的非零元, 就地处理时要置零
+        self.bdIdx, = np.nonzero(brow | bcol)
+        # 边界行上的对角元, 就地处理时要置一
+        self.diagIdx, = np.nonzero(brow & (row == col))
+        # 内部行、边界列上的非零元, 用来修改右端向量
+        self.colIdx, = np.nonzero(~brow & bcol)
+        self.colRow = row[self.colIdx]
+        self.colCol = col[self.colIdx]
+
+        # 消去边界自由度后内部自由度对应的子矩阵
+        isFree = ~isDDof
+        self.freeIdx, = np.nonzero(~brow & ~bcol)
+        fmap = np.cumsum(isFree) - 1
+        self.subIndices = fmap[col[self.freeIdx]].astype(A.indices.dtype)
+        self.subIndptr = np.zeros(isFree.sum()+1, dtype=A.indptr.dtype)
+        np.cumsum(np.bincount(row[self.freeIdx], minlength=gdof)[isFree],
+                out=self.subIndptr[1:])
+
+        # 第一次就地处理前边界非零元的值, 见 `save`
+        self.bdVal = None
+        self.colVal = None
+        self._data = None
+
+    def save(self, A):
+        """
+        @brief 就地处理之前保存边界非零元的值
+
+        就地处理后 A[:, bd] 已经是零, 同一个矩阵再次处理（例如时间步进中只有
+        右端向量改变）时要用这里保存的值修改右端向量
+        """
+        self.bdVal = A.data[self.bdIdx].copy()
+        self.colVal = A.data[self.colIdx].copy()
+        self._data = A.data
+
+    def is_constrained(self, A):
+        """
+        @brief 判断 A 是否是已经被就地处理过的矩阵
+
+        @note 重新组装时矩阵对象和 data 数组会被复用, 所以除了 data 数组是否是
+              同一个对象, 还要检查边界非零元是否仍然是处理后的值
+        """
+        if (self._data is None) or (A.data is not self._data):
+            return False
+        return np.all(A.data[self.colIdx] == 0) and np.all(A.data[self.diagIdx] == 1)
+
+    def restore(self, A):
+        """
+        @brief 把就地处理过的矩阵 A 恢复为处理之前的值
+        """
+        if not self.is_constrained(A):
+            raise ValueError("the matrix has not been constrained in place by this pattern!")
+        A.data[self.bdIdx] = self.bdVal
+        return A
+
+    def match(self, A, isDDof):
+        """
+        @brief 判断这个模式是否可以用于矩阵 A 和边界自由度 isDDof
+        """
+        if (A.indptr is not self.indptr) or (A.indices is not self.indices):
+            if (A.indptr.shape != self.indptr.shape) or (A.indices.shape != self.indices.shape):
+                return False
+            if not (np.array_equal(A.indptr, self.indptr) and np.array_equal(A.indices, self.indices)):
+                return False
+        return np.array_equal(isDDof, self.isDDof)
+
+    def update_vector(self, A, f, uh, colVal=None):
+        """
+        @brief 计算 f - A[:, bd] @ uh[bd] 在内部自由度上的值, 结果直接写到 f 中
+
+        @param[in] colVal A[:, bd] 在内部行上的非零元, 默认从 A 中取出
+        """
+        if colVal is None:
+            colVal = A.data[self.colIdx]
+        val = colVal*uh[self.colCol]
+        if np.iscomplexobj(val):
+            np.subtract.at(f, self.colRow, val)
+        else:
+            f -= np.bincount(self.colRow, weights=val, minlength=len(f))
+
+
 class DirichletBC():
     def __init__(self, space: Union[Tuple, 'Space'], gD: Callable, 
                  threshold: Optional[Callable] = None):
@@ -17,19 +122,25 @@ class DirichletBC():
         self.gD = gD
         self.threshold = threshold
         self.bctype = 'Dirichlet'
+        self._pattern = None # 缓存的边界非零元位置, 见 `BoundaryPattern`
+        self.isFreeDof = None # 最近一次消去边界自由度时的内部自由度
 
 
     def apply(self, 
             A: csr_matrix, 
             f: np.ndarray, 
             uh: np.ndarray=None, 
-            dflag: np.ndarray=None) -> Tuple[csr_matrix, np.ndarray]:
+            dflag: np.ndarray=None,
+            inplace: bool=False) -> Tuple[csr_matrix, np.ndarray]:
         """
         @brief 处理 Dirichlet 边界条件  
 
         @param[in] A: 系数矩阵
         @param[in] f: 右端向量
         @param[in] uh: 解向量
+        @param[in] inplace: 是否直接修改 A 的 data 数组, 而不是计算 D0@A@D0 + D1
+                   得到一个新的矩阵。边界非零元的位置会被缓存, 稀疏模式和边界
+                   自由度不变时（例如时间步进）可以重复使用。
         """
         if isinstance(self.space, tuple) and not isinstance(self.space[0], tuple):
             # 由标量函数空间组成的向量函数空间
@@ -38,7 +149,8 @@ class DirichletBC():
             if uh is None:
                 uh = self.space[0].function(dim=GD)
 
-            return self.apply_for_vspace_with_scalar_basis(A, f, uh, dflag=dflag)
+            return self.apply_for_vspace_with_scalar_basis(A, f, uh, dflag=dflag,
+                    inplace=inplace)
         else:
             # 标量函数空间或基是向量函数的向量函数空间
             gdof = self.space.number_of_global_dofs()
@@ -46,29 +158,135 @@ class DirichletBC():
             if uh is None:
                 uh = self.space.function(dim=GD)  
 
-            return self.apply_for_other_space(A, f, uh)
+            return self.apply_for_other_space(A, f, uh, inplace=inplace)
+
 
+    def constrain(self, A, bdIdx):
+        """
+        @brief 修改系数矩阵, 使 Dirichlet 自由度对应的行和列只保留对角元 1
+
+        @param[in] bdIdx 长度为 A.shape[0] 的整数数组, Dirichlet 自由度处为 1
 
-    def apply_for_other_space(self, A, f, uh) -> Tuple[csr_matrix, np.ndarray]:
+        @note A 是无矩阵的 `LinearOperator` 时, 返回施加边界条件后的算子
+        """
+        if isinstance(A, LinearOperator):
+            return DirichletConstrainedOperator(A, bdIdx == 1)
+        D0 = spdiags(1-bdIdx, 0, A.shape[0], A.shape[0])
+        D1 = spdiags(bdIdx, 0, A.shape[0], A.shape[0])
+        return D0@A@D0 + D1
+
+    def pattern(self, A, isDDof):
+        """
+        @brief 获取与 A 的稀疏模式和边界自由度对应的 `BoundaryPattern`, 必要时重新计算
+        """
+        if (self._pattern is None) or (not self._pattern.match(A, isDDof)):
+            self._pattern = BoundaryPattern(A, isDDof)
+        return self._pattern
+
+    def apply_inplace(self, A, f, uh, isDDof):
+        """
+        @brief 直接在 CSR 矩阵的 data 数组上处理 Dirichlet 边界条件
+
+        @param[in] uh 一维的解向量, 边界自由度上已经是边界条件的值
+        @param[in] isDDof 一维的布尔数组, 标记 Dirichlet 自由度
+
+        @note 要求边界自由度对应的对角元在 A 的稀疏模式中, 否则退化为
+              D0@A@D0 + D1 的方式。已经就地处理过的矩阵可以直接再次处理,
+              这时用第一次处理前保存的边界列的值修改右端向量
+        """
+        if not isinstance(A, csr_matrix):
+            bdIdx = isDDof.astype(np.int_)
+            f = f - A@uh
+            f[isDDof] = uh[isDDof]
+            return self.constrain(A, bdIdx), f
+
+        A.sum_duplicates()
+        pattern = self.pattern(A, isDDof)
+        if len(pattern.diagIdx) != np.sum(isDDof):
+            bdIdx = isDDof.astype(np.int_)
+            f = f - A@uh
+            f[isDDof] = uh[isDDof]
+            return self.constrain(A, bdIdx), f
+
+        # 同一个矩阵再次就地处理时, 边界列已经是零, 用第一次保存的值
+        if not pattern.is_constrained(A):
+            pattern.save(A)
+
+        f = f.copy() # 注意这里不修改外界 f 的值
+        pattern.update_vector(A, f, uh, colVal=pattern.colVal)
+        f[isDDof] = uh[isDDof]
+        A.data[pattern.bdIdx] = 0.0
+        A.data[pattern.diagIdx] = 1.0
+        return A, f
+
+    def eliminate(self, A, f, uh=None, dflag=None):
+        """
+        @brief 对称消去 Dirichlet 自由度, 得到只含内部自由度的线性系统
+
+        @param[in] A: CSR 格式的系数矩阵
+        @param[in] f: 右端向量
+        @param[in] uh: 解向量, 边界自由度上的值会被设为边界条件的值
+
+        @return A[free][:, free] 和 f[free] - A[free][:, bd]@uh[bd], 其中 free
+                为内部自由度, 保存在 `self.isFreeDof` 中, 求解后用 `restore`
+                把内部自由度的解放回 uh
+
+        @note 子矩阵的稀疏模式是缓存的, 稀疏模式和边界自由度不变时不需要重新计算
+        """
+        space = self.space
+        if isinstance(space, tuple) and not isinstance(space[0], tuple):
+            gdof = space[0].number_of_global_dofs()
+            if uh is None:
+                uh = space[0].function(dim=int(A.shape[0]//gdof))
+            if dflag is None:
+                dflag = space[0].boundary_interpolate(self.gD, uh, threshold=self.threshold)
+        else:
+            if uh is None:
+                uh = space.function()
+            if dflag is None:
+                dflag = space.boundary_interpolate(self.gD, uh, threshold=self.threshold)
+        isDDof = dflag.reshape(-1)
+        u = uh.reshape(-1)
+
+        A = A.tocsr()
+        A.sum_duplicates()
+        pattern = self.pattern(A, isDDof)
+        f = f.copy()
+        pattern.update_vector(A, f, u)
+
+        self.isFreeDof = ~isDDof
+        NF = len(pattern.subIndptr) - 1
+        AI = csr_matrix((A.data[pattern.freeIdx], pattern.subIndices, pattern.subIndptr),
+                shape=(NF, NF))
+        return AI, f[self.isFreeDof]
+
+    def restore(self, x, uh):
+        """
+        @brief 把消去后线性系统的解放回整体解向量 uh
+        """
+        uh.reshape(-1)[self.isFreeDof] = x
+        return uh
+
+    def apply_for_other_space(self, A, f, uh, inplace=False) -> Tuple[csr_matrix, np.ndarray]:
         """
         @brief 处理基是向量函数的向量函数空间或标量函数空间的 Dirichlet 边界条件
         """
         space = self.space
         gD = self.gD
         isDDof = space.boundary_interpolate(gD, uh, threshold=self.threshold) # isDDof.shape == uh.shape
+        if inplace:
+            return self.apply_inplace(A, f, uh.reshape(-1), isDDof.reshape(-1))
         f = f - A@uh.reshape(-1) # 注意这里不修改外界 f 的值
 
         bdIdx = np.zeros(A.shape[0], dtype=np.int_)
         bdIdx[isDDof.reshape(-1)] = 1
-        D0 = spdiags(1-bdIdx, 0, A.shape[0], A.shape[0])
-        D1 = spdiags(bdIdx, 0, A.shape[0], A.shape[0])
-        A = D0@A@D0 + D1
+        A = self.constrain(A, bdIdx)
 
         f[isDDof.reshape(-1)] = uh[isDDof].reshape(-1)
 
         return A, f 
 
-    def apply_for_vspace_with_scalar_basis(self, A, f, uh, dflag=None):
+    def apply_for_vspace_with_scalar_basis(self, A, f, uh, dflag=None, inplace=False):
         """
         @brief 处理基由标量函数组合而成的向量函数空间的 Dirichlet 边界条件
 
@@ -81,12 +299,12 @@ class DirichletBC():
         gD = self.gD
         if dflag is None:
             dflag = space[0].boundary_interpolate(gD, uh, threshold=self.threshold)
+        if inplace:
+            return self.apply_inplace(A, f, uh.reshape(-1), dflag.reshape(-1))
         f = f - A@uh.flat # 注意这里不修改外界 f 的值
 
         bdIdx = np.zeros(A.shape[0], dtype=np.int_)
         bdIdx[dflag.flat] = 1
-        D0 = spdiags(1-bdIdx, 0, A.shape[0], A.shape[0])
-        D1 = spdiags(bdIdx, 0, A.shape[0], A.shape[0])
-        A = D0@A@D0 + D1
+        A = self.constrain(A, bdIdx)
         f[dflag.flat] = uh.ravel()[dflag.flat]
         return A, f 
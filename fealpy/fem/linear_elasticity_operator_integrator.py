@@ -2,6 +2,7 @@ import numpy as np
 from typing import Optional, Tuple
 
 from fealpy.fem.precomp_data import data
+from .assembly_cache import cell_array
 
 class LinearElasticityOperatorIntegrator:
     def __init__(self, lam, mu, q=None, c=None):
@@ -86,6 +87,7 @@ class LinearElasticityOperatorIntegrator:
                 else:
                     ps = mesh.bc_to_point(bcs, index=index)
                     c = c(ps)
+            c = cell_array(c, mesh.number_of_cells(), index=index)
             if np.isscalar(c):
                 A = [c * np.einsum('i, ijm, ijn, j -> jmn', ws, grad[..., i], grad[..., j], cellmeasure,
                         optimize=True) for i, j in idx]
@@ -205,14 +207,15 @@ class LinearElasticityOperatorIntegrator:
             K = out
 
         # 对于每一个设定的索引对，利用四边形积分公式和基函数的梯度来计算一个积分项
-        glambda = mesh.grad_lambda()
+        glambda = mesh.grad_lambda(index=index)
+        c = cell_array(c, mesh.number_of_cells(), index=index)
         if c is None:
             A = [np.einsum('ijkl, c, ck, cl -> cij', data[dataindex], cellmeasure, glambda[..., i], glambda[..., j],
                 optimize=True) for i, j in idx]
         else:
             if callable(c):
                 u = coefspace.interpolate(c)
-                cell2dof = coefspace.cell_to_dof()
+                cell2dof = coefspace.cell_to_dof(index=index)
                 c = u[cell2dof]
             if np.isscalar(c):
                 A  = [c * np.einsum('ijkl, c, ck, cl -> cij', data[dataindex], cellmeasure, glambda[..., i], glambda[..., j],
@@ -1,19 +1,25 @@
 import numpy as np
 from scipy.sparse import csr_matrix
 
+from .assembly_cache import cell_chunks, block_accumulate, is_full_index
+from ..decorator.profiler import profiler
+
 class LinearForm:
     """
 
     """
-    def __init__(self, space, atype=None):
+    def __init__(self, space, atype=None, chunk_size=None):
         """
         @brief 
+
+        @param[in] chunk_size 分块组装时每一块的单元个数, 默认不分块
         """
         self.space = space
         self._V = None # 需要组装的矩阵 
         self.atype = atype # 矩阵组装的方式，None、fast、ref
         self.dintegrators = [] # 区域积分子
         self.bintegrators = [] # 边界积分子
+        self.chunk_size = chunk_size # 分块组装时每一块的单元个数
 
     def add_domain_integrator(self, I):
         """
@@ -45,10 +51,38 @@ class LinearForm:
         else:
             return self._V.copy()
 
-    def assembly(self):
+    def _assembly_cell_vector(self, di, space, index, cellmeasure, out):
+        """
+        @brief 组装一块单元上的单元向量, 不分块时不向积分子传递单元索引
+        """
+        with profiler.scope(type(di).__name__):
+            if is_full_index(index):
+                di.assembly_cell_vector(space, cellmeasure=cellmeasure, out=out)
+            else:
+                di.assembly_cell_vector(space, index=index,
+                        cellmeasure=cellmeasure[index], out=out)
+
+    def _assembly_face_vector(self, bi, space):
+        """
+        @brief 调用边界积分子把边界上的向量累加到 _V 中
+        """
+        with profiler.scope(type(bi).__name__):
+            bi.assembly_face_vector(space, out=self._V)
+
+    def _chunk_size(self, NC, nthreads):
+        """
+        @brief 分块的大小, 多线程而没有设置 chunk_size 时每个线程处理一块
+        """
+        if (self.chunk_size is None) and (nthreads is not None) and (nthreads > 1):
+            return -(-NC//nthreads)
+        return self.chunk_size
+
+    def assembly(self, nthreads=None):
         """
         @brief 数值积分组装
 
+        @param[in] nthreads 组装使用的线程个数, 默认单线程
+
         @note space 可能是以下的情形, 程序上需要更好的设计
             * 标量空间
             * 由标量空间组成的向量空间
@@ -56,14 +90,15 @@ class LinearForm:
             * 向量空间（基函数是向量型的）
             * 张量空间（基函数是张量型的
         """
-        if isinstance(self.space, tuple) and not isinstance(self.space[0], tuple):
-            # 由标量函数空间张成的向量函数空间
-            return self.assembly_for_vspace_with_scalar_basis()
-        else:
-            # 标量函数空间或基是向量函数的向量函数空间
-            return self.assembly_for_sspace_and_vspace_with_vector_basis()
+        with profiler.scope('LinearForm.assembly'):
+            if isinstance(self.space, tuple) and not isinstance(self.space[0], tuple):
+                # 由标量函数空间张成的向量函数空间
+                return self.assembly_for_vspace_with_scalar_basis(nthreads=nthreads)
+            else:
+                # 标量函数空间或基是向量函数的向量函数空间
+                return self.assembly_for_sspace_and_vspace_with_vector_basis(nthreads=nthreads)
 
-    def assembly_for_sspace_and_vspace_with_vector_basis(self):
+    def assembly_for_sspace_and_vspace_with_vector_basis(self, nthreads=None):
         """
         @brief 基函数为标量函数的标量空间, 以及基函数为向量函数的函数空间
         """
@@ -79,20 +114,25 @@ class LinearForm:
         gdof = space.number_of_global_dofs()
         ldof = space.number_of_local_dofs()
 
-        bb = np.zeros((NC, ldof), dtype=space.ftype)
-        for di in self.dintegrators:
-            di.assembly_cell_vector(space, cellmeasure=cellmeasure, out=bb)
-
         cell2dof = space.cell_to_dof()
-        self._V = np.zeros((gdof, ), dtype=space.ftype)
-        np.add.at(self._V, cell2dof, bb)
+
+        def block_vector(index, V):
+            bb = np.zeros((len(cellmeasure[index]), ldof), dtype=space.ftype)
+            profiler.allocated(bb)
+            for di in self.dintegrators:
+                self._assembly_cell_vector(di, space, index, cellmeasure, bb)
+            np.add.at(V, cell2dof[index], bb)
+
+        chunks = cell_chunks(NC, self._chunk_size(NC, nthreads))
+        self._V = block_accumulate(block_vector, chunks,
+                lambda: np.zeros((gdof, ), dtype=space.ftype), nthreads)
 
         for bi in self.bintegrators:
-            bi.assembly_face_vector(space, out=self._V)
+            self._assembly_face_vector(bi, space)
 
         return self._V
 
-    def assembly_for_vspace_with_scalar_basis(self):
+    def assembly_for_vspace_with_scalar_basis(self, nthreads=None):
         """
         @brief 由标量空间张成的向量函数空间
         """
@@ -110,26 +150,33 @@ class LinearForm:
         ldof = space[0].number_of_local_dofs()
 
         cell2dof = space[0].cell_to_dof()
-        if space[0].doforder == 'sdofs': # 标量空间自由度优先排序
-            bb = np.zeros((NC, GD, ldof), dtype=mesh.ftype)
-        elif space[0].doforder == 'vdims': # 向量分量自由度优先排序
-            bb = np.zeros((NC, ldof, GD), dtype=mesh.ftype)
-
-        for di in self.dintegrators:
-            di.assembly_cell_vector(space, cellmeasure=cellmeasure, out=bb)
-
-        self._V = np.zeros((GD*gdof, ), dtype=mesh.ftype)
-        if space[0].doforder == 'sdofs': # 标量空间自由度优先排序
-            V = self._V.reshape(GD, gdof)
-            for i in range(GD):
-                np.add.at(V[i, :], cell2dof, bb[:, i, :])
-        elif space[0].doforder == 'vdims': # 向量分量自由度优先排序
-            V = self._V.reshape(gdof, GD) 
-            for i in range(GD):
-                np.add.at(V[:, i], cell2dof, bb[:, :, i])
+
+        def block_vector(index, F):
+            n = len(cellmeasure[index])
+            if space[0].doforder == 'sdofs': # 标量空间自由度优先排序
+                bb = np.zeros((n, GD, ldof), dtype=mesh.ftype)
+            elif space[0].doforder == 'vdims': # 向量分量自由度优先排序
+                bb = np.zeros((n, ldof, GD), dtype=mesh.ftype)
+            profiler.allocated(bb)
+
+            for di in self.dintegrators:
+                self._assembly_cell_vector(di, space, index, cellmeasure, bb)
+
+            if space[0].doforder == 'sdofs': # 标量空间自由度优先排序
+                V = F.reshape(GD, gdof)
+                for i in range(GD):
+                    np.add.at(V[i, :], cell2dof[index], bb[:, i, :])
+            elif space[0].doforder == 'vdims': # 向量分量自由度优先排序
+                V = F.reshape(gdof, GD) 
+                for i in range(GD):
+                    np.add.at(V[:, i], cell2dof[index], bb[:, :, i])
+
+        chunks = cell_chunks(NC, self._chunk_size(NC, nthreads))
+        self._V = block_accumulate(block_vector, chunks,
+                lambda: np.zeros((GD*gdof, ), dtype=mesh.ftype), nthreads)
         
         for bi in self.bintegrators:
-            bi.assembly_face_vector(space, out=self._V)
+            self._assembly_face_vector(bi, space)
 
         return self._V
 
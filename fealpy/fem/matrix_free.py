@@ -0,0 +1,168 @@
+import numpy as np
+from scipy.sparse.linalg import LinearOperator
+
+
+class MatrixFreeOperator(LinearOperator):
+    """
+    @brief 无矩阵的双线性型算子
+
+    不组装全局稀疏矩阵, 每次矩阵向量乘都在单元上计算 A_K x_K 再累加到全局,
+    可以直接传给 scipy 的 Krylov 求解器（cg、gmres、minres 等）。
+
+    @note 对角线在第一次需要时计算并保存, 可以用于 Jacobi 预条件
+    """
+    def __init__(self, form, gdof, dtype=np.float64):
+        """
+        @param[in] form `atype='matfree'` 的 BilinearForm 对象
+        @param[in] gdof 全局自由度个数
+        """
+        super().__init__(dtype=dtype, shape=(gdof, gdof))
+        self.form = form
+        self._diag = None
+
+    def _matvec(self, x):
+        return self.form.mult(x.reshape(-1)).reshape(x.shape)
+
+    def _rmatvec(self, x):
+        # 这里的积分子给出的都是对称的单元算子
+        return self._matvec(x)
+
+    def diagonal(self):
+        """
+        @brief 算子的对角线
+        """
+        if self._diag is None:
+            self._diag = self.form.diagonal()
+        return self._diag
+
+
+def tensor_product_basis(mesh, bcs, p):
+    """
+    @brief 张量积单元（四边形、六面体）上的一维基函数及其导数在一维积分点处的值
+
+    @return B, D 形状都为 (NQ1, p+1), 如果 mesh 或 bcs 不是张量积结构则返回 None
+
+    @note 这里要求各个方向的一维积分点相同, 这与 `mesh.shape_function` 的假设一致
+    """
+    if not (isinstance(bcs, tuple) and hasattr(mesh, 'first_fundamental_form')):
+        return None
+    bc = bcs[0]
+    for val in bcs[1:]:
+        if (val.shape != bc.shape) or np.any(val != bc):
+            return None
+    B = mesh._shape_function(bc, p=p)
+    R = mesh._grad_shape_function(bc, p=p)
+    D = np.einsum('...ij, j->...i', R, np.array([-1, 1], dtype=mesh.ftype))
+    return B, D
+
+
+def tensor_contract(mats, uc):
+    """
+    @brief 按方向依次作用一维矩阵（和因子分解）
+
+    @param[in] mats 长度为 TD 的列表, mats[d] 形状为 (m, n), 作用在第 d 个方向
+    @param[in] uc 形状为 (NC, n, n, ...) 的数组
+
+    @return 形状为 (NC, m, m, ...) 的数组
+
+    @note 计算量为 O(NC*n^(TD+1)), 而直接用张量积基函数计算为 O(NC*n^(2*TD))
+    """
+    for d, A in enumerate(mats):
+        uc = np.moveaxis(np.tensordot(uc, A, axes=([d+1], [1])), -1, d+1)
+    return uc
+
+
+def sum_factorization_value(B, uc, TD):
+    """
+    @brief 用和因子分解计算单元上的有限元函数在张量积分点处的值
+
+    @param[in] uc 形状为 (NC, ldof) 的单元自由度值
+
+    @return 形状为 (NQ, NC) 的数组
+    """
+    NC = uc.shape[0]
+    n = B.shape[-1]
+    val = tensor_contract([B]*TD, uc.reshape((NC,) + (n,)*TD))
+    return val.reshape(NC, -1).T
+
+
+def sum_factorization_value_transpose(B, f, TD):
+    """
+    @brief `sum_factorization_value` 的转置, 计算 \\sum_q f_q \\phi_l(x_q)
+
+    @param[in] f 形状为 (NQ, NC) 的数组
+
+    @return 形状为 (NC, ldof) 的数组
+    """
+    NC = f.shape[1]
+    m = B.shape[0]
+    val = tensor_contract([B.T]*TD, f.T.reshape((NC,) + (m,)*TD))
+    return val.reshape(NC, -1)
+
+
+def sum_factorization_grad(B, D, uc, TD):
+    """
+    @brief 用和因子分解计算单元上的有限元函数在张量积分点处关于参考变量的梯度
+
+    @return 形状为 (NQ, NC, TD) 的数组
+    """
+    NC = uc.shape[0]
+    n = B.shape[-1]
+    uc = uc.reshape((NC,) + (n,)*TD)
+    val = np.zeros((NC, B.shape[0]**TD, TD), dtype=np.result_type(B, uc))
+    for t in range(TD):
+        mats = [D if d == t else B for d in range(TD)]
+        val[..., t] = tensor_contract(mats, uc).reshape(NC, -1)
+    return val.swapaxes(0, 1)
+
+
+def sum_factorization_grad_transpose(B, D, f, TD):
+    """
+    @brief `sum_factorization_grad` 的转置, 计算 \\sum_q f_q \\cdot \\nabla_u \\phi_l(x_q)
+
+    @param[in] f 形状为 (NQ, NC, TD) 的数组
+
+    @return 形状为 (NC, ldof) 的数组
+    """
+    NC = f.shape[1]
+    m = B.shape[0]
+    val = 0
+    for t in range(TD):
+        mats = [D.T if d == t else B.T for d in range(TD)]
+        ft = f[..., t].T.reshape((NC,) + (m,)*TD)
+        val = val + tensor_contract(mats, ft).reshape(NC, -1)
+    return val
+
+
+class DirichletConstrainedOperator(LinearOperator):
+    """
+    @brief 施加 Dirichlet 边界条件后的无矩阵算子
+
+    与组装矩阵时的 D0 A D0 + D1 等价, 其中 D0、D1 分别是内部自由度和 Dirichlet
+    自由度的对角指示矩阵。
+    """
+    def __init__(self, A, isDDof):
+        """
+        @param[in] A 原来的算子
+        @param[in] isDDof 形状为 (gdof, ) 的布尔数组, 标记 Dirichlet 自由度
+        """
+        super().__init__(dtype=A.dtype, shape=A.shape)
+        self.A = A
+        self.isDDof = isDDof
+
+    def _matvec(self, x):
+        shape = x.shape
+        x = x.reshape(-1)
+        y = x.copy()
+        y[self.isDDof] = 0.0
+        y = self.A.matvec(y)
+        y[self.isDDof] = x[self.isDDof]
+        return y.reshape(shape)
+
+    def _rmatvec(self, x):
+        return self._matvec(x)
+
+    def diagonal(self):
+        d = np.array(self.A.diagonal())
+        d[self.isDDof] = 1.0
+        return d
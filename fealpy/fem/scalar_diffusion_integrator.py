@@ -1,19 +1,72 @@
 import numpy as np
 
 from fealpy.fem.precomp_data import data
+from .assembly_cache import fetch_cell_data, cell_array
+from .matrix_free import tensor_product_basis
+from .matrix_free import sum_factorization_grad, sum_factorization_grad_transpose
 
 class ScalarDiffusionIntegrator:
     """
     @note (c \\grad u, \\grad v)
     """    
+    cacheable = True # 支持 BilinearForm 的组装缓存
+
     def __init__(self, c=None, q=None):
         self.coef = c
         self.q = q
         self.type = "BL0"
 
-    def assembly_cell_matrix(self, space, index=np.s_[:], cellmeasure=None, out=None):
+    def cell_measure(self, mesh, index=np.s_[:]):
+        """
+        @brief 计算单元测度
+        """
+        if mesh.meshtype == 'UniformMesh2d':
+            NC = mesh.number_of_cells()
+            return np.broadcast_to(mesh.entity_measure('cell'), (NC,))[index]
+        else:
+            return mesh.entity_measure('cell', index=index)
+
+    def grad_basis_data(self, space, q, index=np.s_[:]):
+        """
+        @brief 计算积分点、积分权重以及基函数梯度在积分点处的值
+
+        @return bcs, ws, gphi, 其中 gphi.shape == (NQ, NC, ldof, GD)
+        """
+        qf = space.mesh.integrator(q, 'cell')
+        bcs, ws = qf.get_quadrature_points_and_weights()
+        return bcs, ws, space.grad_basis(bcs, index=index)
+
+    def coef_value(self, mesh, bcs, q, index=np.s_[:], cache=None):
+        """
+        @brief 计算系数在积分点处的值, 系数不是函数时直接返回
+        """
+        coef = self.coef
+        if callable(coef):
+            if getattr(coef, 'coordtype', 'cartesian') == 'barycentric':
+                coef = coef(bcs, index=index)
+            else:
+                ps = fetch_cell_data(cache, ('bc_to_point', mesh, q),
+                        lambda: mesh.bc_to_point(bcs, index=index), index=index)
+                coef = coef(ps)
+        return cell_array(coef, mesh.number_of_cells(), index=index)
+
+    def grad_transform(self, mesh, bcs, index=np.s_[:]):
+        """
+        @brief 张量积单元上参考梯度到实际梯度的变换 J G^{-1}, 其中 G = J^T J
+
+        @return 形状为 (NQ, NC, GD, TD) 的数组
+        """
+        J = mesh.jacobi_matrix(bcs, index=index)
+        G = np.linalg.inv(mesh.first_fundamental_form(J))
+        return np.einsum('...km, ...mn->...kn', J, G)
+
+    def assembly_cell_matrix(self, space, index=np.s_[:], cellmeasure=None,
+            out=None, cache=None):
         """
         @note 没有参考单元的组装方式
+
+        @param[in] cache 组装缓存对象 `AssemblyCache`, 用来保存积分点处的基函数梯度
+                   和单元测度, 这些数据与系数无关, 重复组装时不必重新计算
         """
         p = space.p
         q = self.q if self.q is not None else p+1 
@@ -23,11 +76,8 @@ class ScalarDiffusionIntegrator:
         GD = mesh.geo_dimension()
 
         if cellmeasure is None:
-            if mesh.meshtype == 'UniformMesh2d':
-                 NC = mesh.number_of_cells()
-                 cellmeasure = np.broadcast_to(mesh.entity_measure('cell', index=index), (NC,))
-            else:
-                cellmeasure = mesh.entity_measure('cell', index=index)
+            cellmeasure = fetch_cell_data(cache, ('cellmeasure', mesh),
+                    lambda: self.cell_measure(mesh, index=index), index=index)
 
         NC = len(cellmeasure)
         ldof = space.number_of_local_dofs() 
@@ -36,26 +86,17 @@ class ScalarDiffusionIntegrator:
         else:
             D = out
 
-        qf = mesh.integrator(q, 'cell')
-        bcs, ws = qf.get_quadrature_points_and_weights()
+        bcs, ws, phi0 = fetch_cell_data(cache, ('grad_basis', space, q),
+                lambda: self.grad_basis_data(space, q, index=index), index=index)
         NQ = len(ws)
 
-        phi0 = space.grad_basis(bcs, index=index) # (NQ, NC, ldof, GD)
+        # (NQ, NC, ldof, GD)
         phi1 = phi0
 
         if coef is None:
             D += np.einsum('q, qcid, qcjd, c->cij', ws, phi0, phi1, cellmeasure, optimize=True)
         else:
-            if callable(coef):
-                if hasattr(coef, 'coordtype'):
-                    if coef.coordtype == 'cartesian':
-                        ps = mesh.bc_to_point(bcs, index=index)
-                        coef = coef(ps)
-                    elif coef.coordtype == 'barycentric':
-                        coef = coef(bcs, index=index)
-                else:
-                    ps = mesh.bc_to_point(bcs, index=index)
-                    coef = coef(ps)
+            coef = self.coef_value(mesh, bcs, q, index=index, cache=cache)
             if np.isscalar(coef):
                 D += coef*np.einsum('q, qcid, qcjd, c->cij', ws, phi0, phi1, cellmeasure, optimize=True)
             elif isinstance(coef, np.ndarray): 
@@ -78,11 +119,80 @@ class ScalarDiffusionIntegrator:
             return D
 
 
+    def apply_cell_operator(self, space, uc, index=np.s_[:], cellmeasure=None,
+            cache=None):
+        """
+        @brief 无矩阵地计算单元矩阵与单元自由度向量的乘积
+
+        @param[in] uc 形状为 (NC, ldof) 的单元自由度值
+
+        @return 形状为 (NC, ldof) 的数组
+
+        @note 四边形和六面体单元上使用和因子分解, 不需要张量积基函数的梯度值
+        """
+        p = space.p
+        q = self.q if self.q is not None else p+1
+        mesh = space.mesh
+        GD = mesh.geo_dimension()
+
+        if cellmeasure is None:
+            cellmeasure = fetch_cell_data(cache, ('cellmeasure', mesh),
+                    lambda: self.cell_measure(mesh, index=index), index=index)
+        NC = len(cellmeasure)
+
+        qf = mesh.integrator(q, 'cell')
+        bcs, ws = qf.get_quadrature_points_and_weights()
+        NQ = len(ws)
+
+        tp = fetch_cell_data(cache, ('tensor_basis', mesh, p, q),
+                lambda: tensor_product_basis(mesh, bcs, p), index=index)
+        if tp is None:
+            _, _, gphi = fetch_cell_data(cache, ('grad_basis', space, q),
+                    lambda: self.grad_basis_data(space, q, index=index), index=index)
+            gu = np.einsum('qcld, cl->qcd', gphi, uc, optimize=True)
+        else:
+            B, D = tp
+            TD = mesh.top_dimension()
+            K = fetch_cell_data(cache, ('grad_transform', mesh, q),
+                    lambda: self.grad_transform(mesh, bcs, index=index), index=index)
+            gu = sum_factorization_grad(B, D, uc, TD)
+            gu = np.einsum('qckt, qct->qck', K, gu, optimize=True)
+
+        coef = self.coef_value(mesh, bcs, q, index=index, cache=cache)
+        if coef is None:
+            f = gu
+        elif np.isscalar(coef):
+            f = coef*gu
+        elif isinstance(coef, np.ndarray):
+            if coef.shape == (NC, ):
+                f = coef[None, :, None]*gu
+            elif coef.shape == (NQ, NC):
+                f = coef[..., None]*gu
+            elif coef.shape == (GD, GD):
+                f = np.einsum('dn, qcd->qcn', coef, gu)
+            elif coef.shape == (NC, GD, GD):
+                f = np.einsum('cdn, qcd->qcn', coef, gu)
+            elif coef.shape == (NQ, NC, GD, GD):
+                f = np.einsum('qcdn, qcd->qcn', coef, gu)
+            else:
+                raise ValueError(f"coef with shape {coef.shape}! Now we just support shape: (NC, ), (NQ, NC), (GD, GD), (NC, GD, GD) or NQ, NC, GD, GD)")
+        else:
+            raise ValueError("coef 不支持该类型")
+        f = f*(ws[:, None, None]*cellmeasure[None, :, None])
+
+        if tp is None:
+            return np.einsum('qcld, qcd->cl', gphi, f, optimize=True)
+        else:
+            f = np.einsum('qckt, qck->qct', K, f, optimize=True)
+            return sum_factorization_grad_transpose(B, D, f, TD)
+
     def assembly_cell_matrix_fast(self, space,
             trialspace=None, testspace=None, coefspace=None,
-            index=np.s_[:], cellmeasure=None, out=None):
+            index=np.s_[:], cellmeasure=None, out=None, cache=None):
         """
         @brief 基于无数值积分的组装方式
+
+        @param[in] cache 组装缓存对象, 用来保存单元测度和重心坐标梯度
         """
         coef = self.coef
 
@@ -124,11 +234,8 @@ class ScalarDiffusionIntegrator:
                 str(TAFdegree) + "_TSF_" + TSFtype + "_" + str(TSFdegree)
 
         if cellmeasure is None:
-            if mesh.meshtype == 'UniformMesh2d':
-                 NC = mesh.number_of_cells()
-                 cellmeasure = np.broadcast_to(mesh.entity_measure('cell', index=index), (NC,))
-            else:
-                 cellmeasure = mesh.entity_measure('cell', index=index)
+            cellmeasure = fetch_cell_data(cache, ('cellmeasure', mesh),
+                    lambda: self.cell_measure(mesh, index=index), index=index)
         
         NC = len(cellmeasure)
 
@@ -137,15 +244,17 @@ class ScalarDiffusionIntegrator:
         else:
             D = out
         
-        glambda = mesh.grad_lambda()
+        glambda = fetch_cell_data(cache, ('grad_lambda', mesh),
+                lambda: mesh.grad_lambda(index=index), index=index)
         if coef is None:
             #print("data[dataindex]:", data[dataindex].shape, "\n", data[dataindex])
             D += np.einsum('ijkl, c, ckm, clm -> cij', data[dataindex], cellmeasure, glambda, glambda, optimize=True)
         else:
             if callable(coef):
                 u = coefspace.interpolate(coef)
-                cell2dof = coefspace.cell_to_dof()
+                cell2dof = coefspace.cell_to_dof(index=index)
                 coef = u[cell2dof]
+            coef = cell_array(coef, mesh.number_of_cells(), index=index)
             if np.isscalar(coef):
                 #print("data[dataindex]:", data[dataindex].shape)
                 D += np.einsum('ijkl, c, ckm, clm -> cij', data[dataindex], cellmeasure, glambda, glambda, optimize=True)
@@ -1,21 +1,62 @@
 import numpy as np
 from pyamg import test
 from fealpy.fem.precomp_data import data
+from .assembly_cache import fetch_cell_data, cell_array
+from .matrix_free import tensor_product_basis
+from .matrix_free import sum_factorization_value, sum_factorization_value_transpose
 
 class ScalarMassIntegrator:
     """
     @note (c u, v)
     """    
+    cacheable = True # 支持 BilinearForm 的组装缓存
 
     def __init__(self, c=None, q=None):
         self.coef = c
         self.q = q
         self.type = 'BL3'
 
+    def cell_measure(self, mesh, index=np.s_[:]):
+        """
+        @brief 计算单元测度
+        """
+        if mesh.meshtype == 'UniformMesh2d':
+            NC = mesh.number_of_cells()
+            return np.broadcast_to(mesh.entity_measure('cell'), (NC,))[index]
+        else:
+            return mesh.entity_measure('cell', index=index)
+
+    def basis_data(self, space, q, index=np.s_[:]):
+        """
+        @brief 计算积分点、积分权重以及基函数在积分点处的值
+
+        @return bcs, ws, phi, 其中 phi.shape == (NQ, NC, ldof)
+        """
+        qf = space.mesh.integrator(q, 'cell')
+        bcs, ws = qf.get_quadrature_points_and_weights()
+        return bcs, ws, space.basis(bcs, index=index)
+
+    def coef_value(self, mesh, bcs, q, index=np.s_[:], cache=None):
+        """
+        @brief 计算系数在积分点处的值, 系数不是函数时直接返回
+        """
+        coef = self.coef
+        if callable(coef):
+            if getattr(coef, 'coordtype', 'cartesian') == 'barycentric':
+                coef = coef(bcs, index=index)
+            else:
+                ps = fetch_cell_data(cache, ('bc_to_point', mesh, q),
+                        lambda: mesh.bc_to_point(bcs, index=index), index=index)
+                coef = coef(ps)
+        return cell_array(coef, mesh.number_of_cells(), index=index)
+
     def assembly_cell_matrix(self, space, index=np.s_[:], cellmeasure=None,
-            out=None):
+            out=None, cache=None):
         """
         @note 没有参考单元的组装方式
+
+        @param[in] cache 组装缓存对象 `AssemblyCache`, 用来保存积分点处的基函数值
+                   和单元测度, 这些数据与系数无关, 重复组装时不必重新计算
         """
 
         q = self.q if self.q is not None else space.p+1
@@ -24,11 +65,8 @@ class ScalarMassIntegrator:
         mesh = space.mesh
  
         if cellmeasure is None:
-            if mesh.meshtype == 'UniformMesh2d':
-                 NC = mesh.number_of_cells()
-                 cellmeasure = np.broadcast_to(mesh.entity_measure('cell', index=index), (NC,))
-            else:
-                cellmeasure = mesh.entity_measure('cell', index=index)
+            cellmeasure = fetch_cell_data(cache, ('cellmeasure', mesh),
+                    lambda: self.cell_measure(mesh, index=index), index=index)
 
         NC = len(cellmeasure)
         ldof = space.number_of_local_dofs()  
@@ -38,24 +76,14 @@ class ScalarMassIntegrator:
         else:
             M = out
 
-        qf = mesh.integrator(q, 'cell')
-        bcs, ws = qf.get_quadrature_points_and_weights()
+        bcs, ws, phi0 = fetch_cell_data(cache, ('basis', space, q),
+                lambda: self.basis_data(space, q, index=index), index=index)
 
-        phi0 = space.basis(bcs, index=index) # (NQ, NC, ldof)
+        # phi0.shape == (NQ, NC, ldof)
         if coef is None:
             M += np.einsum('q, qci, qcj, c -> cij', ws, phi0, phi0, cellmeasure, optimize=True)
         else:
-            if callable(coef):
-                if hasattr(coef, 'coordtype'):
-                    if coef.coordtype == 'cartesian':
-                        ps = mesh.bc_to_point(bcs, index=index)
-                        coef = coef(ps)
-                    elif coef.coordtype == 'barycentric':
-                        coef = coef(bcs, index=index)
-                else:
-                    ps = mesh.bc_to_point(bcs, index=index)
-                    coef = coef(ps)
-
+            coef = self.coef_value(mesh, bcs, q, index=index, cache=cache)
             if np.isscalar(coef):
                 M += coef*np.einsum('q, qci, qcj, c->cij', ws, phi0, phi0, cellmeasure, optimize=True)
             elif isinstance(coef, np.ndarray): 
@@ -70,11 +98,65 @@ class ScalarMassIntegrator:
             return M
         
     
+    def apply_cell_operator(self, space, uc, index=np.s_[:], cellmeasure=None,
+            cache=None):
+        """
+        @brief 无矩阵地计算单元质量矩阵与单元自由度向量的乘积
+
+        @param[in] uc 形状为 (NC, ldof) 的单元自由度值
+
+        @return 形状为 (NC, ldof) 的数组
+
+        @note 四边形和六面体单元上使用和因子分解
+        """
+        p = space.p
+        q = self.q if self.q is not None else p+1
+        mesh = space.mesh
+
+        if cellmeasure is None:
+            cellmeasure = fetch_cell_data(cache, ('cellmeasure', mesh),
+                    lambda: self.cell_measure(mesh, index=index), index=index)
+        NC = len(cellmeasure)
+
+        qf = mesh.integrator(q, 'cell')
+        bcs, ws = qf.get_quadrature_points_and_weights()
+
+        tp = fetch_cell_data(cache, ('tensor_basis', mesh, p, q),
+                lambda: tensor_product_basis(mesh, bcs, p), index=index)
+        if tp is None:
+            _, _, phi = fetch_cell_data(cache, ('basis', space, q),
+                    lambda: self.basis_data(space, q, index=index), index=index)
+            phi = np.broadcast_to(phi, (len(ws), NC, phi.shape[-1]))
+            val = np.einsum('qcl, cl->qc', phi, uc, optimize=True)
+        else:
+            B, _ = tp
+            TD = mesh.top_dimension()
+            val = sum_factorization_value(B, uc, TD)
+
+        coef = self.coef_value(mesh, bcs, q, index=index, cache=cache)
+        if coef is None:
+            f = val
+        elif np.isscalar(coef):
+            f = coef*val
+        elif isinstance(coef, np.ndarray):
+            # coef.shape == (NC, ) 或 (NQ, NC)
+            f = coef*val
+        else:
+            raise ValueError("coef is not correct!")
+        f = f*(ws[:, None]*cellmeasure)
+
+        if tp is None:
+            return np.einsum('qcl, qc->cl', phi, f, optimize=True)
+        else:
+            return sum_factorization_value_transpose(B, f, TD)
+
     def assembly_cell_matrix_fast(self, space,
             trialspace=None, testspace=None, coefspace=None,
-            index=np.s_[:], cellmeasure=None, out=None):
+            index=np.s_[:], cellmeasure=None, out=None, cache=None):
         """
         @brief 基于无数值积分的组装方式
+
+        @param[in] cache 组装缓存对象, 用来保存单元测度
         """
         coef = self.coef
 
@@ -116,11 +198,8 @@ class ScalarMassIntegrator:
                 str(TAFdegree) + "_TSF_" + TSFtype + "_" + str(TSFdegree)
 
         if cellmeasure is None:
-            if mesh.meshtype == 'UniformMesh2d':
-                 NC = mesh.number_of_cells()
-                 cellmeasure = np.broadcast_to(mesh.entity_measure('cell', index=index), (NC,))
-            else:
-                 cellmeasure = mesh.entity_measure('cell', index=index)
+            cellmeasure = fetch_cell_data(cache, ('cellmeasure', mesh),
+                    lambda: self.cell_measure(mesh, index=index), index=index)
         
         NC = len(cellmeasure)
 
@@ -134,8 +213,9 @@ class ScalarMassIntegrator:
         else:
             if callable(coef):
                 u = coefspace.interpolate(coef)
-                cell2dof = coefspace.cell_to_dof()
+                cell2dof = coefspace.cell_to_dof(index=index)
                 coef = u[cell2dof]
+            coef = cell_array(coef, mesh.number_of_cells(), index=index)
             if np.isscalar(coef):
                 M += coef * np.einsum('c, aij -> cij', cellmeasure, data[dataindex], optimize=True)
             elif coef.shape == (NC, COFldof):
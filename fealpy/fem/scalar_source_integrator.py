@@ -3,6 +3,8 @@ from numpy.typing import NDArray
 
 from typing import TypedDict, Callable, Tuple, Union
 
+from .assembly_cache import cell_array
+
 
 class ScalarSourceIntegrator():
 
@@ -60,7 +62,7 @@ class ScalarSourceIntegrator():
                 ps = mesh.bc_to_point(bcs, index=index)
                 val = f(ps)
         else:
-            val = f
+            val = cell_array(f, mesh.number_of_cells(), index=index)
 
         if isinstance(val, (int, float)):
             bb += val*np.einsum('q, qci, c->ci', ws, phi, cellmeasure, optimize=True)
@@ -68,7 +70,7 @@ class ScalarSourceIntegrator():
             if val.shape == (NC, ): 
                 bb += np.einsum('q, c, qci, c->ci', ws, val, phi, cellmeasure, optimize=True)
             else:
-                if val.shape[-1] == 1:
+                if (val.ndim == 3) and (val.shape[-1] == 1):
                     val = val[..., 0]
                 bb += np.einsum('q, qc, qci, c->ci', ws, val, phi, cellmeasure, optimize=True)
         if out is None:
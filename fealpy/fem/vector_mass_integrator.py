@@ -4,26 +4,29 @@ import numpy as np
 from fealpy.fem.precomp_data import data
 
 from .scalar_mass_integrator import ScalarMassIntegrator
+from .assembly_cache import fetch_cell_data
 
 class VectorMassIntegrator:
     """
     @note (c u, v)
     """    
+    cacheable = True # 支持 BilinearForm 的组装缓存
+
     def __init__(self, c=None, q=None):
         self.coef = c
         self.q = q
         self.type = 'BL11'
 
-    def assembly_cell_matrix(self, space, index=np.s_[:], cellmeasure=None, out=None):
+    def assembly_cell_matrix(self, space, index=np.s_[:], cellmeasure=None, out=None, cache=None):
         """
         @note 没有参考单元的组装方式
         """
         if isinstance(space, tuple): # 由标量空间组合而成的空间
-            return self.assembly_cell_matrix_for_scalar_basis_vspace(space, index=index, cellmeasure=cellmeasure, out=out)
+            return self.assembly_cell_matrix_for_scalar_basis_vspace(space, index=index, cellmeasure=cellmeasure, out=out, cache=cache)
         else: # 空间基函数是向量函数
-            return self.assembly_cell_matrix_for_vector_basis_vspace(space, index=index, cellmeasure=cellmeasure, out=out)
+            return self.assembly_cell_matrix_for_vector_basis_vspace(space, index=index, cellmeasure=cellmeasure, out=out, cache=cache)
 
-    def assembly_cell_matrix_for_vector_basis_vspace(self, space, index=np.s_[:], cellmeasure=None, out=None):
+    def assembly_cell_matrix_for_vector_basis_vspace(self, space, index=np.s_[:], cellmeasure=None, out=None, cache=None):
         """
         @brief 空间基函数是向量型
         """
@@ -57,7 +60,7 @@ class VectorMassIntegrator:
         if out is None:
             return D
 
-    def assembly_cell_matrix_for_scalar_basis_vspace(self, space, index=np.s_[:], cellmeasure=None, out=None):
+    def assembly_cell_matrix_for_scalar_basis_vspace(self, space, index=np.s_[:], cellmeasure=None, out=None, cache=None):
         """
         @brief 标量空间拼成的向量空间 
         """
@@ -67,12 +70,13 @@ class VectorMassIntegrator:
         assert len(space) == GD
         
         if cellmeasure is None:
-            cellmeasure = mesh.entity_measure('cell', index=index)
+            cellmeasure = fetch_cell_data(cache, ('cellmeasure', mesh),
+                    lambda: mesh.entity_measure('cell', index=index), index=index)
         ldof = space[0].number_of_local_dofs()
         integrator = ScalarMassIntegrator(self.coef, self.q)
         # 组装标量的单元扩散矩阵
         # D.shape == (NC, ldof, ldof)
-        D = integrator.assembly_cell_matrix(space[0], index=index, cellmeasure=cellmeasure)
+        D = integrator.assembly_cell_matrix(space[0], index=index, cellmeasure=cellmeasure, cache=cache)
         NC = len(cellmeasure)
 
         if out is None:
@@ -89,21 +93,21 @@ class VectorMassIntegrator:
         if out is None:
             return VD
 
-    def assembly_cell_matrix_fast(self, space, trialspace=None, testspace=None, coefspace=None, index=np.s_[:], cellmeasure=None, out=None):
+    def assembly_cell_matrix_fast(self, space, trialspace=None, testspace=None, coefspace=None, index=np.s_[:], cellmeasure=None, out=None, cache=None):
         """
         @note 基于无数值积分的组装方式
         """
         self.space = space
         if isinstance(space, tuple): # 由标量空间组合而成的空间
             return self.assembly_cell_matrix_for_scalar_basis_vspace_fast(space, trialspace, testspace, coefspace,
-                                                                        index=index, cellmeasure=cellmeasure, out=out)
+                                                                        index=index, cellmeasure=cellmeasure, out=out, cache=cache)
         else: # 空间基函数是向量函数
-            return self.assembly_cell_matrix_for_vector_basis_vspace(space, index=index, cellmeasure=cellmeasure, out=out)
+            return self.assembly_cell_matrix_for_vector_basis_vspace(space, index=index, cellmeasure=cellmeasure, out=out, cache=cache)
 
 
     def assembly_cell_matrix_for_scalar_basis_vspace_fast(self, space,
             trialspace, testspace, coefspace,
-            index=np.s_[:], cellmeasure=None, out=None):
+            index=np.s_[:], cellmeasure=None, out=None, cache=None):
         """
         @brief 标量空间拼成的向量空间 
         """
@@ -113,12 +117,13 @@ class VectorMassIntegrator:
         
         mesh =space[0].mesh
         if cellmeasure is None:
-            cellmeasure = mesh.entity_measure('cell', index=index)
+            cellmeasure = fetch_cell_data(cache, ('cellmeasure', mesh),
+                    lambda: mesh.entity_measure('cell', index=index), index=index)
         ldof = space[0].number_of_local_dofs()
         integrator = ScalarMassIntegrator(self.coef, self.q)
         # 组装标量的单元扩散矩阵
         # D.shape == (NC, ldof, ldof)
-        D = integrator.assembly_cell_matrix_fast(space[0], trialspace, testspace, coefspace, index=index, cellmeasure=cellmeasure)
+        D = integrator.assembly_cell_matrix_fast(space[0], trialspace, testspace, coefspace, index=index, cellmeasure=cellmeasure, cache=cache)
         NC = len(cellmeasure)
 
         if out is None:
@@ -135,7 +140,7 @@ class VectorMassIntegrator:
         if out is None:
             return VD
 
-    def assembly_cell_matrix_for_vector_basis_vspace_fast(self, space, index=np.s_[:], cellmeasure=None, out=None):
+    def assembly_cell_matrix_for_vector_basis_vspace_fast(self, space, index=np.s_[:], cellmeasure=None, out=None, cache=None):
         """
         @brief 空间基函数是向量型
         """
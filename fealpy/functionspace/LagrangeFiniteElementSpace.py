@@ -974,9 +974,6 @@ class LagrangeFiniteElementSpace():
         Notes
         -----
         并行组装质量矩阵 
-
-        TODO:
-        1. parallel_construct_matrix just work for stiff matrix
         """
         gdof = self.number_of_global_dofs()
         cell2dof = self.cell_to_dof()
@@ -1,6 +1,7 @@
 # 新文件命名规则的空间类
 from .lagrange_fe_space import LagrangeFESpace
 from .bernstein_fe_space import BernsteinFESpace
+from .point_probe import PointProbe
 
 from .conforming_vector_ve_space_2d import ConformingVectorVESpace2d
 from .conforming_scalar_ve_space_2d import ConformingScalarVESpace2d
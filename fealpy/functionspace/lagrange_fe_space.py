@@ -4,6 +4,7 @@ from typing import Union, Callable
 from .Function import Function
 from ..decorator import barycentric, cartesian
 from .fem_dofs import *
+from .point_probe import PointProbe
 
 class LagrangeFESpace():
     DOF = { 'C': {
@@ -141,28 +142,41 @@ class LagrangeFESpace():
     def function_value(self, uh, points, loc=None):
         """
         @brief 计算被给有限元函数的在 cartesian 坐标 points 处的函数值
-               注意，要求网格具有 find_node 函数
         @param points: (NP, 2)
+
+        @return loc, val。不在网格中的点 loc 为 -1, 函数值为 nan
+
+        @note 半边网格用 `find_point_in_triangle_mesh` 从 loc 出发查找点所在的
+              单元, 其它网格用 `mesh.locate` 查找, 这时不需要 loc。张量积网格
+              的局部坐标是一维重心坐标的元组, 基函数值由 `PointProbe` 计算
         """
-        assert hasattr(self.mesh, 'find_point_in_triangle_mesh')
-        if isinstance(uh, list):
+        if hasattr(self.mesh, 'find_point_in_triangle_mesh'):
             loc, bc = self.mesh.find_point_in_triangle_mesh(points, loc) #bc : (NP, 3)
+            index, = np.nonzero(loc >= 0)
+            phi = self.basis(bc[index])[..., 0, :] #(n, ldof)
+        else:
+            probe = PointProbe(self, points)
+            loc, index = probe.loc, probe.index
+            phi = probe.basis() #(n, ldof)
 
-            TD = points.shape[-1]
-            phi = self.basis(bc) #(NP, ldof)
-            e2d = uh[0].space.dof.entity_to_dof(etype=TD)[loc] #(NP, ldof)
-            val = np.zeros((len(uh), )+e2d.shape[:-1], dtype=np.float_)
+        e2d = self.cell_to_dof()[loc[index]] #(n, ldof)
+        if isinstance(uh, list):
+            val = np.full((len(uh), len(loc)), np.nan, dtype=np.float_)
             for i in range(len(uh)):
-                val[i] = np.sum(phi[..., 0, :]*uh[i][e2d], axis=-1)
+                val[i, index] = np.sum(phi*uh[i][e2d], axis=-1)
         else:
-            loc, bc = self.mesh.find_point_in_triangle_mesh(points, loc) #bc : (NP, 3)
-
-            TD = points.shape[-1]
-            phi = self.basis(bc) #(NP, ldof)
-            e2d = uh.space.dof.entity_to_dof(etype=TD)[loc] #(NP, ldof)
-            val = np.sum(phi[..., 0, :]*uh[e2d], axis=-1)
+            val = np.full(len(loc), np.nan, dtype=np.float_)
+            val[index] = np.sum(phi*uh[e2d], axis=-1)
         return loc, val
 
+    def probe(self, points):
+        """
+        @brief 生成在固定点集上求值的 `PointProbe` 对象
+
+        @note 点的定位和基函数值只计算一次, 之后每次求值只需一次稀疏矩阵向量乘
+        """
+        return PointProbe(self, points)
+
     @barycentric
     def value(self,
             uh: np.ndarray,
@@ -0,0 +1,163 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class PointProbe():
+    """
+    @brief 在一组固定的点上批量计算有限元函数的值和梯度
+
+    构造时只做一次点的定位和基函数计算, 并组装成稀疏矩阵
+        P[i, cell2dof[loc[i], l]] = phi_l(x_i)
+    之后每次求值只需要一次稀疏矩阵向量乘, 计算量为 O(NP*ldof)。适用于时间
+    步进中反复提取同一组监测点上的解。
+
+    @note 不在网格中的点的值为 nan, 可以用 `isInside` 判断
+    """
+    def __init__(self, space, points):
+        """
+        @param[in] space 拉格朗日有限元空间（标量空间）
+        @param[in] points 形状为 (NP, GD) 的点
+        """
+        self.space = space
+        mesh = space.mesh
+        self.points = np.asarray(points, dtype=mesh.ftype)
+        self.loc, self.bc = mesh.locate(self.points)
+        self.isInside = self.loc >= 0
+        self.index, = np.nonzero(self.isInside)
+        self._P = None
+        self._G = None
+
+    def number_of_points(self):
+        return len(self.loc)
+
+    def _matrix(self, val):
+        """
+        @brief 由点上的局部基函数值 val (n, ldof) 组装 (NP, gdof) 的稀疏矩阵
+        """
+        NP = self.number_of_points()
+        gdof = self.space.number_of_global_dofs()
+        cell2dof = self.space.cell_to_dof()[self.loc[self.index]]
+        I = np.broadcast_to(self.index[:, None], cell2dof.shape)
+        return csr_matrix((val.reshape(-1), (I.reshape(-1), cell2dof.reshape(-1))),
+                shape=(NP, gdof))
+
+    def _local_bc(self):
+        bc = self.bc
+        if isinstance(bc, tuple):
+            return tuple(val[self.index] for val in bc)
+        return bc[self.index]
+
+    def basis(self):
+        """
+        @brief 基函数在点上的值, 形状为 (n, ldof), n 为网格中的点的个数
+        """
+        mesh = self.space.mesh
+        p = self.space.p
+        bc = self._local_bc()
+        if isinstance(bc, tuple): # 张量积单元, 每个点上做一维基函数的张量积
+            phi = mesh._shape_function(bc[0], p=p)
+            for val in bc[1:]:
+                phi = np.einsum('ni, nj->nij', phi, mesh._shape_function(val, p=p))
+                phi = phi.reshape(phi.shape[0], -1)
+            return phi
+        return mesh.shape_function(bc, p=p)
+
+    def grad_basis(self):
+        """
+        @brief 基函数在点上关于 x 的梯度, 形状为 (n, ldof, GD)
+        """
+        mesh = self.space.mesh
+        p = self.space.p
+        bc = self._local_bc()
+        index = self.loc[self.index]
+        if isinstance(bc, tuple):
+            gphi = self._grad_tensor_basis(bc, p) # (n, ldof, TD)
+            # 几何映射是 p=1 的张量积映射, J[k, d] = dx_k/du_d
+            xs = mesh.entity('node')[mesh.cell_locator().cell[index]]
+            J = np.einsum('nvk, nvd->nkd', xs, self._grad_tensor_basis(bc, 1))
+            return np.einsum('nld, nkd->nlk', gphi, np.linalg.inv(J).swapaxes(-1, -2))
+        R = mesh._grad_shape_function(bc, p=p) # (n, ldof, TD+1)
+        Dlambda = mesh.grad_lambda(index=index) # (n, TD+1, GD)
+        return np.einsum('nlm, nmk->nlk', R, Dlambda)
+
+    def _grad_tensor_basis(self, bc, p):
+        """
+        @brief 张量积基函数关于参考坐标 u 的梯度, 形状为 (n, ldof, TD)
+        """
+        mesh = self.space.mesh
+        TD = len(bc)
+        phi = [mesh._shape_function(val, p=p) for val in bc]
+        # 一维基函数关于 u 的导数, d lambda_0/du = -1, d lambda_1/du = 1
+        dphi = [np.einsum('nlm, m->nl', mesh._grad_shape_function(val, p=p),
+            np.array([-1, 1], dtype=mesh.ftype)) for val in bc]
+        n = len(bc[0])
+        gphi = np.zeros((n, (p+1)**TD, TD), dtype=mesh.ftype)
+        for d in range(TD):
+            val = dphi[0] if d == 0 else phi[0]
+            for t in range(1, TD):
+                f = dphi[t] if t == d else phi[t]
+                val = np.einsum('ni, nj->nij', val, f).reshape(n, -1)
+            gphi[..., d] = val
+        return gphi
+
+    @property
+    def P(self):
+        """
+        @brief 求值矩阵, 形状为 (NP, gdof)
+        """
+        if self._P is None:
+            self._P = self._matrix(self.basis())
+        return self._P
+
+    @property
+    def G(self):
+        """
+        @brief 梯度的求值矩阵, 长度为 GD 的列表, 每个形状为 (NP, gdof)
+        """
+        if self._G is None:
+            gphi = self.grad_basis()
+            self._G = [self._matrix(gphi[..., d]) for d in range(gphi.shape[-1])]
+        return self._G
+
+    def _apply(self, M, uh):
+        """
+        @brief 计算 M @ uh, uh 可以是有限元函数、数组或者它们的列表
+        """
+        if isinstance(uh, (list, tuple)):
+            return np.stack([self._apply(M, u) for u in uh], axis=0)
+
+        u = np.asarray(uh)
+        # Function 的运算结果可能没有 space 属性, 这时按本空间的排序处理
+        space = getattr(uh, '__dict__', {}).get('space', self.space)
+        if (u.ndim > 1) and (getattr(space, 'doforder', 'vdims') == 'sdofs'):
+            # uh.shape == (..., gdof), val.shape == (..., NP)
+            val = (M @ u.reshape(-1, u.shape[-1]).T).T.reshape(u.shape[:-1] + (-1, ))
+            axis = -1
+        else:
+            # uh.shape == (gdof, ...), val.shape == (NP, ...)
+            val = (M @ u.reshape(u.shape[0], -1)).reshape((-1, ) + u.shape[1:])
+            axis = 0
+
+        if not np.all(self.isInside):
+            val = val.astype(np.result_type(val, np.float64), copy=False)
+            np.moveaxis(val, axis, 0)[~self.isInside] = np.nan
+        return val
+
+    def value(self, uh):
+        """
+        @brief 计算有限元函数在点上的值
+
+        @param[in] uh 有限元函数, 或者它们的列表
+
+        @return 标量函数的形状为 (NP, ); 'vdims' 排序的向量函数为 (NP, ...),
+                'sdofs' 排序的为 (..., NP); 列表时在最前面增加一个轴
+        """
+        return self._apply(self.P, uh)
+
+    __call__ = value
+
+    def grad_value(self, uh):
+        """
+        @brief 计算有限元函数在点上的梯度, 在 `value` 的结果后面增加一个梯度分量的轴
+        """
+        return np.stack([self._apply(G, uh) for G in self.G], axis=-1)
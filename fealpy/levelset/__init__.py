@@ -1,3 +1,4 @@
 
 from .ls_fem_solver import LSFEMSolver
 from .ls_solver import LSSolver
+from .narrow_band import NarrowBand
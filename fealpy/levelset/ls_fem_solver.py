@@ -1,6 +1,9 @@
 import numpy as np
 import time
 
+from scipy.sparse import spdiags
+from scipy.sparse.linalg import spsolve
+
 from ..fem import BilinearForm
 from ..fem import LinearForm
 from ..fem import ScalarConvectionIntegrator
@@ -12,7 +15,10 @@ from ..decorator import barycentric
 
 from .ls_solver import LSSolver
 
-from scipy.sparse.linalg import spsolve
+from .narrow_band import NarrowBand
+
+from ..solver import cached_spsolve
+from ..mesh.eikonal import fast_marching
 
 
 class LSFEMSolver(LSSolver):
@@ -43,6 +49,8 @@ class LSFEMSolver(LSSolver):
         self.M = bform.assembly() # TODO:Implement a fast assembly method
 
         self.u = u
+        self.C = None
+        self.band = None
 
         # Assemble the convection matrix only if a velocity field is provided.
         if u is not None:
@@ -134,6 +142,82 @@ class LSFEMSolver(LSSolver):
         return phi0
 
 
+    def narrow_band_solve(self, phi0, dt, u=None, width=None, q=4, redistance=True):
+        """
+        Solve the level set evolution equation for one time step only in a
+        narrow band around the interface.
+
+        Parameters:
+        - phi0 : The level set function at the current time step. It is updated in place.
+        - dt : Time step size for the evolution.
+        - u : (Optional) Updated velocity field for the evolution.
+        - width : The half width of the band, see `NarrowBand`. It is only used
+            when the band is created, i.e. at the first call.
+        - q : The index of the quadrature formula for the mass and convection
+            matrices. Like width, it is fixed for the mass matrix when the band
+            is created.
+        - redistance : Whether to redistance phi0 inside the band with the fast
+            marching method when the band is rebuilt (only for the linear space).
+
+        The same Crank-Nicolson scheme as `lgmres_solve` is used, but the mass
+        and convection matrices are only assembled on the cells of the band and
+        the linear system is only solved for the dofs of the band. The values
+        outside the band are frozen, so the cost of a time step scales with the
+        size of the band instead of the whole mesh. The band is rebuilt (and the
+        element matrices of the new cells assembled) only when the interface
+        reaches its edge, so the time step should satisfy the CFL condition.
+        Without redistancing the level set function flattens out in long runs,
+        the band gets thinner and has to be rebuilt at almost every step.
+
+        The frozen values at the inflow edge dofs of the band are imposed as
+        Dirichlet data. An edge dof is an inflow dof when its discrete flux, the
+        column sum of the band convection matrix, is negative. The outflow edge
+        dofs keep the natural treatment: prescribing them over-determines the
+        transport equation and the Galerkin scheme oscillates there.
+
+        Returns:
+        - phi0 : The updated level set function.
+        """
+        space = self.space
+
+        if u is None and self.u is None:
+            raise ValueError(" Velocity `u` is None! You must offer velocity!")
+
+        if self.band is None:
+            self.band = NarrowBand(space, width=width, q=q)
+        band = self.band
+
+        if not band.is_valid(phi0):
+            if redistance and space.p == 1:
+                # The band criterion and the frozen values need a distance function.
+                phi0[:] = fast_marching(space.mesh, phi0, band=band.width)
+            band.build(phi0)
+
+        M = band.mass_matrix()
+        if u is None:
+            C = band.convection_matrix(self.u, q=q, cache=True)
+        else:
+            C = band.convection_matrix(u, q=q)
+
+        A = M + (dt/2) * C
+        phi = phi0[band.dof]
+        b = M @ phi - (dt/2) * C @ phi
+
+        # The inflow edge dofs keep their frozen values (Dirichlet data).
+        flux = np.asarray(C.sum(axis=0)).reshape(-1)
+        isInflowDof = band.isEdgeDof[band.dof] & (flux < 0)
+        x = np.where(isInflowDof, phi, 0.0)
+        b -= A @ x
+        b[isInflowDof] = phi[isInflowDof]
+        bdIdx = isInflowDof.astype(A.dtype)
+        D0 = spdiags(1-bdIdx, 0, A.shape[0], A.shape[0])
+        D1 = spdiags(bdIdx, 0, A.shape[0], A.shape[0])
+        A = D0@A@D0 + D1
+
+        phi0[band.dof] = spsolve(A.tocsc(), b)
+
+        return phi0
+
     def solve_measure(self, phi0, dt, u=None, tol=1e-8):
         """
         Solve the level set evolution equation for one time step using the
@@ -254,7 +338,8 @@ class LSFEMSolver(LSSolver):
             b = M @ phi1 + dt * b0 - dt * alpha * (S @ phi1)
 
             # Solve the linear system to update the level set function.
-            phi2[:] = spsolve(M, b)
+            # M is the same at every pseudo-time step, so its factorization is reused.
+            phi2[:] = cached_spsolve(M, b)
 
             # Calculate the error between the new and old level set function.
             error = space.mesh.error(phi2, phi1)
@@ -271,3 +356,29 @@ class LSFEMSolver(LSSolver):
 
         return phi1
 
+    def redistance(self, phi0, band=None):
+        '''
+        Reinitialize the level set function to a signed distance function with
+        the narrow-band fast marching method.
+
+        Unlike `reinit`, no linear system is assembled or solved. The nodes of
+        the cells cut by the interface are initialized with their distance to
+        the (planar) interface inside those cells, and the distance is then
+        marched outward. With `band` given, only the nodes whose distance is
+        below `band` are computed, so the cost scales with the size of the band
+        instead of the whole mesh.
+
+        Parameters:
+        - phi0: The level set function to be reinitialized, in a linear Lagrange space.
+        - band: The width of the narrow band. The values outside the band are set to +/-band.
+
+        Returns:
+        - phi1: The reinitialized level set function as a signed distance function.
+        '''
+        space = self.space
+        if space.p != 1:
+            raise ValueError(f"redistance only supports the linear Lagrange space, but p = {space.p}!")
+
+        phi1 = space.function()
+        phi1[:] = fast_marching(space.mesh, phi0, band=band)
+        return phi1
@@ -0,0 +1,192 @@
+import numpy as np
+
+from scipy.sparse import csr_matrix
+
+from ..fem import ScalarMassIntegrator
+from ..fem import ScalarConvectionIntegrator
+
+
+class NarrowBand():
+    """
+    The narrow band of cells around the zero level set.
+
+    The level set function only matters near its zero level set, so the
+    transport equation only needs to be assembled and solved on a few layers
+    of cells around the interface. This class tracks that set of cells and the
+    degrees of freedom on it:
+
+    - active cells: the cells cut by the interface (detected in the same way
+      as `mark_interface_cell`) and the cells with min |phi| < width;
+    - edge dofs: the dofs of the active cells shared with inactive cells. When
+      a cell cut by the interface reaches them, the band has to be rebuilt;
+    - frozen dofs: the dofs outside the band. Their values are kept unchanged.
+
+    The band is only rebuilt when the interface reaches a cell touching the
+    edge dofs, and the element matrices of the active cells are cached, so
+    that only the cells entering the band are assembled after a rebuild. The
+    cache only holds the active cells, i.e. its size scales with the band
+    instead of the whole mesh.
+    """
+    def __init__(self, space, width=None, q=None):
+        """
+        Parameters:
+        - space: The finite element space of the level set function.
+        - width: The half width of the band. If it is None, three times the
+            longest edge of the mesh is used.
+        - q: The index of the quadrature formula for the mass matrix.
+        """
+        self.space = space
+        mesh = space.mesh
+        if width is None:
+            width = 3*np.max(mesh.entity_measure('edge'))
+        self.width = width
+        self.q = q
+
+        self.cell2dof = space.cell_to_dof()
+        NC = len(self.cell2dof)
+        gdof = space.number_of_global_dofs()
+
+        self.isActiveCell = np.zeros(NC, dtype=np.bool_)
+        self.isEdgeDof = np.ones(gdof, dtype=np.bool_)
+        self.activeCell = np.zeros(0, dtype=np.int_)
+        self.dof = np.zeros(0, dtype=np.int_)
+        self.g2l = np.full(gdof, -1, dtype=np.int_)
+        self.nrebuild = 0
+
+        # The element matrices of the active cells, stored compactly in the
+        # order of `activeCell`. g2c maps a cell to its position in the cache,
+        # -1 for the inactive cells.
+        self.g2c = np.full(NC, -1, dtype=np.int_)
+        self._M = self._empty_cache()
+        self._hasM = np.zeros(0, dtype=np.bool_)
+        self._C = None
+        self._hasC = None
+        self._u = None
+
+    def _empty_cache(self, n=0):
+        ldof = self.cell2dof.shape[1]
+        return np.zeros((n, ldof, ldof), dtype=self.space.ftype)
+
+    def _remap(self, K, hasK, activeCell):
+        """
+        Move the cached element matrices of the cells still in the band to
+        their positions in the new compact cache.
+        """
+        old = self.g2c[activeCell]
+        isKept = old >= 0
+        isKept[isKept] = hasK[old[isKept]]
+        newK = self._empty_cache(len(activeCell))
+        newK[isKept] = K[old[isKept]]
+        return newK, isKept
+
+    def interface_cell(self, phi, index=np.s_[:]):
+        """
+        Mark the cells cut by the zero level set of phi.
+        """
+        pc = phi[self.cell2dof[index]]
+        return (np.min(pc, axis=-1) <= 0) & (np.max(pc, axis=-1) >= 0)
+
+    def build(self, phi):
+        """
+        Rebuild the band around the zero level set of phi.
+
+        Parameters:
+        - phi: The level set function, which should be close to a signed
+            distance function within the band.
+        """
+        cell2dof = self.cell2dof
+        pc = phi[cell2dof]
+        isActiveCell = self.interface_cell(phi)
+        isActiveCell |= np.min(np.abs(pc), axis=-1) < self.width
+
+        isEdgeDof = np.zeros(len(self.isEdgeDof), dtype=np.bool_)
+        isEdgeDof[cell2dof[~isActiveCell]] = True
+
+        activeCell, = np.nonzero(isActiveCell)
+        self._M, self._hasM = self._remap(self._M, self._hasM, activeCell)
+        if self._C is not None:
+            self._C, self._hasC = self._remap(self._C, self._hasC, activeCell)
+        self.g2c[self.activeCell] = -1
+        self.g2c[activeCell] = np.arange(len(activeCell))
+
+        self.isActiveCell = isActiveCell
+        self.isEdgeDof = isEdgeDof
+        self.activeCell = activeCell
+
+        self.g2l[self.dof] = -1
+        self.dof = np.unique(cell2dof[self.activeCell])
+        self.g2l[self.dof] = np.arange(len(self.dof))
+        self.nrebuild += 1
+
+    def is_valid(self, phi):
+        """
+        Check if the interface is still inside the band, that is, no cell cut
+        by the interface touches the edge dofs. Only the active cells are
+        checked.
+        """
+        if len(self.activeCell) == 0:
+            return False
+        index = self.activeCell[self.interface_cell(phi, index=self.activeCell)]
+        return not np.any(self.isEdgeDof[self.cell2dof[index]])
+
+    def update(self, phi):
+        """
+        Rebuild the band if the interface has moved to its edge.
+
+        Returns:
+        - True if the band has been rebuilt.
+        """
+        if self.is_valid(phi):
+            return False
+        self.build(phi)
+        return True
+
+    def _assemble(self, K):
+        """
+        Assemble the element matrices K of the active cells into a matrix on the
+        dofs of the band, using the local numbering of `self.dof`.
+        """
+        NN = len(self.dof)
+        cell2dof = self.g2l[self.cell2dof[self.activeCell]]
+        I = np.broadcast_to(cell2dof[:, :, None], K.shape)
+        J = np.broadcast_to(cell2dof[:, None, :], K.shape)
+        return csr_matrix((K.ravel(), (I.ravel(), J.ravel())), shape=(NN, NN))
+
+    def mass_matrix(self):
+        """
+        The mass matrix on the band. The element matrices of the cells newly
+        entering the band are computed and cached.
+        """
+        isNew = ~self._hasM
+        if np.any(isNew):
+            integrator = ScalarMassIntegrator(q=self.q)
+            index = self.activeCell[isNew]
+            self._M[isNew] = integrator.assembly_cell_matrix(self.space, index=index)
+            self._hasM[:] = True
+        return self._assemble(self._M)
+
+    def convection_matrix(self, u, q=4, cache=False):
+        """
+        The convection matrix on the band.
+
+        Parameters:
+        - u: The velocity field.
+        - q: The index of the quadrature formula.
+        - cache: Whether to cache the element matrices. Only use it when u does
+            not change between the calls, e.g. the fixed velocity of the solver.
+        """
+        integrator = ScalarConvectionIntegrator(c=u, q=q)
+        if not cache:
+            C = integrator.assembly_cell_matrix(self.space, index=self.activeCell)
+            return self._assemble(C)
+
+        if u is not self._u:
+            self._C = self._empty_cache(len(self.activeCell))
+            self._hasC = np.zeros(len(self.activeCell), dtype=np.bool_)
+            self._u = u
+        isNew = ~self._hasC
+        if np.any(isNew):
+            index = self.activeCell[isNew]
+            self._C[isNew] = integrator.assembly_cell_matrix(self.space, index=index)
+            self._hasC[:] = True
+        return self._assemble(self._C)
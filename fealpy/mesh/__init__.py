@@ -24,11 +24,14 @@ from .uniform_mesh_2d import UniformMesh2d
 from .uniform_mesh_3d import UniformMesh3d
 
 from .node_set import NodeSet
+from .cell_locator import CellLocator
 
 from .ccg_mesh_reader import CCGMeshReader
 from .fab_file_reader import FABFileReader
 from .poly_file_reader import PolyFileReader
 from .inp_file_reader  import InpFileReader
+from .mesh_checkpoint import save_checkpoint, load_checkpoint
+from .eikonal import fast_sweeping, fast_marching
 
 from .distmesher_2d import DistMesher2d
 from .distmesher_3d import DistMesher3d
@@ -0,0 +1,277 @@
+import numpy as np
+
+
+class CellLocator():
+    """
+    @brief 基于单元包围盒的均匀桶网格, 用于批量查找点所在的单元
+
+    把区域的包围盒分成均匀的桶, 每个单元登记到它的包围盒覆盖的所有桶中。
+    查找时只需要检查点所在桶中的单元, 所以不依赖区域是凸的或者没有洞,
+    也不需要在单元之间行走。
+
+    支持的网格:
+        * 单纯形网格（三角形、四面体）, 返回重心坐标
+        * 张量积网格（四边形、六面体）, 用 Newton 迭代求参考单元坐标
+        * 多边形网格, 用射线法判断, 不返回局部坐标
+
+    @note 网格节点移动后需要重新生成
+    """
+    def __init__(self, mesh, tol=1e-12, chunk_size=2**16):
+        """
+        @param[in] mesh 网格对象
+        @param[in] tol 判断点在单元内的相对容差
+        @param[in] chunk_size 每次批量处理的点的个数, 用来控制内存
+        """
+        self.mesh = mesh
+        self.tol = tol
+        self.chunk_size = chunk_size
+
+        node = mesh.entity('node')
+        GD = mesh.geo_dimension()
+        TD = mesh.top_dimension()
+        if GD != TD:
+            raise ValueError(f"CellLocator needs a mesh with GD == TD, but got GD = {GD}, TD = {TD}.")
+        self.node = node
+        self.GD = GD
+
+        if hasattr(mesh.ds, 'cellLocation'):
+            self.celltype = 'polygon'
+            self.cell = mesh.ds._cell
+            self.cellLocation = mesh.ds.cellLocation
+            start = self.cellLocation[:-1]
+            cmin = np.minimum.reduceat(node[self.cell], start, axis=0)
+            cmax = np.maximum.reduceat(node[self.cell], start, axis=0)
+        else:
+            cell = mesh.entity('cell')
+            NV = cell.shape[1]
+            if NV == TD + 1:
+                self.celltype = 'simplex'
+                self.cell = cell
+                A = node[cell[:, 1:]] - node[cell[:, [0]]] # (NC, TD, GD)
+                self.invA = np.linalg.inv(np.swapaxes(A, -1, -2)) # (NC, TD, GD)
+            elif NV == 2**TD:
+                self.celltype = 'tensor'
+                self.cell = cell[:, self.tensor_order(mesh)]
+            else:
+                raise ValueError(f"Unsupported cell with {NV} vertices.")
+            cmin = np.min(node[cell], axis=1)
+            cmax = np.max(node[cell], axis=1)
+
+        self.NC = len(cmin)
+        self.box = np.stack([cmin, cmax], axis=1) # (NC, 2, GD)
+        self.build(cmin, cmax)
+
+    @staticmethod
+    def tensor_order(mesh):
+        """
+        @brief 张量积单元的顶点在 `bc_to_point` 中的排列顺序
+
+        @note 在第一个单元上计算参考单元顶点的像, 与单元顶点的坐标对比得到
+        """
+        TD = mesh.top_dimension()
+        bc = np.array([[1, 0], [0, 1]], dtype=mesh.ftype)
+        ps = mesh.bc_to_point((bc, )*TD, index=np.array([0])).reshape(-1, TD)
+        cnode = mesh.entity('node')[mesh.entity('cell')[0]]
+        d = np.sum((ps[:, None, :] - cnode[None, :, :])**2, axis=-1)
+        return np.argmin(d, axis=1)
+
+    def build(self, cmin, cmax):
+        """
+        @brief 生成桶网格, 并把每个单元登记到与它的包围盒相交的桶中
+        """
+        NC = self.NC
+        GD = self.GD
+        h = np.mean(np.max(cmax - cmin, axis=1))/2
+        self.origin = np.min(cmin, axis=0) - self.tol*h
+        L = np.max(cmax, axis=0) + self.tol*h - self.origin
+        # 桶的边长取单元尺寸的一半, 但桶的个数不超过单元个数的 8 倍
+        while True:
+            shape = np.maximum(np.ceil(L/h), 1).astype(np.int_)
+            if np.prod(shape) <= 8*NC:
+                break
+            h *= 2
+        self.h = h
+        self.shape = shape
+
+        i0 = self.bucket_index(cmin)
+        i1 = self.bucket_index(cmax)
+        w = i1 - i0 + 1 # 每个单元在各个方向覆盖的桶个数
+        num = np.prod(w, axis=1)
+        cellIdx = np.repeat(np.arange(NC), num)
+        k = np.arange(len(cellIdx)) - np.repeat(np.cumsum(num) - num, num)
+        idx = np.zeros((len(cellIdx), GD), dtype=np.int_)
+        for d in range(GD-1, -1, -1):
+            wd = w[cellIdx, d]
+            idx[:, d] = i0[cellIdx, d] + k % wd
+            k //= wd
+        bucket = np.ravel_multi_index(idx.T, shape)
+
+        i = np.argsort(bucket, kind='stable')
+        self.bucketCell = cellIdx[i]
+        self.bucketLocation = np.zeros(np.prod(shape)+1, dtype=np.int_)
+        self.bucketLocation[1:] = np.cumsum(np.bincount(bucket, minlength=np.prod(shape)))
+
+    def bucket_index(self, points):
+        """
+        @brief 点所在桶的多重指标, 超出范围的截断到边界上的桶
+        """
+        idx = np.floor((points - self.origin)/self.h).astype(np.int_)
+        return np.clip(idx, 0, self.shape - 1)
+
+    def find(self, points):
+        """
+        @brief 查找点所在的单元
+
+        @param[in] points 形状为 (NP, GD) 的点
+
+        @return loc, bc. loc 形状为 (NP, ), 不在网格中的点为 -1; bc 为局部坐标:
+                单纯形网格为重心坐标 (NP, TD+1), 张量积网格为 TD 个 (NP, 2)
+                的一维重心坐标组成的元组, 多边形网格为 None。不在网格中的点
+                对应的局部坐标为 0
+
+        @note 点在几个单元的公共边界上时, 返回编号最小的单元
+        """
+        points = np.asarray(points, dtype=self.node.dtype).reshape(-1, self.GD)
+        NP = len(points)
+        loc = np.full(NP, -1, dtype=np.int_)
+        if self.celltype == 'simplex':
+            bc = np.zeros((NP, self.GD+1), dtype=points.dtype)
+        elif self.celltype == 'tensor':
+            bc = np.zeros((NP, self.GD), dtype=points.dtype)
+        else:
+            bc = None
+
+        for start in range(0, NP, self.chunk_size):
+            s = np.s_[start:start+self.chunk_size]
+            l, b = self._find(points[s])
+            loc[s] = l
+            if (bc is not None) and (b is not None):
+                bc[s] = b
+
+        if self.celltype == 'tensor':
+            bc = tuple(np.stack([1 - bc[:, d], bc[:, d]], axis=-1) for d in range(self.GD))
+            for val in bc:
+                val[loc < 0] = 0.0
+        return loc, bc
+
+    def _find(self, points):
+        NP = len(points)
+        idx = np.floor((points - self.origin)/self.h).astype(np.int_)
+        isIn = np.all((idx >= 0) & (idx < self.shape), axis=1)
+        bucket = np.zeros(NP, dtype=np.int_)
+        bucket[isIn] = np.ravel_multi_index(idx[isIn].T, self.shape)
+
+        # 生成所有 (点, 候选单元) 对
+        location = self.bucketLocation
+        num = np.where(isIn, location[bucket+1] - location[bucket], 0)
+        pidx = np.repeat(np.arange(NP), num)
+        k = np.arange(len(pidx)) - np.repeat(np.cumsum(num) - num, num)
+        cidx = self.bucketCell[location[bucket[pidx]] + k]
+
+        # 先用单元的包围盒排除大部分候选单元, 再做精确的判断
+        box = self.box[cidx]
+        pp = points[pidx]
+        tol = self.tol*self.h
+        flag = np.all((pp >= box[:, 0] - tol) & (pp <= box[:, 1] + tol), axis=-1)
+        pidx = pidx[flag]
+        cidx = cidx[flag]
+        pp = pp[flag]
+
+        if self.celltype == 'simplex':
+            flag, val = self.simplex_test(pp, cidx)
+        elif self.celltype == 'tensor':
+            flag, val = self.tensor_test(pp, cidx)
+        else:
+            flag, val = self.polygon_test(pp, cidx)
+
+        # 候选单元按编号排序, 每个点取第一个包含它的单元
+        i, = np.nonzero(flag)
+        _, j = np.unique(pidx[i], return_index=True)
+        i = i[j]
+        loc = np.full(NP, -1, dtype=np.int_)
+        loc[pidx[i]] = cidx[i]
+        bc = None
+        if val is not None:
+            bc = np.zeros((NP, val.shape[-1]), dtype=points.dtype)
+            bc[pidx[i]] = val[i]
+        return loc, bc
+
+    def simplex_test(self, points, cidx):
+        cell = self.cell
+        v = points - self.node[cell[cidx, 0]]
+        lam = np.einsum('nij, nj->ni', self.invA[cidx], v)
+        bc = np.zeros((len(cidx), self.GD+1), dtype=points.dtype)
+        bc[:, 1:] = lam
+        bc[:, 0] = 1 - np.sum(lam, axis=-1)
+        return np.all(bc >= -self.tol, axis=-1), bc
+
+    def tensor_test(self, points, cidx, maxit=20):
+        """
+        @brief 用 Newton 迭代求张量积单元上的参考坐标 u in [0, 1]^TD
+        """
+        GD = self.GD
+        xs = self.node[self.cell[cidx]] # (n, 2**TD, GD)
+        # 张量积顶点编号的二进制位, 第 d 位对应第 d 个参考坐标
+        bits = (np.arange(2**GD)[:, None] >> np.arange(GD-1, -1, -1)) & 1 # (2**TD, TD)
+        u = np.full((len(cidx), GD), 0.5, dtype=points.dtype)
+        active = np.arange(len(cidx))
+        for it in range(maxit):
+            va = u[active]
+            x = xs[active]
+            f = np.where(bits, va[:, None, :], 1 - va[:, None, :]) # (n, 2**TD, TD)
+            J = np.zeros((len(active), GD, GD), dtype=points.dtype)
+            for d in range(GD):
+                g = f.copy()
+                g[..., d] = 2*bits[:, d] - 1
+                J[..., d] = np.einsum('nv, nvk->nk', np.prod(g, axis=-1), x)
+            r = np.einsum('nv, nvk->nk', np.prod(f, axis=-1), x) - points[active]
+            if GD == 2:
+                det = J[:, 0, 0]*J[:, 1, 1] - J[:, 0, 1]*J[:, 1, 0]
+                dv = np.zeros_like(r)
+                dv[:, 0] = (J[:, 1, 1]*r[:, 0] - J[:, 0, 1]*r[:, 1])/det
+                dv[:, 1] = (J[:, 0, 0]*r[:, 1] - J[:, 1, 0]*r[:, 0])/det
+            else: # Cramer 法则, J[..., d] 是 Jacobi 矩阵的第 d 列
+                c0, c1, c2 = J[..., 0], J[..., 1], J[..., 2]
+                det = np.sum(c0*np.cross(c1, c2), axis=-1)
+                dv = np.zeros_like(r)
+                dv[:, 0] = np.sum(r*np.cross(c1, c2), axis=-1)/det
+                dv[:, 1] = np.sum(c0*np.cross(r, c2), axis=-1)/det
+                dv[:, 2] = np.sum(c0*np.cross(c1, r), axis=-1)/det
+            va = va - dv
+            u[active] = va
+            # 收敛的点, 以及远离参考单元（不在单元内）的点不再迭代
+            isOut = np.any((va < -1.0) | (va > 2.0), axis=-1)
+            active = active[(np.max(np.abs(dv), axis=-1) > 1e-13) & ~isOut]
+            if len(active) == 0:
+                break
+        flag = np.all((u >= -self.tol) & (u <= 1 + self.tol), axis=-1)
+        return flag, u
+
+    def polygon_test(self, points, cidx):
+        """
+        @brief 用射线法判断点是否在多边形内, 落在边上的点也算在内
+        """
+        cell = self.cell
+        location = self.cellLocation
+        start = location[cidx]
+        nv = location[cidx+1] - start
+        tol = self.tol*self.h
+        isIn = np.zeros(len(cidx), dtype=np.bool_)
+        isOn = np.zeros(len(cidx), dtype=np.bool_)
+        x, y = points[:, 0], points[:, 1]
+        for i in range(np.max(nv, initial=0)):
+            valid = i < nv
+            a = self.node[cell[start + np.minimum(i, nv-1)]]
+            b = self.node[cell[start + (i+1) % nv]]
+            cross = ((a[:, 1] > y) != (b[:, 1] > y))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                xc = a[:, 0] + (y - a[:, 1])*(b[:, 0] - a[:, 0])/(b[:, 1] - a[:, 1])
+            isIn ^= valid & cross & (x < xc)
+
+            # 点到线段的距离
+            t = b - a
+            l2 = np.sum(t**2, axis=-1)
+            s = np.clip(np.sum((points - a)*t, axis=-1)/l2, 0, 1)
+            d = np.sqrt(np.sum((a + s[:, None]*t - points)**2, axis=-1))
+            isOn |= valid & (d <= tol)
+        return isIn | isOn, None
@@ -198,7 +198,7 @@ class DistMesher2d():
         mesh = TriangleMesh(node, cell)
 
         # 把边界点投影到边界上
-        isBdNode = mesh.ds.boundary_node_flag()
+        isBdNode = mesh.ds.boundary_node_flag().copy()
         fnode = self.domain.facet(0)
         if fnode is not None:
             n = len(fnode)
@@ -0,0 +1,328 @@
+import heapq
+from itertools import combinations, product
+
+import numpy as np
+
+
+def _grid_interface_distance(phi, h):
+    """
+    @brief 网格上与界面相邻的节点到界面的距离
+
+    在每个方向上用线性插值找到相邻两个节点之间的界面点, 再把各个方向的距离按
+    1/d^2 = sum_i 1/d_i^2 组合起来（界面为平面时是精确的）。
+
+    @return 距离 d 和与界面相邻的节点的标记
+    """
+    shape = phi.shape
+    inv = np.zeros(shape, dtype=np.float64)
+    for axis in range(phi.ndim):
+        i0 = [slice(None)]*phi.ndim
+        i1 = [slice(None)]*phi.ndim
+        i0[axis] = slice(0, -1)
+        i1[axis] = slice(1, None)
+        i0, i1 = tuple(i0), tuple(i1)
+        a, b = phi[i0], phi[i1]
+        cut = a*b < 0
+        theta = np.zeros_like(a)
+        theta[cut] = a[cut]/(a[cut] - b[cut])
+        ia = np.zeros(shape, dtype=np.float64)
+        with np.errstate(divide='ignore'):
+            ia[i0] = np.where(cut, 1/(theta*h[axis])**2, 0.0)
+            ia[i1] = np.maximum(ia[i1], np.where(cut, 1/((1 - theta)*h[axis])**2, 0.0))
+        inv += ia
+    isNear = inv > 0
+    d = np.zeros(shape, dtype=np.float64)
+    d[isNear] = 1/np.sqrt(inv[isNear])
+    isNear |= phi == 0
+    return d, isNear
+
+
+def _godunov_update(a, w):
+    """
+    @brief 求解离散的 eikonal 方程 sum_i ((u - a_i)^+)^2/h_i^2 = 1
+
+    @param[in] a (m, d) 每个方向上两个邻居中较小的值
+    @param[in] w (m, d) 每个方向上的 1/h_i^2
+    """
+    idx = np.argsort(a, axis=-1)
+    a = np.take_along_axis(a, idx, axis=-1)
+    w = np.take_along_axis(w, idx, axis=-1)
+    u = a[:, 0] + 1/np.sqrt(w[:, 0])
+    A = w[:, 0].copy()
+    B = w[:, 0]*a[:, 0]
+    C = w[:, 0]*a[:, 0]**2
+    for k in range(1, a.shape[1]):
+        A += w[:, k]
+        B += w[:, k]*a[:, k]
+        C += w[:, k]*a[:, k]**2
+        flag = u > a[:, k]
+        if not np.any(flag):
+            break
+        disc = np.maximum(B[flag]**2 - A[flag]*(C[flag] - 1), 0.0)
+        u[flag] = (B[flag] + np.sqrt(disc))/A[flag]
+    return u
+
+
+def fast_sweeping(phi0, h, band=None, maxit=20, tol=1e-12, returninfo=False):
+    """
+    @brief 用 fast sweeping 方法把网格上的水平集函数重新初始化为符号距离函数
+
+    与界面相邻的节点用线性插值计算距离并保持不变, 然后在 2^d 个方向上交替做
+    Gauss-Seidel 扫描求解 |grad u| = 1。每个方向的扫描按超平面
+    i + j (+ k) = const 的顺序进行, 同一个超平面上的节点互不依赖, 一次向量化
+    更新。所有方向都扫描一遍后检查解的变化量, 小于 tol 时停止。
+
+    @param[in] phi0 网格节点上的水平集函数, 形状为 (nx+1, ny+1[, nz+1])
+    @param[in] h 各个方向的网格步长
+    @param[in] band 窄带的宽度, 给定时距离大于 band 的值截断为 band
+    @param[in] maxit 最大扫描遍数
+    @param[in] tol 停止的阈值
+    @param[in] returninfo 是否同时返回扫描遍数和最后一遍的变化量
+
+    @return 与 phi0 形状相同的符号距离函数
+    """
+    phi0 = np.asarray(phi0, dtype=np.float64)
+    shape = phi0.shape
+    ndim = phi0.ndim
+    h = np.broadcast_to(np.asarray(h, dtype=np.float64), (ndim, ))
+
+    d, isFixed = _grid_interface_distance(phi0, h)
+    # 比任何距离都大的初值
+    big = 2*np.sum(np.array(shape)*h) + 1.0
+    if band is not None:
+        big = min(big, 2*band + np.max(h))
+
+    # 加一层虚拟节点, 邻居的编号不需要判断是否越界
+    pshape = tuple(n + 2 for n in shape)
+    upad = np.full(pshape, big)
+    inner = (slice(1, -1), )*ndim
+    upad[inner] = np.where(isFixed, d, big)
+    U = upad.reshape(-1)
+    strides = np.cumprod((1, ) + pshape[:0:-1])[::-1]
+
+    index = np.indices(shape).reshape(ndim, -1)
+    pindex = np.dot(strides, index + 1)
+    free = ~isFixed.reshape(-1)
+    index = index[:, free]
+    pindex = pindex[free]
+    w = np.broadcast_to(1/h**2, (len(pindex), ndim))
+
+    # 每个扫描方向上超平面的节点编号
+    orders = []
+    for s in product((1, -1), repeat=ndim):
+        level = sum(index[i] if s[i] > 0 else shape[i] - 1 - index[i] for i in range(ndim))
+        order = np.argsort(level, kind='stable')
+        bounds = np.searchsorted(level[order], np.arange(sum(shape) - ndim + 2))
+        orders.append([order[bounds[i]:bounds[i+1]] for i in range(len(bounds) - 1)
+            if bounds[i+1] > bounds[i]])
+
+    it = 0
+    err = 0.0
+    for it in range(1, maxit + 1):
+        uold = U[pindex].copy()
+        for levels in orders:
+            for k in levels:
+                p = pindex[k]
+                a = np.empty((len(p), ndim), dtype=np.float64)
+                for i in range(ndim):
+                    a[:, i] = np.minimum(U[p - strides[i]], U[p + strides[i]])
+                U[p] = np.minimum(U[p], _godunov_update(a, w[:len(p)]))
+        err = np.max(np.abs(U[pindex] - uold), initial=0.0)
+        if err <= tol:
+            break
+
+    u = upad[inner].copy()
+    if band is not None:
+        np.minimum(u, band, out=u)
+    u *= np.where(phi0 < 0, -1.0, 1.0)
+    if returninfo:
+        return u, {'niter': it, 'error': err}
+    return u
+
+
+# fast marching 每一批确定的节点的值域宽度与最短边长的比
+DELTA = 0.5
+NSWEEP = 2
+
+
+def _simplex_update(x, Y, U):
+    """
+    @brief 单纯形中已知节点 Y 的值为 U 时, 节点 x 上 eikonal 方程的局部解
+
+    即 min_{y} U(y) + |x - y|, 其中 y 取遍 Y 的凸包, U 在凸包上线性插值。
+    对一组 (节点, 单元) 同时计算, 在顶点、边和三角形面（四面体中）上的极小值
+    都用显式公式求出。
+
+    @param[in] x (n, GD)
+    @param[in] Y (n, k, GD), k <= 3
+    @param[in] U (n, k), 未知的节点取为 inf
+
+    @return (n, ) 局部解, 没有已知节点时为 inf
+    """
+    v = x[:, None, :] - Y
+    best = np.min(U + np.sqrt(np.sum(v**2, axis=-1)), axis=-1)
+    k = U.shape[-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for s in combinations(range(k), 2):
+            # 单纯形的边
+            e = Y[:, s[1]] - Y[:, s[0]]
+            v = x - Y[:, s[0]]
+            G = np.sum(e*e, axis=-1)
+            delta = U[:, s[1]] - U[:, s[0]]
+            ev = np.sum(e*v, axis=-1)
+            vperp2 = np.sum(v*v, axis=-1) - ev*ev/G
+            q = delta*delta/G
+            alpha = np.sqrt(vperp2/(1 - q))
+            t = (ev - alpha*delta)/G
+            val = U[:, s[0]] + delta*t + alpha
+            flag = np.isfinite(delta) & (q < 1) & (vperp2 > 0) & (t >= 0) & (t <= 1)
+            np.minimum(best, np.where(flag, val, np.inf), out=best)
+
+        for s in combinations(range(k), 3):
+            # 四面体的面, 2x2 的法方程用 Cramer 法则求解
+            e1 = Y[:, s[1]] - Y[:, s[0]]
+            e2 = Y[:, s[2]] - Y[:, s[0]]
+            v = x - Y[:, s[0]]
+            d1 = U[:, s[1]] - U[:, s[0]]
+            d2 = U[:, s[2]] - U[:, s[0]]
+            g11 = np.sum(e1*e1, axis=-1)
+            g12 = np.sum(e1*e2, axis=-1)
+            g22 = np.sum(e2*e2, axis=-1)
+            det = g11*g22 - g12*g12
+            r1 = np.sum(e1*v, axis=-1)
+            r2 = np.sum(e2*v, axis=-1)
+            c1 = (g22*r1 - g12*r2)/det
+            c2 = (g11*r2 - g12*r1)/det
+            h1 = (g22*d1 - g12*d2)/det
+            h2 = (g11*d2 - g12*d1)/det
+            vperp2 = np.sum(v*v, axis=-1) - r1*c1 - r2*c2
+            q = d1*h1 + d2*h2
+            alpha = np.sqrt(vperp2/(1 - q))
+            t1 = c1 - alpha*h1
+            t2 = c2 - alpha*h2
+            val = U[:, s[0]] + d1*t1 + d2*t2 + alpha
+            flag = np.isfinite(d1) & np.isfinite(d2) & (q < 1) & (vperp2 > 0)
+            flag &= (t1 >= 0) & (t2 >= 0) & (t1 + t2 <= 1)
+            np.minimum(best, np.where(flag, val, np.inf), out=best)
+    return best
+
+
+def fast_marching(mesh, phi0, band=None, delta=None, returninfo=False):
+    """
+    @brief 在三角形或四面体网格上用窄带 fast marching 方法把分片线性的水平集
+           函数重新初始化为符号距离函数
+
+    被界面穿过的单元的节点用到单元内界面（平面）的距离初始化, 然后从这些节点
+    出发按距离从小到大的顺序确定其它节点的值。每一步把试探值不超过
+    umin + delta 的节点一起确定, 再对这批节点周围所有的 (节点, 单元) 对
+    向量化地求解局部问题。给定 band 时只计算距离不超过 band 的节点, 计算量
+    与窄带中的节点个数成正比, 与整个网格的大小无关。
+
+    @param[in] mesh TriangleMesh 或 TetrahedronMesh
+    @param[in] phi0 网格节点上的水平集函数
+    @param[in] band 窄带的宽度, 窄带外节点的距离取为 band
+    @param[in] delta 每一批确定的节点的值域宽度, 默认为最短边长的 DELTA 倍,
+               取 0 时每次只确定值最小的节点（和它值相同的节点）
+    @param[in] returninfo 是否同时返回确定了值的节点个数和批数
+
+    @return 网格节点上的符号距离函数
+
+    @note 钝角单元中局部解不一定满足因果性, 这时结果只是一阶近似
+    """
+    node = mesh.entity('node')
+    cell = mesh.entity('cell')
+    NN = len(node)
+    NVC = cell.shape[1]
+    phi0 = np.asarray(phi0, dtype=np.float64)
+    if delta is None:
+        delta = DELTA*np.min(mesh.entity_measure('edge'))
+
+    u = np.full(NN, np.inf)
+    u[phi0 == 0] = 0.0
+
+    pc = phi0[cell]
+    isCutCell = (np.min(pc, axis=-1) < 0) & (np.max(pc, axis=-1) > 0)
+    if np.any(isCutCell):
+        gphi = np.einsum('cj, cjk->ck', pc[isCutCell], mesh.grad_lambda()[isCutCell])
+        d = np.abs(pc[isCutCell])/np.sqrt(np.sum(gphi**2, axis=-1, keepdims=True))
+        np.minimum.at(u, cell[isCutCell].reshape(-1), d.reshape(-1))
+
+    node2cell = mesh.ds.node_to_cell().tocsr()
+    # 单元中每个局部顶点之外的其它局部顶点
+    opp = np.array([[j for j in range(NVC) if j != i] for i in range(NVC)])
+
+    FAR, TRIAL, ACCEPTED = 0, 1, 2
+    status = np.full(NN, FAR, dtype=np.int8)
+    status[np.isfinite(u)] = ACCEPTED
+    heap = []
+
+    def solve(index, isTarget):
+        """
+        @brief 在节点 index 相邻的单元中, 用已经确定的节点求解目标节点的局部问题
+
+        @return 目标节点和它们的新值（各个单元中局部解的最小值）
+        """
+        c = np.unique(node2cell[index].indices)
+        lv = cell[c]
+        ci, li = np.nonzero(isTarget(lv))
+        j = lv[ci, li]
+        nb = lv[ci[:, None], opp[li]]
+        U = np.where(status[nb] == ACCEPTED, u[nb], np.inf)
+        val = _simplex_update(node[j], node[nb], U)
+        j, inv = np.unique(j, return_inverse=True)
+        best = np.full(len(j), np.inf)
+        np.minimum.at(best, inv, val)
+        return j, best
+
+    def update(index):
+        """
+        @brief 用新确定的节点 index 更新相邻单元中还没有确定的节点
+        """
+        j, best = solve(index, lambda v: status[v] != ACCEPTED)
+        flag = best < u[j]
+        j, best = j[flag], best[flag]
+        u[j] = best
+        status[j] = TRIAL
+        for item in zip(best.tolist(), j.tolist()):
+            heapq.heappush(heap, item)
+
+    update(np.nonzero(status == ACCEPTED)[0])
+
+    nbatch = 0
+    while heap:
+        val, i = heapq.heappop(heap)
+        if status[i] == ACCEPTED or val > u[i]:
+            continue
+        if band is not None and val > band:
+            break
+        # 值在 [val, val + delta] 中的试探节点一起确定
+        batch = [i]
+        status[i] = ACCEPTED
+        while heap and heap[0][0] <= val + delta:
+            v, j = heapq.heappop(heap)
+            if status[j] == ACCEPTED or v > u[j] or (band is not None and v > band):
+                continue
+            status[j] = ACCEPTED
+            batch.append(j)
+        nbatch += 1
+        batch = np.array(batch)
+        if len(batch) > 1:
+            # 同一批中的节点之间也可能相互依赖, 用这批节点的当前值再做
+            # NSWEEP 次 Jacobi 迭代
+            isBatch = np.zeros(NN, dtype=np.bool_)
+            isBatch[batch] = True
+            for _ in range(NSWEEP):
+                j, best = solve(batch, lambda v: isBatch[v])
+                np.minimum(u[j], best, out=best)
+                u[j] = best
+        update(batch)
+
+    isAccepted = status == ACCEPTED
+    fill = np.inf if band is None else band
+    u[~isAccepted] = fill
+    if band is not None:
+        np.minimum(u, band, out=u)
+    u *= np.where(phi0 < 0, -1.0, 1.0)
+    if returninfo:
+        return u, {'naccepted': int(np.sum(isAccepted)), 'nbatch': nbatch}
+    return u
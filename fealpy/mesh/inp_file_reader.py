@@ -1,3 +1,8 @@
+import re
+import mmap
+import operator
+from collections.abc import Mapping
+
 import numpy as np
 
 """
@@ -39,385 +44,345 @@ Assembly 模型的三级结构：
 
 """
 
+# 以逗号结尾的数据行会在下一行继续
+CONTINUATION = re.compile(rb',[ \t\r]*\n')
+
+# 单元类型对应的网格类型
+ELEMENT_MESH = {
+        'C3D4': 'TetrahedronMesh',
+        'C3D8': 'HexahedronMesh', 'C3D8R': 'HexahedronMesh',
+        'C3D8I': 'HexahedronMesh',
+        'CPS3': 'TriangleMesh', 'CPE3': 'TriangleMesh', 'S3': 'TriangleMesh',
+        'S3R': 'TriangleMesh', 'DC2D3': 'TriangleMesh',
+        'CPS4': 'QuadrangleMesh', 'CPE4': 'QuadrangleMesh',
+        'CPS4R': 'QuadrangleMesh', 'CPE4R': 'QuadrangleMesh',
+        'S4': 'QuadrangleMesh', 'S4R': 'QuadrangleMesh', 'DC2D4': 'QuadrangleMesh',
+        'T3D2': 'EdgeMesh', 'B31': 'EdgeMesh'}
+
+# 材料的属性关键字
+MATERIAL_KEYWORDS = {'*elastic', '*density', '*plastic', '*expansion',
+        '*conductivity', '*specific heat', '*damping'}
+
+
+class IndexMap(Mapping):
+    """
+    @brief 原始编号到当前编号的映射
+
+    与原来的字典接口兼容, imap[原始编号] 返回当前编号, 编号不存在时抛出
+    KeyError。内部用 NumPy 查找数组保存, 也可以一次映射一个整数数组,
+    其中有不存在的编号时同样抛出 KeyError。
+
+    查找数组本身是 `array` 属性, 不存在的编号为 -1。
+    """
+    def __init__(self, ids):
+        """
+        @param[in] ids 原始编号数组, ids[i] 映射为 i, 重复的编号以最后一次为准
+        """
+        ids = np.asarray(ids, dtype=np.int_)
+        if len(ids) == 0:
+            self.array = np.zeros(0, dtype=np.int_)
+        else:
+            if ids.min() < 0:
+                raise ValueError(f"the ids should be nonnegative, but got {ids.min()}!")
+            self.array = np.full(ids.max() + 1, -1, dtype=np.int_)
+            self.array[ids] = np.arange(len(ids), dtype=np.int_)
+        # 按出现的顺序保存编号, 与字典的插入顺序一致
+        self.ids = ids[self.array[ids] == np.arange(len(ids))] if len(ids) > 0 else ids
+
+    def lookup(self, ids):
+        """
+        @brief 映射一个整数数组, 不存在的编号为 -1
+        """
+        ids = np.asarray(ids)
+        val = np.full(ids.shape, -1, dtype=np.int_)
+        flag = (ids >= 0) & (ids < len(self.array))
+        val[flag] = self.array[ids[flag]]
+        return val
+
+    def __getitem__(self, key):
+        if np.ndim(key) == 0:
+            k = operator.index(key)
+            if (0 <= k < len(self.array)) and (self.array[k] >= 0):
+                return int(self.array[k])
+            raise KeyError(key)
+        val = self.lookup(key)
+        if np.any(val < 0):
+            missing = np.unique(np.asarray(key)[val < 0])
+            raise KeyError(f"the ids {missing[:10].tolist()} are not defined!")
+        return val
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"IndexMap({len(self)} ids)"
+
+
 class InpFileReader:
     """ 
     @brief 该类负责处理来自 Abaqus .inp 文件的数据
+
+    文件用内存映射打开, 构造时扫描一遍所有 keyword 行的位置, 得到每个数据块在
+    文件中的字节范围 `self.index`。解析数据块时整块转换为 NumPy 数组, 不逐行
+    处理字符串, 数百万单元的模型也可以在几秒内读入。
+
+    节点和单元的编号映射 nmap、emap 是 `IndexMap`, 和字典一样用 nmap[原始编号]
+    得到当前编号, 也可以一次映射整个数组, 引用了不存在的编号时抛出 KeyError。
+    单元的顶点编号已经映射为从 0 开始的连续编号, 可以直接用来
+    构造 `TetrahedronMesh`、`HexahedronMesh` 等网格, 也可以用 `to_mesh` 直接
+    生成网格。
     """
     def __init__(self, fname):
-        with open(fname, 'r') as f:
-            contents = f.read()
-        self.contents = contents.split('\n')
-        self.cline = 0
+        with open(fname, 'rb') as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # 空文件
+                self.data = b''
+        self.index = self.scan()
         self.parts = {}
         self.materials = {}
         self.assembly = {}
         self.step = {}
 
+    def scan(self):
+        """
+        @brief 扫描所有 keyword 行
+
+        @return 列表, 每一项为 (keyword 行, 数据块的起始位置, 数据块的结束位置)
+
+        @note 数据块在下一个以 * 开头的行（包括注释行）之前结束
+        """
+        data = self.data
+        # keyword 行很少, 用 find 查找 '\n*' 比正则表达式逐个位置匹配快得多
+        starts = [0] if data[:1] == b'*' else []
+        pos = data.find(b'\n*')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = data.find(b'\n*', pos + 1)
+        starts.append(len(data))
+        index = []
+        for start, stop in zip(starts[:-1], starts[1:]):
+            end = data.find(b'\n', start, stop)
+            end = stop if end == -1 else end
+            line = data[start:end]
+            # 注释行可能不是 UTF-8 编码, 先在字节上判断
+            if not line.startswith(b'**'):
+                line = line.decode(errors='replace').strip()
+                index.append((line, min(end + 1, stop), stop))
+        return index
+
     def parse(self):
         """
         @brief 解析文件中的数据
         """
-        line = self.get_keyword_line() # 拿到下一个还没有处理的 keyword 行
-        while line is not None:
-            if line.startswith('*Part'):
-                self.parse_part_data()
-            elif line.startswith('*Assembly'):
-                self.parse_assembly_data()
-            elif line.startswith('*Step'):
-                self.parse_step_data()
-            elif line.startswith('*Material'):
-                self.parse_material_data()
-
-            self.cline += 1
-            line = self.get_keyword_line() # 拿到下一个还没有处理的 keyword 行
+        part = None
+        assembly = None
+        material = None
+        for line, start, stop in self.index:
+            d = self.parse_keyword_line(line)
+            keyword = d['keyword'].lower()
+            if keyword not in MATERIAL_KEYWORDS:
+                material = None
+
+            if keyword == '*part':
+                part = d['name']
+                self.parts[part] = {'node':None, 'elem':{}, 'nset':{}, 'elset':{},
+                        'orientation':{}, 'solid_section':{}, 'beam_section':{}}
+            elif keyword == '*end part':
+                part = None
+            elif keyword == '*assembly':
+                assembly = d['name']
+                self.assembly[assembly] = {'instance':{}, 'nset':{}}
+            elif keyword == '*end assembly':
+                assembly = None
+            elif keyword == '*material':
+                material = d['name']
+                self.materials[material] = {}
+            elif material is not None:
+                self.materials[material][keyword[1:]] = self.parse_float_data(start, stop)
+            elif keyword == '*step':
+                self.step[d.get('name', len(self.step))] = d
+            elif part is not None:
+                self.parse_part_keyword(self.parts[part], keyword, d, start, stop)
+            elif assembly is not None:
+                self.parse_assembly_keyword(self.assembly[assembly], keyword, d,
+                        start, stop)
 
     def parse_keyword_line(self, line):
         """
         @brief 解析一个 keyword line
         @param line 要解析的 keyword line
-        @return 包含解析结果的字典
+        @return 包含解析结果的字典, 参数名为小写, 没有值的参数（如 generate）
+                的值为 True
         """
         d = {}
         words  = line.split(',')
         d['keyword'] = words[0].strip()
-        if len(words) > 1:
-            for word in words[1:]:
-                s = word.strip().split('=')
-                d[s[0]] = s[1]
+        for word in words[1:]:
+            s = word.split('=', 1)
+            key = s[0].strip().lower()
+            if key:
+                d[key] = s[1].strip() if len(s) > 1 else True
         return d
 
-
-    def get_keyword_line(self):
-        """
-        @brief 获取还没有处理的 keyword  行
-        @return 下一个未处理的 keyword 行，如果没有则返回 None
+    def first_line_size(self, buf):
         """
-        if self.cline < len(self.contents):
-            line = self.contents[self.cline]
-            while (not line.startswith('*')) or line.startswith('**'):
-                self.cline += 1
-                if self.cline < len(self.contents):
-                    line = self.contents[self.cline]
-                else:
-                    return None
-            return line
-        else:
-            return None
-
-    def parse_part_data(self):
+        @brief 数据块中第一个非空行中数据的个数
         """
-        @brief 解析 part 数据
+        pos = 0
+        while pos < len(buf):
+            end = buf.find(b'\n', pos)
+            end = len(buf) if end == -1 else end
+            ncols = sum(1 for s in buf[pos:end].split(b',') if s.strip())
+            if ncols > 0:
+                return ncols
+            pos = end + 1
+        return 0
+
+    def parse_table(self, start, stop, dtype):
         """
+        @brief 把每行个数相同的数据块转换为二维数组
 
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-        # print("part_data:", d)
-
-        self.parts[d['name']] = {'node':None, 'elem':{}, 'nset':{}, 'elset':{},
-                                 'orientation':{}, 'solid_section':{}, 'beam_section':{}}
-        self.cline += 1
-        line = self.get_keyword_line()
-
-        while line is not None and not line.startswith('*End Part'):
-            if line.startswith('*Node'):
-                self.parse_node_data(self.parts, d['name'])
-            elif line.startswith('*Element'):
-                self.parse_elem_data(self.parts, d['name'])
-            elif line.startswith('*Nset'):
-                self.parse_nset_data(self.parts, d['name'])
-            elif line.startswith('*Elset'):
-                self.parse_elset_data(self.parts, d['name'])
-            elif line.startswith('*Orientation'):
-                self.parse_orientation_data(self.parts, d['name'])
-            elif line.startswith('*Solid Section'):
-                self.parse_solid_section_data(self.parts, d['name'])
-            elif line.startswith('*Beam Section'):
-                self.parse_beam_section_data(self.parts, d['name'])
-            else:
-                print("we pass the keyword line:" + line)
-                self.cline += 1
-
-            line = self.get_keyword_line() # 拿到下一个还没有处理的 keyword 行
-
-
-    def parse_node_data(self, parts, name):
+        @note 先假设每行是一条记录, 整块转换后检查数据的个数。个数不符时说明有
+              续行（行末为逗号）或空行, 这时合并续行后再转换一次
         """
-        @brief 处理节点坐标数据
-        @param parts 用于存储节点数据的字典
-        @param name 当前部分的名称
+        buf = self.data[start:stop]
+        ncols = self.first_line_size(buf)
+        if ncols == 0:
+            return np.zeros((0, 0), dtype=dtype)
+        val = np.fromstring(buf.replace(b',', b' '), dtype=dtype, sep=' ')
+        nrows = buf.count(b'\n') + (not buf.endswith(b'\n'))
+        if len(val) != nrows*ncols:
+            buf = CONTINUATION.sub(b',', buf)
+            ncols = self.first_line_size(buf)
+            val = np.fromstring(buf.replace(b',', b' '), dtype=dtype, sep=' ')
+            if len(val) % ncols != 0:
+                raise ValueError(f"the data block at {start} has rows of different sizes!")
+        return val.reshape(-1, ncols)
+
+    def parse_array(self, start, stop, dtype):
         """
-        i = 0
-        node = []
-        nmap = {}
-
-        self.cline += 1
-        line = self.contents[self.cline]
-        while not line.startswith('*'):
-            s = line.split(',')
-            node.append((float(s[1]), float(s[2]), float(s[3])))
-            nmap[int(s[0])] = i # 原始节点编号 1 被映射为目前节点编号 0，依次
-            i += 1
-
-            self.cline += 1
-            line = self.contents[self.cline]
+        @brief 把数据块转换为一维数组
 
-        parts[name]['node'] = (np.array(node, dtype=np.float64), nmap)
-        # print("node:", parts[name]['node'])
-
-    def parse_elem_data(self, parts, name):
-        """
-        @brief 解析单元数据
-        @param parts 用于存储单元数据的字典
-        @param name 当前部分的名称
+        @note 没有数据的块（如只有一个逗号的行）返回空数组, 直接交给
+              np.fromstring 会得到一个 -1 或 0
         """
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-
-        i = 0
-        elem = []
-        emap = {}
-
-        nmap = parts[name]['node'][1] # 原始节点编号 1 被映射为目前节点编号 0，依次
-
-        self.cline += 1
-        line = self.contents[self.cline]
-        while not line.startswith('*'):
-            ss = line.split(',')
-            elem.append([nmap[int(s)] for s in ss[1:]])
-            emap[int(ss[0])] = i # 原始单元编号 1 被映射为原始单元编号 0，依次
-            i += 1
-            self.cline += 1
-            line = self.contents[self.cline]
+        buf = self.data[start:stop].replace(b',', b' ').strip()
+        if len(buf) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.fromstring(buf, dtype=dtype, sep=' ')
 
-        parts[name]['elem'][d['type']] = (np.array(elem, dtype=np.int_), emap)
-        # print("elem:", parts[name]['elem'][d['type']])
-
-    def parse_nset_data(self, parts, name):
+    def parse_float_data(self, start, stop):
         """
-        @brief 解析节点集合数据，可以用于应用边界条件、载荷等
-
-        @param parts 用于存储节点集合数据的字典
-        @param name 当前部分的名称
+        @brief 把数据块转换为一维浮点数组
         """
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-        # print("nset_data:", d)
-
-        nmap = parts[name]['node'][1]
-        idx = []
-
-        self.cline += 1
-        line = self.contents[self.cline]
-        while not line.startswith('*'):
-            ss = line.split(',')
-            idx += [nmap[int(s)] for s in ss] # 原始节点集合编号 1 被映射为目前节点集合编号 0，依次
-            self.cline += 1
-            line = self.contents[self.cline]
-
-        parts[name]['nset'][d['nset']] = (np.array(idx, dtype=np.int_), nmap)
-        # print("nset:", parts[name]['nset'][d['nset']])
-
+        return self.parse_array(start, stop, np.float64)
 
-    def parse_elset_data(self, parts, name):
+    def parse_set_data(self, d, start, stop):
         """
-        @brief 解析单元集合数据，可以用于应用边界条件、载荷等
-
-        @param parts 用于存储单元集合数据的字典
-        @param name 当前部分的名称
-
-        @note 注意这里我们没有把原始单元的编号映射成当前连续的编号
+        @brief 解析集合的编号, 支持 generate 参数（起始编号, 结束编号, 步长）
         """
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-        # print("elset_d:", d)
-
-        idx = []
-
-        self.cline += 1
-        line = self.contents[self.cline]
-        # print("elset_line:", line)
-        
-        while not line.startswith('*'):
-            ss = line.split(',')
-            # print("elset_ss:", ss)
-            idx += [int(s) for s in ss]
-            self.cline += 1
-            line = self.contents[self.cline]
-
-        parts[name]['elset'][d['elset']] = np.array(idx, dtype=np.int_) 
-        # print("elset:", parts[name]['elset'][d['elset']])
-
-
-    def parse_orientation_data(self, parts, name):
+        idx = self.parse_array(start, stop, np.int_)
+        if d.get('generate', False) and len(idx) > 0:
+            idx = np.concatenate([np.arange(idx[i], idx[i+1] + 1,
+                idx[i+2] if i + 2 < len(idx) else 1)
+                for i in range(0, len(idx), 3)])
+        return idx
+
+    def parse_part_keyword(self, part, keyword, d, start, stop):
         """
-        @brief 解析 parts 的坐标系数据
-        数值用于定义材料坐标系的方向
-        '1., 0., 1.'定义主方向向量，沿着 x 轴的方向
-        '0., 1., 0.'定义第二个向量，是在主方向向量所定义的平面内的向量，沿着 y 轴的方向
-        '1., 0.' 定义主方向向量和第二个向量之间的角度，主方向向量和第二个向量之间的角度是 1 弧度
+        @brief 解析 part 中的数据块
         """
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-
-        idx = []
-
-        self.cline += 1
-        line = self.contents[self.cline]
-        # print("orientation_line:", line)
-
-        while not line.startswith('*'):
-            ss = line.split(',')
-            # print("orientation_ss:", ss)
-            idx += [float(s) for s in ss]
-            self.cline += 1
-            line = self.contents[self.cline]
-
-        parts[name]['orientation'][d['name']] = np.array(idx, dtype=np.float64) 
-        # print("orientation:", parts[name]['orientation'][d['name']])
-
-
-    def parse_solid_section_data(self, parts, name):
-        """
-        @brief 解析 parts 的实体截面数据
-        数值定义了一个实体截面，对应于元素集合 "Set-3"，材料为 "Material-1"
-        '1.' 代表实体截面的厚度
+        if keyword == '*node':
+            self.parse_node_data(part, start, stop)
+        elif keyword == '*element':
+            self.parse_elem_data(part, d, start, stop)
+        elif keyword == '*nset':
+            # 原始节点集合编号 1 被映射为目前节点集合编号 0，依次
+            nmap = part['node'][1]
+            part['nset'][d['nset']] = (nmap[self.parse_set_data(d, start, stop)], nmap)
+        elif keyword == '*elset':
+            # 注意这里我们没有把原始单元的编号映射成当前连续的编号
+            part['elset'][d['elset']] = self.parse_set_data(d, start, stop)
+        elif keyword == '*orientation':
+            # 数值用于定义材料坐标系的方向
+            part['orientation'][d['name']] = self.parse_float_data(start, stop)
+        elif keyword == '*solid section':
+            key = (d['elset'], d['material'])
+            part['solid_section'][key] = self.parse_float_data(start, stop)
+        elif keyword == '*beam section':
+            key = (d['elset'], d['material'], d.get('temperature'), d.get('section'))
+            part['beam_section'][key] = self.parse_float_data(start, stop)
+
+    def parse_node_data(self, part, start, stop):
         """
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-        # print("solid_section_d:", d)
-
-        idx = []
-
-        self.cline += 1
-        line = self.contents[self.cline]
-        # print("solid_section_data:", line)
-
-        while not line.startswith('*'): 
-            ss = line.split(',') 
-            # print("solid_section_ss:", ss) 
-            idx += [float(s) for s in ss if s]
-            self.cline += 1
-
-            line = self.contents[self.cline]
-
-        solid_section_key = (d['elset'], d['material'])
-        parts[name]['solid_section'][solid_section_key] = np.array(idx, dtype=np.float64) 
-        # print("solid_section:", parts[name]['solid_section'][solid_section_key])
-
-
-    def parse_beam_section_data(self, parts, name):
+        @brief 处理节点坐标数据, 同一个 part 中的多个 *Node 块依次拼接
         """
-        @brief 解析 parts 的梁截面数据
-        数值定义了一个梁截面，对应于元素集合 "beam2"，材料为 "Material-1"，温度梯度为 "GRADIENTS"，剖面形状为 "PIPE"
-        '80., 10.' 梁截面的几何参数，具体含义取决于剖面形状， "PIPE" 表示管状剖面，80 是外径，10 是壁厚
-        '0.,0.,-1.' 梁元素的局部 z 轴方向，定义了截面的方向
+        val = self.parse_table(start, stop, np.float64)
+        ids = val[:, 0].astype(np.int_)
+        node = val[:, 1:]
+        if part['node'] is not None:
+            ids = np.concatenate((part['node'][1].ids, ids))
+            node = np.concatenate((part['node'][0], node))
+        # 原始节点编号 1 被映射为目前节点编号 0，依次
+        part['node'] = (np.ascontiguousarray(node), IndexMap(ids))
+
+    def parse_elem_data(self, part, d, start, stop):
         """
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-        # print("beam_section_d:", d)
-
-        idx = []
-
-        self.cline += 1
-        line = self.contents[self.cline]
-        # print("beam_section_data:", line)
-
-        while not line.startswith('*'):
-            ss = line.split(',')
-            # print("beam_section_ss:", ss)
-            idx += [float(s) for s in ss]
-            self.cline += 1
-
-            line = self.contents[self.cline]
-
-        beam_section_key = (d['elset'], d['material'], d['temperature'], d['section'])
-        parts[name]['beam_section'][beam_section_key] = np.array(idx, dtype=np.float64) 
-        # print("beam_section:", parts[name]['beam_section'][beam_section_key])
-
+        @brief 解析单元数据, 单元的顶点编号映射为从 0 开始的节点编号
 
-    def parse_assembly_data(self):
+        @note 单元引用了没有定义的节点时抛出 KeyError
         """
-        @brief 解析 assembly 数据
-        用于将所有的部件（Parts）组合在一起，创建整个模型
-        """
-
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-        print("assembly_d:", d)
-
-        self.assembly[d['name']] = {'instance':{}, 'nset':{}}
-        print("assembly_data:", self.assembly)
-        self.cline += 1
-        line = self.get_keyword_line()
-
-        while line is not None and not line.startswith('*End Assembly'):
-            if line.startswith('*Instance'):
-                self.parse_instance_data(self.assembly, d['name'])
-            elif line.startswith('*Nset'):
-                self.parse_nset_assembly_data(self.assembly, d['name'])
-            else:
-                print("we pass the keyword line:" + line)
-                self.cline += 1
-
-            line = self.get_keyword_line() # 拿到下一个还没有处理的 keyword 行
+        val = self.parse_table(start, stop, np.int_)
+        nmap = part['node'][1]
+        elem = nmap[val[:, 1:]]
+        emap = IndexMap(val[:, 0]) # 原始单元编号 1 被映射为原始单元编号 0，依次
+        part['elem'][d['type']] = (elem, emap)
 
-
-    def parse_instance_data(self, assemblys, name):
+    def parse_assembly_keyword(self, assembly, keyword, d, start, stop):
         """
-        @brief 解析 instance 数据
-        每一个部件在组装过程中都被称为一个实例
-
-        @param parts 用于存储节点集合数据的字典
-        @param name 当前部分的名称
+        @brief 解析 assembly 中的数据块
+        用于将所有的部件（Parts）组合在一起，创建整个模型
         """
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-        # print("instance_d:", d)
-
-        self.cline += 1
-        line = self.get_keyword_line()
-
-        instance_key = (d['name'], d['part'])
-        assemblys[name]['instance'][instance_key] = None
-        # print("instance:", assemblys[name]['instance'][instance_key])
-
-
-    def parse_nset_assembly_data(self, assemblys, name):
+        if keyword == '*instance':
+            assembly['instance'][(d['name'], d['part'])] = None
+        elif keyword == '*nset' and 'instance' in d:
+            # 注意这里我们没有把原始节点的编号映射成当前连续的编号
+            assembly['nset'][(d['nset'], d['instance'])] = self.parse_set_data(d,
+                    start, stop)
+
+    def to_mesh(self, part=None, etype=None):
         """
-        @brief 解析 nset 数据
-
-        @param parts 用于存储单元集合数据的字典
-        @param name 当前部分的名称
+        @brief 由 part 中的节点和单元生成网格
 
-        @note 注意这里我们没有把原始节点的编号映射成当前连续的编号
+        @param[in] part part 的名字, 默认为第一个 part
+        @param[in] etype 单元类型, 如 'C3D4', 默认为第一种单元类型。所有对应同一
+                   种网格的单元类型（如 'C3D8' 和 'C3D8R'）都会放到网格中
         """
-        line = self.contents[self.cline]
-        d = self.parse_keyword_line(line)
-        # print("nset_assembly_d:", d)
-
-        idx = []
-
-        self.cline += 1
-        line = self.contents[self.cline]
-        # print("nset_assembly_line:", line)
-        
-        while not line.startswith('*'):
-            ss = line.split(',')
-            idx += [int(s) for s in ss]
-            self.cline += 1
-            line = self.contents[self.cline]
-
-        nset_assembly_key = (d['nset'], d['instance'])
-        assemblys[name]['nset'][nset_assembly_key] = np.array(idx, dtype=np.int_)
-        # print("nset_assembly:", assemblys[name]['nset'][nset_assembly_key])
-
-
-
-    def parse_step_data(self):
-        line = self.contents[self.cline]
-        print(line)
-
-    def parse_material_data(self):
-        line = self.contents[self.cline]
-        print(line)
-
+        from . import TriangleMesh, QuadrangleMesh, TetrahedronMesh
+        from . import HexahedronMesh, EdgeMesh
+        meshes = {'TriangleMesh': TriangleMesh, 'QuadrangleMesh': QuadrangleMesh,
+                'TetrahedronMesh': TetrahedronMesh, 'HexahedronMesh': HexahedronMesh,
+                'EdgeMesh': EdgeMesh}
+
+        if not self.parts:
+            self.parse()
+        part = self.parts[next(iter(self.parts)) if part is None else part]
+        elem = part['elem']
+        etype = next(iter(elem)) if etype is None else etype
+        mtype = ELEMENT_MESH.get(etype.upper())
+        if mtype is None:
+            raise ValueError(f"the element type {etype} is not supported!")
+        cell = np.concatenate([val[0] for key, val in elem.items()
+            if ELEMENT_MESH.get(key.upper()) == mtype])
+        return meshes[mtype](part['node'][0], cell)
@@ -3,6 +3,7 @@ from numpy.typing import NDArray
 import numpy as np
 
 from ..mesh_data_structure import MeshDataStructure
+from ..cell_locator import CellLocator
 
 
 class Mesh():
@@ -469,6 +470,37 @@ class Mesh():
         length = np.sqrt(np.square(v).sum(axis=1))
         return v/length.reshape(-1, 1)
 
+    def cell_locator(self, rebuild: bool=False):
+        """
+        @brief Get the spatial index used for point location. See `CellLocator`.
+
+        @param rebuild: bool. Force to rebuild the index, which is needed after\
+               the nodes are moved in place.
+
+        @note: The index is cached and rebuilt automatically when the topology\
+               or the node array of the mesh is replaced.
+        """
+        node = self.entity('node')
+        stamp = (getattr(self.ds, 'topology_stamp', 0), id(node),
+                 node.shape, self.number_of_cells())
+        locator = self.__dict__.get('_cell_locator', None)
+        if rebuild or (locator is None) or (locator[0] != stamp):
+            locator = (stamp, CellLocator(self))
+            self._cell_locator = locator
+        return locator[1]
+
+    def locate(self, points: NDArray):
+        """
+        @brief Find the cells containing the given points.
+
+        @param points: NDArray with shape (NP, GD).
+
+        @return: `loc` with shape (NP, ), -1 for the points out of the mesh,\
+                 and the local coordinates `bc` of the points in their cells.\
+                 See `CellLocator.find`.
+        """
+        return self.cell_locator().find(points)
+
     def integral(self, f, q=3, celltype=False):
         """
         @brief 在网格中数值积分一个函数
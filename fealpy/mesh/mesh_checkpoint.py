@@ -0,0 +1,159 @@
+import os
+import json
+import shutil
+import importlib
+
+import numpy as np
+
+from .mesh_data_structure.mesh_ds import HomogeneousMeshDS, new_topology_stamp
+
+CHECKPOINT_VERSION = 1
+
+
+def _to_json(o):
+    if hasattr(o, 'item'): # numpy 的标量
+        return o.item()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable!")
+
+
+def save_checkpoint(path, mesh, fields=None, **meta):
+    """
+    @brief 把网格、网格上的数据和有限元函数保存为检查点
+
+    检查点是一个目录, 每个数组保存为一个 .npy 文件, 目录中的 meta.json 记录网格
+    的类型、数组的名字和有限元空间的参数。除了 node 和 cell, 网格数据结构中已经
+    构造好的拓扑数组（edge、face、face2cell、cell2edge 等）也一起保存, 读入时
+    不需要重新构造拓扑。
+
+    @param[in] path 检查点目录
+    @param[in] mesh 网格, 它的数据结构需要是 `HomogeneousMeshDS`
+    @param[in] fields 字典 {名字: 有限元函数或数组}
+    @param[in] meta 其它需要保存的信息, 如时间 t、时间步 step, 需要能写成 JSON
+
+    @note 先写到临时目录中, 全部写完后再替换原来的检查点, 写入中途程序中断时
+          不会破坏已有的检查点。替换时原来的检查点先改名为 path.old,
+          在两次改名之间中断时 `load_checkpoint` 会读入 path.old
+    """
+    ds = mesh.ds
+    if not isinstance(ds, HomogeneousMeshDS):
+        raise ValueError(f"the checkpoint of {type(mesh).__name__} is not supported!")
+
+    tmp = path.rstrip('/') + '.tmp'
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    def save(name, a):
+        fname = name + '.npy'
+        np.save(os.path.join(tmp, fname), np.asarray(a))
+        return fname
+
+    # 数据结构中的数组, 同一个数组的不同名字（如二维网格的 edge2cell 和
+    # face2cell）只保存一次
+    topology = {}
+    saved = {}
+    for key, val in ds.__dict__.items():
+        if isinstance(val, np.ndarray):
+            if id(val) not in saved:
+                saved[id(val)] = save('ds.' + key, val)
+            topology[key] = saved[id(val)]
+
+    data = {}
+    for etype in ('nodedata', 'edgedata', 'facedata', 'celldata', 'meshdata'):
+        d = getattr(mesh, etype, None)
+        if (d is None) or (etype == 'facedata' and d is getattr(mesh, 'edgedata', None)):
+            continue
+        data[etype] = {key: save(f'{etype}.{key}', val) for key, val in d.items()
+                if isinstance(val, np.ndarray)}
+
+    info = {}
+    for name, val in (fields or {}).items():
+        info[name] = {'file': save('field.' + name, val)}
+        space = getattr(val, '__dict__', {}).get('space', None)
+        if type(space).__name__ == 'LagrangeFESpace':
+            info[name]['space'] = {'type': 'LagrangeFESpace', 'p': space.p,
+                    'spacetype': space.spacetype, 'doforder': space.doforder}
+
+    cls = type(mesh)
+    header = {
+        'version': CHECKPOINT_VERSION,
+        'mesh': {'module': cls.__module__, 'class': cls.__qualname__,
+            'NN': ds.NN, 'node': save('node', mesh.entity('node')),
+            'topology': topology},
+        'data': data,
+        'fields': info,
+        'meta': meta}
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(header, f, indent=1, default=_to_json)
+
+    # 原来的检查点先改名为 .old, 新的检查点就位后再删除, 任何时刻磁盘上
+    # 都至少有一个完整的检查点
+    old = path.rstrip('/') + '.old'
+    if os.path.exists(path):
+        if os.path.exists(old):
+            shutil.rmtree(old)
+        os.replace(path, old)
+    os.replace(tmp, path)
+    if os.path.exists(old):
+        shutil.rmtree(old)
+
+
+def load_checkpoint(path, mmap_mode='c'):
+    """
+    @brief 读入 `save_checkpoint` 保存的检查点
+
+    @param[in] path 检查点目录
+    @param[in] mmap_mode 传给 `np.load` 的内存映射方式, 默认为 'c'（写时复制）,
+               数组在用到时才从磁盘读入, 修改不会写回文件。为 None 时全部读入内存
+
+    @return mesh, fields, meta。fields 中有空间信息的数组恢复为有限元函数, 参数
+            相同的函数共用同一个有限元空间
+
+    @note 网格用空的单元数组初始化（代价可以忽略）, 然后直接设置保存的拓扑
+          数组, 跳过 `construct`
+    """
+    old = path.rstrip('/') + '.old'
+    if (not os.path.exists(path)) and os.path.exists(old):
+        # 上一次保存在替换检查点的中途被中断
+        path = old
+    with open(os.path.join(path, 'meta.json')) as f:
+        header = json.load(f)
+    if header['version'] > CHECKPOINT_VERSION:
+        raise ValueError(f"the checkpoint version {header['version']} is not supported!")
+
+    def load(fname):
+        return np.asarray(np.load(os.path.join(path, fname), mmap_mode=mmap_mode))
+
+    info = header['mesh']
+    cls = getattr(importlib.import_module(info['module']), info['class'])
+    # 同一个文件对应的名字共用一个数组
+    loaded = {fname: load(fname) for fname in set(info['topology'].values())}
+    arrays = {key: loaded[fname] for key, fname in info['topology'].items()}
+
+    node = load(info['node'])
+    cell = arrays['cell']
+    mesh = cls(node, cell[:0])
+    ds = mesh.ds
+    ds.__dict__.update(arrays)
+    ds.NN = info['NN']
+    ds.itype = cell.dtype
+    ds.topology_stamp = new_topology_stamp()
+    ds.clear_relation_cache()
+
+    for etype, d in header['data'].items():
+        getattr(mesh, etype).update({key: load(fname) for key, fname in d.items()})
+
+    fields = {}
+    spaces = {}
+    for name, val in header['fields'].items():
+        a = load(val['file'])
+        if 'space' in val:
+            s = val['space']
+            key = (s['p'], s['spacetype'], s['doforder'])
+            if key not in spaces:
+                from ..functionspace import LagrangeFESpace
+                spaces[key] = LagrangeFESpace(mesh, p=s['p'],
+                        spacetype=s['spacetype'], doforder=s['doforder'])
+            a = spaces[key].function(array=a, dtype=a.dtype)
+        fields[name] = a
+    return mesh, fields, header['meta']
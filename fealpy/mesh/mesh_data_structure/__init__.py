@@ -4,7 +4,10 @@ Provide ABCs for topology data class of mesh
 
 from .mesh_ds import (
     MeshDataStructure, HomogeneousMeshDS, StructureMeshDS,
-    ArrRedirector
+    ArrRedirector, unique_entity
+)
+from .relation_cache import (
+    RelationCache, cached_relation
 )
 from .mesh1d_ds import Mesh1dDataStructure, StructureMesh1dDataStructure
 from .mesh2d_ds import Mesh2dDataStructure, StructureMesh2dDataStructure
@@ -1,4 +1,5 @@
 from typing import TypeVar, Generic, Union, Callable, overload
+from itertools import count
 
 import numpy as np
 from numpy import dtype
@@ -6,9 +7,69 @@ from numpy.typing import NDArray
 from scipy.sparse import coo_matrix, csr_matrix
 
 from .sparse_tool import enable_csr, arr_to_csr
+from .relation_cache import RelationCache, wrap_relations
 
 _VT = TypeVar('_VT')
 
+# 全局的拓扑版本号生成器, 保证不同的数据结构对象之间版本号也不会重复
+_topology_stamp = count(1)
+
+
+def new_topology_stamp() -> int:
+    """
+    @brief 生成一个新的拓扑版本号
+
+    @note 网格拓扑每次（重新）构造时都应该调用这个函数更新 `topology_stamp`,
+          依赖网格拓扑的缓存（如组装缓存）据此判断缓存是否失效。
+    """
+    return next(_topology_stamp)
+
+
+def unique_entity(total: NDArray, NN: int=None):
+    """
+    @brief 找出 total 中不计顶点顺序的不同实体
+
+    @param[in] total 形状为 (M, k) 的实体顶点编号数组, 如单元上的所有面或边
+    @param[in] NN 节点个数, 默认为 total.max() + 1
+
+    @return i0, j 与 `np.unique(np.sort(total, axis=1), return_index=True,
+            return_inverse=True, axis=0)` 的后两个返回值完全相同
+
+    @note `np.unique(..., axis=0)` 把每一行看作一个整体做排序, 比较慢。这里当
+          NN**k 不超过 int64 的范围时, 把排序后的顶点编号压缩成一个 int64 的键值,
+          对一维整数数组做稳定排序; 否则（包括 total 不是整数数组时）对各列做
+          `np.lexsort`。两种方法都保持
+          字典序, 所以得到的实体编号与原来的方法一致。
+    """
+    M, k = total.shape
+    if M == 0:
+        return np.zeros(0, dtype=np.int_), np.zeros(0, dtype=np.int_)
+    stotal = np.sort(total, axis=1)
+    isint = np.issubdtype(stotal.dtype, np.integer)
+    if isint:
+        # 转成 Python 整数, NN**k 不会溢出（NumPy 整数的乘方溢出时没有提示）
+        NN = int(stotal[:, -1].max()) + 1 if NN is None else int(NN)
+
+    if isint and (NN**k < 2**63):
+        key = np.zeros(M, dtype=np.int64)
+        for i in range(k):
+            key *= NN
+            key += stotal[:, i].astype(np.int64)
+        idx = np.argsort(key, kind='stable')
+        skey = key[idx]
+        flag = np.ones(M, dtype=np.bool_)
+        flag[1:] = skey[1:] != skey[:-1]
+    else:
+        idx = np.lexsort(stotal.T[::-1])
+        srow = stotal[idx]
+        flag = np.ones(M, dtype=np.bool_)
+        flag[1:] = np.any(srow[1:] != srow[:-1], axis=1)
+
+    i0 = idx[flag]
+    j = np.zeros(M, dtype=np.int_)
+    j[idx] = np.cumsum(flag) - 1
+    return i0, j
+
 
 class Redirector(Generic[_VT]):
     def __init__(self, target: str) -> None:
@@ -62,6 +123,34 @@ class MeshDataStructure():
     # Constants
     TD: int
 
+    # 拓扑版本号, 拓扑重新构造后会更新, 0 表示拓扑从不改变（如结构网格）
+    topology_stamp: int = 0
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # 子类重载的邻接关系方法同样使用缓存
+        wrap_relations(cls)
+
+    @property
+    def relation_cache(self) -> RelationCache:
+        """
+        @brief 邻接关系的缓存对象, 可以用 `relation_cache.info()` 查看命中情况
+        """
+        cache = self.__dict__.get('_relation_cache', None)
+        if cache is None:
+            cache = RelationCache()
+            self._relation_cache = cache
+        return cache
+
+    def clear_relation_cache(self) -> None:
+        """
+        @brief 清空邻接关系的缓存
+
+        @note 拓扑重新构造后缓存会自动失效, 只有在外部直接修改了拓扑数组
+              （如 `face2cell`）时才需要手动调用
+        """
+        self.relation_cache.clear()
+
     # counters
 
     def number_of_cells(self):
@@ -241,6 +330,9 @@ class MeshDataStructure():
         return self.cell[self.boundary_cell_flag()]
 
 
+wrap_relations(MeshDataStructure)
+
+
 class HomogeneousMeshDS(MeshDataStructure):
     """
     @brief Data structure for meshes with homogeneous shape of cells.
@@ -300,12 +392,7 @@ class HomogeneousMeshDS(MeshDataStructure):
         NC = self.number_of_cells()
 
         total_face = self.total_face()
-        _, i0, j = np.unique(
-            np.sort(total_face, axis=1),
-            return_index=True,
-            return_inverse=True,
-            axis=0
-        )
+        i0, j = unique_entity(total_face, NN=self.NN if self.NN > 0 else None)
         self.face = total_face[i0, :]
         NFC = self.number_of_faces_of_cells()
         NF = i0.shape[0]
@@ -324,18 +411,16 @@ class HomogeneousMeshDS(MeshDataStructure):
             NEC = self.number_of_edges_of_cells()
             total_edge = self.total_edge()
 
-            _, i2, j = np.unique(
-                np.sort(total_edge, axis=1),
-                return_index=True,
-                return_inverse=True,
-                axis=0
-            )
+            i2, j = unique_entity(total_edge, NN=self.NN if self.NN > 0 else None)
             self.edge = total_edge[i2, :]
             self.cell2edge = np.reshape(j, (NC, NEC)) # 原来是 NFC, 应为 NEC
 
         elif self.TD == 2:
             self.edge2cell = self.face2cell
 
+        self.topology_stamp = new_topology_stamp()
+        self.clear_relation_cache()
+
     def clean(self) -> None:
         del self.face # this also deletes edge in 2-d mesh.
         del self.face2cell
@@ -345,6 +430,7 @@ class HomogeneousMeshDS(MeshDataStructure):
             del self.cell2edge
         elif self.TD == 2:
             del self.edge2cell
+        self.clear_relation_cache()
 
     def number_of_vertices_of_cells(self) -> int:
         """
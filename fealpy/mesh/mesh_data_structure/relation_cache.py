@@ -0,0 +1,185 @@
+"""
+Provide the lazy cache of adjacency relations between mesh entities
+"""
+
+from inspect import signature, isfunction
+from functools import wraps
+
+import numpy as np
+
+
+# 需要缓存的邻接关系方法, 子类中重载的同名方法也会被自动缓存
+CACHED_RELATIONS = (
+    'cell_to_edge', 'cell_to_face', 'cell_to_cell',
+    'cell_to_edge_sign', 'cell_to_face_sign',
+    'face_to_edge', 'face_to_face',
+    'edge_to_edge', 'edge_to_face', 'edge_to_cell',
+    'node_to_node', 'node_to_edge', 'node_to_face', 'node_to_cell',
+    'boundary_node_flag', 'boundary_edge_flag',
+    'boundary_face_flag', 'boundary_cell_flag',
+    'boundary_edge_to_edge'
+)
+
+# 边界标记经常被调用者原地修改（如去掉部分边界点）, 复制的代价也很小,
+# 这些关系返回可写的副本
+WRITABLE_RELATIONS = (
+    'boundary_node_flag', 'boundary_edge_flag',
+    'boundary_face_flag', 'boundary_cell_flag',
+)
+
+
+def _freeze(val):
+    """
+    @brief 把缓存的数组变成只读的视图, 调用者原地修改返回值时会报错, 而不是
+           悄悄破坏缓存
+
+    @note 用视图而不是直接设置原数组的标记, 因为有些邻接关系直接返回数据结构
+          自己的数组（如 cell2edge）, 它们仍然需要可写。稀疏矩阵没有只读标记,
+          缓存的稀疏矩阵是共享的, 调用者不能修改
+    """
+    if isinstance(val, np.ndarray):
+        val = val.view()
+        val.setflags(write=False)
+        return val
+    elif isinstance(val, tuple):
+        return tuple(_freeze(v) for v in val)
+    return val
+
+
+class RelationCache():
+    """
+    @brief 网格实体邻接关系的缓存
+
+    每个邻接关系（包括其稀疏矩阵形式, 不同参数分别缓存）在第一次调用时计算,
+    之后直接返回缓存的结果, 不做复制。数组以只读视图的形式返回, 稀疏矩阵在
+    多次调用之间共享, 都不能原地修改, 需要修改时调用者先复制一份。边界标记
+    （`WRITABLE_RELATIONS`）例外, 总是返回可写的副本。网格拓扑
+    重新构造（`topology_stamp` 改变）或者节点、单元个数改变时, 缓存自动清空。
+
+    `hits`、`misses` 记录了每个关系的命中和未命中次数, 可以用 `info()` 查看,
+    从而找出程序中重复计算的邻接关系。
+
+    @note 只有参数都可以哈希时才缓存, 否则直接计算
+    """
+    def __init__(self):
+        self.enabled = True
+        self.hits = {}
+        self.misses = {}
+        self._data = {}
+        self._stamp = None
+        self._computing = set()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def clear(self):
+        """
+        @brief 清空缓存的数据, 保留命中计数
+        """
+        self._data.clear()
+        self._stamp = None
+
+    def reset_counter(self):
+        """
+        @brief 命中和未命中计数清零
+        """
+        self.hits.clear()
+        self.misses.clear()
+
+    def check(self, ds):
+        """
+        @brief 检查网格拓扑是否改变, 如果改变则清空缓存
+        """
+        stamp = (getattr(ds, 'topology_stamp', 0),
+                ds.number_of_nodes(), ds.number_of_cells())
+        if stamp != self._stamp:
+            self._data.clear()
+            self._stamp = stamp
+
+    def fetch(self, ds, key, func):
+        """
+        @brief 获取邻接关系, 如果没有缓存则调用 func() 计算并缓存
+
+        @param[in] ds 网格数据结构对象
+        @param[in] key (关系名, 参数) 组成的元组
+        @param[in] func 无参数的可调用对象, 用来计算邻接关系
+        """
+        if (not self.enabled) or (key in self._computing):
+            # 子类重载的方法会调用父类的同名方法, 这里不重复缓存和计数
+            return func()
+
+        self.check(ds)
+        name = key[0]
+        if key in self._data:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return self._output(name, self._data[key])
+
+        self.misses[name] = self.misses.get(name, 0) + 1
+        self._computing.add(key)
+        try:
+            val = func()
+        finally:
+            self._computing.discard(key)
+        val = _freeze(val)
+        self._data[key] = val
+        return self._output(name, val)
+
+    @staticmethod
+    def _output(name, val):
+        """
+        @brief 边界标记返回可写的副本, 其它关系直接返回缓存的只读结果
+        """
+        if (name in WRITABLE_RELATIONS) and isinstance(val, np.ndarray):
+            return val.copy()
+        return val
+
+    def info(self):
+        """
+        @brief 每个邻接关系的命中和未命中次数
+
+        @return 字典, 键为关系名, 值为 (hits, misses)
+        """
+        names = sorted(set(self.hits) | set(self.misses))
+        return {name: (self.hits.get(name, 0), self.misses.get(name, 0))
+                for name in names}
+
+
+def cached_relation(method, name=None):
+    """
+    @brief 把数据结构的邻接关系方法包装成带缓存的方法
+
+    @param[in] name 缓存使用的关系名, 默认为方法名
+    """
+    if name is None:
+        name = method.__name__
+    sig = signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            # 补上默认参数, 使 f() 与 f(return_sparse=False) 共用同一个缓存
+            bound = sig.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = (name, tuple(bound.arguments.items())[1:])
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        return self.relation_cache.fetch(self, key,
+                lambda: method(self, *args, **kwargs))
+
+    wrapper._cached_relation = True
+    return wrapper
+
+
+def wrap_relations(cls):
+    """
+    @brief 把类中定义的邻接关系方法换成带缓存的版本
+    """
+    for name in CACHED_RELATIONS:
+        method = cls.__dict__.get(name, None)
+        if isfunction(method) and (not getattr(method, '_cached_relation', False)):
+            setattr(cls, name, cached_relation(method, name=name))
+    return cls
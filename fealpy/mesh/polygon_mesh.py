@@ -8,6 +8,7 @@ from ..common import ranges
 
 from .mesh_base import Mesh, Plotable
 from .mesh_data_structure import MeshDataStructure, ArrRedirector
+from .mesh_data_structure.mesh_ds import new_topology_stamp
 
 
 class PolygonMesh(Mesh, Plotable):
@@ -971,6 +972,9 @@ class PolygonMeshDataStructure(MeshDataStructure):
         self.edge2cell[:, 3] = localIdx[i1]
         self.cell2edge = j
 
+        self.topology_stamp = new_topology_stamp()
+        self.clear_relation_cache()
+
     @property
     def cell(self):
         return np.hsplit(self._cell, self.cellLocation[1:-1])
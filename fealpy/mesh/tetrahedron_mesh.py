@@ -1,7 +1,6 @@
 import numpy as np
 from scipy.sparse import coo_matrix, csc_matrix, csr_matrix
 from scipy.sparse import spdiags, eye, tril, triu, bmat
-from scipy.spatial import KDTree
 from .mesh_base import Mesh, Plotable
 from .mesh_data_structure import Mesh3dDataStructure
 from .mphtxt_file_reader import MPHTxtFileReader
@@ -165,14 +164,14 @@ class TetrahedronMesh(Mesh, Plotable):
     def grad_lambda(self, index=np.s_[:]):
         localFace = self.ds.localFace
         node = self.node
-        cell = self.ds.cell
-        NC = self.number_of_cells() if index == np.s_[:] else len(index)
+        cell = self.entity('cell', index=index)
+        NC = cell.shape[0]
         Dlambda = np.zeros((NC, 4, 3), dtype=self.ftype)
         volume = self.entity_measure('cell', index=index)
         for i in range(4):
             j,k,m = localFace[i]
-            vjk = node[cell[index, k],:] - node[cell[index, j],:]
-            vjm = node[cell[index, m],:] - node[cell[index, j],:]
+            vjk = node[cell[:, k],:] - node[cell[:, j],:]
+            vjm = node[cell[:, m],:] - node[cell[:, j],:]
             Dlambda[:, i, :] = np.cross(vjm, vjk)/(6*volume.reshape(-1, 1))
         return Dlambda
 
@@ -478,62 +477,13 @@ class TetrahedronMesh(Mesh, Plotable):
 
 
     def location(self, points):
+        """
+        @brief 给定一组点 points, 找到这些点所在的单元
 
-        NN = self.number_of_nodes()
-        NC = self.number_of_cells()
-        NP = points.shape[0]
-
-        self.celldata['cell'] = np.zeros(NC)
-
-        node = self.entity('node')
-        cell = self.entity('cell')
-        cell2cell = self.ds.cell_to_cell()
-
-        start = np.zeros(NN, dtype=self.itype)
-        start[cell[:, 0]] = range(NC)
-        start[cell[:, 1]] = range(NC)
-        start[cell[:, 2]] = range(NC)
-        start[cell[:, 3]] = range(NC)
-
-        tree = KDTree(node)
-        _, loc = tree.query(points)
-        start = start[loc] # 设置一个初始单元位置
-
-        print("start:", start)
-
-        self.celldata['cell'][start] = 1
-
-        localFace = self.ds.localFace
-        isNotOK = np.ones(NP, dtype=np.bool_)
-        while np.any(isNotOK):
-            idx = start[isNotOK] # 试探的单元编号
-            pp = points[isNotOK] # 还没有找到所在单元的点的坐标
-
-            v = node[cell[idx, :]] - pp[:, None, :] # (NP, 4, 3) - (NP, 1, 3)
-            # 计算点和当前四面体四个面形成四面体的体积
-            a = np.zeros((len(idx), 4), dtype=self.ftype)
-            for i in range(4):
-                vv = np.cross(v[:, localFace[i, 0]], v[:, localFace[i, 1]])
-                a[:, i] = np.sum(vv*v[:, localFace[i, 2]], axis=-1)
-            lidx = np.argmin(a, axis=-1)
-
-            # 最小体积小于 0, 说明点在单元外
-            isOutCell = a[range(a.shape[0]), lidx] < 0.0
-
-            idx0, = np.nonzero(isNotOK)
-            flag = (idx[isOutCell] == cell2cell[idx[isOutCell],
-                lidx[isOutCell]])
-
-            start[idx0[isOutCell][~flag]] = cell2cell[idx[isOutCell][~flag],
-                    lidx[isOutCell][~flag]]
-            start[idx0[isOutCell][flag]] = -1
-
-            self.celldata['cell'][start[start > -1]] = 1
-
-            isNotOK[idx0[isOutCell][flag]] = False
-            isNotOK[idx0[~isOutCell]] = False
-
-        return start
+        @return 形状为 (NP, ) 的单元编号数组, 不在网格中的点为 -1
+        """
+        loc, _ = self.locate(points)
+        return loc
 
     def direction(self, i):
         """ Compute the direction on every node of
@@ -2,7 +2,6 @@ from typing import Sequence
 import numpy as np
 import warnings
 from scipy.sparse import coo_matrix, csr_matrix, bmat, eye
-from scipy.spatial import KDTree
 
 from .triangle_quality import *
 
@@ -583,55 +582,15 @@ class TriangleMesh(Mesh, Plotable):
 
     def location(self, points):
         """
-        Notes
-        -----
-        给定一组点 p , 找到这些点所在的单元
+        @brief 给定一组点 points, 找到这些点所在的单元
 
-        这里假设：
+        @return 形状为 (NP, ) 的单元编号数组, 不在网格中的点为 -1
 
-        1. 所有点在网格内部，
-        2. 网格中没有洞
-        3. 区域还要是凸的
+        @note 基于单元包围盒的桶网格 `CellLocator` 查找, 区域可以是非凸的或者
+              带洞的。需要重心坐标时请直接使用 `locate`
         """
-
-        NN = self.number_of_nodes()
-        NC = self.number_of_cells()
-        NP = points.shape[0]
-        node = self.entity('node')
-        cell = self.entity('cell')
-        cell2cell = self.ds.cell_to_cell()
-
-        start = np.zeros(NN, dtype=self.itype)
-        start[cell[:, 0]] = range(NC)
-        start[cell[:, 1]] = range(NC)
-        start[cell[:, 2]] = range(NC)
-        tree = KDTree(node)
-        _, loc = tree.query(points)
-        start = start[loc] # 设置一个初始单元位置
-
-        isNotOK = np.ones(NP, dtype=np.bool_)
-        while np.any(isNotOK):
-            idx = start[isNotOK]
-            pp = points[isNotOK]
-
-            v0 = node[cell[idx, 0]] - pp # 所在单元的三个顶点
-            v1 = node[cell[idx, 1]] - pp
-            v2 = node[cell[idx, 2]] - pp
-
-            a = np.zeros((len(idx), 3), dtype=self.ftype)
-            a[:, 0] = np.cross(v1, v2)
-            a[:, 1] = np.cross(v2, v0)
-            a[:, 2] = np.cross(v0, v1)
-            lidx = np.argmin(a, axis=-1)
-
-            # 最小面积小于 0, 说明点在单元外
-            isOutCell = a[range(a.shape[0]), lidx] < 0.0
-
-            idx0, = np.nonzero(isNotOK)
-            start[idx0[isOutCell]] = cell2cell[idx[isOutCell], lidx[isOutCell]]
-            isNotOK[idx0[~isOutCell]] = False
-
-        return start
+        loc, _ = self.locate(points)
+        return loc
 
     def circumcenter(self, index=np.s_[:], returnradius=False):
         """
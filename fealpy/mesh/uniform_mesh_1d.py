@@ -7,6 +7,7 @@ from types import ModuleType
 
 from .mesh_base import Mesh, Plotable
 from .mesh_data_structure import StructureMesh1dDataStructure, HomogeneousMeshDS
+from .uniform_mesh_stencil import elliptic_stencil, laplace_stencil
 
 # 这个数据结构为有限元接口服务
 from ..quadrature import GaussLegendreQuadrature
@@ -374,77 +375,43 @@ class UniformMesh1d(Mesh, Plotable):
             return e1
 
     ## @ingroup FDMInterface
-    def elliptic_operator(self, d=1, c=None, r=None):
+    def stencil_shape(self):
+        """
+        @brief 网格节点数组的形状 (nx+1, ), 差分模板算子作用在这个形状的网格函数上
+        """
+        return (self.nx + 1, )
+
+    ## @ingroup FDMInterface
+    def elliptic_operator(self, d=1, c=None, r=None, matrix_free=False):
         """
         @brief 对于一般的椭圆算子组装有限差分矩阵
 
-        椭圆算子的形式: -d(x) * u'' + c(x) * u' + r(x) * u.
+        椭圆算子的形式: -(d(x) u')' + c(x) * u' + r(x) * u.
 
         @param[in] d The diffusion coefficient, default is 1.
         @param[in] c The convection coefficient, default is None.
         @param[in] r The reaction coefficient, default is None.
-        """
+        @param[in] matrix_free 为 True 时返回差分模板算子 `StencilOperator`
 
-        h = self.h
-        NN = self.number_of_nodes()
-        k = np.arange(NN)
+        @note 并未处理边界条件
+        """
         node = self.node
-
-        if callable(d):
-            d = d(node)
-        
-        if c is None:
-            c = np.zeros(NN)
-        elif callable(c):
-            c = c(node)
-        
-        if r is None:
-            r = np.zeros(NN)
-        elif callable(r):
-            r = r(node)
-
-        # Assemble diffusion term
-        cx = d / (h ** 2)
-        A = diags([2 * cx], [0], shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(-cx, (NN - 1,))
-        I = k[1:]
-        J = k[:-1]
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        # Assemble convection term
-        cc = c / (2 * h)
-        val_c = np.broadcast_to(cc[:-1], (NN - 1,))
-        A += csr_matrix((val_c, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A -= csr_matrix((val_c, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        # Assemble reaction term
-        A += diags([r], [0], shape=(NN, NN), format='csr')
-
-        return A
+        d, c, r = (f(node) if callable(f) else f for f in (d, c, r))
+        A = elliptic_stencil(self.stencil_shape(), self.h, d=d, c=c, r=r,
+                dtype=self.ftype)
+        return A if matrix_free else A.tocsr()
 
     ## @ingroup FDMInterface
-    def laplace_operator(self) -> csr_matrix:
+    def laplace_operator(self, matrix_free=False):
         """
         @brief 组装 Laplace 算子 ∆u 对应的有限差分离散矩阵
 
+        @param[in] matrix_free 为 True 时返回差分模板算子 `StencilOperator`
+
         @note 并未处理边界条件
         """
-        h = self.h
-        cx = 1/(h**2)
-        NN = self.number_of_nodes()
-        k = np.arange(NN)
-
-        A = diags([2*cx], [0], shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(-cx, (NN-1, ))
-        I = k[1:]
-        J = k[0:-1]
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-        return A
-
+        A = laplace_stencil(self.stencil_shape(), self.h, dtype=self.ftype)
+        return A if matrix_free else A.tocsr()
 
     ## @ingroup FDMInterface
     def cdr_operator(self) -> csr_matrix: 
@@ -622,27 +589,19 @@ class UniformMesh1d(Mesh, Plotable):
             isBdNode = threshold(node)
             uh[isBdNode]  = gD(node[isBdNode])
 
-    def parabolic_operator_forward(self, tau):
+    def parabolic_operator_forward(self, tau, matrix_free=False):
         """
         @brief 生成抛物方程的向前差分迭代矩阵
 
         @param[in] tau float, 当前时间步长
+        @param[in] matrix_free 为 True 时返回差分模板算子, 显式迭代时不需要形成矩阵
         """
         r = tau/self.h**2 
         if r > 0.5:
             raise ValueError(f"The r: {r} should be smaller than 0.5")
 
-        NN = self.number_of_nodes()
-        k = np.arange(NN)
-
-        A = diags([1 - 2 * r], 0, shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(r, (NN-1, ))
-        I = k[1:]
-        J = k[0:-1]
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-        return A
+        A = 1 - tau * self.laplace_operator(matrix_free=True)
+        return A if matrix_free else A.tocsr()
 
     def parabolic_operator_backward(self, tau):
         """
@@ -650,19 +609,8 @@ class UniformMesh1d(Mesh, Plotable):
 
         @param[in] tau float, 当前时间步长
         """
-        r = tau/self.h**2 
-
-        NN = self.number_of_nodes()
-        k = np.arange(NN)
-
-        A = diags([1+2*r], 0, shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(-r, (NN-1, ))
-        I = k[1:]
-        J = k[0:-1]
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-        return A
+        A = 1 + tau * self.laplace_operator(matrix_free=True)
+        return A.tocsr()
 
     def parabolic_operator_crank_nicholson(self, tau):
         """
@@ -670,51 +618,25 @@ class UniformMesh1d(Mesh, Plotable):
 
         @param[in] tau float, 当前时间步长
         """
-        r = tau/self.h**2 
-
-        NN = self.number_of_nodes()
-        k = np.arange(NN)
-
-        A = diags([1 + r], 0, shape=(NN, NN), format='csr')
-        val = np.broadcast_to(-r/2, (NN-1, ))
-        I = k[1:]
-        J = k[0:-1]
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        B = diags([1 - r], 0, shape=(NN, NN), format='csr')
-        val = np.broadcast_to(r/2, (NN-1, ))
-        B += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        B += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-        return A, B
+        L = self.laplace_operator(matrix_free=True)
+        A = 1 + tau/2 * L
+        B = 1 - tau/2 * L
+        return A.tocsr(), B.tocsr()
 
 
     ## @ingroup FDMInterface
-    def wave_operator_explicit(self, tau: float, a: float = 1.0):
+    def wave_operator_explicit(self, tau: float, a: float = 1.0, matrix_free=False):
         """
         @brief 生成波动方程的显格式离散矩阵
 
         @param[in] tau float, 时间步长
         @param[in] a float, 波速，默认值为 1
+        @param[in] matrix_free 为 True 时返回差分模板算子, 显式迭代时不需要形成矩阵
 
         @return 离散矩阵 A
         """
-        r = a * tau / self.h 
-
-        NN = self.number_of_nodes()
-        k = np.arange(NN)
-
-        A = diags([2 - 2*r**2], 0, shape=(NN, NN), format='csr')
-
-        I = k[1:]
-        J = k[0:-1]
-
-        val = np.broadcast_to(r**2, (NN-1, ))
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-
-        return A
+        A = 2 - (a * tau)**2 * self.laplace_operator(matrix_free=True)
+        return A if matrix_free else A.tocsr()
 
 
     ## @ingroup FDMInterface
@@ -728,31 +650,11 @@ class UniformMesh1d(Mesh, Plotable):
 
         @return 三个离散矩阵 A0, A1, A2，分别对应于不同的时间步
         """
-        r = a * tau / self.h 
-
-        NN = self.number_of_nodes()
-        k = np.arange(NN)
-
-        A0 = diags([1 + 2 * r**2 * theta], 0, shape=(NN, NN), format='csr')
-        A1 = diags([2 - 2 * r**2 * (1 - 2 * theta)], 0, shape=(NN, NN), format='csr')
-        A2 = diags([- 1 - 2 * r**2 * theta], 0, shape=(NN, NN), format='csr')
-
-        I = k[1:]
-        J = k[0:-1]
-
-        val = np.broadcast_to(- r**2 * theta, (NN-1, ))
-        A0 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A0 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(r**2 * (1 - 2 * theta), (NN-1, ))
-        A1 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A1 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(r**2 * theta, (NN-1, ))
-        A2 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A2 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A0, A1, A2
+        L = (a * tau)**2 * self.laplace_operator(matrix_free=True)
+        A0 = 1 + theta * L
+        A1 = 2 - (1 - 2 * theta) * L
+        A2 = -1 - theta * L
+        return A0.tocsr(), A1.tocsr(), A2.tocsr()
 
 
     ## @ingroup FDMInterface
@@ -766,31 +668,7 @@ class UniformMesh1d(Mesh, Plotable):
 
         @return 三个离散矩阵 A0, A1, A2，分别对应于不同的时间步
         """
-        r = a * tau / self.h 
-
-        NN = self.number_of_nodes()
-        k = np.arange(NN)
-
-        A0 = diags([1 + 2 * r**2 * theta], [0], shape=(NN, NN), format='csr')
-        A1 = diags([2 - 2 * r**2 * (1 - 2 * theta)], [0], shape=(NN, NN), format='csr')
-        A2 = diags([- 1 - 2 * r**2 * theta], [0], shape=(NN, NN), format='csr')
-
-        I = k[1:]
-        J = k[0:-1]
-
-        val = np.broadcast_to(- r**2 * theta, (NN-1, ))
-        A0 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A0 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(r**2 * (1 - 2 * theta), (NN-1, ))
-        A1 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A1 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(r**2 * theta, (NN-1, ))
-        A2 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A2 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A0, A1, A2
+        return self.wave_operator_implicit(tau, a=a, theta=theta)
 
 
     ## @ingroup FDMInterface
@@ -4,7 +4,7 @@ import warnings
 
 from matplotlib.pyplot import Figure
 from matplotlib.axes import Axes
-from scipy.sparse import coo_matrix, csr_matrix, diags, spdiags, spmatrix
+from scipy.sparse import coo_matrix, spdiags, spmatrix
 from types import ModuleType
 from typing import Optional, Tuple, Callable, Any, Union, List
 
@@ -12,6 +12,8 @@ from .mesh_base import Mesh, Plotable
 
 # 这个数据接口为有限元服务
 from .mesh_data_structure import StructureMesh2dDataStructure
+from .uniform_mesh_stencil import elliptic_stencil, laplace_stencil
+from .eikonal import fast_sweeping
 from ..quadrature import TensorProductQuadrature, GaussLegendreQuadrature
 from ..geometry import project, find_cut_point, msign
 
@@ -586,14 +588,36 @@ class UniformMesh2d(Mesh, Plotable):
             return el2
 
     ## @ingroup FDMInterface
-    def elliptic_operator(self, d=2, c=None, r=None):
+    def stencil_shape(self):
         """
-        @brief Assemble the finite difference matrix for a general elliptic operator.
+        @brief 网格节点数组的形状 (nx+1, ny+1), 差分模板算子作用在这个形状的网格函数上
         """
-        pass
+        return (self.ds.nx + 1, self.ds.ny + 1)
+
+    ## @ingroup FDMInterface
+    def elliptic_operator(self, d=1, c=None, r=None, matrix_free=False):
+        """
+        @brief 组装一般椭圆算子 -div(d grad u) + c . grad u + r u 的有限差分离散
+
+        @param[in] d 扩散系数, 标量、节点上的数组或函数, 默认为 1
+        @param[in] c 对流系数, 长度为 2 的序列、形状为 (nx+1, ny+1, 2) 的数组
+                   或者函数, 默认为 None
+        @param[in] r 反应系数, 标量、节点上的数组或函数, 默认为 None
+        @param[in] matrix_free 为 True 时返回差分模板算子 `StencilOperator`, 它
+                   可以不形成矩阵直接作用在网格函数上
+
+        @return csr_matrix 或 StencilOperator
+
+        @note 并未处理边界条件
+        """
+        node = self.node
+        d, c, r = (f(node) if callable(f) else f for f in (d, c, r))
+        A = elliptic_stencil(self.stencil_shape(), self.h, d=d, c=c, r=r,
+                dtype=self.ftype)
+        return A if matrix_free else A.tocsr()
 
     ## @ingroup FDMInterface
-    def laplace_operator(self):
+    def laplace_operator(self, matrix_free=False):
         """
         @brief Construct the discrete Laplace operator on a Cartesian grid
 
@@ -603,31 +627,13 @@ class UniformMesh2d(Mesh, Plotable):
         @note Both the x and y directions are uniformly partitioned, but the step sizes
         can be different.
 
+        @param[in] matrix_free If True, return a `StencilOperator` which can be
+        applied to (nx+1, ny+1) grid functions without forming a matrix.
+
         @return Returns a scipy.sparse.csr_matrix representing the discrete Laplace operator.
         """
-
-        n0 = self.ds.nx + 1
-        n1 = self.ds.ny + 1
-        cx = 1 / (self.h[0] ** 2)
-        cy = 1 / (self.h[1] ** 2)
-        NN = self.number_of_nodes()
-        k = np.arange(NN).reshape(n0, n1)
-
-        A = diags([2 * (cx + cy)], [0], shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(-cx, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(-cy, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A
+        A = laplace_stencil(self.stencil_shape(), self.h, dtype=self.ftype)
+        return A if matrix_free else A.tocsr()
 
     ## @ingroup FDMInterface
     def apply_dirichlet_bc(self,
@@ -691,37 +697,20 @@ class UniformMesh2d(Mesh, Plotable):
         uh[isBdNode] = gD(node[isBdNode, :])
 
     ## @ingroup FDMInterface
-    def parabolic_operator_forward(self, tau):
+    def parabolic_operator_forward(self, tau, matrix_free=False):
         """
         @brief 生成抛物方程的向前差分迭代矩阵
 
         @param[in] tau float, 当前时间步长
+        @param[in] matrix_free 为 True 时返回差分模板算子, 显式迭代时不需要形成矩阵
         """
         rx = tau / self.h[0] ** 2
         ry = tau / self.h[1] ** 2
         if rx + ry > 0.5:
             raise ValueError(f"The rx+ry: {rx + ry} should be smaller than 0.5")
 
-        NN = self.number_of_nodes()
-        n0 = self.nx + 1
-        n1 = self.ny + 1
-        k = np.arange(NN).reshape(n0, n1)
-
-        A = diags([1 - 2 * rx - 2 * ry], 0, shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(rx, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(ry, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A
+        A = 1 - tau * self.laplace_operator(matrix_free=True)
+        return A if matrix_free else A.tocsr()
 
     ## @ingroup FDMInterface
     def parabolic_operator_backward(self, tau):
@@ -735,25 +724,8 @@ class UniformMesh2d(Mesh, Plotable):
         if rx + ry > 1.5:
             raise ValueError(f"The sum rx + ry: {rx + ry} should be smaller than 0.5")
 
-        NN = self.number_of_nodes()
-        n0 = self.nx + 1
-        n1 = self.ny + 1
-        k = np.arange(NN).reshape(n0, n1)
-
-        A = diags([1 + 2 * rx + 2 * ry], 0, shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(-rx, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(-ry, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-        return A
+        A = 1 + tau * self.laplace_operator(matrix_free=True)
+        return A.tocsr()
 
     def parabolic_operator_crank_nicholson(self, tau):
         """
@@ -766,76 +738,25 @@ class UniformMesh2d(Mesh, Plotable):
         if rx + ry > 1.5:
             raise ValueError(f"The sum rx + ry: {rx + ry} should be smaller than 1.5")
 
-        NN = self.number_of_nodes()
-        n0 = self.nx + 1
-        n1 = self.ny + 1
-        k = np.arange(NN).reshape(n0, n1)
-
-        A = diags([1 + rx + ry], [0], shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(-rx / 2, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(-ry / 2, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        B = diags([1 - rx - ry], [0], shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(rx / 2, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        B += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        B += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(ry / 2, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        B += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        B += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A, B
-
-        A1 += csr_matrix((val, (J.flat, I.flat)), shape=(NN, NN), dtype=self.ftype)
+        L = self.laplace_operator(matrix_free=True)
+        A = 1 + tau / 2 * L
+        B = 1 - tau / 2 * L
+        return A.tocsr(), B.tocsr()
 
     ## @ingroup FDMInterface
-    def wave_operator_explicit(self, tau: float, a: float = 1.0):
+    def wave_operator_explicit(self, tau: float, a: float = 1.0, matrix_free=False):
         """
         @brief 生成波动方程的显格式离散矩阵
 
         @param[in] tau float, 时间步长
         @param[in] a float, 波速，默认值为 1
+        @param[in] matrix_free 为 True 时返回差分模板算子, 显式迭代
+                   u^{n+1} = A u^n - u^{n-1} 时不需要形成矩阵
 
         @return 离散矩阵 A
         """
-        rx = a * tau / self.h[0]
-        ry = a * tau / self.h[1]
-
-        NN = self.number_of_nodes()
-        n0 = self.nx + 1
-        n1 = self.ny + 1
-        k = np.arange(NN).reshape(n0, n1)
-
-        A = diags([2 * (1 - rx ** 2 - ry ** 2)], 0, shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(rx ** 2, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(ry ** 2, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A
+        A = 2 - (a * tau) ** 2 * self.laplace_operator(matrix_free=True)
+        return A if matrix_free else A.tocsr()
 
     ## @ingroup FDMInterface
     def wave_operator_implicit(self, tau, a=1, theta=0.25):
@@ -848,215 +769,43 @@ class UniformMesh2d(Mesh, Plotable):
 
         @return 三个离散矩阵 A0, A1, A2，分别对应于不同的时间步
         """
-        rx = a * tau / self.h[0]
-        ry = a * tau / self.h[1]
-
-        NN = self.number_of_nodes()
-        n0 = self.nx + 1
-        n1 = self.ny + 1
-        k = np.arange(NN).reshape(n0, n1)
-
-        A0 = diags([1 + 2 * rx ** 2 * theta + 2 * ry ** 2 * theta], 0, shape=(NN, NN), format='csr')
-        A1 = diags([2 * (1 - (rx ** 2 + ry ** 2) * (1 - 2 * theta))], 0, shape=(NN, NN), format='csr')
-        A2 = diags([-(1 + 2 * rx ** 2 * theta + 2 * ry ** 2 * theta)], 0, shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(-rx ** 2 * theta, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A0 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A0 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(-ry ** 2 * theta, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A0 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A0 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(rx ** 2 * (1 - 2 * theta), (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A1 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A1 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(ry ** 2 * (1 - 2 * theta), (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A1 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A1 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(rx ** 2 * theta, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A2 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A2 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(ry ** 2 * theta, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A2 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A2 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A0, A1, A2
+        L = (a * tau) ** 2 * self.laplace_operator(matrix_free=True)
+        A0 = 1 + theta * L
+        A1 = 2 - (1 - 2 * theta) * L
+        A2 = -1 - theta * L
+        return A0.tocsr(), A1.tocsr(), A2.tocsr()
 
     ## @ingroup FDMInterface
     def wave_operator_explicity(self, tau, a=1):
         """
         @brief 用显格式求解波动方程
         """
-        rx = a * tau / self.h[0]
-        ry = a * tau / self.h[1]
-
-        NN = self.number_of_nodes()
-        n0 = self.nx + 1
-        n1 = self.ny + 1
-        k = np.arange(NN).reshape(n0, n1)
-
-        A = diags([2 * (1 - rx ** 2 - ry ** 2)], [0], shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(rx ** 2, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(ry ** 2, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A
+        return self.wave_operator_explicit(tau, a=a)
 
     ## @ingroup FDMInterface
     def wave_operator_theta(self, tau, a=1, theta=0.5):
         """
         @brief 生成波动方程的离散矩阵
         """
-        rx = a * tau / self.h[0]
-        ry = a * tau / self.h[1]
-
-        NN = self.number_of_nodes()
-        n0 = self.nx + 1
-        n1 = self.ny + 1
-        k = np.arange(NN).reshape(n0, n1)
-
-        A0 = diags([1 + 2 * rx ** 2 * theta + 2 * ry ** 2 * theta], [0], shape=(NN, NN), format='csr')
-        A1 = diags([2 * (1 - (rx ** 2 + ry ** 2) * (1 - 2 * theta))], [0], shape=(NN, NN), format='csr')
-        A2 = diags([-(1 + 2 * rx ** 2 * theta + 2 * ry ** 2 * theta)], [0], shape=(NN, NN), format='csr')
-
-        val = np.broadcast_to(-rx ** 2, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A0 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A0 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(-ry ** 2, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A0 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A0 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(rx ** 2 * (1 - 2 * theta), (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A1 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A1 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(ry ** 2 * (1 - 2 * theta), (NN - n1,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A1 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A1 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(rx ** 2 * theta, (NN - n1,))
-        I = k[1:, :].flat
-        J = k[0:-1, :].flat
-        A2 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A2 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        val = np.broadcast_to(ry ** 2 * theta, (NN - n0,))
-        I = k[:, 1:].flat
-        J = k[:, 0:-1].flat
-        A2 += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A2 += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
-
-        return A0, A1, A2
+        return self.wave_operator_implicit(tau, a=a, theta=theta)
 
     ## @ingroup FDMInterface
-    def fast_sweeping_method(self, phi0):
+    def fast_sweeping_method(self, phi0, band=None, maxit=20, tol=1e-12):
         """
         @brief 均匀网格上的 fast sweeping method
-        @param[in] phi 是一个离散的水平集函数
+        @param[in] phi0 是一个离散的水平集函数, 形状为 (nx+1, ny+1) 或者展平后的一维数组
+        @param[in] band 窄带的宽度, 给定时距离大于 band 的值截断为 band
+        @param[in] maxit 最大扫描遍数
+        @param[in] tol 两遍扫描之间的变化量小于 tol 时停止
 
-        @note 注意，我们这里假设 x 和 y 方向剖分的段数相等
-        """
-        m = 2
-        nx = self.ds.nx
-        ny = self.ds.ny
-        k = nx / ny
-        ns = ny
-        h = self.h[0]
+        @return 符号距离函数, 形状与 phi0 相同
 
-        phi = self.function(ex=1)
-        isNearNode = self.function(dtype=np.bool_, ex=1)
-
-        # 把水平集函数转化为离散的网格函数
-        node = self.entity('node')
-        phi[1:-1, 1:-1] = phi0
-        sign = np.sign(phi[1:-1, 1:-1])
-
-        # 标记界面附近的点
-        isNearNode[1:-1, 1:-1] = np.abs(phi[1:-1, 1:-1]) < 2 * h
-        lsfun = UniformMesh2dFunction(self, phi[1:-1, 1:-1])
-        _, d = lsfun.project(node[isNearNode[1:-1, 1:-1]])
-        phi[isNearNode] = np.abs(d)  # 界面附近的点用精确值
-        phi[~isNearNode] = m  # 其它点用一个比较大的值
-
-        a = np.zeros(ns + 1, dtype=np.float64)
-        b = np.zeros(ns + 1, dtype=np.float64)
-        c = np.zeros(ns + 1, dtype=np.float64)
-        d = np.zeros(int(k * ns + 1), dtype=np.float64)
-        e = np.zeros(int(k * ns + 1), dtype=np.float64)
-        f = np.zeros(int(k * ns + 1), dtype=np.float64)
-
-        n = 0
-        for i in range(1, int(k * ns + 2)):
-            a[:] = np.minimum(phi[i - 1, 1:-1], phi[i + 1, 1:-1])
-            b[:] = np.minimum(phi[i, 0:ns + 1], phi[i, 2:])
-            flag = np.abs(a - b) >= h
-            c[flag] = np.minimum(a[flag], b[flag]) + h
-            c[~flag] = (a[~flag] + b[~flag] + np.sqrt(2 * h * h - (a[~flag] - b[~flag]) ** 2)) / 2
-            phi[i, 1:-1] = np.minimum(c, phi[i, 1:-1])
-            n += 1
-
-        for i in range(int(k * ns + 1), 0, -1):
-            a[:] = np.minimum(phi[i - 1, 1:-1], phi[i + 1, 1:-1])
-            b[:] = np.minimum(phi[i, 0:ns + 1], phi[i, 2:])
-            flag = np.abs(a - b) >= h
-            c[flag] = np.minimum(a[flag], b[flag]) + h
-            c[~flag] = (a[~flag] + b[~flag] + np.sqrt(2 * h * h - (a[~flag] - b[~flag]) ** 2)) / 2
-            phi[i, 1:-1] = np.minimum(c, phi[i, 1:-1])
-            n += 1
-
-        for j in range(1, ns + 2):
-            d[:] = np.minimum(phi[0:int(k * ns + 1), j], phi[2:, j])
-            e[:] = np.minimum(phi[1:-1, j - 1], phi[1:-1, j + 1])
-            flag = np.abs(d - e) >= h
-            f[flag] = np.minimum(d[flag], e[flag]) + h
-            f[~flag] = (d[~flag] + e[~flag] + np.sqrt(2 * h * h - (d[~flag] - e[~flag]) ** 2)) / 2
-            phi[1:-1, j] = np.minimum(f, phi[1:-1, j])
-            n += 1
-
-        for j in range(ns + 1, 0, -1):
-            d[:] = np.minimum(phi[0:int(k * ns + 1), j], phi[2:, j])
-            e[:] = np.minimum(phi[1:-1, j - 1], phi[1:-1, j + 1])
-            flag = np.abs(d - e) >= h
-            f[flag] = np.minimum(d[flag], e[flag]) + h
-            f[~flag] = (d[~flag] + e[~flag] + np.sqrt(2 * h * h - (d[~flag] - e[~flag]) ** 2)) / 2
-            phi[1:-1, j] = np.minimum(f, phi[1:-1, j])
-            n += 1
-
-        return sign * phi[1:-1, 1:-1]
+        @note x 和 y 方向的剖分段数和步长可以不同, 见 `eikonal.fast_sweeping`
+        """
+        shape = np.shape(phi0)
+        phi0 = np.reshape(phi0, self.stencil_shape())
+        phi = fast_sweeping(phi0, self.h, band=band, maxit=maxit, tol=tol)
+        return phi.reshape(shape)
 
     ## @ingroup FEMInterface
     def geo_dimension(self):
@@ -1,12 +1,14 @@
 import numpy as np
 import warnings
-from scipy.sparse import csr_matrix, diags, spdiags
+from scipy.sparse import spdiags
 from types import ModuleType
 
 from .mesh_base import Mesh, Plotable
 
 # 这个数据接口为有限元服务
 from .mesh_data_structure import StructureMesh3dDataStructure
+from .uniform_mesh_stencil import elliptic_stencil, laplace_stencil
+from .eikonal import fast_sweeping
 
 from ..geometry import project
 
@@ -574,56 +576,45 @@ class UniformMesh3d(Mesh, Plotable):
 
 
     ## @ingroup FDMInterface
-    def elliptic_operator(self, d=3, c=None, r=None):
+    def stencil_shape(self):
         """
-        @brief Assemble the finite difference matrix for a general elliptic operator.
+        @brief 网格节点数组的形状 (nx+1, ny+1, nz+1), 差分模板算子作用在这个形状的网格函数上
         """
-        pass
+        return (self.ds.nx + 1, self.ds.ny + 1, self.ds.nz + 1)
 
     ## @ingroup FDMInterface
-    def laplace_operator(self):
-        """
-        @brief 构造笛卡尔网格上的 Laplace 离散算子，其中 x, y, z
-        三个方向都是均匀剖分，但各自步长可以不一样
-        @todo 处理带系数的情形
+    def elliptic_operator(self, d=1, c=None, r=None, matrix_free=False):
         """
+        @brief Assemble the finite difference matrix for a general elliptic operator.
 
-        n0 = self.ds.nx + 1
-        n1 = self.ds.ny + 1
-        n2 = self.ds.nz + 1
-
-        hx = self.h[0]
-        hy = self.h[1]
-        hz = self.h[2]
-
-        cx = 1 / (hx ** 2)
-        cy = 1 / (hy ** 2)
-        cz = 1 / (hz ** 2)
-
-        NN = self.number_of_nodes()
-        k = np.arange(NN).reshape(n0, n1, n2)
+        椭圆算子的形式: -div(d grad u) + c . grad u + r u
 
-        A = diags([2 * (cx + cy + cz)], [0], shape=(NN, NN), format='csr')
+        @param[in] d 扩散系数, 标量、节点上的数组或函数, 默认为 1
+        @param[in] c 对流系数, 长度为 3 的序列、形状为 (nx+1, ny+1, nz+1, 3)
+                   的数组或者函数, 默认为 None
+        @param[in] r 反应系数, 标量、节点上的数组或函数, 默认为 None
+        @param[in] matrix_free 为 True 时返回差分模板算子 `StencilOperator`
 
-        val = np.broadcast_to(-cx, (NN - n1 * n2,))
-        I = k[1:, :, :].flat
-        J = k[0:-1, :, :].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
+        @note 并未处理边界条件
+        """
+        node = self.node
+        d, c, r = (f(node) if callable(f) else f for f in (d, c, r))
+        A = elliptic_stencil(self.stencil_shape(), self.h, d=d, c=c, r=r,
+                dtype=self.ftype)
+        return A if matrix_free else A.tocsr()
 
-        val = np.broadcast_to(-cy, (NN - n0 * n2,))
-        I = k[:, 1:, :].flat
-        J = k[:, 0:-1, :].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
+    ## @ingroup FDMInterface
+    def laplace_operator(self, matrix_free=False):
+        """
+        @brief 构造笛卡尔网格上的 Laplace 离散算子，其中 x, y, z
+        三个方向都是均匀剖分，但各自步长可以不一样
 
-        val = np.broadcast_to(-cz, (NN - n0 * n1,))
-        I = k[:, :, 1:].flat
-        J = k[:, :, 0:-1].flat
-        A += csr_matrix((val, (I, J)), shape=(NN, NN), dtype=self.ftype)
-        A += csr_matrix((val, (J, I)), shape=(NN, NN), dtype=self.ftype)
+        @param[in] matrix_free 为 True 时返回差分模板算子 `StencilOperator`
 
-        return A
+        @note 带系数的情形见 `elliptic_operator`
+        """
+        A = laplace_stencil(self.stencil_shape(), self.h, dtype=self.ftype)
+        return A if matrix_free else A.tocsr()
 
     ## @ingroup FDMInterface
     def apply_dirichlet_bc(self, gD, A, f, uh=None):
@@ -663,12 +654,20 @@ class UniformMesh3d(Mesh, Plotable):
         pass
 
     ## @ingroup FDMInterface
-    def fast_sweeping_method(self, phi0):
+    def fast_sweeping_method(self, phi0, band=None, maxit=20, tol=1e-12):
         """
         @brief 均匀网格上的 fast sweeping method
-        @param[in] phi 是一个离散的水平集函数
+        @param[in] phi0 是一个离散的水平集函数, 形状为 (nx+1, ny+1, nz+1) 或者展平后的一维数组
+        @param[in] band 窄带的宽度, 给定时距离大于 band 的值截断为 band
+        @param[in] maxit 最大扫描遍数
+        @param[in] tol 两遍扫描之间的变化量小于 tol 时停止
+
+        @return 符号距离函数, 形状与 phi0 相同
         """
-        pass
+        shape = np.shape(phi0)
+        phi0 = np.reshape(phi0, self.stencil_shape())
+        phi = fast_sweeping(phi0, self.h, band=band, maxit=maxit, tol=tol)
+        return phi.reshape(shape)
 
     ## @ingroup FEMInterface
     def geo_dimension(self):
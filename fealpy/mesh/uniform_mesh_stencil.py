@@ -0,0 +1,316 @@
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import dia_matrix
+from scipy.sparse.linalg import LinearOperator
+
+
+class StencilOperator():
+    """
+    @brief 均匀网格节点上的差分模板算子
+
+    算子作用在形状为 shape = (nx+1, ny+1, ...) 的网格函数上:
+
+        (A u)[i] = sum_{o} c_o[i] * u[i + o],
+
+    其中 o 是模板的偏移, 系数 c_o 是标量或者形状为 shape 的数组（第 i 个节点
+    所在行的系数）, 网格外的邻居直接略去。
+
+    同一个算子既可以不形成矩阵直接作用在网格函数上（`apply` 或 `A @ u`）, 也
+    可以一次性组装成 CSR 矩阵（`tocsr`）。算子之间可以相加、与标量相乘, 标量
+    看成单位算子的倍数, 如显式格式的迭代算子可以写成 `1 - tau*L`。
+
+    @note 节点按 C 顺序编号, 与 `UniformMesh2d` 等网格的节点编号一致
+    """
+    # 让 numpy 的数组和标量在运算中把控制权交给算子
+    __array_ufunc__ = None
+
+    def __init__(self, shape, stencil=None, dtype=np.float64):
+        """
+        @param[in] shape 网格节点数组的形状
+        @param[in] stencil 字典 {偏移: 系数}
+        @param[in] dtype 组装矩阵时使用的数据类型
+        """
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = dtype
+        self.stencil = {}
+        self._kernel = None
+        for offset, coef in (stencil or {}).items():
+            self.add(offset, coef)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def NN(self):
+        return int(np.prod(self.shape))
+
+    def add(self, offset, coef):
+        """
+        @brief 把系数 coef 累加到偏移 offset 上
+
+        @param[in] offset 长度为 ndim 的整数元组, 一维时也可以是整数
+        @param[in] coef 标量, 或者形状为 shape（或展平后长度为 NN）的数组
+        """
+        offset = tuple(int(o) for o in np.atleast_1d(offset))
+        if len(offset) != self.ndim:
+            raise ValueError(f"the offset {offset} does not match the grid of dimension {self.ndim}!")
+        if np.ndim(coef) == 0:
+            coef = coef.item() if hasattr(coef, 'item') else coef
+        else:
+            coef = np.reshape(coef, self.shape)
+        if offset in self.stencil:
+            coef = self.stencil[offset] + coef
+        self.stencil[offset] = coef
+        self._kernel = None
+        return self
+
+    def kernel(self):
+        """
+        @brief 系数都是常数时, 模板对应的卷积核（以中心为原点）, 否则返回 None
+        """
+        if self._kernel is None:
+            if any(isinstance(c, np.ndarray) for c in self.stencil.values()):
+                return None
+            r = max((max(abs(o) for o in offset) for offset in self.stencil), default=0)
+            w = np.zeros((2*r + 1, )*self.ndim, dtype=np.float64)
+            for offset, c in self.stencil.items():
+                w[tuple(o + r for o in offset)] += c
+            self._kernel = w
+        return self._kernel
+
+    def copy(self):
+        A = StencilOperator(self.shape, dtype=self.dtype)
+        for key, val in self.stencil.items():
+            A.stencil[key] = val.copy() if isinstance(val, np.ndarray) else val
+        return A
+
+    def _slices(self, offset):
+        """
+        @brief 偏移 offset 对应的目标和源的切片, 即 dst 中的节点 i 用到 src 中的
+               节点 i + offset
+        """
+        dst = []
+        src = []
+        for o, n in zip(offset, self.shape):
+            if o >= 0:
+                dst.append(slice(0, n - o))
+                src.append(slice(o, n))
+            else:
+                dst.append(slice(-o, n))
+                src.append(slice(0, n + o))
+        return tuple(dst), tuple(src)
+
+    def apply(self, u, out=None):
+        """
+        @brief 不形成矩阵, 直接计算 A @ u
+
+        @param[in] u 形状为 shape 的网格函数, 或者展平后长度为 NN 的数组
+        @param[in] out 存放结果的数组, 形状与 u 相同
+
+        @return 与 u 形状相同的数组
+
+        @note 系数都是常数且 u 是实数组时用 `scipy.ndimage.correlate` 一次扫描
+              完成（网格外补零）, 否则按偏移逐个做切片运算
+        """
+        v = np.reshape(u, self.shape)
+        dtype = np.result_type(v.dtype, *(np.asarray(c).dtype for c in self.stencil.values()))
+        if out is None:
+            out = np.empty(self.shape, dtype=dtype)
+        result = out
+        out = out.reshape(self.shape)
+
+        w = self.kernel()
+        if (w is not None) and (v.dtype.kind == 'f') and (out.dtype == v.dtype):
+            ndimage.correlate(v, w, output=out, mode='constant', cval=0.0)
+            return result.reshape(np.shape(u))
+
+        out[:] = 0
+
+        for offset, c in self.stencil.items():
+            dst, src = self._slices(offset)
+            if isinstance(c, np.ndarray):
+                out[dst] += c[dst]*v[src]
+            else:
+                out[dst] += c*v[src]
+        return result.reshape(np.shape(u))
+
+    __call__ = apply
+
+    def __matmul__(self, u):
+        return self.apply(u)
+
+    def diagonal(self):
+        """
+        @brief 算子对应矩阵的对角线, 长度为 NN
+        """
+        c = self.stencil.get((0, )*self.ndim, 0.0)
+        return np.broadcast_to(c, self.shape).astype(self.dtype).reshape(-1)
+
+    def tocsr(self):
+        """
+        @brief 一次性组装成 CSR 矩阵
+
+        模板的每个偏移对应矩阵的一条对角线, 先把系数直接写入 DIA 格式的数据
+        数组（网格外的邻居对应的位置为 0）, 再由 scipy 转换为 CSR 矩阵, 不需要
+        逐个组装 COO 矩阵再相加。
+
+        @note 值为 0 的元素不会出现在矩阵的稀疏结构中
+        """
+        NN = self.NN
+        strides = np.cumprod((1, ) + self.shape[:0:-1])[::-1]
+        offsets = list(self.stencil.keys())
+        data = np.zeros((len(offsets), NN), dtype=self.dtype)
+        for j, offset in enumerate(offsets):
+            dst, src = self._slices(offset)
+            c = self.stencil[offset]
+            # DIA 格式中第 i 行, 第 i + s 列的元素存放在 data[j, i + s]
+            data[j].reshape(self.shape)[src] = c[dst] if isinstance(c, np.ndarray) else c
+        diag = [int(np.dot(offset, strides)) for offset in offsets]
+        return dia_matrix((data, diag), shape=(NN, NN)).tocsr()
+
+    def aslinearoperator(self):
+        """
+        @brief 转换为 scipy 的 LinearOperator, 可以直接用于 Krylov 迭代解法器
+        """
+        NN = self.NN
+        return LinearOperator((NN, NN), matvec=lambda x: self.apply(x.reshape(-1)),
+                dtype=self.dtype)
+
+    def _operand(self, other):
+        if isinstance(other, StencilOperator):
+            if other.shape != self.shape:
+                raise ValueError(f"the shapes {self.shape} and {other.shape} of the operators do not match!")
+            return other
+        if np.ndim(other) == 0 or np.size(other) in (1, self.NN):
+            return StencilOperator(self.shape, {(0, )*self.ndim: other}, dtype=self.dtype)
+        return NotImplemented
+
+    def __add__(self, other):
+        other = self._operand(other)
+        if other is NotImplemented:
+            return other
+        A = self.copy()
+        for offset, coef in other.stencil.items():
+            A.add(offset, coef)
+        return A
+
+    __radd__ = __add__
+
+    def __mul__(self, a):
+        if isinstance(a, StencilOperator):
+            return NotImplemented
+        a = _grid_field(a, self.shape)
+        A = StencilOperator(self.shape, dtype=self.dtype)
+        for offset, coef in self.stencil.items():
+            A.add(offset, a*coef)
+        return A
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return self*(-1)
+
+    def __sub__(self, other):
+        other = self._operand(other)
+        if other is NotImplemented:
+            return other
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __repr__(self):
+        return f"StencilOperator(shape={self.shape}, offsets={list(self.stencil.keys())})"
+
+
+def _grid_field(val, shape):
+    """
+    @brief 把标量或节点上的数组整理成标量或形状为 shape 的数组
+    """
+    if np.ndim(val) == 0:
+        return val
+    return np.reshape(val, shape)
+
+
+def _face_average(d, axis, side):
+    """
+    @brief 节点系数 d 在 axis 方向上与右（side=1）或左（side=-1）邻居的平均,
+           没有邻居的边界节点取自身的值
+    """
+    df = d.astype(np.result_type(d.dtype, 0.5))
+    n = d.shape[axis]
+    i0 = [slice(None)]*d.ndim
+    i1 = [slice(None)]*d.ndim
+    if side > 0:
+        i0[axis] = slice(0, n-1)
+        i1[axis] = slice(1, n)
+    else:
+        i0[axis] = slice(1, n)
+        i1[axis] = slice(0, n-1)
+    df[tuple(i0)] = (d[tuple(i0)] + d[tuple(i1)])/2
+    return df
+
+
+def elliptic_stencil(shape, h, d=1.0, c=None, r=None, dtype=np.float64):
+    """
+    @brief 一般椭圆算子 -div(d grad u) + c . grad u + r u 的差分模板
+
+    扩散项用守恒型的中心差分, 节点之间的系数取两端节点系数的平均; 对流项用
+    中心差分。系数为常数时扩散项就是通常的 2*ndim+1 点格式。
+
+    @param[in] shape 网格节点数组的形状 (nx+1, ny+1, ...)
+    @param[in] h 各个方向的网格步长
+    @param[in] d 扩散系数, 标量或者节点上的数组
+    @param[in] c 对流系数, 标量（一维）、长度为 ndim 的序列, 或者形状为
+               shape + (ndim, ) 的节点上的数组, 默认为 None
+    @param[in] r 反应系数, 标量或者节点上的数组, 默认为 None
+
+    @return StencilOperator
+    """
+    shape = tuple(shape)
+    ndim = len(shape)
+    h = np.broadcast_to(np.asarray(h, dtype=np.float64), (ndim, ))
+    A = StencilOperator(shape, dtype=dtype)
+    center = (0, )*ndim
+
+    d = _grid_field(d, shape)
+    for axis in range(ndim):
+        e = np.zeros(ndim, dtype=np.int_)
+        e[axis] = 1
+        h2 = h[axis]**2
+        if isinstance(d, np.ndarray):
+            dp = _face_average(d, axis, 1)/h2
+            dm = _face_average(d, axis, -1)/h2
+        else:
+            dp = dm = d/h2
+        A.add(center, dp + dm)
+        A.add(e, -dp)
+        A.add(-e, -dm)
+
+    if c is not None:
+        if ndim == 1 and (np.ndim(c) == 0 or np.size(c) == shape[0]):
+            c = [c]
+        elif isinstance(c, np.ndarray) and c.ndim > 1:
+            c = np.reshape(c, shape + (ndim, ))
+            c = [c[..., axis] for axis in range(ndim)]
+        for axis in range(ndim):
+            ca = _grid_field(c[axis], shape)
+            if np.ndim(ca) == 0 and ca == 0:
+                continue
+            e = np.zeros(ndim, dtype=np.int_)
+            e[axis] = 1
+            ca = ca/(2*h[axis])
+            A.add(e, ca)
+            A.add(-e, -ca)
+
+    if r is not None:
+        A.add(center, _grid_field(r, shape))
+    return A
+
+
+def laplace_stencil(shape, h, dtype=np.float64):
+    """
+    @brief -Delta u 的 2*ndim+1 点差分模板, 对应的矩阵是对称正定的（不处理边界）
+    """
+    return elliptic_stencil(shape, h, d=1.0, dtype=dtype)
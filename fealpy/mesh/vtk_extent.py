@@ -10,9 +10,8 @@ Huayi Wei, weihuayi@xtu.edu.cn
 """
 
 import numpy as np
-import vtk
-import vtk.util.numpy_support as vnp
 
+# VTK 只在用到它的函数中导入, `write_to_vtu` 不依赖 VTK
 from .vtkCellTypes import *
 
 from .backup.core import multi_index_matrix2d
@@ -25,6 +24,7 @@ def vtk_cell_index(p, celltype):
         获取 vtk cell 的相对于 fealpy 网格 cell 的顶点编号规则，用于把 FEALPy 中
         的 cell 顶点编号顺序转化为 vtk 的编号顺序。
     """
+    import vtk
     if celltype == VTK_LAGRANGE_CURVE: 
         return np.arange(p+1, dtype=np.int_)
     elif celltype == VTK_LAGRANGE_TRIANGLE:
@@ -93,60 +93,12 @@ def write_to_vtu(fname, node, NC, cellType, cell, nodedata=None, celldata=None):
 
     Notes
     -----
+        数据以 zlib 压缩的二进制格式写入 appended 段, 不再通过 VTK 的 Python 接口
+        构造 vtkUnstructuredGrid
     """
-    points = vtk.vtkPoints()
-    points.SetData(vnp.numpy_to_vtk(node))
-
-    cells = vtk.vtkCellArray()
-    cell = cell.astype(np.int64)
-    cells.SetCells(NC, vnp.numpy_to_vtkIdTypeArray(cell))
-
-    mesh =vtk.vtkUnstructuredGrid() 
-    mesh.SetPoints(points)
-    mesh.SetCells(cellType, cells)
-
-    pdata = mesh.GetPointData()
-
-    if nodedata is not None:
-        for key, val in nodedata.items():
-            if val is not None:
-                if len(val.shape) == 2 and val.shape[1] == 2:
-                    shape = (val.shape[0], 3)
-                    val1 = np.zeros(shape, dtype=val.dtype)
-                    val1[:, 0:2] = val
-                else:
-                    val1 = val
-
-                if val1.dtype == np.bool_:
-                    d = vnp.numpy_to_vtk(val1.astype(np.int_))
-                else:
-                    d = vnp.numpy_to_vtk(val1[:])
-                d.SetName(key)
-                pdata.AddArray(d)
-
-    if celldata is not None:
-        cdata = mesh.GetCellData()
-        for key, val in celldata.items():
-            if val is not None:
-                if len(val.shape) == 2 and val.shape[1] == 2:
-                    shape = (val.shape[0], 3)
-                    val1 = np.zeros(shape, dtype=val.dtype)
-                    val1[:, 0:2] = val
-                else:
-                    val1 = val
-
-                if val1.dtype == np.bool_:
-                    d = vnp.numpy_to_vtk(val1.astype(np.int_))
-                else:
-                    d = vnp.numpy_to_vtk(val1[:])
-
-                d.SetName(key)
-                cdata.AddArray(d)
-    writer = vtk.vtkXMLUnstructuredGridWriter()
-    writer.SetFileName(fname)
-    writer.SetDataMode(vtk.VTK_BINARY)
-    writer.SetInputData(mesh)
-    writer.Write()
+    from ..writer.VTUWriter import write_vtu
+    write_vtu(fname, node, cell, cellType, NC, nodedata=nodedata,
+            celldata=celldata)
 
 def write_polyhedron_mesh_to_vtu(fname, mesh, nodedata=None, celldata=None):
     """
@@ -154,6 +106,9 @@ def write_polyhedron_mesh_to_vtu(fname, mesh, nodedata=None, celldata=None):
     Notes 多面体网格 to VTK PolyhedronMesh
     -----
     """
+    import vtk
+    import vtk.util.numpy_support as vnp
+
     points = vtk.vtkPoints()
     points.SetData(vnp.numpy_to_vtk(node))
 
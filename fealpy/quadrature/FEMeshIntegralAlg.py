@@ -2,9 +2,93 @@ import numpy as np
 from scipy.sparse import csr_matrix, coo_matrix
 import multiprocessing as mp
 from multiprocessing.pool import ThreadPool as Pool
+from multiprocessing import shared_memory
 from ..decorator import timer
 
 
+def _available_memory():
+    """
+    @brief 当前可用的物理内存（字节）, 无法获取时返回 1 GB
+    """
+    try:
+        import os
+        return os.sysconf('SC_AVPHYS_PAGES')*os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return 2**30
+
+
+def _share_array(a):
+    """
+    @brief 把数组复制到一块新的共享内存中
+
+    @return 共享内存对象和共享内存上的数组
+    """
+    a = np.ascontiguousarray(a)
+    shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    b = np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)
+    b[:] = a
+    return shm, b
+
+
+# 子进程中的组装任务, 由 `_init_worker` 在进程启动时设置
+_TASK = None
+
+
+def _init_worker(task):
+    """
+    @brief 进程池的初始化函数, 按名字连接主进程创建的共享内存
+    """
+    global _TASK
+    task = dict(task)
+    shms = []
+    for key, (name, shape, dtype) in task.pop('shared').items():
+        shm = shared_memory.SharedMemory(name=name)
+        shms.append(shm) # 保持引用, 进程结束前共享内存不能被释放
+        task[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    task['shms'] = shms
+    _TASK = task
+
+
+def _assemble_block(start, stop):
+    _assemble_cell_matrix(_TASK, start, stop)
+
+
+def _assemble_cell_matrix(task, start, stop):
+    """
+    @brief 计算编号为 start 到 stop 的单元的单元矩阵, 并写到 task['out'] 中
+    """
+    s = slice(start, stop)
+    measure = task['measure'][s]
+    c = task['c']
+    basis0 = task['basis0']
+    basis1 = task['basis1']
+    shape = (stop - start, ) + task['shape'][1:]
+
+    M = np.zeros(shape, dtype=task['dtype'])
+    for i, (bc, w) in enumerate(zip(task['bcs'], task['ws'])): # 对所有积分点进行循环
+        phi0 = basis0(bc, index=s)
+        phi1 = phi0 if basis1 is None else basis1(bc, index=s)
+        # 标量基函数增加一个分量轴, 与单元无关的基函数值广播到每个单元
+        phi0 = np.broadcast_to(phi0.reshape(phi0.shape[:2] + (-1, )),
+                (shape[0], shape[1], task['GD']))
+        phi1 = np.broadcast_to(phi1.reshape(phi1.shape[:2] + (-1, )),
+                (shape[0], shape[2], task['GD']))
+
+        cm = w*measure
+        if c is None:
+            pass
+        elif np.isscalar(c):
+            cm = c*cm
+        elif c.shape == (len(task['ws']), task['shape'][0]):
+            cm = c[i, s]*cm
+        elif c.shape == (task['shape'][0], ):
+            cm = c[s]*cm
+        else: # (GD, GD) 常矩阵
+            phi0 = np.einsum('mn, jkn->jkm', c, phi0)
+        M += np.einsum('jkd, jmd, j->jkm', phi0, phi1, cm)
+    task['out'][s] = M
+
+
 class FEMeshIntegralAlg():
     def __init__(self, mesh, q, cellmeasure=None):
         """
@@ -231,90 +315,141 @@ class FEMeshIntegralAlg():
 
 
     @timer
-    def parallel_construct_matrix(self, b0, 
-            b1=None, c=None, q=None):
+    def parallel_construct_matrix(self, b0,
+            b1=None, c=None, q=None, nprocs=None, memory=None, pool='process'):
         """
-
-        Parameters
-        ----------
-        b0: tuple, 
-            b0[0]: basis function
-            b0[1]: cell2dof
-            b0[2]: number of global dofs
-        b1: default is None, just like b0
-
-        Notes
-        -----
-        
-        把网格中的单元分组，再分组组装相应的矩阵。对于三维大规模问题，如果同时计
-        算所有单元的矩阵，占用内存会过多，效率过低。
-
-
-        TODO
-        -----
-            1. 给定一个计算机内存的大小和 cpu 的个数，动态决定合理的问题分割策略
-            2. 考虑存在系数的情况
+        @brief 多进程分块组装矩阵
+
+        @param[in] b0 元组 (basis, cell2dof, gdof), basis 为重心坐标函数,
+                   调用方式为 basis(bc, index=s)
+        @param[in] b1 默认为 None, 与 b0 相同
+        @param[in] c 系数, 可以是标量, 形状为 (NC, ) 或 (NQ, NC) 的数组,
+                   (GD, GD) 的常矩阵, 或者带 barycentric/cartesian 装饰的函数
+        @param[in] nprocs 进程个数, 默认为 cpu 个数减 2
+        @param[in] memory 所有进程计算单元矩阵时临时数组的内存上限（字节）,
+                   默认为当前可用内存的四分之一。它只限制分块计算中的临时
+                   数组, 不包括结果: 所有单元的单元矩阵 (NC, ldof0, ldof1)
+                   和最后的稀疏矩阵总是完整存储的
+        @param[in] pool 'process' 为进程池, 'thread' 为线程池
+
+        @note 把网格中的单元分组, 再分组组装相应的矩阵。对于三维大规模问题, 如
+              果同时计算所有单元的矩阵, 占用内存会过多, 效率过低。
+
+              单元测度、系数以及结果的单元矩阵数组放在共享内存
+              （`multiprocessing.shared_memory`）中, 子进程把每一块的单元矩阵
+              直接写到共享数组的对应位置, 不需要把结果传回主进程。主进程最后
+              只做一次 COO 到 CSR 的转换。每一块的单元个数由 `memory` 和进程
+              个数决定, 所以 `memory` 控制的是峰值内存中与块大小有关的部分,
+              峰值内存还包括单元矩阵数组和稀疏矩阵本身。
+
+              进程的启动方式为 fork 时基函数对象直接由子进程继承; 为 spawn 时
+              基函数对象（包括它所依赖的网格）会在每个子进程初始化时复制一次。
         """
-
         mesh = self.mesh
         NC = mesh.number_of_cells()
         qf = self.integrator if q is None else mesh.integrator(q, etype='cell')
         bcs, ws = qf.get_quadrature_points_and_weights()
 
-        basis0 = b0[0]
-        cell2dof0 = b0[1]
-        gdof0 = b0[2]
-
-        # 对问题进行分割
-        nc = mp.cpu_count()-2
-
-        block = NC//nc
-        r = NC%nc
-        index = np.full(nc+1, block)
-        index[0] = 0
-        index[1:r+1] += 1
-        np.cumsum(index, out=index)
-
+        basis0, cell2dof0, gdof0 = b0
         if b1 is None:
-            gdof1 = gdof0
+            basis1, cell2dof1, gdof1 = None, cell2dof0, gdof0
         else:
-            gdof1 = b1[2]
-
-        A = csr_matrix((gdof0, gdof1))
-        def f(i):
-            s = slice(index[i], index[i+1])
-            measure = self.cellmeasure[s]
-            c2d0 = cell2dof0[s]
-            if b1 is None:
-                c2d1 = c2d0
+            basis1, cell2dof1, gdof1 = b1
+
+        # 在第一个积分点上试算, 得到基函数值的形状
+        phi = basis0(bcs[0], index=np.s_[:1])
+        GD = phi.shape[-1] if phi.ndim == 3 else 1
+        ldof0 = cell2dof0.shape[1]
+        ldof1 = cell2dof1.shape[1]
+        dtype = np.result_type(phi, self.cellmeasure)
+
+        # 系数在主进程中计算成数组, 再和单元测度一起放到共享内存中
+        if callable(c):
+            if c.coordtype == 'barycentric':
+                c = c(bcs)
+            elif c.coordtype == 'cartesian':
+                c = c(mesh.bc_to_point(bcs))
+        if isinstance(c, np.ndarray) and (c.ndim == 0):
+            c = c.item()
+        if isinstance(c, np.ndarray):
+            if c.shape not in {(NC, ), (len(ws), NC), (GD, GD)}:
+                raise ValueError(f"the shape {c.shape} of the coefficient is not supported!")
+            dtype = np.result_type(dtype, c)
+        elif c is not None:
+            dtype = np.result_type(dtype, c)
+
+        # 由内存上限决定每一块的单元个数, 每个单元需要的临时数组为
+        # phi0, phi1 以及 einsum 的中间结果和单元矩阵
+        if nprocs is None:
+            nprocs = mp.cpu_count() - 2
+        nprocs = max(int(nprocs), 1)
+        if memory is None:
+            memory = _available_memory()//4
+        itemsize = np.dtype(dtype).itemsize
+        nbytes = itemsize*(2*(ldof0 + ldof1)*GD + 2*ldof0*ldof1)
+        block = max(int(memory//(nprocs*nbytes)), 1)
+        block = min(block, -(-NC//nprocs))
+        index = np.arange(0, NC+block, block)
+        index[-1] = NC
+        index = np.unique(index)
+
+        task = {
+                'basis0': basis0, 'basis1': basis1,
+                'bcs': bcs, 'ws': ws, 'GD': GD,
+                'shape': (NC, ldof0, ldof1), 'dtype': dtype}
+        arrays = {'measure': self.cellmeasure}
+        if isinstance(c, np.ndarray):
+            arrays['c'] = c
+        else:
+            task['c'] = c
+
+        blocks = list(zip(index[:-1], index[1:]))
+        if (pool == 'thread') or (nprocs == 1) or (len(blocks) == 1):
+            task.update(arrays)
+            task['out'] = np.zeros(task['shape'], dtype=dtype)
+            if (pool == 'thread') and (nprocs > 1):
+                with Pool(nprocs) as p:
+                    p.starmap(_assemble_cell_matrix,
+                            [(task, start, stop) for start, stop in blocks])
             else:
-                c2d1 = b1[1][s]
-
-            shape = (len(measure), c2d0.shape[1], c2d1.shape[1])
-            M = np.zeros(shape, measure.dtype)
-            for bc, w in zip(bcs, ws): # 对所有积分点进行循环
-                phi0 = basis0(bc, index=s)
-                if b1 is None:
-                    phi1 = phi0
-                else:
-                    phi1 = b1[0](bc, index=s)
-                M += np.einsum('jkd, jmd, j->jkm', phi0, phi1, w*measure)
-
-            I = np.broadcast_to(c2d0[:, :, None], shape=M.shape)
-            J = np.broadcast_to(c2d1[:, None, :], shape=M.shape)
-
-            Bi = csr_matrix((M.flat, (I.flat, J.flat)), shape=(gdof0, gdof1))
-            return Bi 
-
-        # 并行组装总矩阵
-        with Pool(nc) as p:
-            B = p.map(f, range(nc))
-
-        for val in B:
-            A += val
-
+                for start, stop in blocks:
+                    _assemble_cell_matrix(task, start, stop)
+            M = task['out']
+            return self._reduce_cell_matrix(M, cell2dof0, cell2dof1, gdof0, gdof1)
+        elif pool != 'process':
+            raise ValueError(f"pool should be 'process' or 'thread', but got {pool}")
+
+        shms = []
+        try:
+            shared = {}
+            views = {}
+            arrays['out'] = np.zeros(task['shape'], dtype=dtype)
+            for key, val in arrays.items():
+                shm, views[key] = _share_array(val)
+                shms.append(shm)
+                shared[key] = (shm.name, views[key].shape, views[key].dtype.str)
+            task['shared'] = shared
+
+            with mp.Pool(nprocs, initializer=_init_worker, initargs=(task, )) as p:
+                p.starmap(_assemble_block, blocks)
+
+            A = self._reduce_cell_matrix(views['out'], cell2dof0, cell2dof1, gdof0, gdof1)
+            del views
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
         return A
 
+    def _reduce_cell_matrix(self, M, cell2dof0, cell2dof1, gdof0, gdof1):
+        """
+        @brief 把单元矩阵一次性累加成全局 CSR 矩阵
+        """
+        I = np.broadcast_to(cell2dof0[:, :, None], shape=M.shape)
+        J = np.broadcast_to(cell2dof1[:, None, :], shape=M.shape)
+        return csr_matrix((M.reshape(-1), (I.reshape(-1), J.reshape(-1))),
+                shape=(gdof0, gdof1))
+
     @timer
     def serial_construct_matrix(self, b0, 
             b1=None, c=None, q=None):
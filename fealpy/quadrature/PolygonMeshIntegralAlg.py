@@ -5,6 +5,7 @@ from .GaussLegendreQuadrature import GaussLegendreQuadrature
 class PolygonMeshIntegralAlg():
     def __init__(self, mesh, q, cellmeasure=None, cellbarycenter=None):
         self.mesh = mesh
+        self.q = q
 
         self.integrator = mesh.integrator(q)
         self.cellintegrator = self.integrator 
@@ -21,6 +22,9 @@ class PolygonMeshIntegralAlg():
         self.facebarycenter = self.edgebarycenter
         self.faceintegrator = self.edgeintegrator
 
+        # 单元上的积分表, 以积分公式的阶数为键
+        self._cellquadrature = {}
+
     def triangle_measure(self, tri):
         v1 = tri[1] - tri[0]
         v2 = tri[2] - tri[0]
@@ -60,42 +64,64 @@ class PolygonMeshIntegralAlg():
         """
         return self.integral(u, celltype=True, q=q)
 
-    def integral(self, u, celltype=False, q=None):
-        mesh = self.mesh
-        node = mesh.node
-        bc = self.cellbarycenter
+    def cell_quadrature(self, q=None):
+        """
+        @brief 多边形单元上的积分表
 
+        每个单元剖分成以重心和各条边为顶点的子三角形, 把三角形上的积分公式映射
+        到所有子三角形上。子三角形按所属的单元排序, 存放在一维数组中, 第一次
+        调用时计算并按 q 缓存, 以后的积分都直接使用。
+
+        @return ps 积分点, 形状为 (NQ, NT, GD), NT 是子三角形的个数
+                ws 积分权重乘以子三角形的面积, 形状为 (NQ, NT)
+                index 每个子三角形所属的单元, 形状为 (NT, )
+                start 每个单元的第一个子三角形的位置, 形状为 (NC, ), 用于
+                `np.add.reduceat` 把子三角形上的积分加到单元上
+        """
+        q = self.q if q is None else q
+        if q in self._cellquadrature:
+            return self._cellquadrature[q]
+
+        mesh = self.mesh
+        node = mesh.entity('node')
         edge = mesh.entity('edge')
         edge2cell = mesh.ds.edge_to_cell()
-
         NC = mesh.number_of_cells()
+        bc = self.cellbarycenter
 
-        qf = self.cellintegrator if q is None else self.mesh.integrator(q)
+        qf = self.cellintegrator if q == self.q else mesh.integrator(q)
         bcs, ws = qf.quadpts, qf.weights
 
-        tri = [bc[edge2cell[:, 0]], node[edge[:, 0]], node[edge[:, 1]]]
+        # 边的左边单元和内部边的右边单元都有一个子三角形, 保持逆时针方向
+        isInEdge = (edge2cell[:, 0] != edge2cell[:, 1])
+        index = np.r_[edge2cell[:, 0], edge2cell[isInEdge, 1]]
+        v1 = np.r_[edge[:, 0], edge[isInEdge, 1]]
+        v2 = np.r_[edge[:, 1], edge[isInEdge, 0]]
+
+        idx = np.argsort(index, kind='stable')
+        index = index[idx]
+        tri = [bc[index], node[v1[idx]], node[v2[idx]]]
         a = self.triangle_measure(tri)
-        pp = np.einsum('ij, jkm->ikm', bcs, tri, optimize=True)
-        val = u(pp, edge2cell[:, 0])
 
-        shape = (NC, ) + val.shape[2:]
-        e = np.zeros(shape, dtype=np.float64)
+        ps = np.einsum('ij, jkm->ikm', bcs, tri, optimize=True)
+        ws = ws[:, None]*a
+        start = np.zeros(NC, dtype=np.int_)
+        start[1:] = np.cumsum(np.bincount(index, minlength=NC))[:-1]
 
-        ee = np.einsum('i, ij..., j->j...', ws, val, a, optimize=True)
-        np.add.at(e, edge2cell[:, 0], ee)
+        self._cellquadrature[q] = (ps, ws, index, start)
+        return self._cellquadrature[q]
 
-        isInEdge = (edge2cell[:, 0] != edge2cell[:, 1])
-        if np.sum(isInEdge) > 0:
-            tri = [
-                    bc[edge2cell[isInEdge, 1]],
-                    node[edge[isInEdge, 1]],
-                    node[edge[isInEdge, 0]]
-                    ]
-            a = self.triangle_measure(tri)
-            pp = np.einsum('ij, jkm->ikm', bcs, tri, optimize=True)
-            val = u(pp, edge2cell[isInEdge, 1])
-            ee = np.einsum('i, ij..., j->j...', ws, val, a, optimize=True)
-            np.add.at(e, edge2cell[isInEdge, 1], ee)
+    def integral(self, u, celltype=False, q=None):
+        """
+        @brief 计算 u 在每个单元（celltype=True）或者整个区域上的积分
+
+        @param[in] u 函数 u(x, index), x 的形状为 (NQ, NT, GD), index 为每个
+                     子三角形所属的单元
+        """
+        ps, ws, index, start = self.cell_quadrature(q)
+        val = u(ps, index)
+        ee = np.einsum('ij..., ij->j...', val, ws, optimize=True)
+        e = np.add.reduceat(ee, start, axis=0)
 
         if celltype is True:
             return e
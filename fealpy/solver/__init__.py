@@ -2,6 +2,9 @@ import platform
 
 from .solve import solve, active_set_solver
 from .gamg_solver import GAMGSolver
+from .factorization_cache import FactorizationCache, cached_spsolve
+from .saddle_point_preconditioner import SaddlePointPreconditioner
+from .fast_poisson_solver import FastPoissonSolver
 
 try:
     from .matlab_solver import MatlabSolver
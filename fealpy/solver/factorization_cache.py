@@ -0,0 +1,148 @@
+from collections import OrderedDict
+import hashlib
+
+import numpy as np
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import splu
+
+try:
+    from sksparse.cholmod import cholesky as cholmod_cholesky
+    from sksparse.cholmod import CholmodNotPositiveDefiniteError
+except ImportError:
+    cholmod_cholesky = None
+
+
+class FactorizationCache():
+    """
+    @brief 稀疏矩阵分解的 LRU 缓存
+
+    时间步进中经常要用同一个矩阵（如质量矩阵、常系数的算子）反复求解不同的右端,
+    每次都调用 `spsolve` 会重复做同样的分解。这里按矩阵的内容缓存分解结果,
+    之后的求解只需要做三角回代。
+
+    矩阵对称时, 如果安装了 scikit-sparse, 优先使用 Cholesky 分解, 否则（或者
+    Cholesky 分解失败时）使用 `splu`。
+
+    @note 缓存的键由矩阵的形状、类型和 CSC 格式的 data、indices、indptr 的哈希值
+          组成, 所以原地修改过的矩阵不会误用旧的分解。计算哈希值只需要遍历一次
+          非零元, 代价远小于分解。
+    """
+    def __init__(self, maxsize=8, memory=2**30, cholesky=True):
+        """
+        @param[in] maxsize 最多缓存的分解个数
+        @param[in] memory 缓存的分解占用内存（字节）的上限, 为 None 时不限制
+        @param[in] cholesky 对称矩阵是否尝试 Cholesky 分解
+        """
+        self.maxsize = maxsize
+        self.memory = memory
+        self.cholesky = cholesky
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict() # key -> (分解, 占用的字节数)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, A):
+        return self.key(A) in self._data
+
+    @property
+    def nbytes(self):
+        """
+        @brief 缓存的分解占用内存的估计值（字节）
+        """
+        return sum(val[1] for val in self._data.values())
+
+    def clear(self):
+        """
+        @brief 清空缓存
+        """
+        self._data.clear()
+
+    @staticmethod
+    def key(A):
+        """
+        @brief 矩阵 A 在缓存中的键
+        """
+        A = csc_matrix(A)
+        h = hashlib.blake2b(digest_size=16)
+        for a in (A.data, A.indices, A.indptr):
+            h.update(np.ascontiguousarray(a).view(np.uint8))
+        return (A.shape, A.dtype.str, A.nnz, h.hexdigest())
+
+    def factorize(self, A):
+        """
+        @brief 返回矩阵 A 的分解, 它是一个可以调用的求解函数 x = solve(b),
+               b 的形状为 (N, ) 或 (N, m)
+        """
+        A = csc_matrix(A)
+        key = self.key(A)
+        if key in self._data:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+        self.misses += 1
+        solve, nbytes = self._factorize(A)
+        self._data[key] = (solve, nbytes)
+        self._evict()
+        return solve
+
+    def solve(self, A, b):
+        """
+        @brief 求解 A x = b, 重复使用 A 的分解
+
+        @param[in] b 形状为 (N, ) 或 (N, m) 的右端项, 多个右端一起求解
+        """
+        return self.factorize(A)(b)
+
+    def _factorize(self, A):
+        """
+        @brief 分解矩阵, 并估计分解占用的内存
+        """
+        itemsize = A.dtype.itemsize + A.indices.dtype.itemsize
+        if self.cholesky and (cholmod_cholesky is not None) and is_symmetric(A):
+            try:
+                factor = cholmod_cholesky(A)
+                # Cholesky 因子的非零元个数没有直接的接口, 用 A 的非零元个数估计
+                return factor, 4*A.nnz*itemsize
+            except CholmodNotPositiveDefiniteError:
+                pass
+        lu = splu(A)
+        return lu.solve, (lu.L.nnz + lu.U.nnz)*itemsize
+
+    def _evict(self):
+        """
+        @brief 按 LRU 的顺序删除超过个数和内存上限的分解, 至少保留最新的一个
+        """
+        def full():
+            if len(self._data) > self.maxsize:
+                return True
+            return (self.memory is not None) and (self.nbytes > self.memory)
+
+        while (len(self._data) > 1) and full():
+            self._data.popitem(last=False)
+
+
+def is_symmetric(A):
+    """
+    @brief 判断稀疏矩阵是否对称
+    """
+    if A.shape[0] != A.shape[1]:
+        return False
+    return abs(A - A.T).max() == 0
+
+
+# 默认的全局缓存
+default_cache = FactorizationCache()
+
+
+def cached_spsolve(A, b, cache=None):
+    """
+    @brief 与 `spsolve` 用法相同, 但是重复使用缓存中矩阵 A 的分解
+
+    @param[in] cache 使用的缓存, 默认为全局缓存 `default_cache`
+    """
+    if cache is None:
+        cache = default_cache
+    return cache.solve(A, b)
@@ -0,0 +1,235 @@
+import numpy as np
+from scipy import fft as sfft
+from scipy.sparse import coo_matrix, identity, kron, csr_matrix
+from scipy.sparse.linalg import LinearOperator
+
+
+# 每种边界条件对应的实变换类型和一维离散算子 -D^2 (乘以 h^2 之后) 的特征值。
+# node 表示未知量在网格节点上, cell 表示未知量在单元中心上（如 MAC 格式的压力）
+def _eigenvalues(grid, bc, n):
+    k = np.arange(n)
+    if bc == 'periodic':
+        theta = np.pi*k/n
+    elif grid == 'node' and bc == 'dirichlet':
+        theta = np.pi*(k + 1)/(2*(n + 1))
+    elif grid == 'node' and bc == 'neumann':
+        theta = np.pi*k/(2*(n - 1))
+    elif grid == 'cell' and bc == 'dirichlet':
+        theta = np.pi*(k + 1)/(2*n)
+    elif grid == 'cell' and bc == 'neumann':
+        theta = np.pi*k/(2*n)
+    return 4*np.sin(theta)**2
+
+
+_TRANSFORM_TYPE = {
+        ('node', 'dirichlet'): ('dst', 1),
+        ('node', 'neumann'): ('dct', 1),
+        ('cell', 'dirichlet'): ('dst', 2),
+        ('cell', 'neumann'): ('dct', 2)}
+
+
+def _matrix_1d(grid, bc, n, h):
+    """
+    @brief 一维离散算子 -D^2 的矩阵
+    """
+    k = np.arange(n)
+    I = [k, k[1:], k[:-1]]
+    J = [k, k[:-1], k[1:]]
+    V = [np.full(n, 2.0), np.full(n-1, -1.0), np.full(n-1, -1.0)]
+    if bc == 'periodic':
+        I += [[0, n-1]]
+        J += [[n-1, 0]]
+        V += [[-1.0, -1.0]]
+    elif bc == 'neumann' and grid == 'node':
+        V[2][0] = -2.0
+        V[1][-1] = -2.0
+    elif grid == 'cell':
+        # 单元中心的虚拟节点: Dirichlet 时 u_{-1} = -u_0, Neumann 时 u_{-1} = u_0
+        V[0][[0, -1]] += 1.0 if bc == 'dirichlet' else -1.0
+    I, J, V = (np.concatenate(a) for a in (I, J, V))
+    return coo_matrix((V/h**2, (I, J)), shape=(n, n)).tocsr()
+
+
+class FastPoissonSolver():
+    """
+    @brief 均匀网格上常系数 Poisson 和 Helmholtz 方程 -Delta u + c u = f 的快速解法器
+
+    差分算子是每个方向的二阶中心差分, 在每个方向上分别用离散正弦变换（Dirichlet）、
+    离散余弦变换（Neumann）或者快速 Fourier 变换（周期）对角化, 计算量为
+    O(N log N)。
+
+    未知量的位置由 grid 决定:
+
+    * 'node': 未知量在网格节点上。Dirichlet 边界时只包含内部节点, Neumann 边界
+      时包含边界节点（用对称的虚拟节点）, 周期边界时不包含和第一个节点重合的
+      最后一个节点。
+    * 'cell': 未知量在单元中心上, 边界在单元的边上, 如 MAC 格式中的压力。
+
+    c = 0 并且所有方向都不是 Dirichlet 边界时离散算子是奇异的, 这时求出的是
+    平均值为 0 的解（右端项的平均值部分被忽略）。
+
+    变系数问题可以用它作为预条件子, 见 `linear_operator`。
+    """
+    def __init__(self, shape, h, bc='dirichlet', c=0.0, grid='node', workers=None):
+        """
+        @param[in] shape 未知量数组的形状
+        @param[in] h 各个方向的网格步长
+        @param[in] bc 边界条件 'dirichlet'、'neumann' 或 'periodic', 也可以给每个
+                   方向分别指定
+        @param[in] c Helmholtz 项的系数（常数）
+        @param[in] grid 'node' 或 'cell'
+        @param[in] workers 传给 `scipy.fft` 的并行线程数
+        """
+        self.shape = tuple(int(n) for n in np.atleast_1d(shape))
+        ndim = len(self.shape)
+        self.h = np.broadcast_to(np.asarray(h, dtype=np.float64), (ndim, ))
+        if isinstance(bc, str):
+            bc = (bc, )*ndim
+        if len(bc) != ndim:
+            raise ValueError(f"the number of boundary conditions {len(bc)} does not match the dimension {ndim}!")
+        for b in bc:
+            if b not in ('dirichlet', 'neumann', 'periodic'):
+                raise ValueError(f"the boundary condition {b} is not supported!")
+        if grid not in ('node', 'cell'):
+            raise ValueError(f"the grid type {grid} is not supported!")
+        self.bc = tuple(bc)
+        self.grid = grid
+        self.c = c
+        self.workers = workers
+
+        # 周期方向的最后一个用实数 FFT
+        periodic = [i for i, b in enumerate(self.bc) if b == 'periodic']
+        self.raxis = periodic[-1] if periodic else None
+
+        lam = np.full((1, )*ndim, float(c))
+        for i, (n, b) in enumerate(zip(self.shape, self.bc)):
+            e = _eigenvalues(grid, b, n)/self.h[i]**2
+            if i == self.raxis:
+                e = e[:n//2 + 1]
+            lam = lam + e.reshape((-1, ) + (1, )*(ndim - i - 1))
+        self.singular = bool(lam.flat[0] == 0.0)
+        if self.singular:
+            lam.flat[0] = 1.0
+        self.lam = lam
+
+    @classmethod
+    def from_mesh(cls, mesh, bc='dirichlet', c=0.0, grid='node', workers=None):
+        """
+        @brief 由 `UniformMesh1d/2d/3d` 构造
+
+        grid='node' 时未知量的形状由网格节点的形状去掉 Dirichlet 边界节点（或者
+        周期方向上的最后一个节点）得到; grid='cell' 时把网格节点看成单元中心,
+        如 MAC 格式中的压力网格。
+        """
+        shape = list(mesh.stencil_shape())
+        ndim = len(shape)
+        if isinstance(bc, str):
+            bc = (bc, )*ndim
+        if grid == 'node':
+            for i, b in enumerate(bc):
+                shape[i] -= {'dirichlet': 2, 'neumann': 0, 'periodic': 1}[b]
+        return cls(shape, mesh.h, bc=bc, c=c, grid=grid, workers=workers)
+
+    def forward(self, f):
+        """
+        @brief 把网格函数变换到特征向量的系数上
+        """
+        w = self.workers
+        for i, b in enumerate(self.bc):
+            if b != 'periodic':
+                kind, t = _TRANSFORM_TYPE[(self.grid, b)]
+                f = getattr(sfft, kind)(f, type=t, axis=i, workers=w)
+        if self.raxis is not None:
+            f = sfft.rfft(f, axis=self.raxis, workers=w)
+            for i, b in enumerate(self.bc):
+                if b == 'periodic' and i != self.raxis:
+                    f = sfft.fft(f, axis=i, workers=w)
+        return f
+
+    def backward(self, f):
+        """
+        @brief `forward` 的逆变换
+        """
+        w = self.workers
+        if self.raxis is not None:
+            for i, b in enumerate(self.bc):
+                if b == 'periodic' and i != self.raxis:
+                    f = sfft.ifft(f, axis=i, workers=w)
+            f = sfft.irfft(f, n=self.shape[self.raxis], axis=self.raxis, workers=w)
+        for i, b in enumerate(self.bc):
+            if b != 'periodic':
+                kind, t = _TRANSFORM_TYPE[(self.grid, b)]
+                f = getattr(sfft, 'i' + kind)(f, type=t, axis=i, workers=w)
+        return f
+
+    def solve(self, f):
+        """
+        @brief 求解 -Delta u + c u = f
+
+        @param[in] f 形状为 shape 的右端项, 或者展平后的一维数组
+
+        @return 与 f 形状相同的解
+        """
+        fs = np.reshape(f, self.shape)
+        fh = self.forward(fs)
+        fh /= self.lam
+        if self.singular:
+            fh.flat[0] = 0.0
+        u = self.backward(fh)
+        if np.isrealobj(f):
+            u = u.real
+        return u.reshape(np.shape(f))
+
+    __call__ = solve
+
+    def solve_dirichlet(self, f, ub):
+        """
+        @brief 求解所有方向都是 Dirichlet 边界的节点网格上的问题
+
+        @param[in] f 所有网格节点上的右端项, 形状为 shape + 2
+        @param[in] ub 所有网格节点上的数组, 其中边界节点上的值为边界条件
+
+        @return 所有网格节点上的解, 边界节点上的值等于 ub
+        """
+        if self.grid != 'node' or any(b != 'dirichlet' for b in self.bc):
+            raise ValueError("solve_dirichlet is only for the node grid with Dirichlet boundary!")
+        shape = tuple(n + 2 for n in self.shape)
+        f = np.reshape(f, shape)
+        u = np.array(np.reshape(ub, shape), dtype=np.result_type(ub, f, 0.0))
+        inner = (slice(1, -1), )*len(shape)
+        u[inner] = 0.0
+        # 把边界值移到右端
+        rhs = np.array(f[inner], dtype=u.dtype)
+        for i, h in enumerate(self.h):
+            for s in (slice(0, 1), slice(-1, None)):
+                # 第 i 个方向上边界面的值加到相邻的内部节点上
+                src = list(inner)
+                src[i] = s
+                dst = [slice(None)]*len(shape)
+                dst[i] = s
+                rhs[tuple(dst)] += u[tuple(src)]/h**2
+        u[inner] = self.solve(rhs)
+        return u.reshape(np.shape(ub))
+
+    def matrix(self):
+        """
+        @brief 离散算子的稀疏矩阵, 由一维矩阵的 Kronecker 积组装
+        """
+        ndim = len(self.shape)
+        NN = int(np.prod(self.shape))
+        A = self.c*identity(NN, format='csr')
+        for i, (n, b) in enumerate(zip(self.shape, self.bc)):
+            T = _matrix_1d(self.grid, b, n, self.h[i])
+            n0 = int(np.prod(self.shape[:i]))
+            n1 = int(np.prod(self.shape[i+1:]))
+            A = A + kron(kron(identity(n0), T), identity(n1), format='csr')
+        return csr_matrix(A)
+
+    def linear_operator(self):
+        """
+        @brief 求解器对应的 `LinearOperator`, 可以作为变系数问题的 Krylov 迭代法的
+               预条件子
+        """
+        N = int(np.prod(self.shape))
+        return LinearOperator((N, N), matvec=lambda r: self.solve(r.reshape(-1)),
+                dtype=np.float64)
@@ -1,13 +1,24 @@
 import numpy as np
 import scipy.sparse as sp
-from scipy.sparse.linalg import (eigs, cg,  dsolve,  gmres, lgmres, 
-        LinearOperator, spsolve_triangular)
+from scipy.sparse.linalg import (cg,  dsolve,  gmres, lgmres, 
+        LinearOperator, spsolve_triangular, splu)
 from pypardiso import spsolve
 
 from .amg_coarsen import ruge_stuben_chen_coarsen 
 from .amg_interpolation import two_points_interpolation
+from .smoother import power_iteration
+from .smoother import MulticolorGaussSeidelSmoother
+from .smoother import L1JacobiSmoother
+from .smoother import ChebyshevSmoother
 from ..decorator import timer
 
+# 可以选择的光滑子, 'GS' 为默认的 Gauss-Seidel, 每一步求解一次三角方程组
+SMOOTHERS = {
+        'MGS': MulticolorGaussSeidelSmoother, # 多色 Gauss-Seidel
+        'L1J': L1JacobiSmoother, # l1-Jacobi
+        'CHEB': ChebyshevSmoother, # Chebyshev 多项式
+        }
+
 class IterationCounter(object):
     def __init__(self, disp=True):
         self._disp = disp
@@ -17,6 +28,29 @@ class IterationCounter(object):
         if self._disp:
             print('iter %3i' % (self.niter))
 
+def condest(A, maxit=100, rtol=1e-4, lu=None):
+    """
+    @brief 估计矩阵的条件数 |lambda_max|/|lambda_min|
+
+    @param[in] lu 已有的 A 的 LU 分解（`splu` 的返回值）, 给定时不再分解
+
+    @note 用幂法估计模最大的特征值, 用 LU 分解后的反幂法估计模最小的特征值,
+          只需要一次分解和若干次矩阵向量乘、三角求解, 比两次 `eigs` 便宜得多。
+          得到的是条件数的估计值（一般略小于真实值）, 用于判断矩阵是否接近奇异。
+    """
+    N = A.shape[0]
+    emax = power_iteration(lambda x: A@x, N, maxit=maxit, rtol=rtol)
+    if lu is None:
+        try:
+            lu = splu(sp.csc_matrix(A))
+        except RuntimeError: # 矩阵奇异
+            return np.inf
+    einv = power_iteration(lu.solve, N, maxit=maxit, rtol=rtol)
+    if not np.isfinite(einv):
+        return np.inf
+    return emax*einv
+
+
 class GAMGSolver():
     """
     @brief 几何与代数多重网格的快速解法器
@@ -36,6 +70,7 @@ class GAMGSolver():
             itype: str = 'T', # 插值方法
             ptype: str = 'W', # 预条件类型
             sstep: int = 2, # 默认光滑步数
+            stype: str = 'GS', # 光滑子类型
             isolver: str = 'CG', # 默认迭代解法器
             maxit: int = 200,   # 默认迭代最大次数
             csolver: str = 'direct', # 默认粗网格解法器
@@ -48,6 +83,7 @@ class GAMGSolver():
         self.itype = itype
         self.ptype = ptype
         self.sstep = sstep
+        self.stype = stype
         self.isolver = isolver
         self.maxit = maxit
         self.csolver = csolver
@@ -78,9 +114,6 @@ class GAMGSolver():
         if space is not None:
             Ps = space.prolongation_matrix(cdegree=cdegree)
             for P in Ps:
-                self.L.append(sp.tril(self.A[-1], format='csr'))
-                self.U.append(sp.triu(self.A[-1], format='csr'))
-                self.D.append(self.A[-1].diagonal())
                 self.P.append(P)
                 R = P.T.tocsr()
                 self.R.append(R)
@@ -91,10 +124,6 @@ class GAMGSolver():
         NN = np.ceil(np.log2(self.A[-1].shape[0])/2-4)
         NL = max(min( int(NN), 8), 2) # 估计粗化的层数 
         for l in range(NL):
-            self.L.append(sp.tril(self.A[-1]).tocsr()) # 前磨光的光滑子
-            self.U.append(sp.triu(self.A[-1]).tocsr()) # 后磨光的光滑子
-            self.D.append(self.A[-1].diagonal())
-
             isC, G = ruge_stuben_chen_coarsen(self.A[-1], self.theta)
             P, R = two_points_interpolation(G, isC)
             self.P.append(P)
@@ -104,16 +133,102 @@ class GAMGSolver():
             if self.A[-1].shape[0] < self.csize:
                 break
 
-        # 计算最粗矩阵最大和最小特征值
-        emax, _ = eigs(self.A[-1], 1, which='LM')
-        emin, _ = eigs(self.A[-1], 1, which='SM')
+        self.setup_smoother()
+        self.setup_coarse_solver()
+
+    @timer
+    def resetup(self, A):
+        """
+        @brief 矩阵的数值改变而稀疏结构不变时（如时间步进、Newton 迭代中系数的
+               改变）, 重新构造多重网格
+
+        @param[in] A 新的矩阵, 必须与 `setup` 时的矩阵规模相同
+
+        @note 保留 `setup` 得到的粗细点划分和延拓、限制算子, 只重新计算各层的
+              Galerkin 乘积 R A P、光滑子的数据和最粗层的分解。当系数变化很大时,
+              原来的粗化可能不再合适, 这时应该重新调用 `setup`。
+        """
+        if not hasattr(self, 'P'):
+            raise RuntimeError("GAMGSolver.setup should be called before resetup!")
+        if A.shape != self.A[0].shape:
+            raise ValueError(f"the shape {A.shape} of the matrix is not same as "
+                    f"the shape {self.A[0].shape} in setup!")
+
+        self.A = [A]
+        for P, R in zip(self.P, self.R):
+            self.A.append((R @ self.A[-1] @ P).tocsr())
+
+        self.setup_smoother()
+        self.setup_coarse_solver()
+
+    def setup_smoother(self):
+        """
+        @brief 计算除最粗层外每一层上光滑子需要的数据
+        """
+        NL = len(self.A)
+        # 三角和对角部分只有 Gauss-Seidel 光滑子需要, 其它光滑子自己保存数据
+        self.L = [ ]
+        self.U = [ ]
+        self.D = [ ]
+
+        if self.stype == 'GS':
+            self.L = [sp.tril(self.A[l], format='csr') for l in range(NL-1)] # 前磨光的光滑子
+            self.U = [sp.triu(self.A[l], format='csr') for l in range(NL-1)] # 后磨光的光滑子
+            self.D = [self.A[l].diagonal() for l in range(NL-1)]
+            self.S = None
+        elif self.stype in SMOOTHERS:
+            Smoother = SMOOTHERS[self.stype]
+            self.S = [Smoother(self.A[l]) for l in range(NL-1)]
+        else:
+            raise ValueError(f"the smoother type {self.stype} is not supported, "
+                    f"it should be one of 'GS', {', '.join(repr(s) for s in SMOOTHERS)}")
+
+    def presmooth(self, r, level):
+        """
+        @brief 第 level 层以零为初值的前磨光, 共 sstep + 1 步
+        """
+        if self.S is None:
+            e = spsolve(self.L[level], r)
+            for i in range(self.sstep):
+                e += spsolve(self.L[level], r - self.A[level] @ e)
+        else:
+            e = np.zeros_like(r)
+            self.S[level].smooth(r, e, lower=True, maxit=self.sstep+1)
+        return e
 
-        # 计算条件数的估计值
-        condest = abs(emax[0] / emin[0])
+    def postsmooth(self, r, e, level):
+        """
+        @brief 第 level 层以 e 为初值的后磨光, 共 sstep + 1 步, 原地修改 e
+        """
+        if self.S is None:
+            e += spsolve(self.U[level], r - self.A[level] @ e)
+            for i in range(self.sstep):
+                e += spsolve(self.U[level], r - self.A[level] @ e)
+        else:
+            self.S[level].smooth(r, e, lower=False, maxit=self.sstep+1)
+        return e
 
-        if condest > 1e12:
+    def setup_coarse_solver(self):
+        """
+        @brief 估计最粗层矩阵的条件数, 必要时加上正则项, 并对其做 LU 分解
+        """
+        # 计算条件数的估计值, 估计中用到的 LU 分解直接用于最粗层的求解
+        try:
+            self.clu = splu(self.A[-1].tocsc())
+        except RuntimeError: # 矩阵奇异
+            self.clu = None
+        self.condest = np.inf if self.clu is None else condest(self.A[-1], lu=self.clu)
+
+        if self.condest > 1e12:
             N = self.A[-1].shape[0]
-            self.A[-1] += 1e-12*sp.eye(N)  
+            self.A[-1] = (self.A[-1] + 1e-12*sp.eye(N)).tocsr()
+            self.clu = splu(self.A[-1].tocsc())
+
+    def coarse_solve(self, r):
+        """
+        @brief 用最粗层矩阵的 LU 分解求解最粗层的方程
+        """
+        return self.clu.solve(r)
 
     def construct_coarse_equation(self, A, F, level=1):
         """
@@ -153,9 +268,10 @@ class GAMGSolver():
             print(l, "-th level:")
             print("A.shape = ", self.A[l].shape)
             if l < NL-1:
-                print("L.shape = ", self.L[l].shape) 
-                print("U.shape = ", self.U[l].shape) 
-                print("D.shape = ", self.D[l].shape)
+                if self.stype == 'GS':
+                    print("L.shape = ", self.L[l].shape) 
+                    print("U.shape = ", self.U[l].shape) 
+                    print("D.shape = ", self.D[l].shape)
                 print("P.shape = ", self.P[l].shape) 
                 print("R.shape = ", self.R[l].shape) 
 
@@ -201,21 +317,17 @@ class GAMGSolver():
 
         # 前磨光
         for l in range(level, NL - 1, 1):
-            el = spsolve(self.L[l], r[l])
-            for i in range(self.sstep):
-                el += spsolve(self.L[l], r[l] - self.A[l] @ el)
+            el = self.presmooth(r[l], l)
             e.append(el)
             r.append(self.R[l] @ (r[l] - self.A[l] @ el))
 
-        el = spsolve(self.A[-1], r[-1])
+        el = self.coarse_solve(r[-1])
         e.append(el)
 
         # 后磨光
         for l in range(NL - 2, level - 1, -1):
             e[l] += self.P[l] @ e[l + 1]
-            e[l] += spsolve(self.U[l], r[l] - self.A[l] @ e[l])
-            for i in range(self.sstep): # 后磨光
-                e[l] += spsolve(self.U[l], r[l] - self.A[l] @ e[l])
+            self.postsmooth(r[l], e[l], l)
 
         return e[level]
 
@@ -229,12 +341,10 @@ class GAMGSolver():
 
         NL = len(self.A)
         if level == (NL - 1): # 如果是最粗层
-            e = spsolve(self.A[-1], r)
+            e = self.coarse_solve(r)
             return e
 
-        e = spsolve(self.L[level], r)
-        for s in range(self.sstep):
-            e += spsolve(self.L[level], r - self.A[level] @ e) 
+        e = self.presmooth(r, level)
 
         rc = self.R[level] @ ( r - self.A[level] @ e) 
 
@@ -242,9 +352,7 @@ class GAMGSolver():
         ec += self.wcycle( rc - self.A[level+1] @ ec, level=level+1)
         
         e += self.P[level] @ ec
-        e += spsolve(self.U[level], r - self.A[level] @ e)
-        for s in range(self.sstep):
-            e += spsolve(self.U[level], r - self.A[level] @ e)
+        self.postsmooth(r, e, level)
         return e
 
 
@@ -266,7 +374,7 @@ class GAMGSolver():
             r.append(self.R[l] @ (r[l] - self.A[l] @ e[l]))
 
         # 最粗层直接求解 
-        ec = spsolve(self.A[-1], r[-1])
+        ec = self.coarse_solve(r[-1])
         e.append(ec)
 
         # 从次最粗层到最细层
@@ -288,13 +396,16 @@ class GAMGSolver():
         r = [r] 
         e = [ ]
 
+        if len(self.D) == 0: # 不是 Gauss-Seidel 光滑子时第一次用到对角部分
+            self.D = [self.A[l].diagonal() for l in range(NL-1)]
+
         for l in range(0, NL - 1, 1):
             e.append(r[l]/self.D[l])
             r.append(self.R[l] @ r[l])
 
         # 最粗层直接求解 
         # TODO: 最粗层增加迭代求解
-        ec = spsolve(self.A[-1], r[-1])
+        ec = self.coarse_solve(r[-1])
         e.append(ec)
 
         for l in range(NL - 2, -1, -1):
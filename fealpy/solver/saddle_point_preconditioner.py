@@ -0,0 +1,197 @@
+import warnings
+
+import numpy as np
+from scipy.sparse import csr_matrix, spdiags, eye
+from scipy.sparse.linalg import LinearOperator, gmres, minres
+
+from .gamg_solver import GAMGSolver
+from .factorization_cache import FactorizationCache
+
+
+def krylov_solve(method, A, b, x0=None, M=None, rtol=1e-8, maxit=None, callback=None):
+    """
+    @brief 调用 scipy 的 Krylov 子空间方法, 兼容新旧版本的 `tol`/`rtol` 参数名
+    """
+    solver = {'gmres': gmres, 'minres': minres}[method]
+    kwargs = {'x0': x0, 'M': M, 'maxiter': maxit, 'callback': callback}
+    if method == 'gmres':
+        kwargs['callback_type'] = 'pr_norm'
+    try:
+        return solver(A, b, rtol=rtol, **kwargs)
+    except TypeError:
+        return solver(A, b, tol=rtol, **kwargs)
+
+
+class SaddlePointPreconditioner():
+    """
+    @brief 鞍点问题的块预条件子
+
+    求解 Stokes、Oseen 方程离散得到的块系统
+        [[F,  Bt],   [u]   [f]
+         [B,  C ]] @ [p] = [g]
+    其中 F 为速度块, C 为稳定化项（可以为零）。块三角预条件子为
+        P = [[F, Bt],
+             [0, S ]]
+    S = C - B F^{-1} Bt 为 Schur 补。F^{-1} 用一次 GAMG 的 V-cycle（或直接分解）
+    近似, S^{-1} 有以下几种近似:
+
+    * 'mass': S^{-1} ~ Mp^{-1}, Mp 为压力质量矩阵除以粘性系数, 适用于 Stokes 问题
+    * 'pcd': S^{-1} ~ Mp^{-1} Fp Ap^{-1}, Fp 为压力空间上的对流扩散算子,
+      Ap 为压力 Laplace 矩阵, 适用于 Oseen 问题
+    * 'lsc': 最小二乘交换子, 只用到块矩阵本身,
+      S^{-1} ~ (B Q^{-1} Bt)^{-1} (B Q^{-1} F Q^{-1} Bt) (B Q^{-1} Bt)^{-1},
+      Q 为速度质量矩阵的对角线（默认为 F 的对角线）
+    * 'simple': S ~ C - B diag(F)^{-1} Bt, 组装成稀疏矩阵后求解, 适用于时间步长
+      较小、速度块以质量矩阵为主的情形
+
+    Schur 补的符号由 C - B diag(F)^{-1} Bt 的对角线自动判断, 所以 Bt = B^T 和
+    Bt = -B^T 两种写法都可以用, 给定的 Mp、Ap 都是正定的矩阵即可。
+
+    @note ptype='diag' 时为块对角预条件子 diag(F^{-1}, |S|^{-1}), 对称问题可以和
+          MINRES 一起使用; 'upper'、'lower' 为块三角预条件子, 和 GMRES 一起使用。
+    """
+    def __init__(self, A, n, ptype='upper', stype='lsc',
+            Mp=None, Ap=None, Fp=None, Q=None,
+            usolver='gamg', psolver='direct', **kwargs):
+        """
+        @param[in] A 块矩阵
+        @param[in] n 速度自由度的个数, A 的前 n 行、列为速度块
+        @param[in] ptype 预条件子的类型, 'upper'、'lower' 或 'diag'
+        @param[in] stype Schur 补的近似, 'mass'、'pcd'、'lsc' 或 'simple'
+        @param[in] usolver 速度块的求解方式, 'gamg' 或 'direct'
+        @param[in] psolver 压力空间上矩阵的求解方式, 'gamg' 或 'direct'
+        @param[in] kwargs 传给 `GAMGSolver` 的参数
+        """
+        A = csr_matrix(A)
+        self.A = A
+        self.n = n
+        self.ptype = ptype
+        self.stype = stype
+        self.psolver = psolver
+        self.kwargs = kwargs
+        self._cache = FactorizationCache(maxsize=4, memory=None)
+
+        F = A[:n, :n].tocsr()
+        Bt = A[:n, n:].tocsr()
+        B = A[n:, :n].tocsr()
+        C = A[n:, n:].tocsr()
+        self.F, self.Bt, self.B, self.C = F, Bt, B, C
+
+        # Schur 补的对角线近似 C - B diag(F)^{-1} Bt, 用来判断 Schur 补的符号
+        D = 1.0/F.diagonal()
+        Sd = C.diagonal() - np.asarray(B.multiply(Bt.T) @ D).reshape(-1)
+        self.sign = -1.0 if np.sum(Sd) < 0 else 1.0
+
+        self.usolve = self.inverse(F, usolver)
+
+        if stype == 'mass':
+            if Mp is None:
+                raise ValueError("the pressure mass matrix `Mp` is needed for stype='mass'!")
+            self.Mpsolve = self.inverse(Mp, psolver)
+        elif stype == 'pcd':
+            if (Mp is None) or (Ap is None) or (Fp is None):
+                raise ValueError("`Mp`, `Ap` and `Fp` are needed for stype='pcd'!")
+            self.Mpsolve = self.inverse(Mp, psolver)
+            self.Apsolve = self.inverse(Ap, psolver)
+            self.Fp = csr_matrix(Fp)
+        elif stype == 'lsc':
+            if Q is None:
+                Q = F.diagonal()
+            elif not isinstance(Q, np.ndarray):
+                Q = Q.diagonal() # 稀疏矩阵
+            self.Qinv = 1.0/Q
+            L = (B @ spdiags(self.Qinv, 0, n, n) @ Bt).tocsr()
+            Lsolve = self.inverse(self.sign*L, psolver) # 变成正定矩阵再求解
+            self.Lsolve = lambda r: self.sign*Lsolve(r)
+        elif stype == 'simple':
+            S = (C - B @ spdiags(D, 0, n, n) @ Bt).tocsr()
+            Ssolve = self.inverse(self.sign*S, psolver)
+            self.Ssolve = lambda r: self.sign*Ssolve(r)
+        else:
+            raise ValueError(f"the Schur complement approximation {stype} is not supported!")
+
+        if ptype not in {'upper', 'lower', 'diag'}:
+            raise ValueError(f"the preconditioner type {ptype} is not supported!")
+
+    def inverse(self, A, solver):
+        """
+        @brief 返回求解 A x = r 的函数
+
+        @note 'gamg' 时做一次 V-cycle, 'direct' 时用缓存的 LU 分解。矩阵奇异时
+              （如纯 Neumann 边界的压力 Laplace 矩阵）加一个很小的对角正则项。
+        """
+        A = csr_matrix(A)
+        if solver == 'gamg':
+            kwargs = {'ptype': 'V', 'sstep': 1, 'stype': 'MGS'}
+            kwargs.update(self.kwargs)
+            amg = GAMGSolver(**kwargs)
+            amg.setup(A)
+            return amg.vcycle
+        elif solver == 'direct':
+            try:
+                return self._cache.factorize(A)
+            except RuntimeError: # 矩阵奇异
+                eps = 1e-10*np.max(np.abs(A.diagonal()))
+                return self._cache.factorize(A + eps*eye(A.shape[0], format='csr'))
+        else:
+            raise ValueError(f"the solver {solver} is not supported!")
+
+    def schur_solve(self, r):
+        """
+        @brief 近似求解 S y = r
+        """
+        stype = self.stype
+        if stype == 'mass':
+            return self.sign*self.Mpsolve(r)
+        elif stype == 'pcd':
+            return self.sign*self.Mpsolve(self.Fp @ self.Apsolve(r))
+        elif stype == 'lsc':
+            y = self.Lsolve(r)
+            y = self.Bt @ y
+            y = self.Qinv*(self.F @ (self.Qinv*y))
+            y = self.B @ y
+            # 以上近似的是 B F^{-1} Bt 的逆, Schur 补是它的相反数
+            return -self.Lsolve(y)
+        else:
+            return self.Ssolve(r)
+
+    def __call__(self, r):
+        n = self.n
+        ru = r[:n]
+        rp = r[n:]
+        y = np.zeros_like(r)
+        if self.ptype == 'upper':
+            y[n:] = self.schur_solve(rp)
+            y[:n] = self.usolve(ru - self.Bt @ y[n:])
+        elif self.ptype == 'lower':
+            y[:n] = self.usolve(ru)
+            y[n:] = self.schur_solve(rp - self.B @ y[:n])
+        else:
+            y[:n] = self.usolve(ru)
+            y[n:] = self.sign*self.schur_solve(rp) # |S|^{-1}
+        return y
+
+    def linear_operator(self):
+        """
+        @brief 预条件子对应的 `LinearOperator`
+        """
+        N = self.A.shape[0]
+        return LinearOperator((N, N), matvec=self, dtype=self.A.dtype)
+
+    def solve(self, b, x0=None, method='gmres', rtol=1e-8, maxit=None):
+        """
+        @brief 用预条件的 GMRES 或 MINRES 求解 A x = b
+
+        @return 解和迭代次数
+
+        @note 没有收敛时给出 RuntimeWarning, 可以用 `warnings` 模块把它变成异常
+        """
+        counter = [0]
+        def callback(x):
+            counter[0] += 1
+        x, info = krylov_solve(method, self.A, b, x0=x0, M=self.linear_operator(),
+                rtol=rtol, maxit=maxit, callback=callback)
+        if info != 0:
+            warnings.warn(f"{method} does not converge with info: {info}",
+                    RuntimeWarning, stacklevel=2)
+        return x, counter[0]
@@ -1,6 +1,58 @@
-from scipy.sparse import spdiags, eye, bmat, tril, triu
+import numpy as np
+from scipy.sparse import spdiags, eye, bmat, tril, triu, csr_matrix
 from scipy.sparse.linalg import spsolve_triangular
 
+
+def power_iteration(matvec, N, maxit=100, rtol=1e-4):
+    """
+    @brief 用幂法估计线性算子模最大的特征值的模
+
+    @param[in] matvec 线性算子与向量的乘积
+    @param[in] N 向量的长度
+    """
+    x = np.random.default_rng(0).random(N)
+    x /= np.linalg.norm(x)
+    lam = 0.0
+    for i in range(maxit):
+        y = matvec(x)
+        lam0 = lam
+        lam = np.linalg.norm(y)
+        if (lam == 0.0) or (not np.isfinite(lam)):
+            break
+        x = y/lam
+        if abs(lam - lam0) < rtol*lam:
+            break
+    return lam
+
+
+def graph_coloring(A):
+    """
+    @brief 矩阵图的着色, 同一种颜色的自由度之间没有矩阵耦合
+
+    @return 形状为 (N, ) 的颜色编号数组
+
+    @note 用 Luby 的并行极大独立集算法, 每一轮在未着色的点中选出随机权重比所有
+          未着色邻居都大的点, 作为一种新的颜色, 每一轮都是向量化的稀疏矩阵运算
+    """
+    N = A.shape[0]
+    G = csr_matrix(A, copy=True)
+    G.data = np.abs(G.data)
+    G = (G + G.T).tocsr()
+    G.setdiag(0)
+    G.eliminate_zeros()
+    G.data[:] = 1
+
+    w = np.random.default_rng(0).permutation(N) + 1.0 # 互不相同的正权重
+    color = np.full(N, -1, dtype=np.int_)
+    c = 0
+    while np.any(color < 0):
+        isFree = color < 0
+        wf = np.where(isFree, w, 0.0)
+        wmax = G.multiply(wf[None, :]).tocsr().max(axis=1).toarray().reshape(-1)
+        color[isFree & (w > wmax)] = c
+        c += 1
+    return color
+
 class GaussSeidelSmoother():
     def __init__(self, A):
         """
@@ -51,3 +103,84 @@ class JacobiSmoother():
             r[:] = b - self.L@r - self.U@r
             r /= self.D
         return r
+
+
+class MulticolorGaussSeidelSmoother():
+    """
+    @brief 多色 Gauss-Seidel 光滑子
+
+    先对矩阵图着色, 同一种颜色的自由度之间互不耦合, 可以同时更新。每一步光滑
+    按颜色顺序做若干次向量化的更新, 总计算量为一次矩阵向量乘, 不需要求解三角
+    方程组。前磨光按颜色的正序, 后磨光按逆序, 这样 V-cycle 是对称的。
+    """
+    def __init__(self, A):
+        A = A.tocsr()
+        self.color = graph_coloring(A)
+        NC = self.color.max() + 1
+        self.index = [np.nonzero(self.color == c)[0] for c in range(NC)]
+        self.A = [A[idx] for idx in self.index]
+        D = A.diagonal()
+        self.D = [D[idx] for idx in self.index]
+
+    def number_of_colors(self):
+        return len(self.index)
+
+    def smooth(self, b, x0, lower=True, maxit=3):
+        order = range(len(self.index))
+        if not lower:
+            order = order[::-1]
+        for i in range(maxit):
+            for c in order:
+                idx = self.index[c]
+                x0[idx] += (b[idx] - self.A[c]@x0)/self.D[c]
+
+
+class L1JacobiSmoother():
+    """
+    @brief l1-Jacobi 光滑子
+
+    用 d_i = sum_j |a_ij| 代替 Jacobi 迭代中的对角元, 对于对称正定矩阵总是收敛的,
+    不需要选取松弛因子。
+    """
+    def __init__(self, A):
+        A = A.tocsr()
+        self.A = A
+        self.D = np.asarray(abs(A).sum(axis=1)).reshape(-1)
+
+    def smooth(self, b, x0, lower=True, maxit=3):
+        for i in range(maxit):
+            x0 += (b - self.A@x0)/self.D
+
+
+class ChebyshevSmoother():
+    """
+    @brief Chebyshev 多项式光滑子
+
+    对 D^{-1}A 的谱区间 [a, b] 上的高频部分做 Chebyshev 多项式加速, 其中
+    b = 1.1*rho, a = b/ratio, rho 为用幂法估计的 D^{-1}A 的谱半径。每一步只需要
+    矩阵向量乘, `maxit` 为多项式的次数。
+    """
+    def __init__(self, A, ratio=30.0):
+        A = A.tocsr()
+        self.A = A
+        self.D = A.diagonal()
+        N = A.shape[0]
+        self.rho = power_iteration(lambda x: (A@x)/self.D, N, maxit=20, rtol=1e-2)
+        self.upper = 1.1*self.rho
+        self.lower = self.upper/ratio
+
+    def smooth(self, b, x0, lower=True, maxit=3):
+        theta = (self.upper + self.lower)/2
+        delta = (self.upper - self.lower)/2
+        sigma = theta/delta
+        rho = 1/sigma
+        r = (b - self.A@x0)/self.D
+        d = r/theta
+        for i in range(maxit):
+            x0 += d
+            if i == maxit - 1:
+                break
+            r -= (self.A@d)/self.D
+            rho1 = 1/(2*sigma - rho)
+            d = rho1*rho*d + 2*rho1/delta*r
+            rho = rho1
@@ -1,9 +1,11 @@
+import os
+import queue
+import threading
+import multiprocessing
+
 import numpy as np
-import vtk
-import vtk.util.numpy_support as vnp
 
-import multiprocessing
-import time
+from .VTUWriter import VTUPiece, VTUWriter
 
 class MeshWriter:
     """
@@ -11,56 +13,58 @@ class MeshWriter:
     Notes
     -----
     用于在数值模拟过程中输出网格和数据到 vtk 文件中
-    """
-    def __init__(self, mesh, simulation=None, args=None, etype='cell',
-            index=np.s_[:]):
-
-        GD = mesh.geo_dimension()
-        TD = mesh.top_dimension()
-
-        NN = mesh.number_of_nodes()
-
-        node, cell, cellType, NC = mesh.to_vtk(etype=etype, index=index)
-
-        points = vtk.vtkPoints()
-        points.SetData(vnp.numpy_to_vtk(node))
-
-        cells = vtk.vtkCellArray()
-        cells.SetCells(NC, vnp.numpy_to_vtkIdTypeArray(cell))
 
-        self.mesh =vtk.vtkUnstructuredGrid() 
-        self.mesh.SetPoints(points)
-        self.mesh.SetCells(cellType, cells)
-
-        pdata = self.mesh.GetPointData()
+    网格的节点和单元只编码一次, 之后每次写入只需要编码数据。文件用纯 NumPy 写出,
+    不依赖 VTK 的 Python 接口。
 
+    与以前的版本相比, `run` 的默认行为有两点不同:
+        * 模拟程序在同一个进程的线程中运行, 而不是在子进程中运行
+        * 每个时间层写一个 vtu 文件, 再加一个 .pvd 时间序列文件, 而不是用 VTK
+          写一个包含所有时间层的 vtu 文件
+    `series='vtk'` 时恢复以前的行为（需要 VTK 的 Python 接口）。
+    """
+    def __init__(self, mesh, simulation=None, args=None, etype='cell',
+            index=np.s_[:], series='pvd'):
+        """
+        @param[in] series 'pvd' 为逐个时间层的 vtu 文件和 .pvd 文件, 模拟程序在
+                   线程中运行; 'vtk' 为以前的方式, 模拟程序在子进程中运行, 所有
+                   时间层写到一个 vtu 文件中
+        """
+        if series not in {'pvd', 'vtk'}:
+            raise ValueError(f"series should be 'pvd' or 'vtk', but got {series}")
+        self.mesh = mesh
+        self.etype = etype
+        self.index = index
+        self.series = series
+
+        self.grid = mesh.to_vtk(etype=etype, index=index) # node, cell, cellType, NC
+        self.piece = VTUPiece(*self.grid)
+
+        self.nodedata = {}
+        self.celldata = {}
         for key, val in mesh.nodedata.items():
             if val is not None:
-                d = vnp.numpy_to_vtk(val[:])
-                d.SetName(key)
-                pdata.AddArray(d)
-
-        cdata = self.mesh.GetCellData()
+                self.nodedata[key] = val
         for key, val in mesh.celldata.items():
             if val is not None:
-                d = vnp.numpy_to_vtk(val[:])
-                d.SetName(key)
-                cdata.AddArray(d)
+                self.celldata[key] = val
 
         self.simulation = simulation
-        if self.simulation is not None:
+        if (self.simulation is not None) and (series == 'vtk'):
             self.queue = multiprocessing.Queue()
             self.process = multiprocessing.Process(None, simulation,
-                    args= args + (self.queue, ))
+                    args=tuple(args or ()) + (self.queue, ))
+        elif self.simulation is not None:
+            # 模拟程序在同一个进程的线程中运行, 数据不需要在进程之间序列化
+            self.queue = queue.Queue()
+            self.process = threading.Thread(target=simulation,
+                    args=tuple(args or ()) + (self.queue, ), daemon=True)
         else:
             self.queue = None
             self.process = None
 
     def write(self, fname='test.vtu'):
-        writer = vtk.vtkXMLUnstructuredGridWriter()
-        writer.SetFileName(fname)
-        writer.SetInputData(self.mesh)
-        writer.Write()
+        self.piece.write(fname, nodedata=self.nodedata, celldata=self.celldata)
 
     def run(self, fname='test.vtu'):
         """
@@ -69,34 +73,97 @@ class MeshWriter:
         -----
 
         动态写入时间有关的数据
+
+        模拟程序通过队列发送数据:
+            * 正整数: 总的时间层数
+            * 字典 {name: (datatype, data)}: 一个时间层的数据, datatype 为
+              'celldata' 或 'pointdata'
+            * -1: 模拟结束
+
+        每个时间层写入一个 vtu 文件 fname_0000000000.vtu, ..., 并生成 .pvd 时间
+        序列文件, 写文件在后台线程中进行。`series='vtk'` 时用 VTK 把所有时间层
+        写到 fname 一个文件中, 见 `run_vtk_series`。
         """
-        writer = vtk.vtkXMLUnstructuredGridWriter()
-        writer.SetFileName(fname)
-        writer.SetInputData(self.mesh)
+        if self.series == 'vtk':
+            return self.run_vtk_series(fname)
+
+        output_dir, name = os.path.split(fname)
+        prefix = os.path.splitext(name)[0]
+        writer = VTUWriter(self.mesh, output_dir=output_dir or './',
+                prefix=prefix, etype=self.etype, index=self.index)
         self.process.start()
-        cdata = self.mesh.GetCellData()
-        pdata = self.mesh.GetPointData()
-        i = 0
-        while True:
-            if not self.queue.empty():
+        try:
+            while True:
                 data = self.queue.get()
                 if isinstance(data, dict):
                     for key, val in data.items():
-                        datatype, data = val
-                        d = vnp.numpy_to_vtk(data)
-                        d.SetName(key)
+                        datatype, val = val
                         if datatype == 'celldata':
-                            cdata.AddArray(d)
+                            self.celldata[key] = val
                         elif datatype == 'pointdata':
-                            pdata.AddArray(d)
-                    writer.WriteNextTime(i)    
-                    i += 1
+                            self.nodedata[key] = val
+                    writer.write(nodedata=self.nodedata, celldata=self.celldata)
                 elif isinstance(data, int):
-                    if data > 0: # 这里是总的时间层
-                        writer.SetNumberOfTimeSteps(data)
-                        writer.Start()
-                    elif data == -1:
+                    if data == -1:
                         self.process.join()
                         print('Simulation stop!')
-                        writer.Stop()
                         break
+        finally:
+            writer.close()
+
+    def run_vtk_series(self, fname='test.vtu'):
+        """
+
+        Notes
+        -----
+
+        以前的写入方式: 用 VTK 的 vtkXMLUnstructuredGridWriter 把所有时间层写到
+        一个 vtu 文件中, 模拟程序先发送总的时间层数
+        """
+        import vtk
+        import vtk.util.numpy_support as vnp
+
+        node, cell, cellType, NC = self.grid
+        points = vtk.vtkPoints()
+        points.SetData(vnp.numpy_to_vtk(node))
+        cells = vtk.vtkCellArray()
+        cells.SetCells(NC, vnp.numpy_to_vtkIdTypeArray(cell))
+        grid = vtk.vtkUnstructuredGrid()
+        grid.SetPoints(points)
+        grid.SetCells(cellType, cells)
+
+        pdata = grid.GetPointData()
+        cdata = grid.GetCellData()
+        for data, vdata in ((self.nodedata, pdata), (self.celldata, cdata)):
+            for key, val in data.items():
+                d = vnp.numpy_to_vtk(val[:])
+                d.SetName(key)
+                vdata.AddArray(d)
+
+        writer = vtk.vtkXMLUnstructuredGridWriter()
+        writer.SetFileName(fname)
+        writer.SetInputData(grid)
+        self.process.start()
+        i = 0
+        while True:
+            data = self.queue.get()
+            if isinstance(data, dict):
+                for key, val in data.items():
+                    datatype, val = val
+                    d = vnp.numpy_to_vtk(val)
+                    d.SetName(key)
+                    if datatype == 'celldata':
+                        cdata.AddArray(d)
+                    elif datatype == 'pointdata':
+                        pdata.AddArray(d)
+                writer.WriteNextTime(i)
+                i += 1
+            elif isinstance(data, int):
+                if data > 0: # 这里是总的时间层
+                    writer.SetNumberOfTimeSteps(data)
+                    writer.Start()
+                elif data == -1:
+                    self.process.join()
+                    print('Simulation stop!')
+                    writer.Stop()
+                    break
@@ -1,10 +1,8 @@
-import numpy as np
-import vtk
-import vtk.util.numpy_support as vnp
-
 import multiprocessing
 import time
 
+from .VTUWriter import write_vtu
+
 class VTKMeshWriter:
     """
 
@@ -33,38 +31,8 @@ class VTKMeshWriter:
         -----
         """
         node, cell, cellType, NC = mesh.to_vtk()
-        points = vtk.vtkPoints()
-        points.SetData(vnp.numpy_to_vtk(node))
-
-        cells = vtk.vtkCellArray()
-        cells.SetCells(NC, vnp.numpy_to_vtkIdTypeArray(cell))
-
-        vtkmesh =vtk.vtkUnstructuredGrid() 
-        vtkmesh.SetPoints(points)
-        vtkmesh.SetCells(cellType, cells)
-
-        pdata = vtkmesh.GetPointData()
-        for key, val in mesh.nodedata.items():
-            if val.dtype == np.bool_:
-                d = vnp.numpy_to_vtk(val.astype(np.int_))
-            else:
-                d = vnp.numpy_to_vtk(val)
-            d.SetName(key)
-            pdata.AddArray(d)
-
-        cdata = vtkmesh.GetCellData()
-        for key, val in mesh.celldata.items():
-            if val.dtype == np.bool_:
-                d = vnp.numpy_to_vtk(val.astype(np.int_))
-            else:
-                d = vnp.numpy_to_vtk(val)
-            d.SetName(key)
-            cdata.AddArray(d)
-
-        writer = vtk.vtkXMLUnstructuredGridWriter()
-        writer.SetFileName(fname)
-        writer.SetInputData(vtkmesh)
-        writer.Write()
+        write_vtu(fname, node, cell, cellType, NC, nodedata=mesh.nodedata,
+                celldata=mesh.celldata)
 
     def run(self):
         """
@@ -0,0 +1,326 @@
+import os
+import zlib
+import queue
+import threading
+import warnings
+
+import numpy as np
+
+
+VTK_TYPES = {
+        np.dtype(np.int8): 'Int8', np.dtype(np.uint8): 'UInt8',
+        np.dtype(np.int16): 'Int16', np.dtype(np.uint16): 'UInt16',
+        np.dtype(np.int32): 'Int32', np.dtype(np.uint32): 'UInt32',
+        np.dtype(np.int64): 'Int64', np.dtype(np.uint64): 'UInt64',
+        np.dtype(np.float32): 'Float32', np.dtype(np.float64): 'Float64'}
+
+
+def encode_array(a, compress=False, blocksize=2**20):
+    """
+    @brief 把数组编码为 VTK XML 文件 appended 段中的二进制数据块
+
+    @param[in] compress 是否用 zlib 压缩
+    @param[in] blocksize 压缩时每一块的字节数
+
+    @note 头部使用 UInt64。不压缩时为 [nbytes] + 数据; 压缩时为
+          [块数, 块大小, 最后一块的大小, 每一块压缩后的大小...] + 压缩后的数据
+    """
+    data = np.ascontiguousarray(a).tobytes()
+    n = len(data)
+    if not compress:
+        return np.array([n], dtype='<u8').tobytes() + data
+
+    blocks = [data[i:i+blocksize] for i in range(0, n, blocksize)]
+    blocks = [zlib.compress(b) for b in blocks]
+    last = n - (len(blocks) - 1)*blocksize if n > 0 else 0
+    header = [len(blocks), blocksize, last] + [len(b) for b in blocks]
+    return np.array(header, dtype='<u8').tobytes() + b''.join(blocks)
+
+
+def vtk_array(val, n):
+    """
+    @brief 把节点或单元数据整理成 VTK 接受的形状 (n, ) 或 (n, ncomponents)
+
+    @note 二维的向量数据补齐成三维, 布尔型转换为 UInt8, 形状为 (ncomponents, n)
+          的数据（如 'sdofs' 排序的向量函数）会被转置。数据比实体多时（如 p>1
+          的拉格朗日自由度, 前 n 个是节点上的值）只保留前 n 个, 并给出警告
+    """
+    val = np.asarray(val)
+    if (val.ndim == 2) and (val.shape[0] < n) and (val.shape[1] >= n):
+        val = val.T
+    if (val.ndim > 0) and (val.shape[0] > n):
+        warnings.warn(f"the data with shape {val.shape} has more entries than "
+                f"the number of entities {n}, only the first {n} are written!",
+                stacklevel=2)
+        val = val[:n]
+    if (val.ndim == 0) or (val.shape[0] != n):
+        raise ValueError(f"the data with shape {val.shape} does not match "
+                f"the number of entities {n}!")
+    val = val.reshape(n, -1) if val.ndim > 1 else val
+    if (val.ndim == 2) and (val.shape[1] == 2):
+        val = np.concatenate((val, np.zeros((n, 1), dtype=val.dtype)), axis=1)
+    if val.dtype == np.bool_:
+        val = val.astype(np.uint8)
+    elif val.dtype not in VTK_TYPES:
+        val = val.astype(np.float64)
+    return np.ascontiguousarray(val.astype(val.dtype.newbyteorder('<'), copy=False))
+
+
+def vtk_cells(cell, NC, cellType):
+    """
+    @brief 把 `mesh.to_vtk` 返回的单元数组转换为 VTU 的 connectivity、offsets 和
+           types 数组
+
+    @param[in] cell 形状为 (NC, NV) 的数组, 或者 [NV, v0, v1, ..., NV, ...] 形式
+               的一维数组
+    """
+    cell = np.asarray(cell)
+    if cell.ndim == 2:
+        nv = np.full(NC, cell.shape[1], dtype=np.int64)
+        connectivity = cell.reshape(-1)
+    else:
+        NV = cell[0] if len(cell) > 0 else 0
+        if (len(cell) == NC*(NV+1)) and np.all(cell[::NV+1] == NV):
+            # 所有单元的顶点个数相同
+            connectivity = cell.reshape(NC, NV+1)[:, 1:].reshape(-1)
+            nv = np.full(NC, NV, dtype=np.int64)
+        else:
+            nv = np.zeros(NC, dtype=np.int64)
+            start = np.zeros(NC, dtype=np.int64)
+            k = 0
+            for i in range(NC):
+                nv[i] = cell[k]
+                start[i] = k + 1
+                k += nv[i] + 1
+            isVertex = np.ones(len(cell), dtype=np.bool_)
+            isVertex[start - 1] = False
+            connectivity = cell[isVertex]
+    offsets = np.cumsum(nv, dtype=np.int64)
+    types = np.broadcast_to(np.asarray(cellType, dtype=np.uint8), (NC, ))
+    return (connectivity.astype('<i8'), offsets.astype('<i8'),
+            np.ascontiguousarray(types, dtype=np.uint8))
+
+
+class VTUPiece():
+    """
+    @brief 一个 VTU 文件的内容, 几何部分（节点和单元）编码后可以在多个时间步之间
+           复用
+    """
+    def __init__(self, node, cell, cellType, NC, compress=True):
+        node = np.asarray(node)
+        if node.shape[1] == 2:
+            node = np.concatenate((node, np.zeros((len(node), 1), dtype=node.dtype)), axis=1)
+        self.NN = len(node)
+        self.NC = NC
+        self.compress = compress
+        connectivity, offsets, types = vtk_cells(cell, NC, cellType)
+        self.geometry = [
+                ('Points', None, vtk_array(node, self.NN)),
+                ('Cells', 'connectivity', connectivity),
+                ('Cells', 'offsets', offsets),
+                ('Cells', 'types', types)]
+        # 几何数据只编码一次
+        self.blocks = [encode_array(a, compress=compress) for _, _, a in self.geometry]
+
+    def write(self, fname, nodedata=None, celldata=None):
+        """
+        @brief 写入一个 VTU 文件, 数据以 raw 二进制格式放在 appended 段中
+        """
+        fields = []
+        for section, data, n in (('PointData', nodedata, self.NN),
+                ('CellData', celldata, self.NC)):
+            for name, val in (data or {}).items():
+                if val is not None:
+                    fields.append((section, name, vtk_array(val, n)))
+
+        blocks = [encode_array(a, compress=self.compress) for _, _, a in fields]
+        blocks += self.blocks
+        arrays = fields + self.geometry
+
+        offset = 0
+        tags = []
+        for (section, name, a), b in zip(arrays, blocks):
+            nc = a.shape[1] if a.ndim == 2 else 1
+            attr = f' Name="{name}"' if name is not None else ''
+            tags.append((section, f'<DataArray type="{VTK_TYPES[a.dtype.newbyteorder("=")]}"'
+                f'{attr} NumberOfComponents="{nc}" format="appended" offset="{offset}"/>'))
+            offset += len(b)
+
+        compressor = ' compressor="vtkZLibDataCompressor"' if self.compress else ''
+        lines = ['<?xml version="1.0"?>',
+                '<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian"'
+                f' header_type="UInt64"{compressor}>',
+                '<UnstructuredGrid>',
+                f'<Piece NumberOfPoints="{self.NN}" NumberOfCells="{self.NC}">']
+        for section in ('PointData', 'CellData', 'Points', 'Cells'):
+            lines.append(f'<{section}>')
+            lines.extend(tag for s, tag in tags if s == section)
+            lines.append(f'</{section}>')
+        lines += ['</Piece>', '</UnstructuredGrid>', '<AppendedData encoding="raw">', '_']
+
+        with open(fname, 'wb') as f:
+            f.write('\n'.join(lines).encode())
+            for b in blocks:
+                f.write(b)
+            f.write(b'\n</AppendedData>\n</VTKFile>\n')
+
+
+def write_vtu(fname, node, cell, cellType, NC, nodedata=None, celldata=None,
+        compress=True):
+    """
+    @brief 不依赖 VTK 库, 把网格和数据写入 VTU 文件
+
+    @param[in] node, cell, cellType, NC 与 `mesh.to_vtk()` 的返回值相同
+    @param[in] compress 是否用 zlib 压缩数据
+    """
+    VTUPiece(node, cell, cellType, NC, compress=compress).write(fname,
+            nodedata=nodedata, celldata=celldata)
+
+
+def write_pvd(fname, files, times):
+    """
+    @brief 写入时间序列的 .pvd 文件
+    """
+    lines = ['<?xml version="1.0"?>',
+            '<VTKFile type="Collection" version="0.1" byte_order="LittleEndian">',
+            '<Collection>']
+    for f, t in zip(files, times):
+        lines.append(f'<DataSet timestep="{t!r}" group="" part="0" file="{f}"/>')
+    lines += ['</Collection>', '</VTKFile>', '']
+    with open(fname, 'w') as f:
+        f.write('\n'.join(lines))
+
+
+class VTUWriter():
+    """
+    @brief 数值模拟过程中输出网格和数据的时间序列
+
+    每次调用 `write` 时复制当前的数据, 交给后台的写入线程, 计算不会因为写文件而
+    阻塞。每个时间步写一个 VTU 文件, 同时更新 .pvd 文件, 可以直接用 ParaView 打开
+    整个时间序列。
+
+    网格不变时（static_mesh=True）, 节点和单元只编码、压缩一次, 之后的每个时间步
+    只需要编码节点和单元数据, 几何部分直接复用已经编码好的字节。网格改变时调用
+    `set_mesh`。
+
+    @note 写入线程中发生的异常会在下一次调用 `write` 或 `close` 时抛出
+    """
+    def __init__(self, mesh, output_dir='./', prefix='test', etype='cell',
+            index=np.s_[:], compress=True, static_mesh=True, background=True,
+            maxsize=4):
+        """
+        @param[in] mesh 网格, 需要有 `to_vtk` 方法
+        @param[in] output_dir 输出目录
+        @param[in] prefix 文件名前缀, 时间步文件为 prefix_0000000000.vtu, 时间序列
+                   文件为 prefix.pvd
+        @param[in] compress 是否用 zlib 压缩
+        @param[in] static_mesh 网格是否不变, 不变时几何部分只编码一次
+        @param[in] background 是否在后台线程中写文件
+        @param[in] maxsize 等待写入的时间步个数的上限, 超过时 `write` 会等待
+        """
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.etype = etype
+        self.index = index
+        self.compress = compress
+        self.static_mesh = static_mesh
+        self.files = []
+        self.times = []
+        self._error = None
+        self.set_mesh(mesh)
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=maxsize)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def set_mesh(self, mesh):
+        """
+        @brief 设置（或更新）输出的网格
+        """
+        self.mesh = mesh
+        self._piece = None
+        if self.static_mesh:
+            self._piece = self._make_piece()
+
+    def _make_piece(self):
+        node, cell, cellType, NC = self.mesh.to_vtk(etype=self.etype, index=self.index)
+        return VTUPiece(node, cell, cellType, NC, compress=self.compress)
+
+    def write(self, t=None, nodedata=None, celldata=None):
+        """
+        @brief 输出一个时间步
+
+        @param[in] t 时间, 默认为时间步的编号
+        @param[in] nodedata, celldata 数据字典, 默认为网格的 nodedata 和 celldata
+        """
+        self._check()
+        step = len(self.files)
+        t = step if t is None else t
+        fname = f'{self.prefix}_{step:010}.vtu'
+        self.files.append(fname)
+        self.times.append(t)
+
+        nodedata = self.mesh.nodedata if nodedata is None else nodedata
+        celldata = self.mesh.celldata if celldata is None else celldata
+        # 复制数据, 计算可以继续修改原来的数组
+        nodedata = {k: np.array(v) for k, v in nodedata.items() if v is not None}
+        celldata = {k: np.array(v) for k, v in celldata.items() if v is not None}
+        piece = self._piece if self.static_mesh else self._make_piece()
+
+        task = (piece, fname, nodedata, celldata, list(self.files), list(self.times))
+        if self._queue is None:
+            self._write(*task)
+        else:
+            self._queue.put(task)
+
+    def _write(self, piece, fname, nodedata, celldata, files, times):
+        piece.write(os.path.join(self.output_dir, fname), nodedata=nodedata,
+                celldata=celldata)
+        write_pvd(os.path.join(self.output_dir, self.prefix + '.pvd'), files, times)
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                if self._error is None:
+                    self._write(*task)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _check(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def flush(self):
+        """
+        @brief 等待所有的时间步写入完成
+        """
+        if self._queue is not None:
+            self._queue.join()
+        self._check()
+
+    def close(self):
+        """
+        @brief 写完所有的时间步, 结束写入线程
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._queue = None
+        self._check()
@@ -1,2 +1,3 @@
 from .MeshWriter import MeshWriter
 from .VTKMeshWriter import VTKMeshWriter
+from .VTUWriter import VTUWriter, write_vtu, write_pvd
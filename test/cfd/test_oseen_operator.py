@@ -0,0 +1,80 @@
+import numpy as np
+from scipy.sparse import bmat
+import pytest
+
+from fealpy.functionspace import LagrangeFESpace
+from fealpy.mesh import TriangleMesh
+from fealpy.decorator import cartesian, barycentric
+from fealpy.fem import BilinearForm
+from fealpy.fem import VectorMassIntegrator, VectorDiffusionIntegrator
+from fealpy.fem import VectorConvectionIntegrator
+from fealpy.cfd import NSFEMSolver
+
+
+@cartesian
+def velocity_field(p):
+    x = p[..., 0]
+    y = p[..., 1]
+    u = np.zeros(p.shape)
+    u[..., 0] = np.sin(np.pi * x) ** 2 * np.sin(2 * np.pi * y)
+    u[..., 1] = -np.sin(np.pi * y) ** 2 * np.sin(2 * np.pi * x)
+    return u
+
+
+def reference_A(solver, un, mu, rho):
+    """
+    @brief 每一步重新组装的 Oseen 块矩阵
+    """
+    uspace = solver.uspace
+    q = solver.q
+    bform = BilinearForm((uspace,)*2)
+    bform.add_domain_integrator(VectorMassIntegrator(c=rho, q=q))
+    M = bform.assembly()
+    bform = BilinearForm((uspace,)*2)
+    bform.add_domain_integrator(VectorDiffusionIntegrator(c=mu, q=q))
+    S = bform.assembly()
+
+    @barycentric
+    def coef(bcs, index):
+        if callable(rho):
+            return rho(bcs,index)[:,None,:]*un(bcs,index)
+        else:
+            return rho*un(bcs,index)
+
+    bform = BilinearForm((uspace,)*2)
+    bform.add_domain_integrator(VectorConvectionIntegrator(c=coef, q=q))
+    C = bform.assembly()
+    AP = solver.AP
+    A = bmat([[1/solver.dt*M+S+C, -AP], [AP.T, None]], format='csr')
+    return A, M
+
+
+@pytest.mark.parametrize('variable', [False, True])
+def test_ossen_A(variable):
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=6, ny=6)
+    uspace = LagrangeFESpace(mesh, p=2, doforder='sdofs')
+    pspace = LagrangeFESpace(mesh, p=1, doforder='sdofs')
+    solver = NSFEMSolver(mesh, 0.1, uspace, pspace, rho=1.0, mu=0.1)
+
+    un = uspace.interpolate(velocity_field, dim=2)
+    A1 = None
+    for k in range(3):
+        un[:] *= 1.5
+        if variable:
+            rho = uspace.interpolate(lambda p: 1 + k + p[..., 0])
+            mu = uspace.interpolate(lambda p: 0.1 + k*p[..., 1])
+            A = solver.ossen_A(un, mu, rho)
+            b = solver.ossen_b(un, rho)
+        else:
+            rho, mu = 1.0, 0.1
+            A = solver.ossen_A(un)
+            b = solver.ossen_b(un)
+        A0, M = reference_A(solver, un, mu, rho)
+        assert abs(A - A0).max() < 1e-10
+        ugdof = 2*uspace.number_of_global_dofs()
+        np.testing.assert_allclose(b[:ugdof], 1/solver.dt*M@un.flatten())
+        assert np.all(b[ugdof:] == 0)
+
+        # 每次返回同一个矩阵对象, 值被新的一步覆盖
+        assert (A1 is None) or (A is A1)
+        A1 = A
@@ -0,0 +1,100 @@
+import json
+import time
+
+import numpy as np
+
+from fealpy.decorator import Profiler, profiler, timer
+from fealpy.mesh import TriangleMesh
+from fealpy.functionspace import LagrangeFESpace
+from fealpy.fem import BilinearForm, LinearForm
+from fealpy.fem import ScalarDiffusionIntegrator, ScalarMassIntegrator
+from fealpy.fem import ScalarSourceIntegrator
+
+
+def test_profiler():
+    p = Profiler()
+    with p.scope('a'):
+        pass
+    assert p.root.children == {} # 默认关闭, 不做统计
+
+    p.enable(trace=True)
+    for i in range(3):
+        with p.scope('a'):
+            with p.scope('b'):
+                p.count('iter', 2)
+                p.allocated(np.zeros(10))
+                time.sleep(0.001)
+            with p.scope('c'):
+                pass
+    p.allocated(100) # 根节点
+
+    a = p.find('a')
+    b = p.find('a', 'b')
+    assert (a.count, b.count) == (3, 3)
+    assert b.counters == {'iter': 6}
+    assert b.nbytes == 3*80
+    assert p.root.nbytes == 100
+    assert a.time >= b.time >= 0.003
+    assert a.self_time() <= a.time - b.time + 1e-12
+    assert p.find('b') is b
+
+    d = json.loads(p.to_json())
+    assert d['children'][0]['name'] == 'a'
+    assert [c['name'] for c in d['children'][0]['children']] == ['b', 'c']
+    trace = p.to_chrome_trace()
+    assert len(trace['traceEvents']) == 9
+    assert all(e['ph'] == 'X' for e in trace['traceEvents'])
+    assert 'b' in p.report()
+
+    p.reset()
+    assert p.find('a') is None
+    p.disable()
+
+
+def test_timer():
+    @timer
+    def f(x):
+        return 2*x
+
+    @timer(name='g')
+    def g(x):
+        return f(x) + 1
+
+    assert g(1) == 3 # 关闭时只调用原函数
+    profiler.reset()
+    profiler.enable()
+    try:
+        assert g(1) == 3
+        assert profiler.find('g').count == 1
+        assert profiler.find('g', 'test_timer.<locals>.f').count == 1
+    finally:
+        profiler.disable()
+        profiler.reset()
+
+
+def test_assembly_profile():
+    mesh = TriangleMesh.from_box(nx=4, ny=4)
+    space = LagrangeFESpace(mesh, p=2)
+    bform = BilinearForm(space)
+    bform.add_domain_integrator([ScalarDiffusionIntegrator(q=4), ScalarMassIntegrator(q=4)])
+    lform = LinearForm(space)
+    lform.add_domain_integrator(ScalarSourceIntegrator(lambda p: np.ones(p.shape[:-1]), q=4))
+
+    profiler.reset()
+    profiler.enable()
+    try:
+        A = bform.assembly()
+        F = lform.assembly()
+    finally:
+        profiler.disable()
+
+    NC = mesh.number_of_cells()
+    ldof = space.number_of_local_dofs()
+    root = profiler.find('BilinearForm.assembly')
+    assert root.count == 1
+    assert root.children['ScalarDiffusionIntegrator'].count == 1
+    assert root.children['ScalarMassIntegrator'].count == 1
+    assert root.nbytes == NC*ldof*ldof*8
+    assert 'scatter' in root.children
+    assert profiler.find('LinearForm.assembly', 'ScalarSourceIntegrator').count == 1
+    profiler.reset()
@@ -146,6 +146,200 @@ def test_linear_elasticity_model():
 
     np.testing.assert_array_almost_equal(A.toarray(), B.toarray())
 
+def test_assembly_cache():
+    from fealpy.mesh import TriangleMesh
+    from fealpy.functionspace import LagrangeFESpace as Space
+    from fealpy.fem import ScalarDiffusionIntegrator
+    from fealpy.fem import ScalarMassIntegrator
+    from fealpy.decorator import cartesian
+
+    @cartesian
+    def coef(p):
+        x = p[..., 0]
+        return x**2 + 1
+
+    mesh = TriangleMesh.from_box(nx=4, ny=4)
+    space = Space(mesh, p=2)
+
+    bform = BilinearForm(space)
+    bform.add_domain_integrator([ScalarDiffusionIntegrator(coef), ScalarMassIntegrator()])
+    A = bform.assembly()
+
+    cform = BilinearForm(space, cache=True)
+    di = ScalarDiffusionIntegrator(coef)
+    cform.add_domain_integrator([di, ScalarMassIntegrator()])
+    B = cform.assembly()
+    assert len(cform._cache) > 0
+    np.testing.assert_array_almost_equal(A.toarray(), B.toarray())
+
+    # 只改变系数, 复用缓存数据
+    di.coef = 2.0
+    B = cform.assembly()
+    bform.dintegrators[0].coef = 2.0
+    A = bform.assembly()
+    np.testing.assert_array_almost_equal(A.toarray(), B.toarray())
+
+    # 网格加密后缓存自动失效
+    mesh.uniform_refine()
+    space = Space(mesh, p=2)
+    bform.space = space
+    cform.space = space
+    A = bform.assembly()
+    B = cform.assembly()
+    np.testing.assert_array_almost_equal(A.toarray(), B.toarray())
+
+@pytest.mark.parametrize('doforder', ['sdofs', 'vdims'])
+def test_fixed_sparsity_pattern(doforder):
+    from fealpy.mesh import TriangleMesh
+    from fealpy.functionspace import LagrangeFESpace as Space
+    from fealpy.fem import VectorDiffusionIntegrator
+    from fealpy.fem import VectorMassIntegrator
+
+    mesh = TriangleMesh.from_box(nx=3, ny=3)
+    space = Space(mesh, p=2, doforder=doforder)
+    GD = 2
+    bform = BilinearForm(GD*(space,))
+    bform.add_domain_integrator([VectorDiffusionIntegrator(), VectorMassIntegrator()])
+    A = bform.assembly()
+
+    # 和 COO 方式组装的矩阵比较
+    ldof = space.number_of_local_dofs()
+    gdof = space.number_of_global_dofs()
+    cell2dof = space.cell_to_dof()
+    NC = mesh.number_of_cells()
+    CM = np.zeros((NC, GD*ldof, GD*ldof), dtype=np.float64)
+    for di in bform.dintegrators:
+        di.assembly_cell_matrix(bform.space, out=CM)
+    if doforder == 'sdofs':
+        c2d = np.hstack([cell2dof + i*gdof for i in range(GD)])
+    else:
+        c2d = (GD*cell2dof[:, :, None] + np.arange(GD)).reshape(NC, -1)
+    I = np.broadcast_to(c2d[:, :, None], shape=CM.shape)
+    J = np.broadcast_to(c2d[:, None, :], shape=CM.shape)
+    B = csr_matrix((CM.flat, (I.flat, J.flat)), shape=(GD*gdof, GD*gdof))
+    np.testing.assert_array_almost_equal(A.toarray(), B.toarray())
+
+    # 再次组装时复用同一个矩阵对象
+    bform.dintegrators[1].coef = 2.0
+    C = bform.assembly()
+    assert C is A
+
+    cform = BilinearForm(GD*(space,))
+    cform.add_domain_integrator([VectorDiffusionIntegrator(), VectorMassIntegrator(2.0)])
+    D = cform.assembly()
+    np.testing.assert_array_almost_equal(C.toarray(), D.toarray())
+
+
+@pytest.mark.parametrize('meshtype', ['tri', 'quad', 'hex'])
+@pytest.mark.parametrize('p', [1, 2, 3])
+def test_matrix_free(meshtype, p):
+    from scipy.sparse.linalg import cg
+    from fealpy.mesh import TriangleMesh, QuadrangleMesh, HexahedronMesh
+    from fealpy.functionspace import LagrangeFESpace as Space
+    from fealpy.fem import ScalarDiffusionIntegrator
+    from fealpy.fem import ScalarMassIntegrator
+    from fealpy.fem import DirichletBC
+
+    if meshtype == 'tri':
+        mesh = TriangleMesh.from_box(nx=4, ny=4)
+    elif meshtype == 'quad':
+        mesh = QuadrangleMesh.from_box(nx=4, ny=3)
+    else:
+        mesh = HexahedronMesh.from_box(nx=2, ny=2, nz=2)
+    space = Space(mesh, p=p)
+
+    c = lambda x: 1 + x[..., 0]**2
+    integrators = [ScalarDiffusionIntegrator(c=c), ScalarMassIntegrator(c=2.0)]
+    aform = BilinearForm(space)
+    aform.add_domain_integrator(integrators)
+    A = aform.assembly()
+
+    bform = BilinearForm(space, atype='matfree')
+    bform.add_domain_integrator(integrators)
+    B = bform.assembly()
+    assert bform.get_matrix() is B
+
+    x = np.random.rand(A.shape[0])
+    np.testing.assert_allclose(B@x, A@x, atol=1e-12)
+    np.testing.assert_allclose(B.diagonal(), A.diagonal(), atol=1e-12)
+
+    # 施加边界条件后可以直接用 Krylov 方法求解
+    u = lambda x: np.sum(x, axis=-1)
+    bc = DirichletBC(space, u)
+    f = np.ones(A.shape[0])
+    A0, f0 = bc.apply(A, f, uh=space.function())
+    B0, f1 = bc.apply(B, f, uh=space.function())
+    np.testing.assert_allclose(f1, f0, atol=1e-12)
+    np.testing.assert_allclose(B0@x, A0@x, atol=1e-12)
+    uh, info = cg(B0, f1)
+    assert info == 0
+    assert np.linalg.norm(A0@uh - f0) < 1e-4*np.linalg.norm(f0)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 100])
+def test_chunked_assembly(chunk_size):
+    from fealpy.mesh import TetrahedronMesh
+    from fealpy.functionspace import LagrangeFESpace as Space
+    from fealpy.fem import ScalarDiffusionIntegrator
+    from fealpy.fem import ScalarMassIntegrator
+    from fealpy.fem import ScalarSourceIntegrator
+    from fealpy.fem import LinearForm
+
+    mesh = TetrahedronMesh.from_box(nx=2, ny=2, nz=2)
+    space = Space(mesh, p=2)
+    NC = mesh.number_of_cells()
+    c = np.random.rand(NC)
+    f = lambda p: 1 + p[..., 0]
+
+    A = []
+    F = []
+    for cs in [None, chunk_size]:
+        bform = BilinearForm(space, chunk_size=cs)
+        bform.add_domain_integrator([ScalarDiffusionIntegrator(c=c), ScalarMassIntegrator(c=f)])
+        A.append(bform.assembly().toarray())
+        # 再次组装复用稀疏模式
+        np.testing.assert_allclose(bform.assembly().toarray(), A[-1], atol=1e-12)
+
+        lform = LinearForm(space, chunk_size=cs)
+        lform.add_domain_integrator(ScalarSourceIntegrator(f))
+        F.append(lform.assembly())
+
+    np.testing.assert_allclose(A[1], A[0], atol=1e-12)
+    np.testing.assert_allclose(F[1], F[0], atol=1e-12)
+
+    # 分块时符号组装也按块进行, 不保存全部单元矩阵元素的位置
+    pattern = bform._cache.fetch(('pattern', space), None)
+    assert (pattern.slot is None) == (chunk_size < NC)
+    assert pattern.nnz == np.count_nonzero(A[0])
+
+
+@pytest.mark.parametrize('nthreads', [2, 4])
+def test_threaded_assembly(nthreads):
+    from fealpy.mesh import TriangleMesh
+    from fealpy.functionspace import LagrangeFESpace as Space
+    from fealpy.fem import ScalarDiffusionIntegrator
+    from fealpy.fem import ScalarSourceIntegrator
+    from fealpy.fem import LinearForm
+
+    mesh = TriangleMesh.from_box(nx=8, ny=8)
+    space = Space(mesh, p=2)
+    f = lambda p: 1 + p[..., 0]*p[..., 1]
+
+    bform = BilinearForm(space)
+    bform.add_domain_integrator(ScalarDiffusionIntegrator(c=f))
+    A = bform.assembly().copy()
+    B = bform.assembly(nthreads=nthreads).copy()
+    C = bform.assembly(nthreads=nthreads)
+    np.testing.assert_allclose(B.toarray(), A.toarray(), atol=1e-12)
+    # 同样的线程个数下结果完全相同
+    np.testing.assert_array_equal(B.data, C.data)
+
+    lform = LinearForm(space, chunk_size=10)
+    lform.add_domain_integrator(ScalarSourceIntegrator(f))
+    F0 = lform.assembly()
+    F1 = lform.assembly(nthreads=nthreads)
+    np.testing.assert_allclose(F1, F0, atol=1e-12)
+
 
 if __name__ == '__main__':
     test_linear_elasticity_model()
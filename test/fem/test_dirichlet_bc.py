@@ -0,0 +1,81 @@
+import numpy as np
+from scipy.sparse.linalg import spsolve
+import pytest
+
+from fealpy.mesh import TriangleMesh
+from fealpy.functionspace import LagrangeFESpace as Space
+from fealpy.fem import BilinearForm
+from fealpy.fem import ScalarDiffusionIntegrator
+from fealpy.fem import VectorDiffusionIntegrator
+from fealpy.fem import DirichletBC
+
+
+def solution(p):
+    return np.sin(p[..., 0])*np.exp(p[..., 1])
+
+
+@pytest.mark.parametrize('vector', [False, True])
+def test_inplace_and_eliminate(vector):
+    mesh = TriangleMesh.from_box(nx=4, ny=4)
+    space = Space(mesh, p=2, doforder='vdims')
+    if vector:
+        S = (space, )*2
+        bform = BilinearForm(S)
+        bform.add_domain_integrator(VectorDiffusionIntegrator())
+        gD = lambda p: np.stack([solution(p), 2*solution(p)], axis=-1)
+        function = lambda: space.function(dim=2)
+    else:
+        S = space
+        bform = BilinearForm(S)
+        bform.add_domain_integrator(ScalarDiffusionIntegrator())
+        gD = solution
+        function = lambda: space.function()
+
+    A = bform.assembly()
+    F = np.random.rand(A.shape[0])
+    bc = DirichletBC(S, gD)
+    A0, F0 = bc.apply(A.copy(), F, uh=function())
+    x0 = spsolve(A0, F0)
+
+    # 就地修改, 重复组装时复用边界非零元的位置
+    for i in range(2):
+        A = bform.assembly()
+        A1, F1 = bc.apply(A, F, uh=function(), inplace=True)
+        assert A1 is A
+        np.testing.assert_allclose(A1.toarray(), A0.toarray())
+        np.testing.assert_allclose(F1, F0)
+    pattern = bc._pattern
+    bc.apply(bform.assembly(), F, uh=function(), inplace=True)
+    assert bc._pattern is pattern
+
+    # 对称消去
+    uh = function()
+    AI, FI = bc.eliminate(bform.assembly(), F, uh)
+    assert AI.shape[0] == np.sum(bc.isFreeDof)
+    bc.restore(spsolve(AI, FI), uh)
+    np.testing.assert_allclose(uh.reshape(-1), x0, atol=1e-10)
+
+
+def test_inplace_reuse_matrix():
+    """
+    时间步进中矩阵只组装和处理一次, 每一步只改变右端向量
+    """
+    mesh = TriangleMesh.from_box(nx=8, ny=8)
+    space = Space(mesh, p=1)
+    bform = BilinearForm(space)
+    bform.add_domain_integrator(ScalarDiffusionIntegrator())
+    A = bform.assembly()
+    A0 = A.copy()
+    bc = DirichletBC(space, lambda p: 1 + p[..., 0])
+
+    for step in range(3):
+        F = np.random.rand(A.shape[0])
+        A1, F1 = bc.apply(A0.copy(), F, uh=space.function())
+        x0 = spsolve(A1, F1)
+
+        A, F2 = bc.apply(A, F, uh=space.function(), inplace=True)
+        np.testing.assert_allclose(spsolve(A, F2), x0, atol=1e-10)
+
+    # 恢复为处理之前的矩阵
+    bc._pattern.restore(A)
+    np.testing.assert_allclose(A.toarray(), A0.toarray())
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from fealpy.decorator import cartesian
+from fealpy.mesh import TriangleMesh, TetrahedronMesh
+from fealpy.functionspace import LagrangeFiniteElementSpace
+
+
+@cartesian
+def coef(p):
+    x = p[..., 0]
+    return x**2 + 1
+
+
+@pytest.mark.parametrize('pool, nprocs', [('process', 3), ('thread', 2), ('process', 1)])
+@pytest.mark.parametrize('mtype', ['tri', 'tet'])
+def test_parallel_construct_matrix(pool, nprocs, mtype):
+    if mtype == 'tri':
+        mesh = TriangleMesh.from_box(nx=6, ny=6)
+    else:
+        mesh = TetrahedronMesh.from_box(nx=2, ny=2, nz=2)
+    space = LagrangeFiniteElementSpace(mesh, p=2)
+    integralalg = space.integralalg
+    gdof = space.number_of_global_dofs()
+    cell2dof = space.cell_to_dof()
+    NC = mesh.number_of_cells()
+    NQ = len(integralalg.integrator.get_quadrature_points_and_weights()[1])
+    c = np.random.rand(NC) + 1
+
+    # memory 很小时每一块只有几个单元
+    kwargs = {'nprocs': nprocs, 'memory': 10**4, 'pool': pool}
+    for basis in [space.grad_basis, space.basis]:
+        b0 = (basis, cell2dof, gdof)
+        for c0, c1 in [(None, None), (2.0, 2.0), (coef, coef),
+                (c, np.broadcast_to(c, (NQ, NC)))]:
+            A = integralalg.parallel_construct_matrix(b0, c=c0, **kwargs)
+            A0 = integralalg.serial_construct_matrix(b0, c=c1)
+            np.testing.assert_allclose(A.toarray(), A0.toarray(), atol=1e-12)
+
+    K = np.array([[2.0, 1.0], [1.0, 3.0]])
+    if mtype == 'tri':
+        b0 = (space.grad_basis, cell2dof, gdof)
+        A = integralalg.parallel_construct_matrix(b0, c=K, **kwargs)
+        A0 = integralalg.serial_construct_matrix(b0, c=K)
+        np.testing.assert_allclose(A.toarray(), A0.toarray(), atol=1e-12)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from fealpy.mesh import TriangleMesh, QuadrangleMesh
+from fealpy.mesh import TetrahedronMesh, HexahedronMesh
+from fealpy.functionspace import LagrangeFESpace
+
+
+def solution(p):
+    return np.sum(p**2, axis=-1) + p[..., 0]*p[..., 1]
+
+
+def gradient(p):
+    val = 2*p
+    val[..., 0] += p[..., 1]
+    val[..., 1] += p[..., 0]
+    return val
+
+
+@pytest.mark.parametrize('Mesh', [TriangleMesh, QuadrangleMesh,
+    TetrahedronMesh, HexahedronMesh])
+@pytest.mark.parametrize('p', [2, 3])
+def test_probe(Mesh, p):
+    if Mesh in {TetrahedronMesh, HexahedronMesh}:
+        mesh = Mesh.from_box(nx=2, ny=3, nz=2)
+        GD = 3
+    else:
+        mesh = Mesh.from_box(nx=4, ny=3)
+        GD = 2
+    space = LagrangeFESpace(mesh, p=p)
+    uh = space.interpolate(solution)
+
+    rng = np.random.default_rng(0)
+    points = rng.random((100, GD))
+    points[0] = 2.0 # 不在网格中的点
+    probe = space.probe(points)
+
+    val = probe(uh)
+    assert np.isnan(val[0])
+    np.testing.assert_allclose(val[1:], solution(points[1:]), atol=1e-12)
+
+    gval = probe.grad_value(uh)
+    assert gval.shape == (100, GD)
+    np.testing.assert_allclose(gval[1:], gradient(points[1:]), atol=1e-10)
+
+    # 向量函数和多个函数
+    vh = space.function(dim=2)
+    vh[:, 0] = uh
+    vh[:, 1] = 2*uh
+    val = probe(vh)
+    assert val.shape == (100, 2)
+    np.testing.assert_allclose(val[1:, 1], 2*solution(points[1:]), atol=1e-12)
+    assert probe([uh, 2*uh]).shape == (2, 100)
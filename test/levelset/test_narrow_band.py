@@ -0,0 +1,107 @@
+import pytest
+import numpy as np
+
+from scipy.sparse.linalg import spsolve
+
+from fealpy.functionspace import LagrangeFESpace
+from fealpy.mesh.triangle_mesh import TriangleMesh
+from fealpy.decorator import cartesian
+from fealpy.levelset import LSFEMSolver, NarrowBand
+
+
+@pytest.fixture
+def narrow_band_setup():
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=64, ny=64)
+    space = LagrangeFESpace(mesh, p=1)
+
+    # A rigid rotation around the center of the domain.
+    @cartesian
+    def velocity_field(p):
+        u = np.zeros(p.shape)
+        u[..., 0] = 0.5 - p[..., 1]
+        u[..., 1] = p[..., 0] - 0.5
+        return u
+
+    @cartesian
+    def circle(p):
+        x = p[..., 0]
+        y = p[..., 1]
+        return np.sqrt((x - 0.5)**2 + (y - 0.75)**2) - 0.15
+
+    phi0 = space.interpolate(circle)
+    u = space.interpolate(velocity_field, dim=2)
+    return space, u, phi0
+
+
+def test_narrow_band_build(narrow_band_setup):
+    space, u, phi0 = narrow_band_setup
+    mesh = space.mesh
+
+    band = NarrowBand(space, width=0.05)
+    assert band.update(phi0)
+    assert not band.update(phi0)
+
+    # The band contains all the interface cells and only a part of the mesh.
+    isInterfaceCell = mesh.mark_interface_cell(np.asarray(phi0))
+    assert np.all(band.isActiveCell[isInterfaceCell])
+    assert len(band.dof) < space.number_of_global_dofs()/4
+
+    # The matrices on the band are the submatrices of the global ones.
+    solver = LSFEMSolver(space, u=u)
+    isInnerDof = ~band.isEdgeDof[band.dof]
+    dof = band.dof[isInnerDof]
+    M = band.mass_matrix()
+    C = band.convection_matrix(u)
+    assert np.allclose(M[isInnerDof][:, isInnerDof].toarray(), solver.M[dof][:, dof].toarray())
+    assert np.allclose(C[isInnerDof][:, isInnerDof].toarray(), solver.C[dof][:, dof].toarray())
+
+    # After moving the interface, only the active cells are cached and the
+    # matrices of the cells still in the band are reused.
+    band.build(phi0 - 0.03)
+    assert len(band._M) == len(band.activeCell)
+    assert np.all(band.g2c[band.activeCell] == np.arange(len(band.activeCell)))
+    assert np.sum(band.g2c >= 0) == len(band.activeCell)
+    isInnerDof = ~band.isEdgeDof[band.dof]
+    dof = band.dof[isInnerDof]
+    M = band.mass_matrix()
+    C = band.convection_matrix(u, cache=True)
+    assert np.allclose(M[isInnerDof][:, isInnerDof].toarray(), solver.M[dof][:, dof].toarray())
+    assert np.allclose(C[isInnerDof][:, isInnerDof].toarray(), solver.C[dof][:, dof].toarray())
+
+
+def test_narrow_band_solve(narrow_band_setup):
+    space, u, phi0 = narrow_band_setup
+    solver = LSFEMSolver(space, u=u)
+
+    dt = 0.01
+    nt = 20
+    A = (solver.M + dt/2*solver.C).tocsc()
+    B = solver.M - dt/2*solver.C
+    phi1 = phi0.copy()
+    for _ in range(nt):
+        phi1 = spsolve(A, B@phi1)
+
+    phi2 = space.function()
+    phi2[:] = phi0
+    for _ in range(nt):
+        solver.narrow_band_solve(phi2, dt, width=0.05)
+
+    # The exact solution is the rotated circle.
+    theta = dt*nt
+    c = np.array([0.5 - 0.25*np.sin(theta), 0.5 + 0.25*np.cos(theta)])
+    node = space.mesh.entity('node')
+    phi = np.sqrt(np.sum((node - c)**2, axis=-1)) - 0.15
+
+    # Near the interface the error is well below the mesh size, the band is
+    # rebuilt (and redistanced) a few times on the way.
+    isNear = np.abs(phi) < 1/64
+    assert np.max(np.abs(phi1 - phi)[isNear]) < 5e-3
+    assert np.max(np.abs(phi2 - phi)[isNear]) < 5e-3
+    assert 1 < solver.band.nrebuild < nt
+
+    # The interface is inside the band and the values outside are at least the width.
+    band = solver.band
+    isOutside = np.ones(space.number_of_global_dofs(), dtype=np.bool_)
+    isOutside[band.dof] = False
+    assert np.all(band.isActiveCell[space.mesh.mark_interface_cell(np.asarray(phi2))])
+    assert np.all(np.abs(phi2[isOutside]) >= 0.05)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from fealpy.mesh import TriangleMesh, QuadrangleMesh, PolygonMesh
+from fealpy.mesh import TetrahedronMesh, HexahedronMesh
+from fealpy.functionspace import LagrangeFESpace
+
+
+def lshape(p):
+    # L 形区域, 去掉 [0.5, 1]^2 中的单元
+    return np.all(p[..., :2] > 0.5, axis=-1)
+
+
+@pytest.mark.parametrize('Mesh', [TriangleMesh, QuadrangleMesh, PolygonMesh,
+    TetrahedronMesh, HexahedronMesh])
+def test_locate_nonconvex(Mesh):
+    if Mesh in {TetrahedronMesh, HexahedronMesh}:
+        mesh = Mesh.from_box(nx=4, ny=4, nz=3, threshold=lshape)
+        GD = 3
+    else:
+        mesh = Mesh.from_box(nx=8, ny=8, threshold=lshape)
+        GD = 2
+    NC = mesh.number_of_cells()
+
+    # 单元的重心都在各自的单元内
+    loc, bc = mesh.locate(mesh.entity_barycenter('cell'))
+    np.testing.assert_array_equal(loc, np.arange(NC))
+
+    rng = np.random.default_rng(0)
+    points = rng.random((1000, GD))
+    loc, bc = mesh.locate(points)
+    isOut = lshape(points)
+    assert np.all(loc[isOut] == -1)
+    assert np.all(loc[~isOut] >= 0)
+
+    if Mesh in {TriangleMesh, TetrahedronMesh}:
+        cell = mesh.entity('cell')[loc[~isOut]]
+        ps = np.einsum('ij, ijk->ik', bc[~isOut], mesh.entity('node')[cell])
+        np.testing.assert_allclose(ps, points[~isOut], atol=1e-12)
+    elif Mesh in {QuadrangleMesh, HexahedronMesh}:
+        for i in np.nonzero(~isOut)[0][:20]:
+            b = tuple(val[[i]] for val in bc)
+            ps = mesh.bc_to_point(b, index=loc[[i]])
+            np.testing.assert_allclose(ps.reshape(-1), points[i], atol=1e-12)
+
+
+@pytest.mark.parametrize('Mesh', [TriangleMesh, QuadrangleMesh])
+def test_function_value(Mesh):
+    mesh = Mesh.from_box(nx=5, ny=5, threshold=lshape)
+    space = LagrangeFESpace(mesh, p=2)
+    uh = space.interpolate(lambda p: p[..., 0]**2 + p[..., 0]*p[..., 1])
+    points = np.array([[0.1, 0.2], [0.7, 0.3], [0.25, 0.9], [0.8, 0.8]])
+    loc, val = space.function_value(uh, points)
+    u = points[:, 0]**2 + points[:, 0]*points[:, 1]
+    np.testing.assert_allclose(val[:3], u[:3])
+
+    # 不在网格中的点不能用最后一个单元求值
+    assert loc[3] == -1 and np.isnan(val[3])
+    loc, val = space.function_value([uh, 2*uh], points)
+    np.testing.assert_allclose(val[:, :3], [u[:3], 2*u[:3]])
+    assert np.all(np.isnan(val[:, 3]))
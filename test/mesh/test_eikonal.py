@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from fealpy.mesh import UniformMesh2d, UniformMesh3d, TriangleMesh, TetrahedronMesh
+from fealpy.mesh import fast_sweeping, fast_marching
+
+
+def test_fast_sweeping_2d():
+    # x 和 y 方向的剖分段数和步长不同
+    emax = []
+    for n in (32, 64):
+        mesh = UniformMesh2d((0, n, 0, 2*n), h=(2/n, 1.5/n), origin=(-1, -1.5))
+        node = mesh.entity('node')
+        r = np.sqrt(np.sum(node**2, axis=-1))
+        phi0 = (r**2 - 0.25)*np.exp(node[..., 0])
+        phi = mesh.fast_sweeping_method(phi0)
+        assert phi.shape == phi0.shape
+        assert np.all(np.sign(phi) == np.sign(phi0))
+        emax.append(np.max(np.abs(phi - (r - 0.5))))
+    assert emax[1] < emax[0]
+    assert emax[1] < 0.03
+
+    # 平面界面时是精确的
+    mesh = UniformMesh2d((0, 20, 0, 30), h=(0.1, 0.1))
+    node = mesh.node # (nx+1, ny+1, 2)
+    phi0 = 3*(node[..., 1] - 1.23)*(1 + node[..., 0])
+    phi, info = fast_sweeping(phi0, mesh.h, returninfo=True)
+    assert np.allclose(phi, node[..., 1] - 1.23)
+    assert info['niter'] <= 3
+
+
+def test_fast_sweeping_3d():
+    n = 24
+    mesh = UniformMesh3d((0, n, 0, n, 0, n), h=(2/n, 2/n, 2/n), origin=(-1, -1, -1))
+    node = mesh.entity('node')
+    r = np.sqrt(np.sum(node**2, axis=-1))
+    phi = mesh.fast_sweeping_method(r - 0.5, band=0.3)
+    assert np.max(np.abs(phi)) <= 0.3
+    isBand = np.abs(r - 0.5) < 0.25
+    assert np.max(np.abs(phi - (r - 0.5))[isBand]) < 0.05
+
+
+def test_fast_marching_2d():
+    emax = []
+    for n in (16, 32):
+        mesh = TriangleMesh.from_box([-1, 1, -1, 1], nx=n, ny=n)
+        node = mesh.entity('node')
+        r = np.sqrt(np.sum(node**2, axis=-1))
+        phi = fast_marching(mesh, (r**2 - 0.25)*(2 + node[:, 0]))
+        emax.append(np.max(np.abs(phi - (r - 0.5))))
+    assert emax[1] < emax[0]
+    assert emax[1] < 0.05
+
+    # 窄带: 只计算窄带中的节点
+    phi, info = fast_marching(mesh, r**2 - 0.25, band=0.1, returninfo=True)
+    assert info['naccepted'] < mesh.number_of_nodes()/4
+    isBand = np.abs(r - 0.5) < 0.1
+    assert np.max(np.abs(phi - (r - 0.5))[isBand]) < 0.01
+    assert np.all(np.abs(phi[~isBand]) >= 0.09)
+
+
+def test_fast_marching_3d():
+    mesh = TetrahedronMesh.from_box([-1, 1, -1, 1, -1, 1], nx=8, ny=8, nz=8)
+    node = mesh.entity('node')
+    phi0 = node[:, 0] + 2*node[:, 1] - 2*node[:, 2] - 0.1
+    phi = fast_marching(mesh, phi0)
+    # 平面界面, 边界上的节点的特征线可能来自网格外, 误差为 O(h)
+    e = np.abs(phi - phi0/3)
+    isInner = np.max(np.abs(node), axis=-1) < 1
+    assert np.max(e[isInner]) < 0.02
+    assert np.max(e) < 0.5*0.25
+
+
+def test_fast_marching_batch():
+    # 成批确定节点的结果与逐个确定节点的结果一致
+    for mesh in (TriangleMesh.from_box([-1, 1, -1, 1], nx=32, ny=32),
+            TetrahedronMesh.from_box([-1, 1, -1, 1, -1, 1], nx=8, ny=8, nz=8)):
+        node = mesh.entity('node')
+        r = np.sqrt(np.sum(node**2, axis=-1))
+        phi0 = (r**2 - 0.25)*(2 + node[:, 0])
+        phi, info = fast_marching(mesh, phi0, returninfo=True)
+        phi1, info1 = fast_marching(mesh, phi0, delta=0.0, returninfo=True)
+        assert info['naccepted'] == info1['naccepted'] == mesh.number_of_nodes()
+        assert info['nbatch'] < info1['nbatch']/10
+        np.testing.assert_allclose(phi, phi1, atol=1e-4)
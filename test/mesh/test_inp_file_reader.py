@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from fealpy.mesh import InpFileReader, TetrahedronMesh, HexahedronMesh
+
+
+INP = """*Heading
+** Job name: test
+*Part, name=Part-1
+*Node
+      1,           0.,           0.,           0.
+      2,           1.,           0.,           0.
+      4,           0.,           1.,           0.
+      5,           0.,           0.,           1.
+      7,           1.,           1.,           1.
+*Element, type=C3D4
+ 10, 1, 2, 4, 5
+ 11, 2, 4,
+     5, 7
+*Nset, nset=Set-1, generate
+ 1,  5,  4
+*Nset, nset=Set-2
+ 2, 7
+*Elset, elset=Set-3
+ 10, 11
+** Section: Section-1
+*Solid Section, elset=Set-3, material=Material-1
+,
+*End Part
+**
+*Assembly, name=Assembly
+*Instance, name=Part-1-1, part=Part-1
+*End Instance
+*Nset, nset=Set-4, instance=Part-1-1
+ 1, 2
+*End Assembly
+*Material, name=Material-1
+*Density
+ 7.8e-09,
+*Elastic
+ 210000., 0.3
+*Step, name=Step-1, nlgeom=NO
+*Static
+1., 1., 1e-05, 1.
+*End Step
+"""
+
+
+def test_inp_file_reader(tmp_path):
+    fname = tmp_path / 'test.inp'
+    fname.write_text(INP)
+    reader = InpFileReader(str(fname))
+    reader.parse()
+
+    part = reader.parts['Part-1']
+    node, nmap = part['node']
+    assert node.shape == (5, 3)
+    np.testing.assert_allclose(node[-1], [1, 1, 1])
+    assert nmap[7] == 4 and 3 not in nmap
+    with pytest.raises(KeyError):
+        nmap[3]
+    assert dict(nmap) == {1: 0, 2: 1, 4: 2, 5: 3, 7: 4}
+    np.testing.assert_array_equal(nmap[np.array([7, 1])], [4, 0])
+
+    cell, emap = part['elem']['C3D4']
+    np.testing.assert_array_equal(cell, [[0, 1, 2, 3], [1, 2, 3, 4]])
+    assert emap[11] == 1
+
+    np.testing.assert_array_equal(part['nset']['Set-1'][0], [0, 3])
+    np.testing.assert_array_equal(part['nset']['Set-2'][0], [1, 4])
+    np.testing.assert_array_equal(part['elset']['Set-3'], [10, 11])
+    # 只有一个逗号的数据行没有数据
+    assert len(part['solid_section'][('Set-3', 'Material-1')]) == 0
+
+    assembly = reader.assembly['Assembly']
+    assert ('Part-1-1', 'Part-1') in assembly['instance']
+    np.testing.assert_array_equal(assembly['nset'][('Set-4', 'Part-1-1')], [1, 2])
+
+    np.testing.assert_allclose(reader.materials['Material-1']['elastic'], [210000., 0.3])
+    np.testing.assert_allclose(reader.materials['Material-1']['density'], [7.8e-9])
+    assert 'Step-1' in reader.step
+
+    mesh = reader.to_mesh()
+    assert isinstance(mesh, TetrahedronMesh)
+    assert mesh.number_of_cells() == 2
+
+
+def test_inp_file_reader_missing_node(tmp_path):
+    # 单元引用了没有定义的节点 3, 不能映射到其它节点上
+    inp = INP.replace(' 11, 2, 4,', ' 11, 2, 3,')
+    fname = tmp_path / 'test.inp'
+    fname.write_text(inp)
+    reader = InpFileReader(str(fname))
+    with pytest.raises(KeyError):
+        reader.parse()
+
+
+def test_inp_file_reader_empty_set(tmp_path):
+    # 只有空白的数据行得到空的集合
+    inp = INP.replace('*Nset, nset=Set-2\n 2, 7\n', '*Nset, nset=Set-2\n \n')
+    fname = tmp_path / 'test.inp'
+    fname.write_text(inp)
+    reader = InpFileReader(str(fname))
+    reader.parse()
+    part = reader.parts['Part-1']
+    assert len(part['nset']['Set-2'][0]) == 0
+    assert part['nset']['Set-2'][0].dtype == np.int_
+
+
+def test_inp_file_reader_comment_encoding(tmp_path):
+    # 注释行不是 UTF-8 编码时也可以读入
+    fname = tmp_path / 'test.inp'
+    fname.write_bytes(INP.replace('** Job name: test', '** Job name: t\xe9st').encode('latin-1'))
+    reader = InpFileReader(str(fname))
+    reader.parse()
+    assert reader.parts['Part-1']['node'][0].shape == (5, 3)
+
+
+def test_inp_file_reader_hex(tmp_path):
+    mesh = HexahedronMesh.from_box(nx=3, ny=2, nz=2)
+    node = mesh.entity('node')
+    cell = mesh.entity('cell')
+    lines = ['*Part, name=Box', '*Node']
+    lines += [f'{i+1}, {x}, {y}, {z}' for i, (x, y, z) in enumerate(node)]
+    lines += ['*Element, type=C3D8R']
+    lines += [f'{i+1}, ' + ', '.join(str(v+1) for v in c) for i, c in enumerate(cell)]
+    lines += ['*End Part']
+    fname = tmp_path / 'box.inp'
+    fname.write_text('\r\n'.join(lines))
+
+    reader = InpFileReader(str(fname))
+    m = reader.to_mesh(part='Box')
+    assert isinstance(m, HexahedronMesh)
+    np.testing.assert_allclose(m.entity('node'), node)
+    np.testing.assert_array_equal(m.entity('cell'), cell)
+    np.testing.assert_allclose(np.sum(m.entity_measure('cell')), 1.0)
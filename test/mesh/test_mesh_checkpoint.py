@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+
+from fealpy.mesh import TriangleMesh, TetrahedronMesh, QuadrangleMesh
+from fealpy.mesh import save_checkpoint, load_checkpoint
+from fealpy.functionspace import LagrangeFESpace
+
+
+@pytest.mark.parametrize('mesh', [
+    TriangleMesh.from_box([0, 1, 0, 1], nx=4, ny=4),
+    QuadrangleMesh.from_box([0, 1, 0, 1], nx=3, ny=2),
+    TetrahedronMesh.from_box([0, 1, 0, 1, 0, 1], nx=2, ny=2, nz=2)])
+@pytest.mark.parametrize('mmap_mode', ['c', None])
+def test_mesh_checkpoint(tmp_path, mesh, mmap_mode):
+    path = str(tmp_path / 'ckpt')
+    mesh.celldata['flag'] = np.arange(mesh.number_of_cells()) % 2 == 0
+    save_checkpoint(path, mesh, t=0.5, step=np.int64(10))
+
+    m, fields, meta = load_checkpoint(path, mmap_mode=mmap_mode)
+    assert type(m) is type(mesh)
+    assert meta == {'t': 0.5, 'step': 10}
+    assert fields == {}
+    np.testing.assert_array_equal(m.entity('node'), mesh.entity('node'))
+    for etype in ('cell', 'face', 'edge'):
+        np.testing.assert_array_equal(m.entity(etype), mesh.entity(etype))
+    np.testing.assert_array_equal(m.ds.face2cell, mesh.ds.face2cell)
+    np.testing.assert_array_equal(m.ds.cell_to_edge(), mesh.ds.cell_to_edge())
+    np.testing.assert_array_equal(m.ds.boundary_node_flag(),
+            mesh.ds.boundary_node_flag())
+    np.testing.assert_array_equal(m.celldata['flag'], mesh.celldata['flag'])
+    assert m.number_of_nodes() == mesh.number_of_nodes()
+    assert m.ds.topology_stamp != mesh.ds.topology_stamp
+    np.testing.assert_allclose(m.entity_measure('cell'), mesh.entity_measure('cell'))
+
+
+def test_function_checkpoint(tmp_path):
+    path = str(tmp_path / 'ckpt')
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=4, ny=4)
+    space = LagrangeFESpace(mesh, p=2)
+    vspace = LagrangeFESpace(mesh, p=1, doforder='sdofs')
+    uh = space.interpolate(lambda p: np.sin(p[..., 0])*p[..., 1])
+    vh = vspace.function(dim=2)
+    vh[:] = np.random.rand(*vh.shape)
+    ph = space.function()
+    ph[:] = 1.0
+    save_checkpoint(path, mesh, fields={'u': uh, 'v': vh, 'p': ph,
+        'w': np.arange(3)}, t=1.0)
+
+    # 覆盖已有的检查点
+    uh[:] *= 2
+    save_checkpoint(path, mesh, fields={'u': uh, 'v': vh, 'p': ph,
+        'w': np.arange(3)}, t=2.0)
+
+    m, fields, meta = load_checkpoint(path)
+    assert meta['t'] == 2.0
+    u, v, p, w = fields['u'], fields['v'], fields['p'], fields['w']
+    np.testing.assert_allclose(u, uh)
+    np.testing.assert_allclose(v, vh)
+    np.testing.assert_array_equal(w, np.arange(3))
+    assert u.space is p.space # 参数相同的函数共用空间
+    assert (u.space.p, v.space.p, v.space.doforder) == (2, 1, 'sdofs')
+    assert u.space.mesh is m
+
+    # 恢复的函数可以直接使用, 修改不会写回检查点
+    np.testing.assert_allclose(u.space.cell_to_dof(), space.cell_to_dof())
+    bc = np.array([[1/3, 1/3, 1/3]])
+    np.testing.assert_allclose(u(bc), uh(bc))
+    u[:] = 0.0
+    _, fields, _ = load_checkpoint(path)
+    np.testing.assert_allclose(fields['u'], uh)
+
+    # 覆盖后不留下 .old 目录; 两次改名之间中断时读入 .old
+    assert not os.path.exists(path + '.old')
+    os.replace(path, path + '.old')
+    _, fields, meta = load_checkpoint(path)
+    assert meta['t'] == 2.0
+    np.testing.assert_allclose(fields['u'], uh)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from fealpy.mesh import TriangleMesh, QuadrangleMesh
+from fealpy.mesh import TetrahedronMesh, HexahedronMesh
+from fealpy.mesh.mesh_data_structure import unique_entity
+
+
+def old_unique(total):
+    _, i0, j = np.unique(np.sort(total, axis=1),
+            return_index=True,
+            return_inverse=True,
+            axis=0)
+    return i0, j.reshape(-1)
+
+
+@pytest.mark.parametrize('k', [2, 3, 4])
+@pytest.mark.parametrize('NN', [None, 2**40, np.int64(2**40)])
+@pytest.mark.parametrize('dtype', [np.int_, np.int32, np.uint64, np.float64])
+def test_unique_entity(k, NN, dtype):
+    # NN 很大时键值会溢出, 走 lexsort 分支
+    rng = np.random.default_rng(k)
+    total = rng.integers(0, 30, size=(1000, k)).astype(dtype)
+    i0, j = unique_entity(total, NN=NN)
+    i1, j1 = old_unique(total)
+    np.testing.assert_array_equal(i0, i1)
+    np.testing.assert_array_equal(j, j1)
+
+
+@pytest.mark.parametrize('Mesh', [TriangleMesh, QuadrangleMesh,
+    TetrahedronMesh, HexahedronMesh])
+def test_construct(Mesh):
+    if Mesh in {TriangleMesh, QuadrangleMesh}:
+        mesh = Mesh.from_box(nx=5, ny=4)
+    else:
+        mesh = Mesh.from_box(nx=3, ny=4, nz=2)
+    ds = mesh.ds
+
+    i0, j = old_unique(ds.total_face())
+    np.testing.assert_array_equal(ds.face, ds.total_face()[i0])
+    if mesh.top_dimension() == 3:
+        i0, j = old_unique(ds.total_edge())
+        np.testing.assert_array_equal(ds.edge, ds.total_edge()[i0])
+        np.testing.assert_array_equal(ds.cell2edge.reshape(-1), j)
+
+
+def test_relation_cache():
+    mesh = TriangleMesh.from_box(nx=4, ny=4)
+    ds = mesh.ds
+    cache = ds.relation_cache
+
+    cell2cell = ds.cell_to_cell()
+    # 默认参数与显式给出的参数共用一个缓存
+    np.testing.assert_array_equal(ds.cell_to_cell(return_sparse=False), cell2cell)
+    assert cache.info()['cell_to_cell'] == (1, 1)
+
+    # 返回的是只读视图, 不能原地修改, 复制后可以修改
+    assert not cell2cell.flags.writeable
+    with pytest.raises(ValueError):
+        cell2cell[:] = -1
+    c2c = cell2cell.copy()
+    c2c[:] = -1
+    assert np.all(ds.cell_to_cell() >= 0)
+    # 缓存的是只读视图, 数据结构自己的数组（如 face2cell）仍然可写
+    assert not ds.cell_to_edge().flags.writeable
+    assert ds.face2cell.flags.writeable
+
+    A = ds.cell_to_cell(return_sparse=True)
+    assert cache.info()['cell_to_cell'] == (2, 2)
+    assert (A != ds.cell_to_cell(return_sparse=True)).nnz == 0
+
+    isBdNode = ds.boundary_node_flag()
+    assert np.sum(isBdNode) == 16
+    # 边界标记返回可写的副本
+    isBdNode[:] = False
+    assert np.sum(ds.boundary_node_flag()) == 16
+
+    # 加密后拓扑改变, 缓存自动失效
+    mesh.uniform_refine()
+    assert ds.cell_to_cell().shape == (mesh.number_of_cells(), 3)
+    assert np.sum(ds.boundary_node_flag()) == 32
+    assert cache.info()['boundary_node_flag'] == (1, 2)
+
+    cache.enabled = False
+    ds.cell_to_cell()
+    assert cache.info()['cell_to_cell'] == (3, 3)
@@ -95,7 +95,28 @@ def test_integral():
         return val
     a = mesh.integral(f, q=5, celltype=False)
     np.testing.assert_allclose(a,2/3,atol=1e-16)
-    return a 
+    return a
+
+def test_integral_alg():
+    from fealpy.quadrature import PolygonMeshIntegralAlg
+    tmesh = TriangleMesh.from_box([0, 1, 0, 1], nx=10, ny=10)
+    mesh = PolygonMesh.from_triangle_mesh_by_dual(tmesh)
+    integralalg = PolygonMeshIntegralAlg(mesh, 5)
+
+    def f(p, index):
+        x = p[..., 0]
+        y = p[..., 1]
+        val = np.zeros(p.shape[:-1] + (2, ), dtype=np.float64)
+        val[..., 0] = x**2 + y**2
+        val[..., 1] = index
+        return val
+
+    # 子三角形的积分表只计算一次
+    e = integralalg.integral(f, celltype=True)
+    assert integralalg.cell_quadrature() is integralalg.cell_quadrature(5)
+    np.testing.assert_allclose(e, mesh.integral(f, q=5, celltype=True), atol=1e-15)
+    np.testing.assert_allclose(e[:, 1], np.arange(mesh.number_of_cells())*mesh.entity_measure('cell'))
+    np.testing.assert_allclose(integralalg.integral(f, q=3)[0], 2/3)
 
 if __name__ == "__main__":
     #test_polygon_mesh_constructor()
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import spsolve
+
+from fealpy.mesh import UniformMesh1d, UniformMesh2d, UniformMesh3d
+from fealpy.mesh.uniform_mesh_stencil import StencilOperator, elliptic_stencil
+
+
+def reference_elliptic(shape, h, d, c, r):
+    """
+    逐个节点组装 -div(d grad u) + c . grad u + r u 的差分矩阵
+    """
+    NN = int(np.prod(shape))
+    k = np.arange(NN).reshape(shape)
+    I, J, V = [], [], []
+    for idx in np.ndindex(*shape):
+        i = k[idx]
+        I.append(i); J.append(i); V.append(r[idx])
+        for axis in range(len(shape)):
+            h2 = h[axis]**2
+            for s in (1, -1):
+                nb = list(idx)
+                nb[axis] += s
+                dn = d[tuple(nb)] if 0 <= nb[axis] < shape[axis] else d[idx]
+                df = (d[idx] + dn)/2/h2
+                I.append(i); J.append(i); V.append(df)
+                if 0 <= nb[axis] < shape[axis]:
+                    I.append(i); J.append(k[tuple(nb)])
+                    V.append(-df + s*c[idx + (axis, )]/(2*h[axis]))
+    return coo_matrix((V, (I, J)), shape=(NN, NN)).toarray()
+
+
+@pytest.mark.parametrize("shape, h", [
+    ((7, ), (0.1, )),
+    ((5, 6), (0.1, 0.2)),
+    ((3, 4, 5), (0.3, 0.2, 0.1))])
+def test_elliptic_stencil(shape, h):
+    rng = np.random.default_rng(0)
+    d = rng.random(shape) + 1
+    c = rng.random(shape + (len(shape), ))
+    r = rng.random(shape)
+
+    A = elliptic_stencil(shape, h, d=d, c=c, r=r)
+    B = reference_elliptic(shape, h, d, c, r)
+    assert np.allclose(A.tocsr().toarray(), B)
+
+    u = rng.random(shape)
+    assert np.allclose(A.apply(u), (B@u.reshape(-1)).reshape(shape))
+    assert np.allclose(A@u.reshape(-1), B@u.reshape(-1))
+    assert np.allclose(A.diagonal(), np.diag(B))
+
+
+def test_stencil_arithmetic():
+    mesh = UniformMesh2d((0, 8, 0, 6), h=(1/8, 1/6))
+    L = mesh.laplace_operator(matrix_free=True)
+    assert L.kernel() is not None
+
+    tau = 1e-3
+    S = 1 - tau*L
+    A = mesh.parabolic_operator_forward(tau)
+    assert isinstance(S, StencilOperator)
+    assert np.allclose(S.tocsr().toarray(), A.toarray())
+
+    u = np.random.rand(*mesh.stencil_shape())
+    out = np.empty_like(u)
+    S.apply(u, out=out)
+    assert np.allclose(out.reshape(-1), A@u.reshape(-1))
+
+    # 系数为数组时按切片计算
+    S = S + np.ones(mesh.stencil_shape())
+    assert S.kernel() is None
+    assert np.allclose((S@u).reshape(-1), A@u.reshape(-1) + u.reshape(-1))
+
+
+def test_laplace_operator():
+    mesh = UniformMesh2d((0, 2, 0, 2), h=(1.0, 1.0))
+    A = mesh.laplace_operator()
+    expected = np.array([
+        [ 4, -1,  0, -1,  0,  0,  0,  0,  0],
+        [-1,  4, -1,  0, -1,  0,  0,  0,  0],
+        [ 0, -1,  4,  0,  0, -1,  0,  0,  0],
+        [-1,  0,  0,  4, -1,  0, -1,  0,  0],
+        [ 0, -1,  0, -1,  4, -1,  0, -1,  0],
+        [ 0,  0, -1,  0, -1,  4,  0,  0, -1],
+        [ 0,  0,  0, -1,  0,  0,  4, -1,  0],
+        [ 0,  0,  0,  0, -1,  0, -1,  4, -1],
+        [ 0,  0,  0,  0,  0, -1,  0, -1,  4]])
+    assert np.allclose(A.toarray(), expected)
+
+    mesh = UniformMesh3d((0, 2, 0, 3, 0, 4), h=(0.5, 0.25, 0.125))
+    A = mesh.laplace_operator()
+    assert np.allclose(A.diagonal(), 2*(4 + 16 + 64))
+    assert abs(A - A.T).max() == 0
+
+
+def test_wave_operator():
+    mesh = UniformMesh1d([0, 10], h=0.1)
+    tau = 0.01
+    A0, A1, A2 = mesh.wave_operator_implicit(tau, theta=0.25)
+    L = mesh.laplace_operator().toarray()*tau**2
+    I = np.eye(L.shape[0])
+    assert np.allclose(A0.toarray(), I + 0.25*L)
+    assert np.allclose(A1.toarray(), 2*I - 0.5*L)
+    assert np.allclose(A2.toarray(), -I - 0.25*L)
+
+    A = mesh.wave_operator_explicit(tau, matrix_free=True)
+    assert np.allclose(A.tocsr().toarray(), 2*I - L)
+
+
+def test_elliptic_operator_convergence():
+    """
+    -div(d grad u) + c . grad u + r u = f, u = sin(pi x) sin(pi y),
+    d = 1 + x^2 + y^2, c = (1, 2), r = 1
+    """
+    pi = np.pi
+    def solution(p):
+        x, y = p[..., 0], p[..., 1]
+        return np.sin(pi*x)*np.sin(pi*y)
+
+    def diffusion(p):
+        x, y = p[..., 0], p[..., 1]
+        return 1 + x**2 + y**2
+
+    def source(p):
+        x, y = p[..., 0], p[..., 1]
+        s, cs = np.sin(pi*x), np.cos(pi*x)
+        t, ct = np.sin(pi*y), np.cos(pi*y)
+        ux, uy = pi*cs*t, pi*s*ct
+        lap = -2*pi**2*s*t
+        d = 1 + x**2 + y**2
+        return -(d*lap + 2*x*ux + 2*y*uy) + ux + 2*uy + s*t
+
+    emax = []
+    for n in (16, 32):
+        mesh = UniformMesh2d((0, n, 0, n), h=(1/n, 1/n))
+        A = mesh.elliptic_operator(d=diffusion, c=(1.0, 2.0), r=1.0)
+        f = source(mesh.node).reshape(-1)
+        A, f = mesh.apply_dirichlet_bc(solution, A, f)
+        uh = spsolve(A, f)
+        emax.append(np.max(np.abs(uh - solution(mesh.node).reshape(-1))))
+    assert emax[1] < emax[0]/3.5
@@ -0,0 +1,44 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+
+from fealpy.solver import FactorizationCache
+
+
+def matrix(n, shift=0.0):
+    A = sp.diags([-1.0, 2.0 + shift, -1.0], [-1, 0, 1], shape=(n, n), format='csr')
+    return A
+
+
+def test_factorization_cache():
+    cache = FactorizationCache(maxsize=2)
+    A = matrix(50)
+    b = np.random.rand(50)
+    x = cache.solve(A, b)
+    np.testing.assert_allclose(x, spsolve(A, b))
+    assert (cache.misses, cache.hits) == (1, 0)
+
+    # 内容相同的矩阵共用分解, 多个右端一起求解
+    B = np.random.rand(50, 3)
+    X = cache.solve(A.copy().tocsc(), B)
+    np.testing.assert_allclose(X, spsolve(A.tocsc(), B))
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    # 原地修改后的矩阵重新分解
+    A.data[0] += 1.0
+    assert A not in cache
+    np.testing.assert_allclose(cache.solve(A, b), spsolve(A, b))
+    assert cache.misses == 2
+
+    # LRU 淘汰
+    A1 = matrix(50, shift=1.0)
+    cache.solve(A1, b)
+    assert len(cache) == 2
+    assert matrix(50) not in cache
+    assert A in cache and A1 in cache
+
+    cache = FactorizationCache(memory=0)
+    cache.solve(A, b)
+    cache.solve(A1, b)
+    assert len(cache) == 1
+    assert A1 in cache
@@ -0,0 +1,92 @@
+import itertools
+
+import numpy as np
+import pytest
+from scipy.sparse.linalg import spsolve, cg
+
+from fealpy.mesh import UniformMesh2d, UniformMesh3d
+from fealpy.solver import FastPoissonSolver
+
+
+@pytest.mark.parametrize("grid", ['node', 'cell'])
+@pytest.mark.parametrize("c", [0.0, 3.0])
+def test_solve(grid, c):
+    rng = np.random.default_rng(0)
+    for shape, h in [((6, 7), (0.1, 0.3)), ((4, 5, 6), (0.2, 0.1, 0.3))]:
+        for bc in itertools.product(('dirichlet', 'neumann', 'periodic'), repeat=len(shape)):
+            S = FastPoissonSolver(shape, h, bc=bc, c=c, grid=grid)
+            A = S.matrix()
+            f = rng.random(shape)
+            u = S.solve(f)
+            r = A@u.reshape(-1) - f.reshape(-1)
+            if S.singular:
+                # 奇异时右端项的平均值部分被忽略, 解的平均值为 0
+                r -= r.mean()
+                if grid == 'cell':
+                    assert abs(u.mean()) < 1e-12
+            assert np.max(np.abs(r)) < 1e-10
+
+
+def test_solve_dirichlet():
+    pi = np.pi
+    def solution(p):
+        return np.sin(pi*p[..., 0])*np.sin(pi*p[..., 1]) + p[..., 0]
+
+    def source(p):
+        return 2*pi**2*np.sin(pi*p[..., 0])*np.sin(pi*p[..., 1])
+
+    mesh = UniformMesh2d((0, 20, 0, 30), h=(1/20, 1/30))
+    node = mesh.entity('node')
+    S = FastPoissonSolver.from_mesh(mesh, bc='dirichlet')
+    assert S.shape == (19, 29)
+
+    ub = mesh.interpolate(solution)
+    u = S.solve_dirichlet(source(node), ub)
+
+    A = mesh.laplace_operator()
+    A, f = mesh.apply_dirichlet_bc(solution, A, source(node).reshape(-1))
+    assert np.allclose(u.reshape(-1), spsolve(A, f))
+
+
+def test_preconditioner():
+    """
+    用常系数的快速解法器作为 -div(d grad u) = f 的预条件子
+    """
+    iters = []
+    for n in (32, 64):
+        mesh = UniformMesh3d((0, n, 0, n, 0, n), h=(1/n, 1/n, 1/n))
+        S = FastPoissonSolver.from_mesh(mesh, bc='dirichlet')
+        shape = tuple(m + 2 for m in S.shape)
+
+        d = lambda p: 1 + 0.5*np.sin(2*np.pi*p[..., 0])*p[..., 1]
+        A = mesh.elliptic_operator(d=d, matrix_free=True)
+        inner = (slice(1, -1), )*3
+
+        # 只取内部节点对应的子矩阵
+        isInner = np.zeros(shape, dtype=np.bool_)
+        isInner[inner] = True
+        A = A.tocsr()[isInner.reshape(-1)][:, isInner.reshape(-1)]
+        f = np.ones(A.shape[0])
+
+        count = [0]
+        def callback(x):
+            count[0] += 1
+        x, info = cg(A, f, M=S.linear_operator(), callback=callback, rtol=1e-8)
+        assert info == 0
+        assert np.linalg.norm(A@x - f) < 1e-6*np.linalg.norm(f)
+        iters.append(count[0])
+    assert iters[1] <= iters[0] + 2
+    assert iters[1] < 30
+
+
+def test_mac_projection():
+    from fealpy.fdm.mac_ns_solver_2d import MACNSSolver2d
+    solver = MACNSSolver2d([0, 1, 0, 2], nx=32, ny=64)
+    rng = np.random.default_rng(0)
+    u = rng.random((33, 64))
+    v = rng.random((32, 65))
+    u[[0, -1], :] = 0
+    v[:, [0, -1]] = 0
+    u, v, phi = solver.projection(u, v, 0.01)
+    div = (u[1:] - u[:-1])/solver.dx + (v[:, 1:] - v[:, :-1])/solver.dy
+    assert np.max(np.abs(div)) < 1e-9
@@ -1,5 +1,6 @@
 import numpy as np
 import scipy.sparse as sp
+import pytest
 
 from fealpy.solver import GAMGSolver
 
@@ -42,6 +43,95 @@ def test_gamg():
     uh[:] = solver.solve(F)
 
 
+def test_resetup():
+    from scipy.sparse.linalg import cg, LinearOperator
+    from fealpy.solver.gamg_solver import condest
+    from fealpy.decorator import cartesian
+    from fealpy.mesh import TriangleMesh 
+    from fealpy.functionspace import LagrangeFESpace
+    from fealpy.fem import ScalarDiffusionIntegrator 
+    from fealpy.fem import BilinearForm
+
+    mesh = TriangleMesh.from_box(nx=40, ny=40)
+    space = LagrangeFESpace(mesh, p=1)
+    isBdDof = space.is_boundary_dof()
+
+    def matrix(c):
+        bform = BilinearForm(space)
+        bform.add_domain_integrator(ScalarDiffusionIntegrator(c=c, q=3))
+        A = bform.assembly()
+        # 边界自由度上置为单位阵
+        T = sp.diags(np.where(isBdDof, 0.0, 1.0))
+        return (T@A@T + sp.diags(isBdDof.astype(np.float64))).tocsr()
+
+    A0 = matrix(1.0)
+    solver = GAMGSolver(ptype='V', sstep=2)
+    solver.setup(A0)
+    P = [p.copy() for p in solver.P]
+
+    @cartesian
+    def coef(p):
+        return 1 + p[..., 0]**2
+
+    A1 = matrix(coef)
+    solver.resetup(A1)
+
+    # 延拓算子不变, 各层的矩阵为新矩阵的 Galerkin 乘积
+    assert len(P) == len(solver.P)
+    for P0, P1 in zip(P, solver.P):
+        assert (P0 != P1).nnz == 0
+    for l in range(len(solver.P)):
+        A = (solver.R[l] @ solver.A[l] @ solver.P[l]).toarray()
+        np.testing.assert_allclose(solver.A[l+1].toarray(), A, atol=1e-10)
+
+    N = A1.shape[0]
+    M = LinearOperator((N, N), matvec=solver.vcycle, dtype=A1.dtype)
+    b = np.ones(N)
+    x, info = cg(A1, b, M=M)
+    assert info == 0
+    assert np.linalg.norm(b - A1@x) < 1e-4*np.linalg.norm(b)
+
+    # 条件数的估计
+    A = solver.A[-1].toarray()
+    e = np.abs(np.linalg.eigvals(A))
+    np.testing.assert_allclose(condest(solver.A[-1]), e.max()/e.min(), rtol=1e-2)
+    # 最粗层的分解在估计条件数和求解中共用
+    np.testing.assert_allclose(solver.condest, condest(solver.A[-1], lu=solver.clu))
+
+@pytest.mark.parametrize('stype', ['GS', 'MGS', 'L1J', 'CHEB'])
+@pytest.mark.parametrize('ptype', ['V', 'W'])
+def test_smoother_type(stype, ptype):
+    from scipy.sparse.linalg import cg, LinearOperator
+    from fealpy.mesh import TriangleMesh 
+    from fealpy.functionspace import LagrangeFESpace
+    from fealpy.fem import ScalarDiffusionIntegrator 
+    from fealpy.fem import BilinearForm
+
+    mesh = TriangleMesh.from_box(nx=40, ny=40)
+    space = LagrangeFESpace(mesh, p=1)
+    bform = BilinearForm(space)
+    bform.add_domain_integrator(ScalarDiffusionIntegrator(q=3))
+    A = bform.assembly()
+    isBdDof = space.is_boundary_dof()
+    T = sp.diags(np.where(isBdDof, 0.0, 1.0))
+    A = (T@A@T + sp.diags(isBdDof.astype(np.float64))).tocsr()
+
+    solver = GAMGSolver(ptype=ptype, sstep=2, stype=stype)
+    solver.setup(A)
+    cycle = solver.vcycle if ptype == 'V' else solver.wcycle
+
+    N = A.shape[0]
+    M = LinearOperator((N, N), matvec=cycle, dtype=A.dtype)
+    b = np.ones(N)
+    counter = [0]
+    def callback(x):
+        counter[0] += 1
+    x, info = cg(A, b, M=M, callback=callback)
+    assert info == 0
+    assert counter[0] < 20
+    # 三角和对角部分只为 Gauss-Seidel 光滑子构造
+    assert (len(solver.L) > 0) == (stype == 'GS')
+
 
 if __name__ == "__main__":
     test_gamg()
@@ -0,0 +1,109 @@
+import numpy as np
+import scipy.sparse as sp
+import pytest
+
+from fealpy.mesh import TriangleMesh
+from fealpy.functionspace import LagrangeFESpace
+from fealpy.decorator import cartesian
+from fealpy.fem import BilinearForm
+from fealpy.fem import ScalarMassIntegrator, ScalarDiffusionIntegrator
+from fealpy.fem import ScalarConvectionIntegrator
+from fealpy.cfd import NSFEMSolver
+from fealpy.solver import SaddlePointPreconditioner
+
+
+@cartesian
+def velocity_field(p):
+    x = p[..., 0]
+    y = p[..., 1]
+    u = np.zeros(p.shape)
+    u[..., 0] = np.sin(np.pi * x) ** 2 * np.sin(2 * np.pi * y)
+    u[..., 1] = -np.sin(np.pi * y) ** 2 * np.sin(2 * np.pi * x)
+    return u
+
+
+def oseen_system(mu, wind, dt=1e8):
+    """
+    @brief P2-P1 元离散的 Oseen 方程, 速度为齐次 Dirichlet 边界条件,
+           返回去掉边界速度自由度后的块矩阵和压力空间上的矩阵
+    """
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=8, ny=8)
+    uspace = LagrangeFESpace(mesh, p=2, doforder='sdofs')
+    pspace = LagrangeFESpace(mesh, p=1, doforder='sdofs')
+    solver = NSFEMSolver(mesh, dt, uspace, pspace, rho=1.0, mu=mu)
+    un = uspace.interpolate(velocity_field, dim=2)
+    un[:] *= wind
+    A = solver.ossen_A(un)
+
+    isBdDof = uspace.is_boundary_dof()
+    pgdof = pspace.number_of_global_dofs()
+    isFree = np.r_[~isBdDof, ~isBdDof, np.ones(pgdof, dtype=np.bool_)]
+    A = A[isFree, :][:, isFree].tocsr()
+    n = 2*np.sum(~isBdDof)
+
+    def matrix(integrator):
+        bform = BilinearForm(pspace)
+        bform.add_domain_integrator(integrator)
+        return bform.assembly()
+
+    Mp = matrix(ScalarMassIntegrator(q=4))/mu
+    Ap = matrix(ScalarDiffusionIntegrator(q=4))
+    wp = pspace.interpolate(velocity_field, dim=2)
+    wp[:] *= wind
+    Fp = mu*Ap + matrix(ScalarConvectionIntegrator(c=wp, q=4))
+    return A, n, Mp, Ap, Fp/mu
+
+
+@pytest.mark.parametrize('stype', ['mass', 'lsc'])
+@pytest.mark.parametrize('ptype', ['upper', 'lower'])
+@pytest.mark.parametrize('usolver', ['gamg', 'direct'])
+def test_stokes(stype, ptype, usolver):
+    A, n, Mp, Ap, Fp = oseen_system(mu=1.0, wind=0.0)
+    P = SaddlePointPreconditioner(A, n, ptype=ptype, stype=stype, Mp=Mp,
+            usolver=usolver)
+    # 压力只确定到相差一个常数, 取相容的右端
+    x = np.random.default_rng(0).random(A.shape[0])
+    b = A@x
+    y, niter = P.solve(b, rtol=1e-8, maxit=200)
+    assert np.linalg.norm(b - A@y) < 1e-6*np.linalg.norm(b)
+    assert niter < 100
+
+
+@pytest.mark.parametrize('usolver', ['gamg', 'direct'])
+def test_simple(usolver):
+    # 时间步长较小时速度块以质量矩阵为主, diag(F) 是 F 很好的近似
+    A, n, Mp, Ap, Fp = oseen_system(mu=1.0, wind=1.0, dt=1e-3)
+    P = SaddlePointPreconditioner(A, n, ptype='upper', stype='simple',
+            usolver=usolver)
+    x = np.random.default_rng(0).random(A.shape[0])
+    b = A@x
+    y, niter = P.solve(b, rtol=1e-8, maxit=200)
+    assert np.linalg.norm(b - A@y) < 1e-6*np.linalg.norm(b)
+    assert niter < 100
+
+
+def test_minres():
+    A, n, Mp, Ap, Fp = oseen_system(mu=1.0, wind=0.0)
+    # 对称形式 [[F, -AP], [-AP^T, 0]]
+    A = sp.bmat([[A[:n, :n], A[:n, n:]], [-A[n:, :n], None]], format='csr')
+    P = SaddlePointPreconditioner(A, n, ptype='diag', stype='mass', Mp=Mp,
+            usolver='direct')
+    x = np.random.default_rng(0).random(A.shape[0])
+    b = A@x
+    y, niter = P.solve(b, method='minres', rtol=1e-10, maxit=500)
+    assert np.linalg.norm(b - A@y) < 1e-6*np.linalg.norm(b)
+
+    # 不收敛时给出警告, 而不是打印
+    with pytest.warns(RuntimeWarning, match='does not converge'):
+        P.solve(b, method='minres', rtol=1e-14, maxit=2)
+
+
+@pytest.mark.parametrize('stype', ['pcd', 'lsc'])
+def test_oseen(stype):
+    A, n, Mp, Ap, Fp = oseen_system(mu=0.05, wind=1.0)
+    P = SaddlePointPreconditioner(A, n, ptype='upper', stype=stype,
+            Mp=Mp*0.05, Ap=Ap, Fp=Fp*0.05, usolver='direct')
+    x = np.random.default_rng(0).random(A.shape[0])
+    b = A@x
+    y, niter = P.solve(b, rtol=1e-8, maxit=300)
+    assert np.linalg.norm(b - A@y) < 1e-6*np.linalg.norm(b)
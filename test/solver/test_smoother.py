@@ -0,0 +1,52 @@
+import numpy as np
+import scipy.sparse as sp
+import pytest
+
+from fealpy.mesh import TriangleMesh
+from fealpy.functionspace import LagrangeFESpace
+from fealpy.fem import ScalarDiffusionIntegrator
+from fealpy.fem import BilinearForm
+from fealpy.solver.smoother import graph_coloring
+from fealpy.solver.smoother import GaussSeidelSmoother
+from fealpy.solver.smoother import MulticolorGaussSeidelSmoother
+from fealpy.solver.smoother import L1JacobiSmoother
+from fealpy.solver.smoother import ChebyshevSmoother
+
+
+def matrix(p=2):
+    mesh = TriangleMesh.from_box(nx=10, ny=10)
+    space = LagrangeFESpace(mesh, p=p)
+    bform = BilinearForm(space)
+    bform.add_domain_integrator(ScalarDiffusionIntegrator(q=p+2))
+    A = bform.assembly()
+    isBdDof = space.is_boundary_dof()
+    T = sp.diags(np.where(isBdDof, 0.0, 1.0))
+    return (T@A@T + sp.diags(isBdDof.astype(np.float64))).tocsr()
+
+
+def test_graph_coloring():
+    A = matrix()
+    color = graph_coloring(A)
+    assert np.all(color >= 0)
+    # 相邻的自由度颜色不同
+    G = sp.triu(A, k=1).tocsr()
+    G.eliminate_zeros()
+    G = G.tocoo()
+    assert np.all(color[G.row] != color[G.col])
+
+
+@pytest.mark.parametrize('Smoother', [GaussSeidelSmoother,
+    MulticolorGaussSeidelSmoother, L1JacobiSmoother, ChebyshevSmoother])
+def test_smoother(Smoother):
+    A = matrix()
+    N = A.shape[0]
+    x = np.random.default_rng(1).random(N)
+    b = A@x
+    S = Smoother(A)
+    for lower in [True, False]:
+        x0 = np.zeros(N)
+        e0 = np.sqrt((x - x0)@A@(x - x0))
+        S.smooth(b, x0, lower=lower, maxit=3)
+        e1 = np.sqrt((x - x0)@A@(x - x0))
+        # 光滑子在能量范数下是收缩的
+        assert e1 < e0
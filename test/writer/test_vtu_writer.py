@@ -0,0 +1,153 @@
+import os
+import sys
+import importlib
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from fealpy.mesh import TriangleMesh, TetrahedronMesh
+from fealpy.writer import VTUWriter, MeshWriter, write_vtu
+
+
+def read_vtu(fname):
+    vtk = pytest.importorskip('vtk')
+    from vtk.util.numpy_support import vtk_to_numpy
+    reader = vtk.vtkXMLUnstructuredGridReader()
+    reader.SetFileName(fname)
+    reader.Update()
+    grid = reader.GetOutput()
+    node = vtk_to_numpy(grid.GetPoints().GetData())
+    cell = vtk_to_numpy(grid.GetCells().GetConnectivityArray())
+    pdata = grid.GetPointData()
+    cdata = grid.GetCellData()
+    nodedata = {pdata.GetArrayName(i): vtk_to_numpy(pdata.GetArray(i))
+            for i in range(pdata.GetNumberOfArrays())}
+    celldata = {cdata.GetArrayName(i): vtk_to_numpy(cdata.GetArray(i))
+            for i in range(cdata.GetNumberOfArrays())}
+    return node, cell, nodedata, celldata
+
+
+@pytest.mark.parametrize('compress', [True, False])
+@pytest.mark.parametrize('mesh', [
+    TriangleMesh.from_box([0, 1, 0, 1], nx=4, ny=3),
+    TetrahedronMesh.from_box([0, 1, 0, 1, 0, 1], nx=2, ny=2, nz=2)])
+def test_write_vtu(tmp_path, mesh, compress):
+    fname = str(tmp_path / 'mesh.vtu')
+    NN = mesh.number_of_nodes()
+    NC = mesh.number_of_cells()
+    GD = mesh.geo_dimension()
+    u = np.sin(mesh.entity('node')[:, 0])
+    v = mesh.entity('node').copy()
+    flag = np.arange(NC) % 2 == 0
+
+    write_vtu(fname, *mesh.to_vtk(), nodedata={'u': u, 'v': v},
+            celldata={'flag': flag, 'idx': np.arange(NC)}, compress=compress)
+
+    node, cell, nodedata, celldata = read_vtu(fname)
+    np.testing.assert_allclose(node[:, :GD], mesh.entity('node'))
+    np.testing.assert_array_equal(cell.reshape(NC, -1), mesh.entity('cell'))
+    np.testing.assert_allclose(nodedata['u'], u)
+    assert nodedata['v'].shape == (NN, 3) # 二维向量补齐为三维
+    np.testing.assert_allclose(nodedata['v'][:, :GD], v)
+    np.testing.assert_array_equal(celldata['flag'], flag)
+    np.testing.assert_array_equal(celldata['idx'], np.arange(NC))
+
+
+def test_mesh_to_vtk(tmp_path):
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=2, ny=2)
+    mesh.nodedata['u'] = mesh.entity('node')[:, 1]
+    fname = str(tmp_path / 'mesh.vtu')
+    mesh.to_vtk(fname=fname)
+    node, cell, nodedata, _ = read_vtu(fname)
+    np.testing.assert_allclose(nodedata['u'], mesh.nodedata['u'])
+
+
+def test_mesh_to_vtk_high_order(tmp_path):
+    # p=2 的自由度数组比节点多, 只写出前 NN 个（节点上的值）
+    from fealpy.functionspace import LagrangeFESpace
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=2, ny=2)
+    NN = mesh.number_of_nodes()
+    space = LagrangeFESpace(mesh, p=2)
+    uh = space.interpolate(lambda p: p[..., 0] + 2*p[..., 1])
+    vh = space.function(dim=2)
+    vh[:] = 1.0
+    mesh.nodedata['uh'] = uh
+    mesh.nodedata['vh'] = vh
+    fname = str(tmp_path / 'mesh.vtu')
+    with pytest.warns(UserWarning, match='only the first'):
+        mesh.to_vtk(fname=fname)
+    node, _, nodedata, _ = read_vtu(fname)
+    np.testing.assert_allclose(nodedata['uh'], uh[:NN])
+    np.testing.assert_allclose(nodedata['vh'][:, :2], 1.0)
+
+
+@pytest.mark.parametrize('background', [True, False])
+def test_vtu_writer(tmp_path, background):
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=3, ny=3)
+    NN = mesh.number_of_nodes()
+    u = np.zeros(NN)
+    with VTUWriter(mesh, output_dir=str(tmp_path), prefix='heat',
+            background=background) as writer:
+        for i in range(4):
+            u[:] = i # 写入时复制数据, 之后修改 u 不影响输出
+            writer.write(t=0.1*i, nodedata={'u': u})
+
+    root = ET.parse(str(tmp_path / 'heat.pvd')).getroot()
+    datasets = root.find('Collection').findall('DataSet')
+    assert len(datasets) == 4
+    for i, d in enumerate(datasets):
+        assert float(d.get('timestep')) == pytest.approx(0.1*i)
+        node, cell, nodedata, _ = read_vtu(str(tmp_path / d.get('file')))
+        np.testing.assert_allclose(nodedata['u'], i)
+        assert len(node) == NN
+
+
+def test_vtu_writer_error(tmp_path):
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=2, ny=2)
+    writer = VTUWriter(mesh, output_dir=str(tmp_path))
+    writer.write(nodedata={'u': np.zeros(3)}) # 长度不对
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_write_to_vtu_without_vtk(tmp_path, monkeypatch):
+    # 没有安装 VTK 时也可以导入并写出 vtu 文件
+    import fealpy.mesh.vtk_extent as vtk_extent
+    monkeypatch.setitem(sys.modules, 'vtk', None)
+    module = importlib.reload(vtk_extent)
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=2, ny=2)
+    node, cell, cellType, NC = mesh.to_vtk()
+    fname = str(tmp_path / 'mesh.vtu')
+    module.write_to_vtu(fname, node, NC, cellType, cell)
+    assert os.path.exists(fname)
+    monkeypatch.undo()
+    importlib.reload(vtk_extent)
+
+
+def simulation(NN, queue):
+    queue.put(3)
+    for i in range(3):
+        queue.put({'u': ('pointdata', np.full(NN, float(i)))})
+    queue.put(-1)
+
+
+@pytest.mark.parametrize('series', ['pvd', 'vtk'])
+def test_mesh_writer_run(tmp_path, series):
+    if series == 'vtk':
+        pytest.importorskip('vtk')
+    mesh = TriangleMesh.from_box([0, 1, 0, 1], nx=2, ny=2)
+    NN = mesh.number_of_nodes()
+    writer = MeshWriter(mesh, simulation=simulation, args=(NN, ), series=series)
+    fname = str(tmp_path / 'sim.vtu')
+    writer.run(fname)
+    if series == 'pvd':
+        # 每个时间层一个 vtu 文件和一个 .pvd 文件
+        root = ET.parse(str(tmp_path / 'sim.pvd')).getroot()
+        datasets = root.find('Collection').findall('DataSet')
+        assert len(datasets) == 3
+        _, _, nodedata, _ = read_vtu(str(tmp_path / datasets[-1].get('file')))
+        np.testing.assert_allclose(nodedata['u'], 2.0)
+    else:
+        # 所有时间层在同一个文件中
+        assert os.listdir(str(tmp_path)) == ['sim.vtu']